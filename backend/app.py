@@ -1,16 +1,79 @@
 # backend/app.py
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-from parse_xml import list_snapshots, list_games, parse_boxscore, parse_lineups, parse_pbp, parse_shot_chart, parse_shot_zones
+from parse_xml import DATA_ROOT, list_snapshots, list_games, parse_game_info, parse_boxscore, parse_lineups, parse_pbp, parse_shot_chart, parse_shot_zones
 from parse_pbp_shots import parse_pbp_shots
-from parse_lineup_stints import create_lineup_tracker
+from pbp_feed import MAX_EVENTS, get_pbp_feed, parse_feed_filter
+from game_state import build_game_state, parse_fields
+from game_stream import get_game_stream
+from parse_lineup_stints import create_lineup_tracker, LineupLeaderboard
+from event_store import clock_to_seconds, get_event_store
+from cache_warmer import DEFAULT_GAME_WARMERS, WARM_CACHES, CacheWarmer
+from http_cache import init_http_cache
+from metrics import init_metrics, metrics_response
+from response_cache import init_response_cache, response_stats
+from oncourt_index import get_oncourt_index
+from game_replay import get_game_replay
+from game_simulator import DEFAULT_SIMULATIONS, parse_simulations, simulate_game
+from win_probability import get_win_probability_series
+from scoring_runs import RunDefinition, get_run_detector
+from stat_timelines import get_stat_timeline
+from assist_network import get_assist_network, season_assist_network
+from possession_chains import get_possession_chains
+from lineup_recommender import LineupConstraints, recommend_lineups
+from player_similarity import DEFAULT_MIN_ATTEMPTS, season_similarity_index
+from rapm import DEFAULT_RIDGE_LAMBDA, parse_ridge_lambda, season_rapm
+from onoff_splits import compute_onoff, current_stint_plus_minus, get_onoff_splits, onoff_metrics
+from situations import (SITUATIONS, get_shot_zone_column, get_situation_masks, masked_lineup_stats, masked_shot_stats,
+                        masked_stats, season_situational_stats)
+from season_aggregates import DEFAULT_SNAPSHOT, filter_games, season_partial, season_lineup_stats, season_onoff_stats, season_player_stats
+import logging
+import math
 import os
+import threading
 
 app = Flask(__name__)
 CORS(app)
+init_metrics(app)
+init_http_cache(app)
+init_response_cache(app)
 
-# Add this line to define DATA_ROOT
-DATA_ROOT = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'pbp_snap_shot')
+# Lineup trackers are kept per game so polling only applies newly arrived events
+# (game_id, snapshot_dir_name) -> (event store the tracker was built alongside, tracker)
+lineup_trackers = {}
+lineup_trackers_lock = threading.Lock()
+
+def get_lineup_tracker(game_id, snapshot):
+    """
+    Get the cached tracker for a game, caught up with the latest PBP events
+
+    The tracker reads roster_lineup.xml only when it's built, so it is rebuilt
+    whenever the game's event store is replaced (a new roster file, or PBP
+    that changed rather than grew) and otherwise just applies new events.
+    """
+    snapshot_dir_name = snapshot.lower().replace(' ', '_')
+    key = (game_id, snapshot_dir_name)
+    store = get_event_store(snapshot_dir_name, game_id)
+    if store is None:
+        return None
+    with lineup_trackers_lock:
+        cached = lineup_trackers.get(key)
+        if cached is None or cached[0] is not store:
+            tracker = create_lineup_tracker(
+                game_id=game_id,
+                snapshot=snapshot,
+                home_team_id=store.home_team_id,
+                away_team_id=store.visitor_team_id,
+                verbose=False
+            )
+            lineup_trackers[key] = (store, tracker)
+        else:
+            tracker = cached[1]
+        tracker.process_pbp_events()
+        return tracker
+
+# Builds event stores, on-court indexes and lineup trackers for every game before clients ask
+cache_warmer = CacheWarmer(DEFAULT_GAME_WARMERS + (lambda snapshot, game_id: get_lineup_tracker(game_id, snapshot),))
 
 @app.route('/snapshots', methods=['GET'])
 def get_snapshots():
@@ -18,7 +81,7 @@ def get_snapshots():
         snaps = list_snapshots()
         return jsonify({"snapshots": snaps})
     except Exception as e:
-        print(f"Error in get_snapshots: {e}")
+        app.logger.exception(f"Error in get_snapshots: {e}")
         return jsonify({"error": str(e), "snapshots": []}), 500
 
 @app.route('/games', methods=['GET'])
@@ -30,7 +93,7 @@ def get_games():
         games = list_games(snapshot)
         return jsonify({"games": games})
     except Exception as e:
-        print(f"Error in get_games: {e}")
+        app.logger.exception(f"Error in get_games: {e}")
         return jsonify({"error": str(e), "games": []}), 500
 
 @app.route('/boxscore', methods=['GET'])
@@ -46,7 +109,7 @@ def get_boxscore():
             return jsonify({"error": "No boxscore found"}), 404
         return jsonify(data)
     except Exception as e:
-        print(f"Error in get_boxscore: {e}")
+        app.logger.exception(f"Error in get_boxscore: {e}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/lineups', methods=['GET'])
@@ -60,7 +123,7 @@ def get_lineups():
         lineups = parse_lineups(snapshot, game_id)
         return jsonify({"lineups": lineups})
     except Exception as e:
-        print(f"Error in get_lineups: {e}")
+        app.logger.exception(f"Error in get_lineups: {e}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/pbp', methods=['GET'])
@@ -74,7 +137,43 @@ def get_pbp():
         pbp_data = parse_pbp(snapshot, game_id)
         return jsonify({"pbp": pbp_data})
     except Exception as e:
-        print(f"Error in get_pbp: {e}")
+        app.logger.exception(f"Error in get_pbp: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/pbp-events', methods=['GET'])
+def get_pbp_events():
+    """
+    Get raw play-by-play events newer than since (the nextSince cursor of an
+    earlier response) or since_event_num (an Event_num), optionally filtered by
+    period, msg_type and player_id (comma-separated lists). Pass nextSince back
+    as since to poll for new events
+    """
+    snapshot = request.args.get('snapshot')
+    game_id = request.args.get('game_id')
+    since = request.args.get('since')
+    since_event_num = request.args.get('since_event_num')
+    limit = request.args.get('limit', str(MAX_EVENTS))
+
+    if not snapshot or not game_id:
+        return jsonify({"error": "Please provide snapshot and game_id parameters"}), 400
+
+    try:
+        feed_filter = parse_feed_filter(request.args.get('period'), request.args.get('msg_type'),
+                                        request.args.get('player_id'))
+        feed = get_pbp_feed(snapshot, game_id)
+        if feed is None:
+            return jsonify({"error": "No game info found"}), 404
+        if since:
+            start = feed.position_after_cursor(int(since))
+        elif since_event_num:
+            start = feed.position_after_event_num(int(since_event_num))
+        else:
+            start = 0
+        return jsonify(feed.delta(start, feed_filter, max(1, min(int(limit), MAX_EVENTS))))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.exception(f"Error in get_pbp_events: {e}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/shot-chart', methods=['GET'])
@@ -88,7 +187,7 @@ def get_shot_chart():
         shot_data = parse_shot_chart(snapshot, game_id)
         return jsonify({"shot_chart": shot_data})
     except Exception as e:
-        print(f"Error in get_shot_chart: {e}")
+        app.logger.exception(f"Error in get_shot_chart: {e}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/shot-zones', methods=['GET'])
@@ -107,7 +206,7 @@ def get_shot_zones():
             return jsonify({"error": "No shot data found"}), 404
         return jsonify({"shot_zones": shot_data})
     except Exception as e:
-        print(f"Error in get_shot_zones: {e}")
+        app.logger.exception(f"Error in get_shot_zones: {e}")
         return jsonify({"error": str(e)}), 500
     
 @app.route('/api/shots', methods=['GET'])
@@ -138,37 +237,75 @@ def get_shots():
         return jsonify(shots)
         
     except Exception as e:
-        print(f"Error in get_shots: {e}")
+        app.logger.exception(f"Error in get_shots: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/game-state', methods=['GET'])
+def get_game_state():
+    """Get boxscore, lineups, PBP summary, shot zones and shots in one response; fields= selects a subset"""
+    snapshot = request.args.get('snapshot')
+    game_id = request.args.get('game_id')
+    
+    if not snapshot or not game_id:
+        return jsonify({"error": "Please provide snapshot and game_id parameters"}), 400
+    
+    try:
+        state = build_game_state(snapshot, game_id, parse_fields(request.args.get('fields')))
+        if state is None:
+            return jsonify({"error": "No boxscore found"}), 404
+        return jsonify(state)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.exception(f"Error in get_game_state: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/stream/game-state', methods=['GET'])
+def get_game_state_stream():
+    """Stream the game state as Server-Sent Events: the full state first, then merge patches as files change"""
+    snapshot = request.args.get('snapshot')
+    game_id = request.args.get('game_id')
+    
+    if not snapshot or not game_id:
+        return jsonify({"error": "Please provide snapshot and game_id parameters"}), 400
+    
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    stream = get_game_stream(snapshot, game_id)
+    subscriber = stream.subscribe(fields)
+    return Response(stream.messages(subscriber), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.route('/api/lineup-data/<game_id>/<snapshot>', methods=['GET'])
 def get_lineup_data(game_id, snapshot):
     """Get lineup data for the specified game and snapshot"""
-    # Initialize tracker
-    tracker = create_lineup_tracker(
-        game_id=game_id,
-        snapshot=snapshot,
-        home_team_id="1612709903",
-        away_team_id="1612709924",
-        verbose=False
-    )
-    
-    # Process events and generate report
-    tracker.process_pbp_events()
+    tracker = get_lineup_tracker(game_id, snapshot)
+    if tracker is None:
+        return jsonify({"error": "No game info found"}), 404
+    
     report = tracker.generate_lineup_report()
+    home_id = tracker.home_team_id
+    away_id = tracker.away_team_id
+    
+    # Plus/minus comes from the on/off splits, which follow the boxscore convention
+    oncourt = get_oncourt_index(snapshot, game_id)
+    splits = get_onoff_splits(snapshot, game_id) or {}
     
     # Format data for frontend
     response = {
         "currentLineups": {
             "home": {
-                "teamId": "1612709903",
-                "players": report["currentLineups"]["1612709903"],
-                "currentRun": report["currentRun"]["1612709903"]
+                "teamId": home_id,
+                "players": report["currentLineups"][home_id],
+                "currentRun": report["currentRun"][home_id]
             },
             "away": {
-                "teamId": "1612709924",
-                "players": report["currentLineups"]["1612709924"],
-                "currentRun": report["currentRun"]["1612709924"]
+                "teamId": away_id,
+                "players": report["currentLineups"][away_id],
+                "currentRun": report["currentRun"][away_id]
             }
         },
         "lineupStats": {
@@ -181,11 +318,18 @@ def get_lineup_data(game_id, snapshot):
             }
             for lineup_key, stats in report["lineupStats"].items()
         },
+        "bestLineups": {
+            metric: [
+                {"lineupKey": lineup_key, "value": value}
+                for lineup_key, value in ranked
+            ]
+            for metric, ranked in report["bestLineups"].items()
+        },
         "playerStats": {
             player_id: {
                 "currentStint": {
                     "startTime": player_data["currentStint"]["startTime"],
-                    "plusMinus": player_data["currentStint"]["plusMinus"],
+                    "plusMinus": current_stint_plus_minus(oncourt, player_id) if oncourt else 0,
                     "fgm": player_data["currentStint"]["fgm"],
                     "fga": player_data["currentStint"]["fga"],
                     "stintDuration": player_data["currentStint"]["stintDuration"],
@@ -194,7 +338,7 @@ def get_lineup_data(game_id, snapshot):
                 },
                 "totalStats": {
                     "minutes": player_data["totalStats"]["minutes"],
-                    "plusMinus": player_data["totalStats"]["plusMinus"],
+                    "plusMinus": onoff_metrics(splits[player_id])["plus_minus"] if player_id in splits else 0,
                     "fgm": player_data["totalStats"]["fgm"],
                     "fga": player_data["totalStats"]["fga"],
                     "turnovers": player_data["totalStats"]["turnovers"],
@@ -207,6 +351,590 @@ def get_lineup_data(game_id, snapshot):
     
     return jsonify(response)
 
+@app.route('/api/lineup-recommendation/<game_id>/<snapshot>', methods=['GET'])
+def get_lineup_recommendation(game_id, snapshot):
+    """Propose the best available fives for a team given fouls, minutes and positions"""
+    team_id = request.args.get('team_id')
+    limit = request.args.get('limit', '5')
+    budget_ms = request.args.get('budget_ms', '250')
+    max_minutes = request.args.get('max_minutes')
+    
+    if not team_id:
+        return jsonify({"error": "Please provide team_id parameter"}), 400
+    
+    try:
+        constraints = LineupConstraints(
+            min_positions={group: int(request.args.get(f'min_{group.lower()}', default))
+                           for group, default in LineupConstraints().min_positions.items()},
+            avoid_foul_trouble=request.args.get('allow_foul_trouble') != 'true',
+            max_minutes=float(max_minutes) if max_minutes else None,
+            required=tuple(p for p in request.args.get('required', '').split(',') if p),
+            excluded=tuple(p for p in request.args.get('excluded', '').split(',') if p)
+        )
+        result = recommend_lineups(snapshot, game_id, team_id, constraints, int(limit), int(budget_ms) / 1000)
+        if result is None:
+            return jsonify({"error": "No game info found"}), 404
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.exception(f"Error in get_lineup_recommendation: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/lineup-leaderboard/<game_id>/<snapshot>', methods=['GET'])
+def get_lineup_leaderboard(game_id, snapshot):
+    """Get the top lineups by one metric, cheap enough to poll every few seconds"""
+    metric = request.args.get('metric', 'net_rating')
+    limit = request.args.get('limit', '5')
+    min_possessions = request.args.get('min_possessions')
+    
+    if metric not in LineupLeaderboard.METRICS:
+        return jsonify({"error": f"metric must be one of {', '.join(LineupLeaderboard.METRICS)}"}), 400
+    
+    try:
+        limit = int(limit)
+        min_possessions = int(min_possessions) if min_possessions else None
+        tracker = get_lineup_tracker(game_id, snapshot)
+        if tracker is None:
+            return jsonify({"error": "No game info found"}), 404
+        
+        ranked = tracker.leaderboard.top(metric, limit, min_possessions)
+        return jsonify({
+            "metric": metric,
+            "minPossessions": max(min_possessions or 0, tracker.leaderboard.min_possessions),
+            "lineups": [
+                {
+                    "lineupKey": lineup_key,
+                    "teamId": lineup_key.split('-')[0],
+                    "players": sorted(tracker.lineup_history[lineup_key].players),
+                    "value": value,
+                    "possessions": tracker.lineup_history[lineup_key].possessions_for
+                }
+                for lineup_key, value in ranked
+            ]
+        })
+    except Exception as e:
+        app.logger.exception(f"Error in get_lineup_leaderboard: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/season/lineups', methods=['GET'])
+def get_season_lineups():
+    """Get lineup stats merged across games, optionally by team, month (YYYY-MM) or opponent"""
+    snapshot = request.args.get('snapshot', DEFAULT_SNAPSHOT)
+    team_id = request.args.get('team_id')
+    month = request.args.get('month')
+    opponent_id = request.args.get('opponent_id')
+    
+    if opponent_id and not team_id:
+        return jsonify({"error": "opponent_id requires team_id"}), 400
+    
+    try:
+        min_possessions = int(request.args.get('min_possessions', '0'))
+        partial = season_partial(snapshot, team_id, month, opponent_id)
+        return jsonify({
+            "games": sorted(partial.games),
+            "lineupStats": season_lineup_stats(partial, team_id, min_possessions)
+        })
+    except Exception as e:
+        app.logger.exception(f"Error in get_season_lineups: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/season/players', methods=['GET'])
+def get_season_players():
+    """Get player and stint stats merged across games, with the same filters as /api/season/lineups"""
+    snapshot = request.args.get('snapshot', DEFAULT_SNAPSHOT)
+    team_id = request.args.get('team_id')
+    month = request.args.get('month')
+    opponent_id = request.args.get('opponent_id')
+    
+    if opponent_id and not team_id:
+        return jsonify({"error": "opponent_id requires team_id"}), 400
+    
+    try:
+        partial = season_partial(snapshot, team_id, month, opponent_id)
+        return jsonify({
+            "games": sorted(partial.games),
+            "playerStats": season_player_stats(partial, team_id)
+        })
+    except Exception as e:
+        app.logger.exception(f"Error in get_season_players: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/season/on-off', methods=['GET'])
+def get_season_on_off():
+    """Get on/off splits merged across games, with the same filters as /api/season/lineups"""
+    snapshot = request.args.get('snapshot', DEFAULT_SNAPSHOT)
+    team_id = request.args.get('team_id')
+    month = request.args.get('month')
+    opponent_id = request.args.get('opponent_id')
+    
+    if opponent_id and not team_id:
+        return jsonify({"error": "opponent_id requires team_id"}), 400
+    
+    try:
+        partial = season_partial(snapshot, team_id, month, opponent_id)
+        return jsonify({
+            "games": sorted(partial.games),
+            "players": season_onoff_stats(partial, team_id)
+        })
+    except Exception as e:
+        app.logger.exception(f"Error in get_season_on_off: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/on-court', methods=['GET'])
+def get_on_court():
+    """Get the ten players on the floor at a period and clock, or at an event index"""
+    snapshot = request.args.get('snapshot')
+    game_id = request.args.get('game_id')
+    period = request.args.get('period')
+    clock = request.args.get('clock')
+    event_index = request.args.get('event_index')
+    
+    if not snapshot or not game_id:
+        return jsonify({"error": "Please provide snapshot and game_id parameters"}), 400
+    if event_index is None and (not period or not clock):
+        return jsonify({"error": "Please provide period and clock, or event_index"}), 400
+    
+    try:
+        index = get_oncourt_index(snapshot, game_id)
+        if index is None:
+            return jsonify({"error": "No game info found"}), 404
+        
+        if event_index is not None:
+            event_index = int(event_index)
+            if not 0 <= event_index < len(index.store):
+                return jsonify({"error": "event_index out of range"}), 404
+            on_court = index.on_court_at_event(event_index)
+        else:
+            on_court = index.on_court_at(int(period), clock)
+        
+        home_id, visitor_id = index.team_ids
+        return jsonify({
+            "home": {"teamId": home_id, "players": list(on_court[home_id])},
+            "visitor": {"teamId": visitor_id, "players": list(on_court[visitor_id])}
+        })
+    except Exception as e:
+        app.logger.exception(f"Error in get_on_court: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/player-intervals', methods=['GET'])
+def get_player_intervals():
+    """Get every spell on the floor for a player"""
+    snapshot = request.args.get('snapshot')
+    game_id = request.args.get('game_id')
+    player_id = request.args.get('player_id')
+    
+    if not snapshot or not game_id or not player_id:
+        return jsonify({"error": "Please provide snapshot, game_id and player_id parameters"}), 400
+    
+    try:
+        index = get_oncourt_index(snapshot, game_id)
+        if index is None:
+            return jsonify({"error": "No game info found"}), 404
+        return jsonify({
+            "playerId": player_id,
+            "intervals": [interval.to_dict() for interval in index.intervals_for(player_id)]
+        })
+    except Exception as e:
+        app.logger.exception(f"Error in get_player_intervals: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/on-off', methods=['GET'])
+def get_on_off():
+    """Get every player's on/off court splits for a game"""
+    snapshot = request.args.get('snapshot')
+    game_id = request.args.get('game_id')
+    team_id = request.args.get('team_id')
+    
+    if not snapshot or not game_id:
+        return jsonify({"error": "Please provide snapshot and game_id parameters"}), 400
+    
+    try:
+        splits = get_onoff_splits(snapshot, game_id)
+        if splits is None:
+            return jsonify({"error": "No game info found"}), 404
+        return jsonify({
+            "players": {
+                player_id: onoff_metrics(row)
+                for player_id, row in splits.items()
+                if not team_id or row["team_id"] == team_id
+            }
+        })
+    except Exception as e:
+        app.logger.exception(f"Error in get_on_off: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/runs', methods=['GET'])
+def get_runs():
+    """
+    Get every scoring run in a game. min_points sets the run size (default 8)
+    and window_seconds limits runs to N-0 within that much game time
+    """
+    snapshot = request.args.get('snapshot')
+    game_id = request.args.get('game_id')
+    min_points = request.args.get('min_points', '8')
+    window_seconds = request.args.get('window_seconds')
+    
+    if not snapshot or not game_id:
+        return jsonify({"error": "Please provide snapshot and game_id parameters"}), 400
+    
+    try:
+        definition = RunDefinition(
+            min_points=int(min_points),
+            window_seconds=float(window_seconds) if window_seconds else None
+        )
+        detector = get_run_detector(snapshot, game_id, definition)
+        if detector is None:
+            return jsonify({"error": "No game info found"}), 404
+        return jsonify({
+            "runs": [run.to_dict() for run in detector.runs],
+            "longestRuns": detector.longest_runs()
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.exception(f"Error in get_runs: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/stat-window', methods=['GET'])
+def get_stat_window():
+    """
+    Get team and player stats over a stretch of a game: the last N seconds
+    (last_seconds), one period (period), everything since an event (since_event),
+    or between two moments (from_period/from_clock and to_period/to_clock)
+    """
+    snapshot = request.args.get('snapshot')
+    game_id = request.args.get('game_id')
+    player_ids = request.args.get('player_ids')
+    
+    if not snapshot or not game_id:
+        return jsonify({"error": "Please provide snapshot and game_id parameters"}), 400
+    
+    try:
+        timeline = get_stat_timeline(snapshot, game_id)
+        if timeline is None:
+            return jsonify({"error": "No game info found"}), 404
+        
+        store = timeline.store
+        if request.args.get('last_seconds'):
+            last_seconds = float(request.args['last_seconds'])
+            if not math.isfinite(last_seconds) or last_seconds < 0:
+                raise ValueError("last_seconds must be a non-negative number of seconds")
+            lo, hi = timeline.last_seconds(last_seconds)
+        elif request.args.get('period'):
+            lo, hi = timeline.period_range(int(request.args['period']))
+        elif request.args.get('since_event'):
+            since_event = int(request.args['since_event'])
+            if since_event < 0:
+                raise ValueError("since_event must be a non-negative event index")
+            lo, hi = min(since_event, len(store)), len(store)
+        elif request.args.get('from_period') and request.args.get('from_clock'):
+            start = store.to_elapsed(int(request.args['from_period']), clock_to_seconds(request.args['from_clock']))
+            end = store.elapsed[-1] if len(store) else 0.0
+            if request.args.get('to_period') and request.args.get('to_clock'):
+                end = store.to_elapsed(int(request.args['to_period']), clock_to_seconds(request.args['to_clock']))
+            lo, hi = timeline.event_range(start, end)
+        else:
+            lo, hi = 0, len(store)
+        
+        return jsonify({
+            "fromEvent": lo,
+            "toEvent": hi,
+            "teams": timeline.team_stats(lo, hi),
+            "players": timeline.player_stats(lo, hi, player_ids.split(',') if player_ids else None)
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        app.logger.exception(f"Error in get_stat_window: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/situational', methods=['GET'])
+def get_situational():
+    """Get team, player, lineup, shot zone and on/off stats for one game restricted to a situation (clutch, bonus, ...)"""
+    snapshot = request.args.get('snapshot')
+    game_id = request.args.get('game_id')
+    situation = request.args.get('situation', 'clutch')
+    
+    if not snapshot or not game_id:
+        return jsonify({"error": "Please provide snapshot and game_id parameters"}), 400
+    if situation not in SITUATIONS:
+        return jsonify({"error": f"situation must be one of {', '.join(SITUATIONS)}"}), 400
+    
+    try:
+        result = get_situation_masks(snapshot, game_id)
+        oncourt = get_oncourt_index(snapshot, game_id)
+        if result is None or oncourt is None:
+            return jsonify({"error": "No game info found"}), 404
+        
+        store, masks = result
+        mask = masks[situation]
+        return jsonify({
+            "situation": situation,
+            "events": int(mask.sum()),
+            **masked_stats(store, mask),
+            "lineups": masked_lineup_stats(oncourt, mask),
+            "shots": masked_shot_stats(store, *get_shot_zone_column(store), mask),
+            "onOff": {
+                player_id: onoff_metrics(row)
+                for player_id, row in compute_onoff(oncourt, mask).items()
+            }
+        })
+    except Exception as e:
+        app.logger.exception(f"Error in get_situational: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/season/situational', methods=['GET'])
+def get_season_situational():
+    """Get team, player, lineup and shot zone totals in a situation summed across games, with the same filters as /api/season/lineups"""
+    snapshot = request.args.get('snapshot', DEFAULT_SNAPSHOT)
+    situation = request.args.get('situation', 'clutch')
+    team_id = request.args.get('team_id')
+    month = request.args.get('month')
+    opponent_id = request.args.get('opponent_id')
+    
+    if situation not in SITUATIONS:
+        return jsonify({"error": f"situation must be one of {', '.join(SITUATIONS)}"}), 400
+    if opponent_id and not team_id:
+        return jsonify({"error": "opponent_id requires team_id"}), 400
+    
+    try:
+        game_ids = filter_games(list_games(snapshot), team_id, month, opponent_id)
+        return jsonify({"situation": situation, **season_situational_stats(snapshot, situation, game_ids)})
+    except Exception as e:
+        app.logger.exception(f"Error in get_season_situational: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/assist-network', methods=['GET'])
+def get_assist_network_data():
+    """Get the top passer -> scorer connections and per-player assist totals for a game"""
+    snapshot = request.args.get('snapshot')
+    game_id = request.args.get('game_id')
+    team_id = request.args.get('team_id')
+    limit = request.args.get('limit', '10')
+    
+    if not snapshot or not game_id:
+        return jsonify({"error": "Please provide snapshot and game_id parameters"}), 400
+    
+    try:
+        network = get_assist_network(snapshot, game_id)
+        if network is None:
+            return jsonify({"error": "No game info found"}), 404
+        return jsonify({
+            "connections": network.top_connections(int(limit), team_id),
+            "players": network.player_totals(team_id)
+        })
+    except Exception as e:
+        app.logger.exception(f"Error in get_assist_network_data: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/season/assist-network', methods=['GET'])
+def get_season_assist_network():
+    """Get the assist network merged across games, with the same filters as /api/season/lineups"""
+    snapshot = request.args.get('snapshot', DEFAULT_SNAPSHOT)
+    team_id = request.args.get('team_id')
+    month = request.args.get('month')
+    opponent_id = request.args.get('opponent_id')
+    limit = request.args.get('limit', '25')
+    
+    if opponent_id and not team_id:
+        return jsonify({"error": "opponent_id requires team_id"}), 400
+    
+    try:
+        game_ids = filter_games(list_games(snapshot), team_id, month, opponent_id)
+        network = season_assist_network(snapshot, game_ids)
+        return jsonify({
+            "games": game_ids,
+            "connections": network.top_connections(int(limit), team_id),
+            "players": network.player_totals(team_id)
+        })
+    except Exception as e:
+        app.logger.exception(f"Error in get_season_assist_network: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/rebounds', methods=['GET'])
+def get_rebounds():
+    """Get offensive rebound rate, second-chance points and putback efficiency per team, player and lineup"""
+    snapshot = request.args.get('snapshot')
+    game_id = request.args.get('game_id')
+    include_chains = request.args.get('include_chains') == 'true'
+    
+    if not snapshot or not game_id:
+        return jsonify({"error": "Please provide snapshot and game_id parameters"}), 400
+    
+    try:
+        chains = get_possession_chains(snapshot, game_id)
+        if chains is None:
+            return jsonify({"error": "No game info found"}), 404
+        
+        response = chains.summary()
+        if include_chains:
+            response["chains"] = chains.chains
+        return jsonify(response)
+    except Exception as e:
+        app.logger.exception(f"Error in get_rebounds: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/similar-players', methods=['GET'])
+def get_similar_players():
+    """Get the players whose shot zone and box profiles are closest to a player's across the snapshot's games"""
+    snapshot = request.args.get('snapshot', DEFAULT_SNAPSHOT)
+    player_id = request.args.get('player_id')
+    team_id = request.args.get('team_id')
+    limit = request.args.get('limit', '10')
+    min_attempts = request.args.get('min_attempts', str(DEFAULT_MIN_ATTEMPTS))
+    
+    if not player_id:
+        return jsonify({"error": "Please provide player_id parameter"}), 400
+    
+    try:
+        min_attempts = int(min_attempts)
+        if min_attempts < 0:
+            raise ValueError("min_attempts must be a non-negative number of attempts")
+        limit = int(limit)
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        index = season_similarity_index(snapshot, min_attempts=min_attempts)
+        if player_id not in index.rows:
+            return jsonify({"error": "No profile found for player"}), 404
+        return jsonify({
+            "player": index.describe(player_id),
+            "similar": index.similar(player_id, limit, team_id)
+        })
+    except Exception as e:
+        app.logger.exception(f"Error in get_similar_players: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/season/rapm', methods=['GET'])
+def get_season_rapm():
+    """Get ridge-regressed plus-minus (points per 100 possessions) over every game in a snapshot"""
+    snapshot = request.args.get('snapshot', DEFAULT_SNAPSHOT)
+    team_id = request.args.get('team_id')
+    limit = request.args.get('limit')
+    min_possessions = request.args.get('min_possessions', '0')
+    ridge_lambda = request.args.get('lambda', str(DEFAULT_RIDGE_LAMBDA))
+    
+    try:
+        ridge_lambda = parse_ridge_lambda(ridge_lambda)
+        min_possessions = float(min_possessions)
+        limit = int(limit) if limit else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        solver = season_rapm(snapshot, ridge_lambda=ridge_lambda)
+        return jsonify({
+            **solver.summary(),
+            "players": solver.ratings(team_id, min_possessions, limit)
+        })
+    except Exception as e:
+        app.logger.exception(f"Error in get_season_rapm: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/win-probability', methods=['GET'])
+def get_win_probability():
+    """Simulate the rest of a game for win probability and the final score distribution"""
+    snapshot = request.args.get('snapshot')
+    game_id = request.args.get('game_id')
+    simulations = request.args.get('simulations', str(DEFAULT_SIMULATIONS))
+    seed = request.args.get('seed')
+    
+    if not snapshot or not game_id:
+        return jsonify({"error": "Please provide snapshot and game_id parameters"}), 400
+    
+    try:
+        simulations = parse_simulations(simulations)
+        seed = int(seed) if seed else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        result = simulate_game(snapshot, game_id, simulations, seed)
+        if result is None:
+            return jsonify({"error": "No game info found"}), 404
+        return jsonify(result)
+    except Exception as e:
+        app.logger.exception(f"Error in get_win_probability: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/win-probability-series', methods=['GET'])
+def get_win_probability_chart():
+    """Get the home win probability after every event, plus the biggest swing plays"""
+    snapshot = request.args.get('snapshot')
+    game_id = request.args.get('game_id')
+    limit = request.args.get('limit', '5')
+    
+    if not snapshot or not game_id:
+        return jsonify({"error": "Please provide snapshot and game_id parameters"}), 400
+    
+    try:
+        series = get_win_probability_series(snapshot, game_id)
+        if series is None:
+            return jsonify({"error": "No game info found"}), 404
+        return jsonify({
+            "homeTeamId": series.store.home_team_id,
+            "visitorTeamId": series.store.visitor_team_id,
+            "series": series.series(),
+            "swings": series.swings(int(limit))
+        })
+    except Exception as e:
+        app.logger.exception(f"Error in get_win_probability_chart: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/response-stats', methods=['GET'])
+def get_response_stats():
+    """Get per-endpoint JSON encode time, compression ratio and response cache hits"""
+    return jsonify({"endpoints": response_stats()})
+
+@app.route('/api/cache-status', methods=['GET'])
+def get_cache_status():
+    """Get how far the background cache warmer has got"""
+    return jsonify(cache_warmer.status())
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Get request latency histograms, phase timings, cache hit rates and throughput as Prometheus text"""
+    return metrics_response()
+
+@app.route('/api/game-state-at', methods=['GET'])
+def get_game_state_at():
+    """
+    Get score, lineups, stints, team fouls, current run and box totals as of
+    an event count or a period and clock, for scrubbing back through a game
+    """
+    snapshot = request.args.get('snapshot')
+    game_id = request.args.get('game_id')
+    period = request.args.get('period')
+    clock = request.args.get('clock')
+    event_count = request.args.get('event_count')
+    
+    if not snapshot or not game_id:
+        return jsonify({"error": "Please provide snapshot and game_id parameters"}), 400
+    if event_count is None and (not period or not clock):
+        return jsonify({"error": "Please provide period and clock, or event_count"}), 400
+    
+    try:
+        replay = get_game_replay(snapshot, game_id)
+        if replay is None:
+            return jsonify({"error": "No game info found"}), 404
+        
+        if event_count is not None:
+            state = replay.state_at(int(event_count))
+        else:
+            state = replay.state_at_time(int(period), clock)
+        return jsonify(replay.describe(state))
+    except Exception as e:
+        app.logger.exception(f"Error in get_game_state_at: {e}")
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    # With debug=True this module runs twice; only the reloader's child serves requests
+    if WARM_CACHES and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        cache_warmer.start()
     # Use the port you prefer, just ensure frontend matches
     app.run(host='0.0.0.0', port=5002, debug=True)
@@ -0,0 +1,256 @@
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from flask import Flask
+from werkzeug.exceptions import HTTPException
+
+# Threads running request handlers (XML parsing, model work)
+MAX_WORKERS = int(os.environ.get("ASGI_WORKERS", "8"))
+# Handlers for one game allowed to run at once; further requests for it wait without holding a thread
+PER_GAME_LIMIT = int(os.environ.get("ASGI_PER_GAME_LIMIT", "2"))
+# Threads feeding long-lived streams, kept apart so streams can't starve the handler pool
+STREAM_WORKERS = int(os.environ.get("ASGI_STREAM_WORKERS", "64"))
+STREAMING_PREFIXES = ("/api/stream/",)
+# Request headers that can change a response, so coalesced requests must agree on them
+VARYING_HEADERS = (b"if-none-match", b"if-modified-since", b"accept-encoding", b"origin", b"range")
+
+Response = Tuple[int, List[Tuple[bytes, bytes]], bytes]
+
+def build_environ(scope: Dict, body: bytes) -> Dict:
+    """WSGI environ (PEP 3333) for an ASGI HTTP scope"""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"],
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+        "CONTENT_LENGTH": str(len(body)),
+    }
+    for name, value in scope.get("headers", []):
+        key = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if key == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif key != "CONTENT_LENGTH":
+            key = f"HTTP_{key}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+def start_wsgi(wsgi_app, environ: Dict) -> Tuple[int, List[Tuple[bytes, bytes]], Iterable[bytes]]:
+    """Call a WSGI app, returning its status code, headers and (unconsumed) body iterable"""
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info and started:
+            raise exc_info[1].with_traceback(exc_info[2])
+        started["status"] = int(status.split(" ", 1)[0])
+        started["headers"] = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+
+    iterable = wsgi_app(environ, start_response)
+    if not started:
+        # start_response is allowed to be deferred to the first body chunk
+        iterable = iter(iterable)
+        first = next(iterable, b"")
+        return started["status"], started["headers"], _prepend(first, iterable)
+    return started["status"], started["headers"], iterable
+
+def _prepend(first: bytes, rest) -> Iterable[bytes]:
+    yield first
+    yield from rest
+
+def run_wsgi(wsgi_app, environ: Dict) -> Response:
+    """Run a WSGI app to completion and buffer its body"""
+    status, headers, iterable = start_wsgi(wsgi_app, environ)
+    try:
+        body = b"".join(iterable)
+    finally:
+        if hasattr(iterable, "close"):
+            iterable.close()
+    return status, headers, body
+
+class AsgiAdapter:
+    """
+    ASGI application serving a Flask app from a bounded thread pool.
+
+    The event loop only moves bytes: every handler runs in a pool of
+    MAX_WORKERS threads, and at most PER_GAME_LIMIT of them work on the same
+    game (resolved through the Flask URL map from the game_id and snapshot
+    arguments), so a burst of requests for one slow game waits on the loop
+    instead of taking every thread from requests for other games. Identical
+    concurrent GETs share one handler run. Streaming endpoints are fed from
+    a separate pool because each open stream occupies a thread while it
+    waits for the next message.
+    """
+
+    def __init__(self, app: Flask, max_workers: int = MAX_WORKERS, per_game_limit: int = PER_GAME_LIMIT,
+                 stream_workers: int = STREAM_WORKERS):
+        self.app = app
+        self.per_game_limit = per_game_limit
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="asgi-worker")
+        self.stream_executor = ThreadPoolExecutor(stream_workers, thread_name_prefix="asgi-stream")
+        self._game_limits: Dict[Tuple[str, str], asyncio.Semaphore] = {}
+        # Requests holding or waiting on each game's semaphore
+        self._game_users: Dict[Tuple[str, str], int] = {}
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self._closing = set()
+
+    async def __call__(self, scope: Dict, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        body = await self._read_body(receive)
+        environ = build_environ(scope, body)
+        if scope["path"].startswith(STREAMING_PREFIXES):
+            await self._stream(environ, receive, send)
+            return
+
+        status, headers, content = await self._respond(scope, environ)
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": content if scope["method"] != "HEAD" else b""})
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.stream_executor.shutdown(wait=False, cancel_futures=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    def game_key(self, environ: Dict) -> Optional[Tuple[str, str]]:
+        """(snapshot, game_id) a request works on, or None for requests not tied to one game"""
+        try:
+            _, view_args = self.app.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return None
+        query = parse_qs(environ["QUERY_STRING"])
+        game_id = view_args.get("game_id") or query.get("game_id", [None])[0]
+        snapshot = view_args.get("snapshot") or query.get("snapshot", [""])[0]
+        if not game_id:
+            return None
+        return snapshot.lower().replace(" ", "_"), game_id
+
+    async def _run(self, environ: Dict) -> Response:
+        loop = asyncio.get_running_loop()
+        key = self.game_key(environ)
+        if key is None:
+            return await loop.run_in_executor(self.executor, run_wsgi, self.app, environ)
+
+        # A game's semaphore lives only while requests hold or wait on it, so
+        # made-up game ids don't leave one behind
+        limit = self._game_limits.get(key)
+        if limit is None:
+            limit = self._game_limits[key] = asyncio.Semaphore(self.per_game_limit)
+        self._game_users[key] = self._game_users.get(key, 0) + 1
+        try:
+            async with limit:
+                return await loop.run_in_executor(self.executor, run_wsgi, self.app, environ)
+        finally:
+            self._game_users[key] -= 1
+            if not self._game_users[key]:
+                del self._game_users[key]
+                del self._game_limits[key]
+
+    async def _respond(self, scope: Dict, environ: Dict) -> Response:
+        """Run the handler, or wait for an identical request already in flight"""
+        if scope["method"] not in ("GET", "HEAD"):
+            return await self._run(environ)
+
+        headers = dict(scope.get("headers", []))
+        key = (scope["method"], scope["path"], environ["QUERY_STRING"]) + tuple(headers.get(name) for name in VARYING_HEADERS)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            response = await self._run(environ)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            # Nobody else may be waiting; retrieve the exception so it isn't reported as unhandled
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _stream(self, environ: Dict, receive, send) -> None:
+        """Relay a streaming response chunk by chunk until it ends or the client disconnects"""
+        loop = asyncio.get_running_loop()
+        status, headers, iterable = await loop.run_in_executor(self.stream_executor, start_wsgi, self.app, environ)
+        iterator = iter(iterable)
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+
+        disconnected = asyncio.ensure_future(receive())
+        chunk = None
+        try:
+            while True:
+                chunk = asyncio.ensure_future(loop.run_in_executor(self.stream_executor, next, iterator, None))
+                done, _ = await asyncio.wait({chunk, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                if chunk not in done:
+                    return
+                data = chunk.result()
+                if data is None:
+                    chunk = None
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+                await send({"type": "http.response.body", "body": data, "more_body": True})
+        finally:
+            disconnected.cancel()
+            task = loop.create_task(self._close_stream(chunk, iterable))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    async def _close_stream(self, pending: Optional[asyncio.Future], iterable) -> None:
+        """Close a stream's body once its worker is done waiting for the next chunk"""
+        if pending is not None:
+            await asyncio.wait({pending})
+        if hasattr(iterable, "close"):
+            await asyncio.get_running_loop().run_in_executor(self.stream_executor, iterable.close)
+
+def create_application() -> AsgiAdapter:
+    from app import app, cache_warmer
+    from cache_warmer import WARM_CACHES
+    if WARM_CACHES:
+        cache_warmer.start()
+    return AsgiAdapter(app)
+
+if __name__ == "__main__":
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit("The async server needs uvicorn: pip install uvicorn")
+    uvicorn.run("asgi:create_application", factory=True, host="0.0.0.0", port=5002)
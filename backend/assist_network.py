@@ -0,0 +1,203 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from event_store import MADE_SHOT, PbpEventStore, get_event_store
+from parse_pbp_shots import event_shot_zone
+from parse_xml import list_games
+
+SHOT_ZONES = ("paint", "midRange1", "midRange2", "midRange3", "cornerThree1", "cornerThree2",
+              "wingThree1", "wingThree2", "topKeyThree", "unknown")
+ZONE_INDEX = {zone: position for position, zone in enumerate(SHOT_ZONES)}
+
+class AssistNetwork:
+    """
+    Passer x scorer assist graph for one game or many.
+
+    Assists are appended as (passer, scorer, points, zone) rows and turned
+    into sparse passer x scorer matrices of assist counts and assisted points
+    on demand; the matrices are rebuilt only after new assists arrive. Zone
+    counts are kept per connection so a pair's assisted shots can be broken
+    down by court zone.
+    """
+
+    def __init__(self):
+        self.player_rows: Dict[str, int] = {}
+        self.player_ids: List[str] = []
+        self.player_names: Dict[str, str] = {}
+        self.player_teams: Dict[str, str] = {}
+
+        self._passers: List[int] = []
+        self._scorers: List[int] = []
+        self._points: List[int] = []
+        self.zone_counts: Dict[Tuple[int, int], np.ndarray] = {}
+
+        self._matrices: Optional[Tuple[sparse.csr_matrix, sparse.csr_matrix]] = None
+        self.events_covered = 0
+
+    def _row(self, player_id: str, team_id: str, name: Optional[str]) -> int:
+        if player_id not in self.player_rows:
+            self.player_rows[player_id] = len(self.player_ids)
+            self.player_ids.append(player_id)
+        if name:
+            self.player_names[player_id] = name
+        if team_id:
+            self.player_teams[player_id] = team_id
+        return self.player_rows[player_id]
+
+    def add_assist(self, passer_id: str, scorer_id: str, team_id: str, points: int, zone: str,
+                   passer_name: Optional[str] = None, scorer_name: Optional[str] = None) -> None:
+        """Record one assisted basket"""
+        passer = self._row(passer_id, team_id, passer_name)
+        scorer = self._row(scorer_id, team_id, scorer_name)
+        self._passers.append(passer)
+        self._scorers.append(scorer)
+        self._points.append(points)
+
+        counts = self.zone_counts.setdefault((passer, scorer), np.zeros(len(SHOT_ZONES), dtype=np.int64))
+        counts[ZONE_INDEX.get(zone, ZONE_INDEX["unknown"])] += 1
+        self._matrices = None
+
+    def extend(self, store: PbpEventStore) -> None:
+        """Add assisted baskets from events appended to a game's store since the last call"""
+        for index in range(self.events_covered, len(store)):
+            if store.msg_type[index] != MADE_SHOT:
+                continue
+            event = store.events[index]
+            if event.get("Stat_Category2") != "AST" or not event.get("Person_id2"):
+                continue
+            _, zone = event_shot_zone(event)
+            self.add_assist(
+                event["Person_id2"], event.get("Person_id"), event.get("Team_id", ""),
+                int(store.home_points[index] + store.visitor_points[index]), zone,
+                event.get("Last_name2"), event.get("Last_name")
+            )
+        self.events_covered = len(store)
+
+    def merge(self, other: "AssistNetwork") -> None:
+        """Add every assist of another network to this one"""
+        for passer, scorer, points in zip(other._passers, other._scorers, other._points):
+            passer_id, scorer_id = other.player_ids[passer], other.player_ids[scorer]
+            self._row(passer_id, other.player_teams.get(passer_id, ""), other.player_names.get(passer_id))
+            self._row(scorer_id, other.player_teams.get(scorer_id, ""), other.player_names.get(scorer_id))
+            self._passers.append(self.player_rows[passer_id])
+            self._scorers.append(self.player_rows[scorer_id])
+            self._points.append(points)
+        for (passer, scorer), counts in other.zone_counts.items():
+            key = (self.player_rows[other.player_ids[passer]], self.player_rows[other.player_ids[scorer]])
+            self.zone_counts[key] = self.zone_counts.get(key, 0) + counts
+        self._matrices = None
+
+    def matrices(self) -> Tuple[sparse.csr_matrix, sparse.csr_matrix]:
+        """Sparse passer x scorer matrices of assist counts and assisted points"""
+        if self._matrices is None:
+            size = len(self.player_ids)
+            shape = (size, size)
+            counts = sparse.coo_matrix((np.ones(len(self._passers)), (self._passers, self._scorers)), shape=shape).tocsr()
+            points = sparse.coo_matrix((np.asarray(self._points, dtype=np.float64), (self._passers, self._scorers)), shape=shape).tocsr()
+            self._matrices = (counts, points)
+        return self._matrices
+
+    def top_connections(self, limit: int = 10, team_id: Optional[str] = None) -> List[Dict]:
+        """
+        Passer -> scorer pairs with the most assists
+
+        Args:
+            limit: Number of pairs to return
+            team_id: Only pairs from this team
+
+        Returns:
+            List of connection dicts, most assists first (ties broken by points)
+        """
+        counts, points = self.matrices()
+        counts = counts.tocoo()
+        points_by_pair = points.tocsr()
+
+        passers, scorers, assists = counts.row, counts.col, counts.data
+        if team_id:
+            keep = np.array([self.player_teams.get(self.player_ids[p]) == team_id for p in passers], dtype=bool)
+            passers, scorers, assists = passers[keep], scorers[keep], assists[keep]
+        pair_points = np.asarray(points_by_pair[passers, scorers]).ravel()
+
+        order = np.lexsort((-pair_points, -assists))[:limit]
+        return [self._connection(int(passers[i]), int(scorers[i]), int(assists[i]), int(pair_points[i])) for i in order]
+
+    def _connection(self, passer: int, scorer: int, assists: int, points: int) -> Dict:
+        passer_id, scorer_id = self.player_ids[passer], self.player_ids[scorer]
+        zones = self.zone_counts.get((passer, scorer), np.zeros(len(SHOT_ZONES), dtype=np.int64))
+        return {
+            "passerId": passer_id,
+            "passerName": self.player_names.get(passer_id, ""),
+            "scorerId": scorer_id,
+            "scorerName": self.player_names.get(scorer_id, ""),
+            "teamId": self.player_teams.get(passer_id, ""),
+            "assists": assists,
+            "points": points,
+            "zones": {zone: int(count) for zone, count in zip(SHOT_ZONES, zones) if count},
+        }
+
+    def player_totals(self, team_id: Optional[str] = None) -> Dict[str, Dict]:
+        """Assists made and assisted baskets received per player"""
+        counts, points = self.matrices()
+        given = np.asarray(counts.sum(axis=1)).ravel()
+        received = np.asarray(counts.sum(axis=0)).ravel()
+        points_created = np.asarray(points.sum(axis=1)).ravel()
+        return {
+            player_id: {
+                "name": self.player_names.get(player_id, ""),
+                "teamId": self.player_teams.get(player_id, ""),
+                "assists": int(given[row]),
+                "assistedBaskets": int(received[row]),
+                "pointsCreated": int(points_created[row]),
+            }
+            for row, player_id in enumerate(self.player_ids)
+            if not team_id or self.player_teams.get(player_id) == team_id
+        }
+
+# Networks keyed by (snapshot_dir_name, game_id) -> (store, network)
+_networks: Dict[Tuple[str, str], Tuple[PbpEventStore, AssistNetwork]] = {}
+_networks_lock = threading.Lock()
+
+def get_assist_network(snapshot: str, game_id: str) -> Optional[AssistNetwork]:
+    """
+    Get the assist network for a game, extended with any newly arrived events
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_id: Game identifier
+
+    Returns:
+        AssistNetwork, or None if the game has no event store
+    """
+    store = get_event_store(snapshot, game_id)
+    if store is None:
+        return None
+
+    key = (store.snapshot, game_id)
+    with _networks_lock:
+        cached = _networks.get(key)
+        if cached is None or cached[0] is not store:
+            cached = (store, AssistNetwork())
+            _networks[key] = cached
+        cached[1].extend(store)
+        return cached[1]
+
+def season_assist_network(snapshot: str, game_ids: Optional[List[str]] = None) -> AssistNetwork:
+    """
+    Merge the assist networks of many games
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_ids: Games to include (defaults to every game in the snapshot)
+
+    Returns:
+        New AssistNetwork covering the games
+    """
+    season = AssistNetwork()
+    for game_id in game_ids if game_ids is not None else list_games(snapshot):
+        network = get_assist_network(snapshot, game_id)
+        if network is not None:
+            season.merge(network)
+    return season
@@ -0,0 +1,294 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Backend modules import each other as top-level modules (see app.py), so make
+# the backend directory importable when this file is run as a script
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+# A case regresses when its median is this much slower than the baseline's...
+DEFAULT_THRESHOLD = 0.25
+# ...and slower by at least this many milliseconds, so timer noise on sub-millisecond cases doesn't count
+MIN_DELTA_MS = 0.05
+# Snapshot directory names inside the benchmark data root
+BUNDLED_SNAPSHOT = "end_of_game"
+OVERTIME_SNAPSHOT = "multi_overtime"
+# Run meta that sizes each input; a case is only comparable across runs where it matches
+INPUT_META = {"season": "seasonGames", "multi_ot": "overtimes"}
+FUNCTIONS = ("parse_boxscore", "parse_lineups", "parse_pbp", "parse_shot_chart", "parse_shot_zones",
+             "parse_pbp_shots", "determine_shot_zone", "lineup_tracker_replay")
+
+def write_data_root(target_root: str, season_games: int, overtimes: int) -> None:
+    """Bundled game plus `season_games` clones, and a multi-overtime copy in its own snapshot"""
+    from synthetic_games import write_overtime_game, write_synthetic_games
+    write_synthetic_games(target_root, season_games, snapshots=[BUNDLED_SNAPSHOT])
+    write_overtime_game(target_root, overtimes, snapshot=BUNDLED_SNAPSHOT, target_snapshot=OVERTIME_SNAPSHOT)
+
+def build_cases(season: bool) -> Dict[str, Tuple[Callable[[], object], int]]:
+    """
+    Benchmark cases over the data root in PBP_DATA_ROOT
+
+    Args:
+        season: Include the season-scale cases (every game of the bundled snapshot)
+
+    Returns:
+        "input/function" -> (callable running one measurement, games it covers)
+    """
+    from event_store import MADE_SHOT, MISSED_SHOT, get_event_store
+    from parse_lineup_stints import create_lineup_tracker
+    from parse_pbp_shots import determine_shot_zone, parse_pbp_shots, transform_coordinates, zone_geometry
+    from parse_xml import (DATA_ROOT, list_games, parse_boxscore, parse_game_info, parse_lineups, parse_pbp,
+                           parse_shot_chart, parse_shot_zones)
+    from synthetic_games import SOURCE_GAME_ID
+
+    inputs = {
+        "bundled": [(BUNDLED_SNAPSHOT, SOURCE_GAME_ID)],
+        "multi_ot": [(OVERTIME_SNAPSHOT, game_id) for game_id in list_games(OVERTIME_SNAPSHOT)],
+    }
+    if season:
+        inputs["season"] = [(BUNDLED_SNAPSHOT, game_id) for game_id in list_games(BUNDLED_SNAPSHOT)]
+
+    geometry = zone_geometry()
+    cases = {}
+    for name, games in inputs.items():
+        shot_files = [
+            os.path.join(DATA_ROOT, snapshot, f"{game_id}_pbp_Q{parse_boxscore(snapshot, game_id)['current_period']}.xml")
+            for snapshot, game_id in games
+        ]
+        teams = [(parse_game_info(snapshot, game_id), snapshot, game_id) for snapshot, game_id in games]
+        points = []
+        for snapshot, game_id in games:
+            store = get_event_store(snapshot, game_id)
+            for index in (store.msg_type == MADE_SHOT).nonzero()[0].tolist() + (store.msg_type == MISSED_SHOT).nonzero()[0].tolist():
+                event = store.events[index]
+                points.append(transform_coordinates(int(event.get("LocationX", 0)), int(event.get("LocationY", 0))))
+
+        def over_games(function, games=games):
+            return lambda: [function(snapshot, game_id) for snapshot, game_id in games]
+
+        def replay(teams=teams):
+            for info, snapshot, game_id in teams:
+                tracker = create_lineup_tracker(game_id, snapshot, info["home_id"], info["visitor_id"])
+                tracker.process_pbp_events()
+
+        cases[f"{name}/parse_boxscore"] = (over_games(parse_boxscore), len(games))
+        cases[f"{name}/parse_lineups"] = (over_games(parse_lineups), len(games))
+        cases[f"{name}/parse_pbp"] = (over_games(parse_pbp), len(games))
+        cases[f"{name}/parse_shot_chart"] = (over_games(parse_shot_chart), len(games))
+        cases[f"{name}/parse_shot_zones"] = (over_games(parse_shot_zones), len(games))
+        cases[f"{name}/parse_pbp_shots"] = (lambda files=shot_files: [parse_pbp_shots(path) for path in files], len(games))
+        cases[f"{name}/determine_shot_zone"] = (
+            lambda points=points: [determine_shot_zone(x, y, *geometry) for x, y in points], len(games))
+        cases[f"{name}/lineup_tracker_replay"] = (replay, len(games))
+    return cases
+
+def time_case(function: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Median and best of `repeat` timed runs after one untimed warm-up run"""
+    function()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {"medianMs": round(1000 * statistics.median(timings), 4), "minMs": round(1000 * min(timings), 4),
+            "runs": repeat}
+
+def measure(repeat: int, season_repeat: int, season: bool, only: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """Time every case (or the ones whose name contains one of `only`)"""
+    results = {}
+    for name, (function, games) in build_cases(season).items():
+        if only and not any(pattern in name for pattern in only):
+            continue
+        result = time_case(function, season_repeat if name.startswith("season/") else repeat)
+        if games > 1:
+            result["perGameMs"] = round(result["medianMs"] / games, 4)
+        result["games"] = games
+        results[name] = result
+    return results
+
+def run(season_games: int, overtimes: int, repeat: int, season_repeat: int, only: Optional[List[str]] = None) -> Dict:
+    """
+    Build the benchmark data root and time every case in a fresh process
+
+    The child process reads the data root through PBP_DATA_ROOT, which the
+    backend resolves at import, and starts with no warm caches.
+
+    Returns:
+        {"meta": run details, "results": case -> timings}
+    """
+    with tempfile.TemporaryDirectory(prefix="benchmarks-") as data_root:
+        write_data_root(data_root, season_games, overtimes)
+        output = os.path.join(data_root, "results.json")
+        command = [sys.executable, os.path.abspath(__file__), "measure", output, "--repeat", str(repeat),
+                   "--season-repeat", str(season_repeat)]
+        if not season_games:
+            command.append("--no-season")
+        for pattern in only or []:
+            command += ["--only", pattern]
+        subprocess.run(command, check=True, cwd=BACKEND_DIR, env=dict(os.environ, PBP_DATA_ROOT=data_root))
+        with open(output) as f:
+            results = json.load(f)
+
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "seasonGames": season_games + 1 if season_games else 0,
+            "overtimes": overtimes,
+            "repeat": repeat,
+            "seasonRepeat": season_repeat,
+        },
+        "results": results,
+    }
+
+def input_mismatches(baseline: Dict, current: Dict) -> List[str]:
+    """Descriptions of the inputs the two runs built differently"""
+    mismatches = []
+    for key in INPUT_META.values():
+        before, after = baseline["meta"].get(key), current["meta"].get(key)
+        if before != after:
+            mismatches.append(f"{key}: baseline {before}, current {after}")
+    return mismatches
+
+def compare_results(baseline: Dict, current: Dict, threshold: float = DEFAULT_THRESHOLD,
+                    min_delta_ms: float = MIN_DELTA_MS) -> List[Dict]:
+    """
+    Case by case comparison of two runs' median times
+
+    Cases whose input was built differently (a different season size or
+    overtime count, see INPUT_META) are compared per game when both runs
+    timed several games, and skipped otherwise.
+
+    Args:
+        baseline: Output of run() to compare against
+        current: Output of run() to check
+        threshold: Relative slowdown (0.25 = 25%) that counts as a regression
+        min_delta_ms: Smallest absolute slowdown that counts
+
+    Returns:
+        One row per case in both runs, with the timing it compared ("basis")
+        and status "regression", "improvement", "ok" or "skipped"
+    """
+    rows = []
+    for name in sorted(set(baseline["results"]) & set(current["results"])):
+        meta_key = INPUT_META.get(name.split("/")[0])
+        basis = "medianMs"
+        if meta_key and baseline["meta"].get(meta_key) != current["meta"].get(meta_key):
+            basis = "perGameMs"
+            if basis not in baseline["results"][name] or basis not in current["results"][name]:
+                rows.append({"case": name, "basis": None, "baselineMs": None, "currentMs": None, "ratio": None,
+                             "status": "skipped"})
+                continue
+        before = baseline["results"][name][basis]
+        after = current["results"][name][basis]
+        ratio = after / before if before else float("inf")
+        if ratio > 1 + threshold and after - before >= min_delta_ms:
+            status = "regression"
+        elif ratio < 1 - threshold and before - after >= min_delta_ms:
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append({"case": name, "basis": basis, "baselineMs": before, "currentMs": after, "ratio": round(ratio, 3),
+                     "status": status})
+    return rows
+
+def format_comparison(rows: List[Dict]) -> str:
+    lines = [f"{'case':<36} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}  status"]
+    for row in rows:
+        if row["status"] == "skipped":
+            lines.append(f"{row['case']:<36} {'':>12} {'':>12} {'':>7}  skipped (different input)")
+            continue
+        flag = {"regression": "REGRESSION", "improvement": "faster"}.get(row["status"], "")
+        if row["basis"] == "perGameMs":
+            flag = f"{flag} (per game)".strip()
+        lines.append(f"{row['case']:<36} {row['baselineMs']:>12.3f} {row['currentMs']:>12.3f} {row['ratio']:>7.2f}  {flag}")
+    return "\n".join(lines)
+
+def format_results(report: Dict) -> str:
+    lines = [f"{'case':<36} {'median ms':>12} {'min ms':>12} {'per game ms':>12}"]
+    for name, result in report["results"].items():
+        per_game = f"{result['perGameMs']:>12.3f}" if "perGameMs" in result else f"{'':>12}"
+        lines.append(f"{name:<36} {result['medianMs']:>12.3f} {result['minMs']:>12.3f} {per_game}")
+    return "\n".join(lines)
+
+def baseline_path(name: str) -> str:
+    """A baseline given by name lives in benchmarks/baselines; anything with a slash or .json is a path"""
+    if os.sep in name or name.endswith(".json"):
+        return name
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the XML parsers, shot zones and LineupTracker")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Time every case")
+    run_parser.add_argument("--season-games", type=int, default=100, help="Synthetic games in the season input (0 skips it)")
+    run_parser.add_argument("--overtimes", type=int, default=3, help="Overtime periods in the multi-OT game")
+    run_parser.add_argument("--repeat", type=int, default=15, help="Timed runs per single-game case")
+    run_parser.add_argument("--season-repeat", type=int, default=3, help="Timed runs per season case")
+    run_parser.add_argument("--only", action="append", help="Only cases whose name contains this (repeatable)")
+    run_parser.add_argument("--save", metavar="BASELINE", help="Save the results as a baseline (name or path)")
+    run_parser.add_argument("--compare", metavar="BASELINE", help="Compare against a baseline (name or path)")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Relative slowdown that fails")
+
+    compare_parser = commands.add_parser("compare", help="Compare two saved results")
+    compare_parser.add_argument("baseline", help="Baseline name or path")
+    compare_parser.add_argument("current", help="Results name or path")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Relative slowdown that fails")
+
+    measure_parser = commands.add_parser("measure", help=argparse.SUPPRESS)
+    measure_parser.add_argument("output")
+    measure_parser.add_argument("--repeat", type=int, required=True)
+    measure_parser.add_argument("--season-repeat", type=int, required=True)
+    measure_parser.add_argument("--no-season", action="store_true")
+    measure_parser.add_argument("--only", action="append")
+    args = parser.parse_args()
+
+    if args.command == "measure":
+        results = measure(args.repeat, args.season_repeat, not args.no_season, args.only)
+        with open(args.output, "w") as f:
+            json.dump(results, f)
+        return
+
+    if args.command == "compare":
+        with open(baseline_path(args.baseline)) as f:
+            baseline = json.load(f)
+        with open(baseline_path(args.current)) as f:
+            current = json.load(f)
+    else:
+        current = run(args.season_games, args.overtimes, args.repeat, args.season_repeat, args.only)
+        print(format_results(current))
+        if args.save:
+            os.makedirs(os.path.dirname(os.path.abspath(baseline_path(args.save))), exist_ok=True)
+            with open(baseline_path(args.save), "w") as f:
+                json.dump(current, f, indent=2)
+                f.write("\n")
+            print(f"Saved {baseline_path(args.save)}")
+        if not args.compare:
+            return
+        with open(baseline_path(args.compare)) as f:
+            baseline = json.load(f)
+
+    for mismatch in input_mismatches(baseline, current):
+        print(f"Warning: inputs differ ({mismatch}); those cases are compared per game or skipped")
+    rows = compare_results(baseline, current, args.threshold)
+    print(format_comparison(rows))
+    regressions = [row["case"] for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from event_store import get_event_store, invalidate_event_store
+from game_stream import notify_game_changed
+from http_cache import source_signature
+from oncourt_index import get_oncourt_index
+from parse_pbp_shots import zone_geometry
+from parse_xml import DATA_ROOT, list_games, parse_schedule
+from pbp_feed import get_pbp_feed
+
+logger = logging.getLogger(__name__)
+
+# Seconds between scans of DATA_ROOT for new and changed games
+REFRESH_SECONDS = float(os.environ.get("CACHE_REFRESH_SECONDS", "5"))
+# Set WARM_CACHES=0 to serve without the background warmer
+WARM_CACHES = os.environ.get("WARM_CACHES", "1") != "0"
+
+# Called with (snapshot dir name, game_id) to build one game's cache
+GameWarmer = Callable[[str, str], object]
+
+# Per-game caches every endpoint shares; app.py adds the lineup tracker
+DEFAULT_GAME_WARMERS: Tuple[GameWarmer, ...] = (get_event_store, get_pbp_feed, get_oncourt_index)
+
+def discover_games() -> List[Tuple[str, str]]:
+    """(snapshot dir name, game_id) of every game under DATA_ROOT"""
+    if not os.path.isdir(DATA_ROOT):
+        return []
+    games = []
+    for snapshot_dir_name in sorted(os.listdir(DATA_ROOT)):
+        if os.path.isdir(os.path.join(DATA_ROOT, snapshot_dir_name)):
+            games.extend((snapshot_dir_name, game_id) for game_id in list_games(snapshot_dir_name))
+    return games
+
+def _needs_rebuild(old_signature: tuple, new_signature: tuple) -> bool:
+    """
+    Whether a game's change touched files its event store can't pick up itself
+
+    The store only reads the game info beyond the files in its own signature:
+    growing PBP period files are appended and a new roster_lineup.xml rebuilds
+    it inside get_event_store, and the boxscore (rewritten on every live
+    update) isn't read at all.
+    """
+    changed = {entry[:2] for entry in set(old_signature) ^ set(new_signature)}
+    return any(snapshot_dir_name and filename.endswith("_game_info.xml") for snapshot_dir_name, filename in changed)
+
+class CacheWarmer:
+    """
+    Builds the backend's caches ahead of the requests that need them.
+
+    A background thread warms the shared state (zone geometry, which also
+    pays Shapely's import, and the schedule) and then every game found under
+    DATA_ROOT. After that it rescans every REFRESH_SECONDS, brings games
+    whose file signature changed up to date, and wakes their live streams.
+    New PBP events are appended to the cached stores; a change to the game
+    info drops its event store first, so every cache built on it is rebuilt. The server is ready to take requests the whole time; a
+    request that arrives first just builds the cache itself, as it would
+    without the warmer.
+    """
+
+    def __init__(self, game_warmers: Sequence[GameWarmer] = DEFAULT_GAME_WARMERS,
+                 refresh_seconds: float = REFRESH_SECONDS):
+        self.game_warmers = list(game_warmers)
+        self.refresh_seconds = refresh_seconds
+        # (snapshot dir name, game_id) -> source signature at the last warm
+        self.signatures: Dict[Tuple[str, str], tuple] = {}
+        self.errors: Dict[Tuple[str, str], str] = {}
+        self.warmed = threading.Event()
+        self.passes = 0
+        self.games_warmed = 0
+        self.first_pass_seconds: Optional[float] = None
+        self.last_pass_seconds: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def warm_shared(self) -> None:
+        """Warm the caches that don't belong to one game"""
+        zone_geometry()
+        parse_schedule()
+
+    def warm_game(self, snapshot: str, game_id: str) -> None:
+        """Run every game warmer for one game"""
+        for warmer in self.game_warmers:
+            warmer(snapshot, game_id)
+
+    def refresh(self) -> List[Tuple[str, str]]:
+        """
+        Warm games that are new or whose files changed since the last pass
+
+        Returns:
+            The (snapshot dir name, game_id) pairs that were rebuilt
+        """
+        start = time.perf_counter()
+        self.warm_shared()
+
+        games = discover_games()
+        changed = []
+        for key in games:
+            signature = source_signature(*key)
+            if self.signatures.get(key) == signature:
+                continue
+            known = key in self.signatures
+            if known and _needs_rebuild(self.signatures[key], signature):
+                invalidate_event_store(*key)
+            try:
+                self.warm_game(*key)
+                self.errors.pop(key, None)
+            except Exception as e:
+                logger.exception(f"Error warming {key[0]}/{key[1]}: {e}")
+                self.errors[key] = str(e)
+            self.signatures[key] = signature
+            self.games_warmed += 1
+            changed.append(key)
+            if known:
+                notify_game_changed(*key)
+
+        for key in set(self.signatures) - set(games):
+            del self.signatures[key]
+            self.errors.pop(key, None)
+
+        self.passes += 1
+        self.last_pass_seconds = time.perf_counter() - start
+        if self.first_pass_seconds is None:
+            self.first_pass_seconds = self.last_pass_seconds
+        self.warmed.set()
+        return changed
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.exception(f"Error refreshing caches: {e}")
+            self._stop.wait(self.refresh_seconds)
+
+    def start(self) -> "CacheWarmer":
+        """Start warming on a daemon thread"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="cache-warmer", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def status(self) -> Dict:
+        """Progress of the warmer for the status endpoint"""
+        return {
+            "warmed": self.warmed.is_set(),
+            "games": len(self.signatures),
+            "gamesWarmed": self.games_warmed,
+            "passes": self.passes,
+            "firstPassMs": round(1000 * self.first_pass_seconds, 1) if self.first_pass_seconds is not None else None,
+            "lastPassMs": round(1000 * self.last_pass_seconds, 1) if self.last_pass_seconds is not None else None,
+            "errors": {f"{snapshot}/{game_id}": error for (snapshot, game_id), error in list(self.errors.items())},
+        }
@@ -0,0 +1,295 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from metrics import record_cache, record_events
+from parse_xml import DATA_ROOT, parse_file, parse_game_info
+
+REGULATION_PERIODS = 4
+REGULATION_PERIOD_SECONDS = 720
+OVERTIME_PERIOD_SECONDS = 300
+
+# Msg_type codes used by the PBP feed
+MADE_SHOT = 1
+MISSED_SHOT = 2
+FREE_THROW = 3
+REBOUND = 4
+TURNOVER = 5
+FOUL = 6
+VIOLATION = 7
+SUBSTITUTION = 8
+TIMEOUT = 9
+JUMP_BALL = 10
+PERIOD_START = 12
+PERIOD_END = 13
+
+# Team side codes for the team_side column
+HOME = 0
+VISITOR = 1
+NO_TEAM = -1
+
+def clock_to_seconds(clock_str: str) -> float:
+    """Convert game clock string (MM:SS or SS.s) to seconds"""
+    try:
+        if ':' in clock_str:
+            m, s = clock_str.split(':')
+            return int(m) * 60 + float(s)
+        return float(clock_str)
+    except (TypeError, ValueError):
+        return 0
+
+def default_period_start(period: int) -> float:
+    """Clock value at the start of a period when the feed doesn't say"""
+    return REGULATION_PERIOD_SECONDS if period <= REGULATION_PERIODS else OVERTIME_PERIOD_SECONDS
+
+class PbpEventStore:
+    """
+    All play-by-play events of one game, parsed once and held in memory.
+
+    Raw attributes are kept as dicts in `events` (same keys as the XML, so
+    LineupTracker handlers accept them), and the fields analysis code needs
+    are mirrored into NumPy columns for vectorized work:
+
+        period, clock (seconds remaining), elapsed (seconds since tip-off),
+        msg_type, action_type, pbp_order, event_num, team_side,
+        home_points / visitor_points (scored on the event),
+        home_score / visitor_score (after the event)
+
+    Scores are rebuilt from Pts rather than read from Home_score/Visitor_score,
+    which lag one event behind in the feed. Elapsed time uses the clock on each
+    period's start event, since untimed G League overtime runs down from 99:00.
+    """
+
+    INT_COLUMNS = ("period", "msg_type", "action_type", "pbp_order", "event_num", "team_side",
+                   "home_points", "visitor_points", "home_score", "visitor_score")
+    FLOAT_COLUMNS = ("clock", "elapsed")
+
+    def __init__(self, game_id: str, snapshot: str, home_team_id: str, visitor_team_id: str):
+        self.game_id = game_id
+        self.snapshot = snapshot
+        self.home_team_id = home_team_id
+        self.visitor_team_id = visitor_team_id
+
+        self.events: List[Dict[str, str]] = []
+        for name in self.INT_COLUMNS:
+            setattr(self, name, np.zeros(0, dtype=np.int64))
+        for name in self.FLOAT_COLUMNS:
+            setattr(self, name, np.zeros(0, dtype=np.float64))
+
+        # period -> (first event index, one past last event index)
+        self.period_offsets: Dict[int, Tuple[int, int]] = {}
+        # period -> clock seconds at the start of the period, and elapsed seconds before it
+        self.period_start_clock: Dict[int, float] = {}
+        self.period_base_elapsed: Dict[int, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def team_side_of(self, team_id: Optional[str]) -> int:
+        """Map a Team_id to HOME, VISITOR or NO_TEAM"""
+        if team_id == self.home_team_id:
+            return HOME
+        if team_id == self.visitor_team_id:
+            return VISITOR
+        return NO_TEAM
+
+    def team_id_of(self, side: int) -> Optional[str]:
+        """Map a team side code back to its Team_id"""
+        return {HOME: self.home_team_id, VISITOR: self.visitor_team_id}.get(side)
+
+    def to_elapsed(self, period: int, clock_seconds: float) -> float:
+        """Convert a period and clock reading to seconds since tip-off"""
+        base, start_clock = self._period_origin(period)
+        return base + start_clock - clock_seconds
+
+    def _period_origin(self, period: int) -> Tuple[float, float]:
+        """Elapsed seconds before a period starts and the clock reading it starts from"""
+        if period in self.period_base_elapsed:
+            return self.period_base_elapsed[period], self.period_start_clock[period]
+
+        # A period only ends when the next begins, so assume earlier periods ran to 0:00
+        earlier = [p for p in self.period_base_elapsed if p < period]
+        if earlier:
+            last = max(earlier)
+            base = self.period_base_elapsed[last] + self.period_start_clock[last]
+            first_missing = last + 1
+        else:
+            base, first_missing = 0.0, 1
+        base += sum(default_period_start(p) for p in range(first_missing, period))
+        return base, default_period_start(period)
+
+    def _register_period(self, period: int, start_clock: float) -> None:
+        """Record where a period starts on the elapsed-time axis"""
+        if period in self.period_base_elapsed:
+            return
+        base, _ = self._period_origin(period)
+        self.period_base_elapsed[period] = base
+        self.period_start_clock[period] = start_clock
+
+    def extend(self, new_events: List[Dict[str, str]]) -> None:
+        """
+        Append events that arrived since the store was last updated
+
+        Args:
+            new_events: Event attribute dicts in feed order
+        """
+        if not new_events:
+            return
+
+        started = time.perf_counter()
+        start = len(self.events)
+        columns = {name: [] for name in self.INT_COLUMNS + self.FLOAT_COLUMNS}
+        home_score = int(self.home_score[-1]) if start else 0
+        visitor_score = int(self.visitor_score[-1]) if start else 0
+
+        for offset, event in enumerate(new_events):
+            period = int(event.get("Period", "1"))
+            msg_type = int(event.get("Msg_type", "0"))
+            clock = clock_to_seconds(event.get("Game_clock", "0:00"))
+            if msg_type == PERIOD_START or period not in self.period_base_elapsed:
+                self._register_period(period, clock if msg_type == PERIOD_START else default_period_start(period))
+
+            side = self.team_side_of(event.get("Team_id"))
+            points = int(event.get("Pts", "0") or 0) if msg_type in (MADE_SHOT, FREE_THROW) else 0
+            home_points = points if side == HOME else 0
+            visitor_points = points if side == VISITOR else 0
+            home_score += home_points
+            visitor_score += visitor_points
+
+            columns["period"].append(period)
+            columns["msg_type"].append(msg_type)
+            columns["action_type"].append(int(event.get("Action_type", "0") or 0))
+            columns["pbp_order"].append(int(event.get("PbpOrder", "0") or 0))
+            columns["event_num"].append(int(event.get("Event_num", "0") or 0))
+            columns["team_side"].append(side)
+            columns["home_points"].append(home_points)
+            columns["visitor_points"].append(visitor_points)
+            columns["home_score"].append(home_score)
+            columns["visitor_score"].append(visitor_score)
+            columns["clock"].append(clock)
+            columns["elapsed"].append(self.to_elapsed(period, clock))
+
+            first, _ = self.period_offsets.get(period, (start + offset, start + offset))
+            self.period_offsets[period] = (first, start + offset + 1)
+
+        for name in self.INT_COLUMNS:
+            setattr(self, name, np.concatenate([getattr(self, name), np.asarray(columns[name], dtype=np.int64)]))
+        for name in self.FLOAT_COLUMNS:
+            setattr(self, name, np.concatenate([getattr(self, name), np.asarray(columns[name], dtype=np.float64)]))
+        self.events.extend(new_events)
+        record_events(len(new_events), time.perf_counter() - started)
+
+    def index_at(self, period: int, clock_seconds: float) -> int:
+        """
+        Number of events that happened at or before a moment in the game
+
+        Args:
+            period: Period number
+            clock_seconds: Clock reading in seconds
+
+        Returns:
+            Index one past the last event at or before the moment
+        """
+        return int(np.searchsorted(self.elapsed, self.to_elapsed(period, clock_seconds), side="right"))
+
+def _pbp_files(snapshot_dir: str, game_id: str) -> List[str]:
+    """Period PBP files for a game, in period order"""
+    if not os.path.isdir(snapshot_dir):
+        return []
+    prefix = f"{game_id}_pbp_Q"
+    files = [f for f in os.listdir(snapshot_dir) if f.startswith(prefix) and f.endswith(".xml")]
+    files.sort(key=lambda f: int(f[len(prefix):-len(".xml")]))
+    return [os.path.join(snapshot_dir, f) for f in files]
+
+def _roster_files(snapshot_dir: str, game_id: str) -> List[str]:
+    """The game's roster_lineup.xml (period-start lineups), if it exists yet"""
+    path = os.path.join(snapshot_dir, f"{game_id}_roster_lineup.xml")
+    return [path] if os.path.isfile(path) else []
+
+def files_signature(paths: List[str]) -> tuple:
+    """Names, sizes and modification times of a set of files"""
+    signature = []
+    for path in paths:
+        stat = os.stat(path)
+        signature.append((os.path.basename(path), stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+def read_pbp_events(snapshot_dir: str, game_id: str) -> List[Dict[str, str]]:
+    """Parse every period file of a game into event attribute dicts"""
+    events = []
+    for path in _pbp_files(snapshot_dir, game_id):
+        root = parse_file(path).getroot()
+        events.extend(dict(event.attrib) for event in root.iter("Event_pbp"))
+    return events
+
+# Stores keyed by (snapshot_dir_name, game_id) -> (file signature, store)
+_stores: Dict[Tuple[str, str], Tuple[tuple, PbpEventStore]] = {}
+# Guards _stores and _store_locks; held only briefly, never across a parse
+_stores_lock = threading.Lock()
+# One lock per game so a cold parse only makes requests for the same game wait
+_store_locks: Dict[Tuple[str, str], threading.Lock] = {}
+
+def _store_lock(key: Tuple[str, str]) -> threading.Lock:
+    with _stores_lock:
+        return _store_locks.setdefault(key, threading.Lock())
+
+def invalidate_event_store(snapshot: str, game_id: str) -> None:
+    """
+    Drop a game's cached store so the next get_event_store builds a new one
+
+    For changes the store's own signature doesn't watch (the game info);
+    caches that check `.store is not store` rebuild along with it.
+    """
+    snapshot_dir_name = snapshot.lower().replace(' ', '_')
+    with _stores_lock:
+        _stores.pop((snapshot_dir_name, game_id), None)
+
+def get_event_store(snapshot: str, game_id: str) -> Optional[PbpEventStore]:
+    """
+    Get the in-memory event store for a game, bringing it up to date
+
+    Files are only re-parsed when their sizes or mtimes change. When the feed
+    has only grown, the new events are appended to the existing store so
+    consumers that track len(store) can process just the new tail. A change
+    to roster_lineup.xml replaces the store instead: the period-start lineups
+    in it can change who was on the floor for events already indexed, and
+    every per-game cache built on the store rebuilds when the store does.
+    Games are built under their own lock, so a slow cold parse of one game
+    doesn't hold up lookups for the others.
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_id: Game identifier
+
+    Returns:
+        PbpEventStore, or None if the game info is missing
+    """
+    snapshot_dir_name = snapshot.lower().replace(' ', '_')
+    snapshot_dir = os.path.join(DATA_ROOT, snapshot_dir_name)
+    key = (snapshot_dir_name, game_id)
+    signature = (files_signature(_pbp_files(snapshot_dir, game_id)),
+                 files_signature(_roster_files(snapshot_dir, game_id)))
+
+    with _store_lock(key):
+        with _stores_lock:
+            cached = _stores.get(key)
+        if cached is not None and cached[0] == signature:
+            record_cache("event_store", True)
+            return cached[1]
+        record_cache("event_store", False)
+
+        game_info = parse_game_info(snapshot_dir_name, game_id)
+        if not game_info:
+            return None
+
+        events = read_pbp_events(snapshot_dir, game_id)
+        store = cached[1] if cached is not None and cached[0][1] == signature[1] else None
+        if store is None or len(events) < len(store) or events[:len(store)] != store.events:
+            store = PbpEventStore(game_id, snapshot_dir_name, game_info['home_id'], game_info['visitor_id'])
+        store.extend(events[len(store):])
+
+        with _stores_lock:
+            _stores[key] = (signature, store)
+        return store
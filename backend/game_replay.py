@@ -0,0 +1,262 @@
+import bisect
+import copy
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from event_store import (FOUL, FREE_THROW, MADE_SHOT, MISSED_SHOT, PERIOD_START, REBOUND,
+                         TURNOVER, PbpEventStore, clock_to_seconds)
+from oncourt_index import OnCourtIndex, get_oncourt_index
+
+# Events between stored checkpoints; a lookup replays at most this many
+DEFAULT_CHECKPOINT_INTERVAL = 50
+
+# Foul Action_types that are not personal fouls (technical) or not team fouls (offensive, charge)
+TECHNICAL_FOUL_ACTIONS = {"11"}
+NON_TEAM_FOUL_ACTIONS = {"4", "11", "26"}
+
+BOX_FIELDS = ("points", "fg_made", "fg_attempted", "three_made", "three_attempted", "ft_made", "ft_attempted",
+              "rebounds", "offensive_rebounds", "assists", "steals", "blocks", "turnovers", "fouls")
+
+def bonus_status(period_fouls: int) -> str:
+    """Same thresholds parse_boxscore uses for the team panel"""
+    return "Bonus+" if period_fouls >= 5 else "Bonus" if period_fouls >= 4 else ""
+
+def _empty_box() -> Dict[str, int]:
+    return {name: 0 for name in BOX_FIELDS}
+
+@dataclass
+class GameState:
+    """
+    Everything derived from the first `event_count` events of a game that is
+    cheaper to carry forward than to recompute: score, team fouls in the
+    current period, the current run and player/team box totals.
+    """
+    event_count: int = 0
+    period: int = 1
+    game_clock: str = "12:00"
+    scores: Dict[str, int] = field(default_factory=dict)
+    period_fouls: Dict[str, int] = field(default_factory=dict)
+    run_team: Optional[str] = None
+    run_points: int = 0
+    player_box: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    team_box: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+class GameReplay:
+    """
+    Reconstruct the derived game state as of any event index or game time.
+
+    A full GameState is copied every `checkpoint_interval` events while the
+    game is replayed once, so a lookup copies the nearest earlier checkpoint
+    and applies fewer than `checkpoint_interval` events. Lineups and stints
+    come from the OnCourtIndex rather than being checkpointed.
+    """
+
+    def __init__(self, store: PbpEventStore, oncourt: OnCourtIndex, checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL):
+        self.store = store
+        self.oncourt = oncourt
+        self.checkpoint_interval = checkpoint_interval
+        self.team_ids = (store.home_team_id, store.visitor_team_id)
+        self._opponent = dict(zip(self.team_ids, reversed(self.team_ids)))
+
+        initial = GameState(
+            scores={team_id: 0 for team_id in self.team_ids},
+            period_fouls={team_id: 0 for team_id in self.team_ids},
+            team_box={team_id: _empty_box() for team_id in self.team_ids}
+        )
+        self.checkpoints: List[GameState] = [initial]
+        self._checkpoint_indexes: List[int] = [0]
+        self._live = copy.deepcopy(initial)
+
+        self.extend()
+
+    def extend(self) -> None:
+        """Replay events added to the store since the last call, storing checkpoints"""
+        for index in range(self._live.event_count, len(self.store)):
+            self.apply_event(self._live, index)
+            if self._live.event_count % self.checkpoint_interval == 0:
+                self.checkpoints.append(copy.deepcopy(self._live))
+                self._checkpoint_indexes.append(self._live.event_count)
+
+    def apply_event(self, state: GameState, index: int) -> None:
+        """
+        Advance a state by one event
+
+        Args:
+            state: State covering events [0, index)
+            index: Index of the event to apply
+        """
+        event = self.store.events[index]
+        msg_type = int(self.store.msg_type[index])
+        team_id = event.get("Team_id")
+        player_id = event.get("Person_id")
+
+        state.event_count = index + 1
+        state.game_clock = event.get("Game_clock", state.game_clock)
+        period = int(self.store.period[index])
+        if msg_type == PERIOD_START or period != state.period:
+            state.period = period
+            state.period_fouls = {tid: 0 for tid in self.team_ids}
+
+        if team_id not in state.scores:
+            return
+
+        player_box = None
+        if player_id:
+            player_box = state.player_box.setdefault(player_id, _empty_box())
+        team_box = state.team_box[team_id]
+        boxes = [box for box in (player_box, team_box) if box is not None]
+        second_category = event.get("Stat_Category2")
+        second_box = None
+        if event.get("Person_id2") and second_category in ("AST", "BLK", "ST"):
+            second_box = state.player_box.setdefault(event["Person_id2"], _empty_box())
+        # Blocks and steals belong to the defending team
+        other_team_box = state.team_box[self._opponent[team_id]]
+
+        points = int(self.store.home_points[index] + self.store.visitor_points[index])
+
+        if msg_type in (MADE_SHOT, MISSED_SHOT):
+            is_three = event.get("Option1") == "3"
+            for box in boxes:
+                box["fg_attempted"] += 1
+                box["three_attempted"] += is_three
+                if msg_type == MADE_SHOT:
+                    box["fg_made"] += 1
+                    box["three_made"] += is_three
+            if second_box is not None:
+                if second_category == "AST":
+                    second_box["assists"] += 1
+                    team_box["assists"] += 1
+                elif second_category == "BLK":
+                    second_box["blocks"] += 1
+                    other_team_box["blocks"] += 1
+
+        elif msg_type == FREE_THROW:
+            for box in boxes:
+                box["ft_attempted"] += 1
+                box["ft_made"] += event.get("Option1") == "1"
+
+        elif msg_type == REBOUND:
+            offensive = team_id == event.get("Offensive_Team_id")
+            for box in boxes:
+                box["rebounds"] += 1
+                box["offensive_rebounds"] += offensive
+
+        elif msg_type == TURNOVER:
+            for box in boxes:
+                box["turnovers"] += 1
+            if second_box is not None and second_category == "ST":
+                second_box["steals"] += 1
+                other_team_box["steals"] += 1
+
+        elif msg_type == FOUL:
+            if event.get("Action_type") not in TECHNICAL_FOUL_ACTIONS:
+                for box in boxes:
+                    box["fouls"] += 1
+            if event.get("Action_type") not in NON_TEAM_FOUL_ACTIONS:
+                state.period_fouls[team_id] += 1
+
+        if points:
+            for box in boxes:
+                box["points"] += points
+            state.scores[team_id] += points
+            if state.run_team == team_id:
+                state.run_points += points
+            else:
+                state.run_team = team_id
+                state.run_points = points
+
+    def state_at(self, event_count: int) -> GameState:
+        """
+        Get the state after the first `event_count` events
+
+        Args:
+            event_count: Number of events applied (0 is before tip-off)
+
+        Returns:
+            A GameState the caller may modify
+        """
+        event_count = max(0, min(event_count, self._live.event_count))
+        position = bisect.bisect_right(self._checkpoint_indexes, event_count) - 1
+        state = copy.deepcopy(self.checkpoints[position])
+        for index in range(state.event_count, event_count):
+            self.apply_event(state, index)
+        return state
+
+    def state_at_time(self, period: int, clock: str) -> GameState:
+        """Get the state after every event at or before a period and clock"""
+        return self.state_at(self.store.index_at(period, clock_to_seconds(clock)))
+
+    def describe(self, state: GameState) -> Dict:
+        """
+        Build the full derived game state for a GameState, adding lineups and
+        current stints from the on-court index
+
+        Returns:
+            JSON-ready dict
+        """
+        lineups = {team_id: () for team_id in self.team_ids}
+        stints = {}
+        if state.event_count > 0:
+            last_index = state.event_count - 1
+            lineups = self.oncourt.on_court_at_event(last_index)
+            for players in lineups.values():
+                for player_id in players:
+                    interval = self.oncourt.interval_at(player_id, last_index)
+                    if interval is not None:
+                        stints[player_id] = {
+                            "period": interval.period,
+                            "startElapsed": interval.start_elapsed,
+                            "seconds": float(self.store.elapsed[last_index]) - interval.start_elapsed,
+                        }
+
+        return {
+            "eventCount": state.event_count,
+            "totalEvents": len(self.store),
+            "period": state.period,
+            "gameClock": state.game_clock,
+            "teams": {
+                team_id: {
+                    "score": state.scores[team_id],
+                    "lineup": list(lineups[team_id]),
+                    "periodFouls": state.period_fouls[team_id],
+                    # A team is in the bonus on the other team's fouls
+                    "bonusStatus": bonus_status(state.period_fouls[self._opponent[team_id]]),
+                    "box": state.team_box[team_id],
+                }
+                for team_id in self.team_ids
+            },
+            "currentRun": {"teamId": state.run_team, "points": state.run_points},
+            "stints": stints,
+            "players": state.player_box,
+        }
+
+# Replays keyed by (snapshot_dir_name, game_id)
+_replays: Dict[Tuple[str, str], GameReplay] = {}
+_replays_lock = threading.Lock()
+
+def get_game_replay(snapshot: str, game_id: str) -> Optional[GameReplay]:
+    """
+    Get the replay for a game, extended with any newly arrived events
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_id: Game identifier
+
+    Returns:
+        GameReplay, or None if the game has no event store
+    """
+    oncourt = get_oncourt_index(snapshot, game_id)
+    if oncourt is None:
+        return None
+
+    key = (oncourt.store.snapshot, game_id)
+    with _replays_lock:
+        replay = _replays.get(key)
+        if replay is None or replay.store is not oncourt.store:
+            replay = GameReplay(oncourt.store, oncourt)
+            _replays[key] = replay
+        else:
+            replay.oncourt = oncourt
+            replay.extend()
+        return replay
@@ -0,0 +1,448 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from event_store import (FOUL, FREE_THROW, HOME, MADE_SHOT, MISSED_SHOT, OVERTIME_PERIOD_SECONDS, PERIOD_END,
+                         PERIOD_START, REBOUND, REGULATION_PERIOD_SECONDS, REGULATION_PERIODS, TURNOVER, VISITOR,
+                         PbpEventStore, default_period_start)
+from game_replay import get_game_replay
+from oncourt_index import OnCourtIndex, get_oncourt_index
+from possession_chains import get_possession_chains
+from process_pool import get_process_pool
+from situations import BONUS_FOULS, masked_stats
+
+# Possession outcomes, in sampling order; "free_throws" is a two-shot trip
+OUTCOMES = ("turnover", "miss", "two", "three", "free_throws")
+TURNOVER_OUTCOME, MISS_OUTCOME, TWO_OUTCOME, THREE_OUTCOME, FREE_THROW_OUTCOME = range(len(OUTCOMES))
+
+# League-typical rates each team's numbers are shrunk toward, worth PRIOR_POSSESSIONS possessions
+PRIOR_OUTCOMES = np.array([0.13, 0.42, 0.26, 0.11, 0.08])
+PRIOR_POSSESSIONS = 40
+PRIOR_FT_PCT = 0.76
+PRIOR_OREB_RATE = 0.27
+PRIOR_SECONDS_PER_POSSESSION = 14.0
+PRIOR_FOUL_RATE = 0.18
+# The current lineups' own possessions count this many times over in the blend
+LINEUP_WEIGHT = 2.0
+# Share of missed-shot probability that turns into a free throw trip when the defense is in the bonus
+BONUS_FREE_THROW_SHIFT = 0.15
+# G League overtime is untimed: the first team to score this many points in it wins
+UNTIMED_OVERTIME_POINTS = 7
+MAX_OVERTIMES = 10
+
+DEFAULT_SIMULATIONS = 20000
+MAX_SIMULATIONS = 200000
+# Batches smaller than this aren't worth sending to another process
+MIN_BATCH_SIZE = 2500
+DURATION_SAMPLES = 4096
+# Cached results kept for distinct (game, simulation count) pairs; the least recently used is dropped
+MAX_RESULTS = 16
+
+@dataclass
+class SimulationState:
+    """Where a game stands when the simulation starts"""
+    home_score: int = 0
+    visitor_score: int = 0
+    period: int = 1
+    clock: float = REGULATION_PERIOD_SECONDS
+    # HOME, VISITOR, or -1 when a loose ball/rebound is still to be decided
+    possession: int = -1
+    home_fouls: int = 0
+    visitor_fouls: int = 0
+    # Score each team must reach to win the current untimed overtime, if in one
+    home_target: Optional[int] = None
+    visitor_target: Optional[int] = None
+
+@dataclass
+class TeamRates:
+    """Per-possession model of one team's offense (and its defense's fouling)"""
+    outcomes: Tuple[float, ...] = tuple(PRIOR_OUTCOMES)
+    ft_pct: float = PRIOR_FT_PCT
+    oreb_rate: float = PRIOR_OREB_RATE
+    foul_rate: float = PRIOR_FOUL_RATE
+
+@dataclass
+class SimulationParams:
+    home: TeamRates
+    visitor: TeamRates
+    seconds_per_possession: float = PRIOR_SECONDS_PER_POSSESSION
+    untimed_overtime_points: Optional[int] = UNTIMED_OVERTIME_POINTS
+
+def possession_after(store: PbpEventStore) -> int:
+    """
+    Which side has the ball after the last event
+
+    Returns:
+        HOME or VISITOR, or -1 when it can't be told (missed shot waiting on the rebound, period break)
+    """
+    for index in range(len(store) - 1, -1, -1):
+        side = int(store.team_side[index])
+        msg_type = int(store.msg_type[index])
+        if msg_type in (PERIOD_START, PERIOD_END):
+            return -1
+        if side < 0:
+            continue
+        if msg_type in (MADE_SHOT, TURNOVER):
+            return 1 - side
+        if msg_type == REBOUND:
+            return side
+        if msg_type == FREE_THROW:
+            return 1 - side if store.events[index].get("Option1") == "1" else -1
+        if msg_type == FOUL:
+            return 1 - side
+        if msg_type == MISSED_SHOT:
+            return -1
+    return -1
+
+def team_rates(stats: Dict[str, int], lineup_stats: Optional[Dict[str, int]], offensive_rebounds: int,
+               rebound_chances: int, fouls_committed: int, opponent_possessions: float) -> TeamRates:
+    """
+    Blend a team's game-to-date numbers with its current lineup's and the league prior
+
+    Args:
+        stats: Team TIMELINE_STATS totals for the game
+        lineup_stats: The same totals over events with the current lineup on the floor
+        offensive_rebounds: Team offensive rebounds
+        rebound_chances: Rebounds available after the team's misses
+        fouls_committed: Team fouls committed
+        opponent_possessions: Opponent possessions so far
+
+    Returns:
+        TeamRates
+    """
+    def outcome_counts(box: Dict[str, int]) -> np.ndarray:
+        twos = box["fg_made"] - box["three_made"]
+        return np.array([box["turnovers"], box["fg_attempted"] - box["fg_made"], twos, box["three_made"],
+                         box["ft_attempted"] / 2], dtype=np.float64)
+
+    counts = PRIOR_OUTCOMES * PRIOR_POSSESSIONS + outcome_counts(stats)
+    ft_made, ft_attempted = stats["ft_made"], stats["ft_attempted"]
+    if lineup_stats is not None:
+        counts += LINEUP_WEIGHT * outcome_counts(lineup_stats)
+        ft_made += LINEUP_WEIGHT * lineup_stats["ft_made"]
+        ft_attempted += LINEUP_WEIGHT * lineup_stats["ft_attempted"]
+
+    prior_weight = PRIOR_POSSESSIONS / 4
+    return TeamRates(
+        outcomes=tuple(counts / counts.sum()),
+        ft_pct=(ft_made + PRIOR_FT_PCT * prior_weight) / (ft_attempted + prior_weight),
+        oreb_rate=(offensive_rebounds + PRIOR_OREB_RATE * prior_weight) / (rebound_chances + prior_weight),
+        foul_rate=(fouls_committed + PRIOR_FOUL_RATE * PRIOR_POSSESSIONS) / (opponent_possessions + PRIOR_POSSESSIONS),
+    )
+
+def simulate_batch(state: SimulationState, params: SimulationParams, count: int, seed) -> Dict[str, np.ndarray]:
+    """
+    Play out `count` rest-of-game trajectories in lockstep
+
+    Every loop iteration plays one possession in every unfinished game:
+    sample the outcome for the side with the ball, the free throws, the
+    offensive rebound on a miss, a defensive foul toward the bonus, and the
+    seconds it took. Periods roll over when the clock runs out; a tie after
+    regulation goes to overtime, timed or untimed per params.
+
+    Args:
+        state: Starting state
+        params: Team rates and pace
+        count: Number of trajectories
+        seed: Anything np.random.default_rng accepts
+
+    Returns:
+        Dict with final "home" and "visitor" scores (int arrays of length count)
+    """
+    rng = np.random.default_rng(seed)
+    rates = (params.home, params.visitor)
+    cumulative = np.array([np.cumsum(r.outcomes) for r in rates])
+    bonus_cumulative = []
+    for r in rates:
+        shifted = np.array(r.outcomes)
+        moved = shifted[MISS_OUTCOME] * BONUS_FREE_THROW_SHIFT
+        shifted[MISS_OUTCOME] -= moved
+        shifted[FREE_THROW_OUTCOME] += moved
+        bonus_cumulative.append(np.cumsum(shifted))
+    bonus_cumulative = np.array(bonus_cumulative)
+    ft_pct = np.array([r.ft_pct for r in rates])
+    oreb_rate = np.array([r.oreb_rate for r in rates])
+    # Indexed by the defending side
+    foul_rate = np.array([r.foul_rate for r in rates])
+
+    scores = np.tile(np.array([state.home_score, state.visitor_score], dtype=np.int64), (count, 1))
+    fouls = np.tile(np.array([state.home_fouls, state.visitor_fouls], dtype=np.int64), (count, 1))
+    period = np.full(count, state.period, dtype=np.int64)
+    clock = np.full(count, float(state.clock))
+    possession = np.full(count, state.possession, dtype=np.int64)
+    unknown = possession < 0
+    possession[unknown] = rng.integers(0, 2, unknown.sum())
+    targets = np.full((count, 2), -1, dtype=np.int64)
+    if state.home_target is not None and state.visitor_target is not None:
+        targets[:] = (state.home_target, state.visitor_target)
+    untimed = targets[:, 0] >= 0
+    # A game that is already over stays at its final score
+    finished = (untimed & (scores >= targets).any(axis=1)) | \
+               (~untimed & (clock <= 0) & (period >= REGULATION_PERIODS) & (scores[:, 0] != scores[:, 1]))
+    done = finished.copy()
+
+    rows = np.arange(count)
+    # Outcome CDF columns for each (offense side, defense in the bonus) table
+    tables = np.array([cumulative[0], bonus_cumulative[0], cumulative[1], bonus_cumulative[1]], dtype=np.float32)
+    thresholds = [tables[:, column].copy() for column in range(len(OUTCOMES) - 1)]
+    outcome_points = np.array([0, 0, 2, 3, 0])
+    # Possession lengths are drawn from a table of gamma samples, which is cheaper than sampling per step
+    durations = rng.gamma(4.0, params.seconds_per_possession / 4.0, DURATION_SAMPLES)
+
+    # Finished games stay in the arrays and are masked out, which beats re-gathering the live rows every step
+    while not done.all():
+        live = ~done
+        offense = possession
+        defense = 1 - offense
+        draws = rng.random((6, count), dtype=np.float32)
+
+        # Defensive foul before the outcome: in the bonus it turns the possession into free throws
+        in_bonus = fouls[rows, defense] >= BONUS_FOULS
+        fouled = live & (draws[0] < foul_rate[defense])
+        fouls[rows, defense] += fouled
+
+        table = offense * 2 + in_bonus
+        outcome = np.zeros(count, dtype=np.int64)
+        for column in thresholds:
+            outcome += draws[1] >= column[table]
+        outcome[fouled & in_bonus] = FREE_THROW_OUTCOME
+
+        free_throws = outcome == FREE_THROW_OUTCOME
+        made_free_throws = (draws[2] < ft_pct[offense]).astype(np.int64) + (draws[3] < ft_pct[offense])
+        points = np.where(free_throws, made_free_throws, outcome_points[outcome])
+        scores[rows, offense] += points * live
+
+        keep_ball = (outcome == MISS_OUTCOME) & (draws[4] < oreb_rate[offense])
+        possession = np.where(live & ~keep_ball, defense, offense)
+
+        # Untimed overtime ends on the target score; everything else runs the clock
+        timed = live & ~untimed
+        clock -= durations[(draws[5] * DURATION_SAMPLES).astype(np.int64)] * timed
+        done |= live & untimed & (scores >= targets).any(axis=1)
+
+        expired = np.flatnonzero(timed & (clock <= 0))
+        if len(expired):
+            decided = (period[expired] >= REGULATION_PERIODS) & (scores[expired, 0] != scores[expired, 1])
+            decided |= period[expired] >= REGULATION_PERIODS + MAX_OVERTIMES
+            done[expired[decided]] = True
+            carry_on = expired[~decided]
+            period[carry_on] += 1
+            fouls[carry_on] = 0
+            possession[carry_on] = rng.integers(0, 2, len(carry_on))
+            overtime = carry_on[period[carry_on] > REGULATION_PERIODS]
+            clock[carry_on] = REGULATION_PERIOD_SECONDS
+            clock[overtime] = OVERTIME_PERIOD_SECONDS
+            if params.untimed_overtime_points is not None and len(overtime):
+                targets[overtime] = scores[overtime] + params.untimed_overtime_points
+                untimed[overtime] = True
+
+    return {"home": scores[:, HOME], "visitor": scores[:, VISITOR]}
+
+def _simulate_entry(args: tuple) -> Dict[str, np.ndarray]:
+    """Process pool entry point, which takes a single picklable argument"""
+    return simulate_batch(*args)
+
+def run_simulations(state: SimulationState, params: SimulationParams, simulations: int = DEFAULT_SIMULATIONS,
+                    seed: Optional[int] = None, use_pool: bool = True, max_workers: Optional[int] = None) -> Dict:
+    """
+    Simulate the rest of a game many times and summarize the outcomes
+
+    Args:
+        state: Starting state
+        params: Team rates and pace
+        simulations: Number of trajectories
+        seed: Seed for reproducible results
+        use_pool: Split the work into one batch per worker and run them in the shared process pool
+        max_workers: Process pool size (defaults to the CPU count; only used when the pool is first created)
+
+    Returns:
+        JSON-ready dict with win probabilities, expected and most likely final scores and the margin distribution
+    """
+    if simulations < 1:
+        raise ValueError("simulations must be at least 1")
+    started = time.perf_counter()
+    workers = max_workers or os.cpu_count() or 1
+    parts = min(workers, simulations // MIN_BATCH_SIZE) if use_pool else 1
+    batches = [len(part) for part in np.array_split(np.arange(simulations), max(parts, 1))]
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    jobs = [(state, params, size, batch_seed) for size, batch_seed in zip(batches, seeds)]
+
+    if use_pool and len(jobs) > 1:
+        results = list(get_process_pool(max_workers).map(_simulate_entry, jobs))
+    else:
+        results = [_simulate_entry(job) for job in jobs]
+
+    home = np.concatenate([r["home"] for r in results])
+    visitor = np.concatenate([r["visitor"] for r in results])
+    margin = home - visitor
+    margins, margin_counts = np.unique(margin, return_counts=True)
+    finals, final_counts = np.unique(np.column_stack([home, visitor]), axis=0, return_counts=True)
+    likely = np.argsort(-final_counts, kind="stable")[:10]
+
+    return {
+        "simulations": int(len(home)),
+        "homeWinProbability": float((margin > 0).mean()),
+        "visitorWinProbability": float((margin < 0).mean()),
+        "tieProbability": float((margin == 0).mean()),
+        "expectedScore": {"home": float(home.mean()), "visitor": float(visitor.mean())},
+        "margin": {
+            "mean": float(margin.mean()),
+            "percentiles": {str(p): float(v) for p, v in zip((5, 25, 50, 75, 95), np.percentile(margin, (5, 25, 50, 75, 95)))},
+        },
+        "marginDistribution": [
+            {"margin": int(m), "probability": float(c / len(margin))} for m, c in zip(margins, margin_counts)
+        ],
+        "likelyFinalScores": [
+            {"home": int(finals[i, 0]), "visitor": int(finals[i, 1]), "probability": float(final_counts[i] / len(home))}
+            for i in likely
+        ],
+        "elapsedMs": round((time.perf_counter() - started) * 1000, 2),
+    }
+
+def game_simulation_inputs(oncourt: OnCourtIndex) -> Tuple[SimulationState, SimulationParams]:
+    """
+    Build the starting state and team rates from a game's events so far
+
+    Args:
+        oncourt: On-court index of the game
+
+    Returns:
+        Tuple of (SimulationState, SimulationParams)
+    """
+    store = oncourt.store
+    team_ids = (store.home_team_id, store.visitor_team_id)
+    count = len(store)
+
+    state = SimulationState(possession=possession_after(store))
+    untimed = True
+    if count:
+        replay = get_game_replay(store.snapshot, store.game_id)
+        current = replay.state_at(count)
+        period = int(store.period[-1])
+        state.home_score, state.visitor_score = int(store.home_score[-1]), int(store.visitor_score[-1])
+        state.period = period
+        state.clock = float(store.clock[-1])
+        state.home_fouls, state.visitor_fouls = (current.period_fouls.get(t, 0) for t in team_ids)
+        if period > REGULATION_PERIODS:
+            untimed = store.period_start_clock.get(period, 0) > default_period_start(period)
+            if untimed:
+                first = store.period_offsets[period][0]
+                start_scores = (int(store.home_score[first] - store.home_points[first]),
+                                int(store.visitor_score[first] - store.visitor_points[first]))
+                state.home_target, state.visitor_target = (s + UNTIMED_OVERTIME_POINTS for s in start_scores)
+
+    whole_game = masked_stats(store, np.ones(count, dtype=bool))["teams"]
+    lineups = oncourt.on_court_at_event(count - 1) if count else {}
+    chains = get_possession_chains(store.snapshot, store.game_id)
+    chain_teams = chains.summary()["teams"] if chains is not None else {}
+
+    possessions = {t: whole_game[t]["fg_attempted"] + whole_game[t]["turnovers"] + whole_game[t]["ft_attempted"] / 2
+                   for t in team_ids}
+    rates = []
+    for side, team_id in enumerate(team_ids):
+        lineup_stats = None
+        players = lineups.get(team_id)
+        if players:
+            mask = (store.team_side == side) & np.all([oncourt_mask(oncourt, p) for p in players], axis=0)
+            lineup_stats = masked_stats(store, mask)["teams"][team_id]
+        chain_row = chain_teams.get(team_id, {})
+        rates.append(team_rates(
+            whole_game[team_id], lineup_stats,
+            chain_row.get("offensive_rebounds", 0), chain_row.get("offensive_rebound_chances", 0),
+            whole_game[team_id]["fouls"], possessions[team_ids[1 - side]],
+        ))
+
+    elapsed = float(store.elapsed[-1]) if count else 0.0
+    total_possessions = sum(possessions.values())
+    pace = (elapsed + PRIOR_SECONDS_PER_POSSESSION * PRIOR_POSSESSIONS) / (total_possessions + PRIOR_POSSESSIONS)
+    params = SimulationParams(rates[0], rates[1], pace, UNTIMED_OVERTIME_POINTS if untimed else None)
+    return state, params
+
+def oncourt_mask(oncourt: OnCourtIndex, player_id: str) -> np.ndarray:
+    """Boolean mask of the events a player was on the floor for"""
+    mask = np.zeros(len(oncourt.store), dtype=bool)
+    for interval in oncourt.intervals_for(player_id):
+        end = interval.end_event if interval.end_event is not None else len(oncourt.store)
+        mask[interval.start_event:end] = True
+    return mask
+
+def describe_inputs(state: SimulationState, params: SimulationParams) -> Dict:
+    """Starting state and rates as returned alongside the simulation results"""
+    def rates(team: TeamRates) -> Dict:
+        return {
+            "outcomes": dict(zip(OUTCOMES, (round(p, 4) for p in team.outcomes))),
+            "ftPct": round(team.ft_pct, 4),
+            "offensiveReboundRate": round(team.oreb_rate, 4),
+            "foulRate": round(team.foul_rate, 4),
+        }
+    return {
+        "state": asdict(state),
+        "home": rates(params.home),
+        "visitor": rates(params.visitor),
+        "secondsPerPossession": round(params.seconds_per_possession, 2),
+    }
+
+# Results keyed by (snapshot_dir_name, game_id, simulations) -> (store, events covered, result),
+# least recently used first
+_results: "OrderedDict[Tuple[str, str, int], Tuple[PbpEventStore, int, Dict]]" = OrderedDict()
+_results_lock = threading.Lock()
+
+def parse_simulations(value: str) -> int:
+    """
+    Parse a simulation count from a query parameter
+
+    Raises:
+        ValueError: If it isn't a whole number from 1 to MAX_SIMULATIONS
+    """
+    try:
+        simulations = int(value)
+    except (TypeError, ValueError):
+        simulations = 0
+    if not 1 <= simulations <= MAX_SIMULATIONS:
+        raise ValueError(f"simulations must be a whole number from 1 to {MAX_SIMULATIONS}")
+    return simulations
+
+def simulate_game(snapshot: str, game_id: str, simulations: int = DEFAULT_SIMULATIONS,
+                  seed: Optional[int] = None) -> Optional[Dict]:
+    """
+    Win probability and final score distribution for the rest of a game
+
+    Results are cached until new events arrive (unless a seed is given, which
+    always reruns).
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_id: Game identifier
+        simulations: Number of trajectories
+        seed: Seed for reproducible results
+
+    Returns:
+        Simulation summary plus the inputs it used, or None if the game has no event store
+    """
+    oncourt = get_oncourt_index(snapshot, game_id)
+    if oncourt is None:
+        return None
+    store = oncourt.store
+
+    key = (store.snapshot, game_id, simulations)
+    if seed is None:
+        with _results_lock:
+            cached = _results.get(key)
+            if cached is not None and cached[0] is store and cached[1] == len(store):
+                _results.move_to_end(key)
+                return cached[2]
+
+    state, params = game_simulation_inputs(oncourt)
+    result = {**run_simulations(state, params, simulations, seed), "inputs": describe_inputs(state, params)}
+    if seed is None:
+        with _results_lock:
+            _results[key] = (store, len(store), result)
+            _results.move_to_end(key)
+            while len(_results) > MAX_RESULTS:
+                _results.popitem(last=False)
+    return result
@@ -0,0 +1,70 @@
+import os
+from typing import Dict, Iterable, Optional
+
+from parse_pbp_shots import parse_pbp_shots
+from parse_xml import (DATA_ROOT, parse_boxscore, parse_lineups, parse_pbp, parse_shot_chart, parse_shot_zones,
+                       shared_parse)
+
+# Sections of the game state, in response order
+GAME_STATE_FIELDS = ("boxscore", "lineups", "pbp", "shotChart", "shotZones", "shots")
+
+def parse_fields(fields: Optional[str]) -> Iterable[str]:
+    """
+    Validate a comma-separated field selection
+
+    Args:
+        fields: e.g. "boxscore,lineups"; every field when empty
+
+    Returns:
+        Selected fields in GAME_STATE_FIELDS order
+    """
+    if not fields:
+        return GAME_STATE_FIELDS
+    selected = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = selected - set(GAME_STATE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(field for field in GAME_STATE_FIELDS if field in selected)
+
+def _current_period_shots(snapshot: str, game_id: str, boxscore: Dict) -> Dict:
+    """Shots as served by /api/shots, located through the boxscore's current period file"""
+    snapshot_dir_name = snapshot.lower().replace(' ', '_')
+    pbp_path = os.path.join(DATA_ROOT, snapshot_dir_name, f"{game_id}_pbp_Q{boxscore.get('current_period', 1)}.xml")
+    if not os.path.exists(pbp_path):
+        return {"shots": []}
+    return parse_pbp_shots(pbp_path)
+
+def build_game_state(snapshot: str, game_id: str, fields: Iterable[str] = GAME_STATE_FIELDS) -> Optional[Dict]:
+    """
+    Everything the game view needs from one pass over the snapshot files
+
+    The boxscore is parsed once and handed to the lineup and shot parsers,
+    and inside shared_parse() every XML file (the current period's PBP file
+    in particular, which five of the parsers read) is parsed at most once.
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_id: Game identifier
+        fields: Sections to include (see GAME_STATE_FIELDS)
+
+    Returns:
+        Dict with the selected sections, each shaped like its standalone
+        endpoint's payload, or None if the game has no boxscore
+    """
+    with shared_parse():
+        boxscore = parse_boxscore(snapshot, game_id)
+        if boxscore is None:
+            return None
+
+        builders = {
+            "boxscore": lambda: boxscore,
+            "lineups": lambda: parse_lineups(snapshot, game_id, boxscore_data=boxscore),
+            "pbp": lambda: parse_pbp(snapshot, game_id),
+            "shotChart": lambda: parse_shot_chart(snapshot, game_id, boxscore_data=boxscore),
+            "shotZones": lambda: parse_shot_zones(snapshot, game_id, boxscore_data=boxscore),
+            "shots": lambda: _current_period_shots(snapshot, game_id, boxscore),
+        }
+        state = {"gameId": game_id, "snapshot": snapshot}
+        for field in fields:
+            state[field] = builders[field]()
+        return state
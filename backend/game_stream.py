@@ -0,0 +1,220 @@
+import json
+import logging
+import queue
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from game_state import GAME_STATE_FIELDS, build_game_state
+from http_cache import source_signature
+
+logger = logging.getLogger(__name__)
+
+# How often a watched game's files are checked for changes
+POLL_SECONDS = 1.0
+# Seconds between keep-alive comments on an idle stream
+KEEPALIVE_SECONDS = 15.0
+# Seconds a game keeps being watched after its last client leaves
+IDLE_SECONDS = 30.0
+# Pending messages per client; a client that falls further behind is resynced with the full state
+CLIENT_QUEUE_SIZE = 16
+
+def merge_patch(old, new):
+    """
+    JSON merge patch (RFC 7386) that turns old into new
+
+    Dicts are diffed key by key, removed keys become None and anything else
+    that changed (lists included) is replaced whole.
+
+    Returns:
+        The patch, or None when old and new are equal
+    """
+    if old == new:
+        return None
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return new
+    patch = {key: None for key in old if key not in new}
+    for key, value in new.items():
+        if key not in old:
+            patch[key] = value
+        else:
+            child = merge_patch(old[key], value)
+            if child is not None:
+                patch[key] = child
+    return patch
+
+def format_event(event: str, data: Dict, event_id: Optional[int] = None) -> str:
+    """One Server-Sent Events message"""
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+class Subscriber:
+    """One connected client: the sections it wants and its pending messages"""
+
+    def __init__(self, fields: Iterable[str]):
+        self.fields = tuple(fields)
+        self.messages: "queue.Queue[Tuple[str, Dict, int]]" = queue.Queue(CLIENT_QUEUE_SIZE)
+        # Set while a resync is queued; the full state it sends covers any later change
+        self.resync_pending = False
+
+    def select(self, state: Dict) -> Dict:
+        return {field: state[field] for field in self.fields if field in state}
+
+    def send(self, event: str, data: Dict, version: int) -> None:
+        if self.resync_pending:
+            return
+        try:
+            self.messages.put_nowait((event, data, version))
+        except queue.Full:
+            # Too far behind for deltas to be useful; drop them and resync on the next message
+            while True:
+                try:
+                    self.messages.get_nowait()
+                except queue.Empty:
+                    break
+            self.resync_pending = True
+            self.messages.put_nowait(("resync", {}, version))
+
+class GameStream:
+    """
+    Shared game state for every client watching one game.
+
+    A single watcher thread checks the game's snapshot files every
+    POLL_SECONDS (or straight away after notify()). When they change it
+    rebuilds the game state once, diffs it against the previous state and
+    hands the merge patch of each client's sections to that client's queue,
+    so N clients cost one parse per change rather than N.
+    """
+
+    def __init__(self, snapshot: str, game_id: str):
+        self.snapshot = snapshot
+        self.game_id = game_id
+        self.state: Optional[Dict] = None
+        self.version = 0
+        self.subscribers: List[Subscriber] = []
+
+        self._signature: Optional[tuple] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh(self) -> bool:
+        """
+        Rebuild the state if the game's files changed and push the deltas
+
+        Returns:
+            True if the state changed
+        """
+        with self._refresh_lock:
+            signature = source_signature(self.snapshot, self.game_id)
+            if signature == self._signature:
+                return False
+            state = build_game_state(self.snapshot, self.game_id) or {}
+            return self._publish(signature, state)
+
+    def _publish(self, signature: tuple, state: Dict) -> bool:
+        """Swap in a rebuilt state and queue each client's delta"""
+        with self._lock:
+            self._signature = signature
+            previous, self.state = self.state, state
+            if previous is not None and merge_patch(previous, state) is None:
+                return False
+            self.version += 1
+            for subscriber in self.subscribers:
+                if previous is None:
+                    subscriber.send("state", subscriber.select(state), self.version)
+                    continue
+                patch = merge_patch(subscriber.select(previous), subscriber.select(state))
+                if patch is not None:
+                    subscriber.send("delta", patch, self.version)
+        return True
+
+    def subscribe(self, fields: Iterable[str] = GAME_STATE_FIELDS) -> Subscriber:
+        """Add a client; it is sent the full state of its sections first"""
+        subscriber = Subscriber(fields)
+        if self.state is None:
+            self.refresh()
+        with self._lock:
+            self.subscribers.append(subscriber)
+            if self.state is not None:
+                subscriber.send("state", subscriber.select(self.state), self.version)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._watch, name=f"game-stream-{self.game_id}", daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        with self._lock:
+            if subscriber in self.subscribers:
+                self.subscribers.remove(subscriber)
+
+    def notify(self) -> None:
+        """Check for changes now instead of at the next poll"""
+        self._wake.set()
+
+    def _watch(self) -> None:
+        idle = 0.0
+        while True:
+            self._wake.wait(POLL_SECONDS)
+            self._wake.clear()
+            with self._lock:
+                watching = bool(self.subscribers)
+            idle = 0.0 if watching else idle + POLL_SECONDS
+            if idle >= IDLE_SECONDS:
+                with self._lock:
+                    if not self.subscribers:
+                        self._thread = None
+                        return
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.exception(f"Error refreshing game stream {self.game_id}: {e}")
+
+    def messages(self, subscriber: Subscriber) -> Iterator[str]:
+        """Server-Sent Events for a client until it disconnects"""
+        try:
+            while True:
+                try:
+                    event, data, version = subscriber.messages.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if event == "resync":
+                    with self._lock:
+                        subscriber.resync_pending = False
+                        event, data, version = "state", subscriber.select(self.state or {}), self.version
+                yield format_event(event, data, version)
+        finally:
+            self.unsubscribe(subscriber)
+
+# Streams keyed by (snapshot_dir_name, game_id)
+_streams: Dict[Tuple[str, str], GameStream] = {}
+_streams_lock = threading.Lock()
+
+def get_game_stream(snapshot: str, game_id: str) -> GameStream:
+    """
+    Get the shared stream for a game, creating it on first use
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_id: Game identifier
+
+    Returns:
+        GameStream
+    """
+    key = (snapshot.lower().replace(' ', '_'), game_id)
+    with _streams_lock:
+        stream = _streams.get(key)
+        if stream is None:
+            stream = _streams[key] = GameStream(snapshot, game_id)
+        return stream
+
+def notify_game_changed(snapshot: str, game_id: str) -> None:
+    """Tell a watched game's stream that new events were ingested"""
+    with _streams_lock:
+        stream = _streams.get((snapshot.lower().replace(' ', '_'), game_id))
+    if stream is not None:
+        stream.notify()
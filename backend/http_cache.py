@@ -0,0 +1,155 @@
+import hashlib
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from flask import Flask, Response, current_app, g, request
+
+from metrics import record_cache
+from parse_xml import DATA_ROOT, SCHEDULE_FILE
+
+# Revalidate every time: snapshots of a live game change under the same URL
+DEFAULT_CACHE_CONTROL = "no-cache"
+# Per-endpoint overrides, keyed by view function name; "no-store" also turns off ETags
+CACHE_CONTROL = {
+    "get_snapshots": "public, max-age=60",
+    "get_game_state_stream": "no-store",
+    "get_response_stats": "no-store",
+    "get_cache_status": "no-store",
+    "get_metrics": "no-store",
+}
+
+def _code_version() -> str:
+    """Stat of the backend's modules, so a deploy invalidates every ETag"""
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    signature = []
+    for filename in sorted(os.listdir(backend_dir)):
+        if filename.endswith(".py"):
+            stat = os.stat(os.path.join(backend_dir, filename))
+            signature.append((filename, stat.st_mtime_ns, stat.st_size))
+    return hashlib.sha1(repr(signature).encode()).hexdigest()[:12]
+
+CODE_VERSION = _code_version()
+
+# Directory listings keyed by path -> (directory mtime, sorted entries)
+_listings: Dict[str, Tuple[int, Tuple[str, ...]]] = {}
+_listings_lock = threading.Lock()
+
+def _directory_entries(path: str) -> Tuple[str, ...]:
+    """Entries of a directory, re-listed only when files are added or removed"""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return ()
+    with _listings_lock:
+        cached = _listings.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+    entries = tuple(sorted(os.listdir(path)))
+    with _listings_lock:
+        _listings[path] = (mtime, entries)
+    return entries
+
+def source_signature(snapshot: Optional[str] = None, game_id: Optional[str] = None) -> Tuple[Tuple, ...]:
+    """
+    Names, sizes and modification times of the files a response is built from
+
+    Args:
+        snapshot: Snapshot name or directory name (every snapshot when None)
+        game_id: Only a game's files (every file of the snapshot when None)
+
+    Returns:
+        Tuple of (snapshot dir, filename, mtime_ns, size), with the schedule file last
+    """
+    if snapshot:
+        snapshot_dirs = [snapshot.lower().replace(' ', '_')]
+    else:
+        snapshot_dirs = [d for d in _directory_entries(DATA_ROOT) if os.path.isdir(os.path.join(DATA_ROOT, d))]
+
+    signature = []
+    prefix = f"{game_id}_" if game_id else ""
+    for snapshot_dir_name in snapshot_dirs:
+        snapshot_dir = os.path.join(DATA_ROOT, snapshot_dir_name)
+        for filename in _directory_entries(snapshot_dir):
+            if filename.startswith(prefix):
+                try:
+                    stat = os.stat(os.path.join(snapshot_dir, filename))
+                except OSError:
+                    continue
+                signature.append((snapshot_dir_name, filename, stat.st_mtime_ns, stat.st_size))
+    if os.path.isfile(SCHEDULE_FILE):
+        stat = os.stat(SCHEDULE_FILE)
+        signature.append(("", os.path.basename(SCHEDULE_FILE), stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+def request_etag(signature: Tuple[Tuple, ...]) -> str:
+    """ETag for the current request: endpoint, arguments, source files and code version"""
+    arguments = sorted((key, tuple(values)) for key, values in request.args.lists())
+    view_args = sorted((request.view_args or {}).items())
+    key = repr((request.endpoint, view_args, arguments, signature, CODE_VERSION))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def cache_control_for(endpoint: Optional[str]) -> str:
+    """Cache-Control policy of an endpoint, from app.config["CACHE_CONTROL"] when set"""
+    policies = current_app.config.get("CACHE_CONTROL", CACHE_CONTROL)
+    return policies.get(endpoint, current_app.config.get("DEFAULT_CACHE_CONTROL", DEFAULT_CACHE_CONTROL))
+
+def _before_request() -> Optional[Response]:
+    """Answer a matching conditional GET with 304 before the view parses anything"""
+    if request.method not in ("GET", "HEAD") or request.endpoint is None or request.endpoint == "static":
+        return None
+    if cache_control_for(request.endpoint) == "no-store":
+        return None
+
+    view_args = request.view_args or {}
+    snapshot = view_args.get("snapshot") or request.args.get("snapshot")
+    game_id = view_args.get("game_id") or request.args.get("game_id")
+    signature = source_signature(snapshot, game_id)
+    g.etag = request_etag(signature)
+    modified = max((entry[2] for entry in signature), default=0)
+    g.last_modified = datetime.fromtimestamp(modified // 1_000_000_000, tz=timezone.utc) if modified else None
+
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(g.etag)
+    else:
+        since = request.if_modified_since
+        matched = since is not None and g.last_modified is not None and g.last_modified <= since
+    if request.if_none_match or request.if_modified_since:
+        record_cache("conditional", matched)
+    if not matched:
+        return None
+
+    response = Response(status=304)
+    _set_validators(response)
+    return response
+
+def _set_validators(response: Response) -> None:
+    response.set_etag(g.etag, weak=True)
+    if g.last_modified is not None:
+        response.last_modified = g.last_modified
+    response.headers["Cache-Control"] = cache_control_for(request.endpoint)
+
+def _after_request(response: Response) -> Response:
+    """Attach ETag, Last-Modified and Cache-Control to successful responses"""
+    if "etag" in g and response.status_code == 200 and "ETag" not in response.headers:
+        _set_validators(response)
+    return response
+
+def init_http_cache(app: Flask) -> None:
+    """
+    Add conditional GET support to every endpoint of an app
+
+    The ETag is derived from the stat of the game's snapshot files (or every
+    file of the snapshot, or of every snapshot, for endpoints without a game
+    or snapshot), the request arguments and the code version. A request whose
+    If-None-Match (or If-Modified-Since) still matches gets a 304 without the
+    view running.
+
+    Args:
+        app: Flask app to install the request hooks on
+    """
+    app.config.setdefault("CACHE_CONTROL", dict(CACHE_CONTROL))
+    app.config.setdefault("DEFAULT_CACHE_CONTROL", DEFAULT_CACHE_CONTROL)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -0,0 +1,349 @@
+import heapq
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from event_store import PbpEventStore
+from oncourt_index import OnCourtIndex, get_oncourt_index
+from onoff_splits import credit_columns, event_vectors, incidence_matrix
+from parse_xml import parse_boxscore, parse_roster
+
+LINEUP_SIZE = 5
+# Boxscore Starting_position -> position group
+POSITION_GROUPS = {"PG": "G", "SG": "G", "G": "G", "SF": "F", "PF": "F", "F": "F", "C": "C"}
+# Personal fouls that disqualify a player (G League plays to six)
+FOUL_OUT = 6
+# Fouls at which a player is in foul trouble, by period; overtime uses the fourth-period limit
+FOUL_TROUBLE = {1: 2, 2: 3, 3: 4, 4: 5}
+# Net ratings are pulled toward zero as if the player/pair had this many extra possessions at 0
+SHRINK_POSSESSIONS = 20
+DEFAULT_TIME_BUDGET = 0.25
+
+@dataclass
+class LineupConstraints:
+    """
+    Rules a recommended five has to satisfy
+
+    min_positions counts position groups (G, F, C); players whose position is
+    unknown can fill any other spot but never count toward a minimum.
+    """
+    min_positions: Dict[str, int] = field(default_factory=lambda: {"G": 1, "F": 1})
+    avoid_foul_trouble: bool = True
+    max_minutes: Optional[float] = None
+    minute_limits: Dict[str, float] = field(default_factory=dict)
+    required: Tuple[str, ...] = ()
+    excluded: Tuple[str, ...] = ()
+
+def foul_trouble_limit(period: int) -> int:
+    """Fouls that put a player in foul trouble in a period"""
+    return FOUL_TROUBLE.get(period, FOUL_TROUBLE[4])
+
+@dataclass
+class LineupModel:
+    """
+    Additive lineup value for one team
+
+    A five's score is the mean of its players' shrunk net ratings plus the
+    mean synergy of its ten pairs, where a pair's synergy is how much better
+    the two did together than their individual ratings suggest (also shrunk
+    by the possessions they shared). Players who haven't played rate 0.
+    """
+    team_id: str
+    player_ids: List[str]
+    player_values: np.ndarray
+    pair_values: np.ndarray
+    pair_possessions: np.ndarray
+
+    def __post_init__(self):
+        self.rows = {player_id: row for row, player_id in enumerate(self.player_ids)}
+
+    def score(self, player_ids: List[str]) -> Dict[str, float]:
+        """Score a five (or any group) of players"""
+        rows = [self.rows[p] for p in player_ids if p in self.rows]
+        players = float(self.player_values[rows].sum()) / LINEUP_SIZE
+        pairs = float(np.triu(self.pair_values[np.ix_(rows, rows)], 1).sum()) / (LINEUP_SIZE * (LINEUP_SIZE - 1) / 2)
+        return {"score": players + pairs, "playerValue": players, "synergy": pairs}
+
+def build_lineup_models(index: OnCourtIndex) -> Dict[str, LineupModel]:
+    """
+    Player and pair net ratings for both teams of a game
+
+    Args:
+        index: On-court index of the game
+
+    Returns:
+        Dict mapping team_id to its LineupModel
+    """
+    store = index.store
+    player_ids, sides, matrix = incidence_matrix(index)
+    vectors = event_vectors(store)
+
+    # Free throws are credited to the lineup on the floor for the foul
+    points = np.zeros_like(vectors["points"])
+    if len(store):
+        np.add.at(points, credit_columns(store), vectors["points"])
+    possessions = vectors["possessions"].sum(axis=1) / 2
+
+    models = {}
+    for side in (0, 1):
+        team_id = store.team_id_of(side)
+        rows = np.flatnonzero(sides == side)
+        weights = matrix[rows].astype(np.float64)
+        margin = points[:, side] - points[:, 1 - side]
+
+        pair_margin = (weights * margin) @ weights.T
+        pair_possessions = (weights * possessions) @ weights.T
+        on_margin = np.diag(pair_margin)
+        on_possessions = np.diag(pair_possessions)
+        player_values = 100 * on_margin / (on_possessions + SHRINK_POSSESSIONS)
+
+        together = np.divide(100 * pair_margin, pair_possessions, out=np.zeros_like(pair_margin), where=pair_possessions > 0)
+        expected = (player_values[:, None] + player_values[None, :]) / 2
+        pair_values = np.where(pair_possessions > 0,
+                               pair_possessions / (pair_possessions + SHRINK_POSSESSIONS) * (together - expected), 0.0)
+        np.fill_diagonal(pair_values, 0.0)
+
+        models[team_id] = LineupModel(team_id, [player_ids[r] for r in rows], player_values, pair_values, pair_possessions)
+    return models
+
+class LineupSearch:
+    """
+    Branch-and-bound search for the best-scoring legal fives.
+
+    Candidates are tried in order of player value. Each node keeps a vector
+    of every candidate's pair synergy with the players already chosen, so
+    extending a partial lineup costs one vector add instead of rescoring its
+    pairs. A node is cut when its optimistic bound (current score plus the
+    best possible gains of the remaining spots) can't beat the k-th best
+    lineup found so far, or when the remaining spots can't meet the position
+    minimums. The search stops at the time budget and returns the best
+    lineups found up to then.
+    """
+
+    def __init__(self, model: LineupModel, candidates: List[str], positions: Dict[str, str],
+                 constraints: LineupConstraints, limit: int = 5, time_budget: float = DEFAULT_TIME_BUDGET):
+        self.model = model
+        self.constraints = constraints
+        self.limit = limit
+        self.time_budget = time_budget
+
+        player_values = np.array([model.player_values[model.rows[p]] if p in model.rows else 0.0 for p in candidates])
+        order = np.argsort(-player_values, kind="stable")
+        self.candidates = [candidates[i] for i in order]
+        self.values = player_values[order] / LINEUP_SIZE
+
+        rows = [model.rows.get(p) for p in self.candidates]
+        count = len(self.candidates)
+        self.pairs = np.zeros((count, count))
+        for i, row_i in enumerate(rows):
+            for j, row_j in enumerate(rows):
+                if row_i is not None and row_j is not None:
+                    self.pairs[i, j] = model.pair_values[row_i, row_j]
+        self.pairs /= LINEUP_SIZE * (LINEUP_SIZE - 1) / 2
+
+        # Best synergy each candidate could still pick up from k more teammates, split with them
+        positive = np.sort(np.clip(self.pairs, 0, None), axis=1)[:, ::-1]
+        self.future_synergy = np.concatenate([np.zeros((count, 1)), np.cumsum(positive, axis=1)], axis=1) / 2
+
+        self.groups = sorted(constraints.min_positions)
+        self.group_masks = {g: np.array([positions.get(p) == g for p in self.candidates], dtype=bool) for g in self.groups}
+        # Candidates of each group at or after each position in the search order
+        self.group_remaining = {g: np.concatenate([np.cumsum(mask[::-1])[::-1], [0]]) for g, mask in self.group_masks.items()}
+        self.required = [self.candidates.index(p) for p in constraints.required if p in self.candidates]
+
+        self.best: List[Tuple[float, Tuple[int, ...]]] = []
+        self.nodes = 0
+        self.complete = True
+
+    def run(self) -> List[Tuple[float, Tuple[str, ...]]]:
+        """Best lineups as (score, player IDs), highest first"""
+        self._deadline = time.perf_counter() + self.time_budget
+        if len(self.candidates) >= LINEUP_SIZE:
+            self._search(0, [], 0.0, np.zeros(len(self.candidates)))
+        ranked = sorted(self.best, reverse=True)
+        return [(score, tuple(self.candidates[i] for i in chosen)) for score, chosen in ranked]
+
+    def _feasible(self, start: int, chosen: List[int]) -> bool:
+        spots = LINEUP_SIZE - len(chosen)
+        needed_total = 0
+        for group in self.groups:
+            have = sum(1 for i in chosen if self.group_masks[group][i])
+            needed = max(0, self.constraints.min_positions[group] - have)
+            if needed > self.group_remaining[group][start]:
+                return False
+            needed_total += needed
+        if any(r < start and r not in chosen for r in self.required):
+            return False
+        return needed_total <= spots
+
+    def _bound(self, start: int, spots: int, link: np.ndarray) -> float:
+        gains = self.values[start:] + link[start:] + self.future_synergy[start:, spots - 1]
+        if len(gains) <= spots:
+            return float(gains.sum())
+        return float(np.partition(gains, len(gains) - spots)[-spots:].sum())
+
+    def _search(self, start: int, chosen: List[int], score: float, link: np.ndarray) -> None:
+        self.nodes += 1
+        if self.nodes % 256 == 0 and time.perf_counter() > self._deadline:
+            self.complete = False
+        if not self.complete:
+            return
+
+        spots = LINEUP_SIZE - len(chosen)
+        if spots == 0:
+            if self._feasible(start, chosen) and all(r in chosen for r in self.required):
+                entry = (score, tuple(chosen))
+                if len(self.best) < self.limit:
+                    heapq.heappush(self.best, entry)
+                elif entry > self.best[0]:
+                    heapq.heapreplace(self.best, entry)
+            return
+        if len(self.candidates) - start < spots or not self._feasible(start, chosen):
+            return
+        if len(self.best) == self.limit and score + self._bound(start, spots, link) <= self.best[0][0]:
+            return
+
+        for i in range(start, len(self.candidates) - spots + 1):
+            chosen.append(i)
+            self._search(i + 1, chosen, score + self.values[i] + link[i], link + self.pairs[i])
+            chosen.pop()
+            if not self.complete:
+                return
+
+def available_players(roster: Dict[str, Dict], boxscore: Optional[Dict], team_id: str, period: int,
+                      constraints: LineupConstraints) -> Tuple[List[str], Dict[str, Dict]]:
+    """
+    Players a team can put on the floor, and why the others can't go
+
+    Args:
+        roster: parse_roster output
+        boxscore: parse_boxscore output (None before the boxscore exists)
+        team_id: Team to pick for
+        period: Current period, for the foul trouble limit
+        constraints: Lineup constraints
+
+    Returns:
+        Tuple of (available player IDs, dict of player_id -> info including position, fouls, minutes and
+        the reason a player was left out)
+    """
+    box_players = {p["person_id"]: p for p in (boxscore or {}).get("players", []) if p.get("team_id") == team_id}
+    trouble = foul_trouble_limit(period)
+
+    players = {}
+    available = []
+    for player_id, person in roster.items():
+        if person["team_id"] != team_id:
+            continue
+        box = box_players.get(player_id, {})
+        fouls = box.get("fouls", 0)
+        minutes = box.get("minutes", 0) + box.get("seconds", 0) / 60
+        position = POSITION_GROUPS.get(box.get("starting_position", ""), person.get("lineup_position", ""))
+        limit = constraints.minute_limits.get(player_id, constraints.max_minutes)
+
+        reason = None
+        if not person["active"]:
+            reason = "inactive"
+        elif player_id in constraints.excluded:
+            reason = "excluded"
+        elif fouls >= FOUL_OUT:
+            reason = "fouled_out"
+        elif constraints.avoid_foul_trouble and fouls >= trouble and player_id not in constraints.required:
+            reason = "foul_trouble"
+        elif limit is not None and minutes >= limit and player_id not in constraints.required:
+            reason = "minutes_limit"
+
+        players[player_id] = {
+            "playerId": player_id,
+            "name": f"{person['first_name']} {person['last_name']}".strip(),
+            "position": position,
+            "fouls": fouls,
+            "minutes": round(minutes, 2),
+            "unavailable": reason,
+        }
+        if reason is None:
+            available.append(player_id)
+    return available, players
+
+# Models keyed by (snapshot_dir_name, game_id) -> (store, events covered, models)
+_models: Dict[Tuple[str, str], Tuple[PbpEventStore, int, Dict[str, LineupModel]]] = {}
+_models_lock = threading.Lock()
+
+def get_lineup_models(snapshot: str, game_id: str) -> Optional[Tuple[OnCourtIndex, Dict[str, LineupModel]]]:
+    """
+    Get a game's on-court index and per-team lineup models, rebuilt only when new events arrive
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_id: Game identifier
+
+    Returns:
+        Tuple of (index, models), or None if the game has no event store
+    """
+    index = get_oncourt_index(snapshot, game_id)
+    if index is None:
+        return None
+
+    key = (index.store.snapshot, game_id)
+    with _models_lock:
+        cached = _models.get(key)
+        if cached is None or cached[0] is not index.store or cached[1] != len(index.store):
+            cached = (index.store, len(index.store), build_lineup_models(index))
+            _models[key] = cached
+        return index, cached[2]
+
+def recommend_lineups(snapshot: str, game_id: str, team_id: str, constraints: Optional[LineupConstraints] = None,
+                      limit: int = 5, time_budget: float = DEFAULT_TIME_BUDGET) -> Optional[Dict]:
+    """
+    Propose the best available fives for a team at the current point of a game
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_id: Game identifier
+        team_id: Team to pick for
+        constraints: Lineup constraints (defaults to LineupConstraints())
+        limit: Number of lineups to return
+        time_budget: Seconds the search may run before returning its best so far
+
+    Returns:
+        Dict with the recommended lineups, the current lineup's score, player
+        availability and search statistics, or None if the game has no event store
+    """
+    result = get_lineup_models(snapshot, game_id)
+    if result is None:
+        return None
+    index, models = result
+    if team_id not in models:
+        raise ValueError(f"Team {team_id} is not playing in game {game_id}")
+
+    constraints = constraints or LineupConstraints()
+    store = index.store
+    period = int(store.period[-1]) if len(store) else 1
+    available, players = available_players(parse_roster(snapshot, game_id), parse_boxscore(snapshot, game_id),
+                                           team_id, period, constraints)
+
+    model = models[team_id]
+    positions = {player_id: info["position"] for player_id, info in players.items()}
+    started = time.perf_counter()
+    search = LineupSearch(model, available, positions, constraints, limit, time_budget)
+    ranked = search.run()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    def describe(player_ids: Tuple[str, ...]) -> Dict:
+        return {
+            "lineupKey": f"{team_id}-{'_'.join(sorted(player_ids))}",
+            "players": [players.get(p, {"playerId": p}) for p in player_ids],
+            **model.score(list(player_ids)),
+        }
+
+    current = index.on_court_at_event(len(store) - 1).get(team_id, ()) if len(store) else ()
+    return {
+        "teamId": team_id,
+        "period": period,
+        "lineups": [describe(player_ids) for _, player_ids in ranked],
+        "currentLineup": describe(tuple(current)) if current else None,
+        "unavailable": [info for info in players.values() if info["unavailable"]],
+        "search": {"nodes": search.nodes, "complete": search.complete, "elapsedMs": round(elapsed_ms, 2)},
+    }
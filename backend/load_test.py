@@ -0,0 +1,402 @@
+import argparse
+import gzip
+import http.client
+import json
+import logging
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+import numpy as np
+
+# Seconds to wait for the server under test to answer its first request
+STARTUP_TIMEOUT = 60.0
+PERCENTILES = (50, 95, 99)
+# "stream": the app as it is now, on the game-state stream; "legacy": the polling app from before it
+MIXES = ("stream", "legacy")
+# Fields App.jsx asks the game-state stream for
+STREAM_FIELDS = "boxscore,lineups,pbp"
+
+def game_stream_path(snapshot: str, game_id: str) -> str:
+    """The game-state stream App.jsx subscribes to when a game is selected"""
+    return f"/api/stream/game-state?snapshot={quote(snapshot)}&game_id={game_id}&fields={STREAM_FIELDS}"
+
+def open_game_requests(snapshot: str, game_id: str, mix: str = "stream") -> List[Tuple[str, str]]:
+    """
+    (name, path) of the plain GETs the React app makes to show a game
+
+    With the "stream" mix App gets the boxscore, lineups and PBP from the
+    game-state stream (game_stream_path) rather than from these requests;
+    VisualizationContainer still fetches the boxscore, CourtStage the shots
+    once the shooting view opens and LineupVisual the lineup data.
+    LineupVisual currently asks for one fixed game; the harness asks for the
+    game the client opened so the load spreads over every game.
+
+    The "legacy" mix is the app before the stream, when App fetched the
+    lineups and PBP itself and the client polled all five requests.
+    """
+    query = f"snapshot={quote(snapshot)}&game_id={game_id}"
+    requests = [("boxscore", f"/boxscore?{query}")]
+    if mix == "legacy":
+        requests += [("lineups", f"/lineups?{query}"), ("pbp", f"/pbp?{query}")]
+    return requests + [
+        ("shots", f"/api/shots?{query}"),
+        ("lineup-data", f"/api/lineup-data/{game_id}/{quote(snapshot)}"),
+    ]
+
+class Recorder:
+    """Latencies, bytes and failures of every request in one phase"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.not_modified = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def record(self, name: str, seconds: float, status: int, size: int) -> None:
+        with self._lock:
+            self.latencies.setdefault(name, []).append(seconds)
+            if status >= 400:
+                self.errors[name] = self.errors.get(name, 0) + 1
+            self.not_modified += status == 304
+            self.bytes += size
+
+    def record_failure(self, name: str) -> None:
+        with self._lock:
+            self.errors[name] = self.errors.get(name, 0) + 1
+
+    def stop(self) -> None:
+        self.finished = time.perf_counter()
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """Count and p50/p95/p99 (ms) of a list of latencies in seconds"""
+    if not latencies:
+        return {"count": 0}
+    values = 1000 * np.asarray(latencies)
+    summary = {"count": len(latencies)}
+    for percentile, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+        summary[f"p{percentile}Ms"] = round(float(value), 2)
+    summary["maxMs"] = round(float(values.max()), 2)
+    return summary
+
+def summarize(recorder: Recorder) -> Dict:
+    """Per-endpoint and overall latency percentiles and throughput of a phase"""
+    seconds = (recorder.finished or time.perf_counter()) - recorder.started
+    everything = [value for values in recorder.latencies.values() for value in values]
+    return {
+        "seconds": round(seconds, 2),
+        "requests": len(everything),
+        "requestsPerSecond": round(len(everything) / seconds, 1) if seconds else 0.0,
+        "notModified": recorder.not_modified,
+        "errors": sum(recorder.errors.values()),
+        "bytes": recorder.bytes,
+        "overall": latency_summary(everything),
+        "endpoints": {
+            name: dict(latency_summary(values), errors=recorder.errors.get(name, 0))
+            for name, values in sorted(recorder.latencies.items())
+        },
+    }
+
+class Client:
+    """
+    One browser tab: a connection (kept alive when the server allows) plus the ETags it has seen
+
+    With conditional=True every repeat request carries If-None-Match, the way
+    the browser revalidates responses sent with Cache-Control: no-cache.
+    """
+
+    def __init__(self, base_url: str, conditional: bool = True):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.conditional = conditional
+        self.etags: Dict[str, str] = {}
+        self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        self.stream_connection: Optional[http.client.HTTPConnection] = None
+        self.stream_socket: Optional[socket.socket] = None
+        self.stream_reader: Optional[threading.Thread] = None
+        self.stream_patches = 0
+
+    def get(self, name: str, path: str, recorder: Recorder) -> Optional[bytes]:
+        headers = {"Accept-Encoding": "gzip"}
+        if self.conditional and path in self.etags:
+            headers["If-None-Match"] = self.etags[path]
+        start = time.perf_counter()
+        try:
+            self.connection.request("GET", path, headers=headers)
+            response = self.connection.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            recorder.record_failure(name)
+            return None
+        recorder.record(name, time.perf_counter() - start, response.status, len(body))
+        if response.getheader("ETag"):
+            self.etags[path] = response.getheader("ETag")
+        if response.status != 200:
+            return None
+        return gzip.decompress(body) if response.getheader("Content-Encoding") == "gzip" else body
+
+    def open_app(self, recorder: Recorder) -> List[Tuple[str, str]]:
+        """Load the snapshot and game lists like the app's first render, returning every (snapshot, game)"""
+        games = []
+        body = self.get("snapshots", "/snapshots", recorder)
+        for snapshot in json.loads(body or b"{}").get("snapshots", []):
+            listing = self.get("games", f"/games?snapshot={quote(snapshot)}", recorder)
+            games.extend((snapshot, game_id) for game_id in json.loads(listing or b"{}").get("games", []))
+        return games
+
+    def open_game(self, snapshot: str, game_id: str, recorder: Recorder, mix: str = "stream") -> None:
+        for name, path in open_game_requests(snapshot, game_id, mix):
+            self.get(name, path, recorder)
+
+    def open_stream(self, snapshot: str, game_id: str, recorder: Recorder) -> None:
+        """
+        Subscribe to the game-state stream like App.jsx and wait for the full state
+
+        The latency recorded under "stream" is the time to the first state
+        event. The stream then stays open on its own connection, counting the
+        patches pushed to it, until close().
+        """
+        self.stream_connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        start = time.perf_counter()
+        try:
+            self.stream_connection.request("GET", game_stream_path(snapshot, game_id),
+                                           headers={"Accept": "text/event-stream"})
+            # The connection lets go of its socket once it hands over a Connection: close response
+            self.stream_socket = self.stream_connection.sock
+            response = self.stream_connection.getresponse()
+            size = 0
+            event = None
+            while response.status == 200:
+                line = response.readline()
+                if not line:
+                    break
+                size += len(line)
+                if line.startswith(b"event:"):
+                    event = line[len(b"event:"):].strip()
+                elif line in (b"\n", b"\r\n") and event == b"state":
+                    break
+        except (OSError, http.client.HTTPException):
+            recorder.record_failure("stream")
+            return
+        recorder.record("stream", time.perf_counter() - start, response.status, size)
+        if response.status == 200:
+            self.stream_reader = threading.Thread(target=self._read_stream, args=(response,), daemon=True)
+            self.stream_reader.start()
+
+    def _read_stream(self, response) -> None:
+        try:
+            for line in iter(response.readline, b""):
+                if line.startswith(b"event: delta"):
+                    self.stream_patches += 1
+        except (OSError, ValueError, http.client.HTTPException):
+            pass
+
+    def close(self) -> None:
+        self.connection.close()
+        if self.stream_socket is not None:
+            # Shutting the socket down ends the reader's blocking readline
+            try:
+                self.stream_socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.stream_socket.close()
+            if self.stream_reader is not None:
+                self.stream_reader.join(timeout=5)
+
+def _run_clients(count: int, target) -> None:
+    threads = [threading.Thread(target=target, args=(index,), daemon=True) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def run_load_test(base_url: str, clients: int = 8, duration: float = 20.0, poll_seconds: float = 1.0,
+                  conditional: bool = True, mix: str = "stream") -> Dict[str, Dict]:
+    """
+    Replay the frontend's requests against a running server, cold then warm
+
+    Cold: every client opens the app and a game at the same moment against a
+    server that hasn't served anything yet, so each response pays its parse.
+    With the "stream" mix that means subscribing to the game-state stream
+    and waiting for its first state event, then the component GETs.
+    Warm: for `duration` seconds each client keeps its stream open, as the
+    browser does, and repeats the component GETs every poll_seconds (the
+    legacy mix repeats all five polled requests). Clients are spread over
+    every game the server lists.
+
+    Args:
+        base_url: Server to test, e.g. http://127.0.0.1:5002
+        clients: Concurrent clients
+        duration: Seconds of the warm phase
+        poll_seconds: Seconds between one client's repeats
+        conditional: Revalidate with If-None-Match like a browser
+        mix: "stream" for the current app, "legacy" for the polling one
+
+    Returns:
+        {"cold": summary, "warm": summary, "games": number of games,
+        "streamPatches": patches pushed to the open streams}
+    """
+    if mix not in MIXES:
+        raise ValueError(f"mix must be one of {', '.join(MIXES)}")
+    sessions = [Client(base_url, conditional) for _ in range(clients)]
+    cold = Recorder()
+    assigned: Dict[int, Tuple[str, str]] = {}
+
+    def open_session(index: int) -> None:
+        games = sessions[index].open_app(cold)
+        if games:
+            assigned[index] = games[index % len(games)]
+            if mix == "stream":
+                sessions[index].open_stream(*assigned[index], cold)
+            sessions[index].open_game(*assigned[index], cold, mix)
+
+    _run_clients(clients, open_session)
+    cold.stop()
+
+    warm = Recorder()
+    deadline = time.perf_counter() + duration
+
+    def poll(index: int) -> None:
+        if index not in assigned:
+            return
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            sessions[index].open_game(*assigned[index], warm, mix)
+            time.sleep(max(0.0, min(poll_seconds - (time.perf_counter() - started), deadline - time.perf_counter())))
+
+    _run_clients(clients, poll)
+    warm.stop()
+
+    for session in sessions:
+        session.close()
+    return {"cold": summarize(cold), "warm": summarize(warm), "games": len(set(assigned.values())),
+            "streamPatches": sum(session.stream_patches for session in sessions)}
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(port: int, server: str = "wsgi", data_root: Optional[str] = None) -> subprocess.Popen:
+    """
+    Start app.py in a child process and wait until it answers
+
+    A separate process keeps the load generator off the server's GIL and
+    guarantees the cold phase starts with empty caches.
+
+    Args:
+        port: Port to listen on (localhost only)
+        server: "wsgi" for the threaded Werkzeug server, "asgi" for uvicorn with the adapter in asgi.py
+        data_root: Data root to serve instead of the bundled snapshots
+
+    Returns:
+        The server process
+    """
+    env = dict(os.environ, WARM_CACHES="0")
+    if data_root:
+        env["PBP_DATA_ROOT"] = data_root
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", server, "--port", str(port)],
+                               cwd=backend_dir, env=env, stdout=subprocess.DEVNULL)
+
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"Server didn't start within {STARTUP_TIMEOUT:.0f}s")
+
+def serve(server: str, port: int) -> None:
+    """Child process entry point: serve app.py on localhost without the dev reloader"""
+    if server == "asgi":
+        import uvicorn
+        uvicorn.run("asgi:create_application", factory=True, host="127.0.0.1", port=port, log_level="warning")
+        return
+
+    from werkzeug.serving import make_server
+    from app import app
+    # Per-request access lines would cost the server more than some of the requests
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    make_server("127.0.0.1", port, app, threaded=True).serve_forever()
+
+def format_report(results: Dict[str, Dict]) -> str:
+    lines = []
+    for phase in ("cold", "warm"):
+        summary = results[phase]
+        overall = summary["overall"]
+        lines.append(f"{phase}: {summary['requests']} requests in {summary['seconds']}s "
+                     f"({summary['requestsPerSecond']} req/s, {summary['notModified']} not modified, "
+                     f"{summary['errors']} errors)")
+        lines.append(f"  {'endpoint':<12} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for name, row in list(summary["endpoints"].items()) + [("all", overall)]:
+            if row["count"]:
+                lines.append(f"  {name:<12} {row['count']:>6} {row['p50Ms']:>8} {row['p95Ms']:>8} {row['p99Ms']:>8}")
+    if results.get("streamPatches"):
+        lines.append(f"game-state patches pushed to open streams: {results['streamPatches']}")
+    return "\n".join(lines)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the backend with the frontend's request mix")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of the warm phase")
+    parser.add_argument("--poll", type=float, default=1.0, help="Seconds between a client's repeat requests")
+    parser.add_argument("--mix", choices=MIXES, default="stream",
+                        help="Request mix: the current app on the game-state stream, or the legacy polling app")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Serve this many synthetic games per snapshot instead of only the bundled game")
+    parser.add_argument("--server", choices=("wsgi", "asgi"), default="wsgi", help="Server to start")
+    parser.add_argument("--url", help="Test an already running server instead of starting one")
+    parser.add_argument("--no-conditional", action="store_true", help="Don't revalidate with If-None-Match")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--serve", choices=("wsgi", "asgi"), help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+
+    process = None
+    with tempfile.TemporaryDirectory(prefix="load-test-") as data_root:
+        if args.url:
+            base_url = args.url.rstrip("/")
+        else:
+            if args.synthetic:
+                from synthetic_games import write_synthetic_games
+                write_synthetic_games(data_root, args.synthetic)
+            port = _free_port()
+            process = start_server(port, args.server, data_root if args.synthetic else None)
+            base_url = f"http://127.0.0.1:{port}"
+        try:
+            results = run_load_test(base_url, args.clients, args.duration, args.poll, not args.no_conditional, args.mix)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    results["config"] = {"clients": args.clients, "duration": args.duration, "poll": args.poll,
+                         "server": "external" if args.url else args.server, "synthetic": args.synthetic,
+                         "mix": args.mix}
+    print(f"{results['games']} games, {args.clients} clients, {args.mix} mix, repeat every {args.poll}s")
+    print(format_report(results))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
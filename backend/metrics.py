@@ -0,0 +1,208 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from flask import Flask, Response, g, has_app_context, request
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Request phases timed separately; compute is whatever the others don't cover
+PHASES = ("parse", "compute", "serialize")
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # One count per bucket plus the +Inf overflow, kept non-cumulative until exported
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le label, observations at or below it) for every bucket and +Inf"""
+        rows, total = [], 0
+        for bound, count in zip([repr(bound) for bound in self.buckets] + ["+Inf"], self.counts):
+            total += count
+            rows.append((bound, total))
+        return rows
+
+class Metrics:
+    """
+    Counters and latency histograms for the text /metrics endpoint.
+
+    Every update is a dict lookup and an add under one lock, so recording
+    costs a few microseconds per request and can stay on in production.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counters: Dict[str, Dict[Labels, float]] = {}
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def value(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return self.counters.get(name, {}).get(tuple(sorted(labels.items())), 0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started = time.time()
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            counters = {name: dict(series) for name, series in self.counters.items()}
+            histograms = {name: {key: (h.cumulative(), h.sum, h.count) for key, h in series.items()}
+                          for name, series in self.histograms.items()}
+            uptime = time.time() - self.started
+
+        lines = []
+        for name, series in sorted(histograms.items()):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, (buckets, total, count) in sorted(series.items()):
+                for bound, cumulative in buckets:
+                    lines.append(f"{name}_bucket{_labels(key + (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(key)} {total:.6f}")
+                lines.append(f"{name}_count{_labels(key)} {count}")
+        for name, series in sorted(counters.items()):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_labels(key)} {_number(value)}")
+
+        events = counters.get("pbp_events_processed_total", {}).get((), 0)
+        seconds = counters.get("pbp_event_processing_seconds_total", {}).get((), 0)
+        lines.append(f"# HELP pbp_events_per_second {HELP['pbp_events_per_second']}")
+        lines.append("# TYPE pbp_events_per_second gauge")
+        lines.append(f"pbp_events_per_second {_number(events / seconds if seconds else 0)}")
+        lines.append(f"# HELP process_uptime_seconds {HELP['process_uptime_seconds']}")
+        lines.append("# TYPE process_uptime_seconds gauge")
+        lines.append(f"process_uptime_seconds {uptime:.3f}")
+        return "\n".join(lines) + "\n"
+
+HELP = {
+    "http_request_duration_seconds": "Time from routing to response headers, by endpoint",
+    "http_requests_total": "Requests answered, by endpoint and status",
+    "http_response_bytes_total": "Body bytes sent (after compression), by endpoint",
+    "http_request_phase_seconds_total": "Request time spent parsing XML, computing and serializing, by endpoint",
+    "cache_requests_total": "Cache lookups, by cache and result",
+    "xml_files_parsed_total": "XML files parsed",
+    "xml_parse_seconds_total": "Time spent parsing XML files",
+    "pbp_events_processed_total": "Play-by-play events added to event stores",
+    "pbp_event_processing_seconds_total": "Time spent building event store columns",
+    "pbp_events_per_second": "Event store build throughput since startup",
+    "process_uptime_seconds": "Seconds since metrics started",
+}
+
+def _labels(key: Labels) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in key) + "}"
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else f"{value:.6f}"
+
+_metrics = Metrics()
+
+def get_metrics() -> Metrics:
+    return _metrics
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count a lookup in one of the backend's caches"""
+    _metrics.inc("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+def record_phase(phase: str, seconds: float) -> None:
+    """Add time to a phase of the current request, if there is one"""
+    if has_app_context() and "request_start" in g:
+        g.phase_seconds[phase] = g.phase_seconds.get(phase, 0.0) + seconds
+
+@contextmanager
+def timed_parse():
+    """Time an XML parse, globally and against the current request"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        _metrics.inc("xml_files_parsed_total")
+        _metrics.inc("xml_parse_seconds_total", seconds)
+        record_phase("parse", seconds)
+
+def record_events(count: int, seconds: float) -> None:
+    """Count play-by-play events processed into an event store"""
+    _metrics.inc("pbp_events_processed_total", count)
+    _metrics.inc("pbp_event_processing_seconds_total", seconds)
+
+def _before_request() -> None:
+    g.request_start = time.perf_counter()
+    g.phase_seconds = {}
+
+def _after_request(response: Response) -> Response:
+    """Record latency, phase split, status and bytes of a finished request"""
+    start = g.get("request_start")
+    if start is None:
+        return response
+    elapsed = time.perf_counter() - start
+    endpoint = request.endpoint or "unmatched"
+
+    phases = g.phase_seconds
+    phases["serialize"] = phases.get("serialize", 0.0) + g.get("encode_seconds", 0.0)
+    phases["compute"] = max(0.0, elapsed - phases.get("parse", 0.0) - phases["serialize"])
+
+    _metrics.observe("http_request_duration_seconds", elapsed, endpoint=endpoint)
+    _metrics.inc("http_requests_total", endpoint=endpoint, status=str(response.status_code))
+    for phase in PHASES:
+        if phases.get(phase):
+            _metrics.inc("http_request_phase_seconds_total", phases[phase], endpoint=endpoint, phase=phase)
+    # Streamed bodies (Server-Sent Events) have no length up front and aren't counted
+    if not response.is_streamed:
+        _metrics.inc("http_response_bytes_total", response.calculate_content_length() or 0, endpoint=endpoint)
+    return response
+
+def metrics_response() -> Response:
+    """The /metrics body"""
+    return Response(_metrics.render(), content_type=CONTENT_TYPE)
+
+def init_metrics(app: Flask) -> None:
+    """
+    Time every request of an app and count what it served
+
+    Must be installed before init_http_cache and init_response_cache: their
+    before-request hooks can answer a request (304 or cached bytes) and
+    skip the hooks after them, while after-request hooks run in reverse, so
+    installing first means timing every request and seeing its final body.
+
+    Args:
+        app: Flask app to install the request hooks on
+    """
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -0,0 +1,282 @@
+import bisect
+import os
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from parse_xml import DATA_ROOT, parse_file
+from event_store import (PERIOD_END, PERIOD_START, SUBSTITUTION, PbpEventStore,
+                         clock_to_seconds, get_event_store)
+
+LINEUP_SLOTS = ("guard_1", "guard_2", "forward_1", "forward_2", "center")
+
+@dataclass
+class OnCourtInterval:
+    """
+    One uninterrupted spell on the floor for a player
+
+    start_event/end_event are indexes into the event store; end_event is the
+    substitution or end-of-period event that ended the spell, or None while the
+    player is still on the floor.
+    """
+    player_id: str
+    team_id: str
+    period: int
+    start_event: int
+    start_elapsed: float
+    end_event: Optional[int] = None
+    end_elapsed: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "playerId": self.player_id,
+            "teamId": self.team_id,
+            "period": self.period,
+            "startEvent": self.start_event,
+            "startElapsed": self.start_elapsed,
+            "endEvent": self.end_event,
+            "endElapsed": self.end_elapsed,
+        }
+
+def load_period_lineups(snapshot_dir_name: str, game_id: str, home_team_id: str, visitor_team_id: str) -> Dict[int, Dict[str, Set[str]]]:
+    """
+    Read the starting five of every period from roster_lineup.xml
+
+    Returns:
+        Dict mapping period -> team_id -> set of player IDs
+    """
+    file_path = os.path.join(DATA_ROOT, snapshot_dir_name, f"{game_id}_roster_lineup.xml")
+    if not os.path.isfile(file_path):
+        return {}
+
+    root = parse_file(file_path).getroot()
+    period_lineups = {}
+    for lineup in root.iter("Msg_game_lineup"):
+        period = int(lineup.get("Period", "1"))
+        period_lineups[period] = {
+            home_team_id: {lineup.get(f"Home_{slot}_id") for slot in LINEUP_SLOTS} - {None, ""},
+            visitor_team_id: {lineup.get(f"Visitor_{slot}_id") for slot in LINEUP_SLOTS} - {None, ""},
+        }
+    return period_lineups
+
+class OnCourtIndex:
+    """
+    Interval index of who was on the floor, built from period-start lineups
+    and substitution events.
+
+    For every (team, period) the index keeps the event index and elapsed time
+    at which each lineup took the floor, so "who was on court at period P,
+    clock C" or "at event i" is a binary search. Every player's spells on the
+    floor are kept in start order for "all intervals for player X".
+    """
+
+    def __init__(self, store: PbpEventStore, period_lineups: Dict[int, Dict[str, Set[str]]]):
+        self.store = store
+        self.period_lineups = period_lineups
+        self.team_ids = (store.home_team_id, store.visitor_team_id)
+
+        self.player_intervals: Dict[str, List[OnCourtInterval]] = defaultdict(list)
+        self._interval_starts: Dict[str, List[int]] = defaultdict(list)
+        # (team_id, period) -> parallel lists of segment start event, start elapsed and players
+        self._segment_events: Dict[Tuple[str, int], List[int]] = defaultdict(list)
+        self._segment_elapsed: Dict[Tuple[str, int], List[float]] = defaultdict(list)
+        self._segment_players: Dict[Tuple[str, int], List[Tuple[str, ...]]] = defaultdict(list)
+
+        self._lineups: Dict[str, Set[str]] = {team_id: set() for team_id in self.team_ids}
+        self._open: Dict[str, OnCourtInterval] = {}
+        self._period: Optional[int] = None
+        self.events_indexed = 0
+
+        self.extend()
+
+    def _start_segment(self, team_id: str, index: int, elapsed: float) -> None:
+        """Record that the team's current five took the floor at an event"""
+        key = (team_id, self._period)
+        players = tuple(sorted(self._lineups[team_id]))
+        if self._segment_events[key] and self._segment_events[key][-1] == index:
+            # Several substitutions on one event index collapse into one segment
+            self._segment_players[key][-1] = players
+            return
+        self._segment_events[key].append(index)
+        self._segment_elapsed[key].append(elapsed)
+        self._segment_players[key].append(players)
+
+    def _open_interval(self, player_id: str, team_id: str, index: int, elapsed: float) -> None:
+        interval = OnCourtInterval(player_id, team_id, self._period, index, elapsed)
+        self.player_intervals[player_id].append(interval)
+        self._interval_starts[player_id].append(index)
+        self._open[player_id] = interval
+
+    def _close_interval(self, player_id: str, index: int, elapsed: float) -> None:
+        interval = self._open.pop(player_id, None)
+        if interval is not None:
+            interval.end_event = index
+            interval.end_elapsed = elapsed
+
+    def _start_period(self, period: int, index: int, elapsed: float) -> None:
+        """Put the period's recorded starting fives on the floor"""
+        for player_id in list(self._open):
+            self._close_interval(player_id, index, elapsed)
+
+        self._period = period
+        for team_id in self.team_ids:
+            starters = self.period_lineups.get(period, {}).get(team_id)
+            if starters is not None:
+                self._lineups[team_id] = set(starters)
+            for player_id in self._lineups[team_id]:
+                self._open_interval(player_id, team_id, index, elapsed)
+            self._start_segment(team_id, index, elapsed)
+
+    def extend(self) -> None:
+        """Index events added to the store since the last call"""
+        store = self.store
+        for index in range(self.events_indexed, len(store)):
+            event = store.events[index]
+            msg_type = int(store.msg_type[index])
+            period = int(store.period[index])
+            elapsed = float(store.elapsed[index])
+
+            if msg_type == PERIOD_START or period != self._period:
+                self._start_period(period, index, elapsed)
+
+            if msg_type == SUBSTITUTION:
+                team_id = event.get("Team_id")
+                player_out_id = event.get("Person_id")
+                player_in_id = event.get("Person_id2")
+                if team_id not in self._lineups:
+                    continue
+                if player_out_id:
+                    self._lineups[team_id].discard(player_out_id)
+                    self._close_interval(player_out_id, index, elapsed)
+                if player_in_id:
+                    self._lineups[team_id].add(player_in_id)
+                    self._open_interval(player_in_id, team_id, index, elapsed)
+                self._start_segment(team_id, index, elapsed)
+
+            elif msg_type == PERIOD_END:
+                for player_id in list(self._open):
+                    self._close_interval(player_id, index, elapsed)
+
+        self.events_indexed = len(store)
+
+    def _lookup(self, team_id: str, period: int, position: float, by_event: bool) -> Tuple[str, ...]:
+        key = (team_id, period)
+        starts = self._segment_events[key] if by_event else self._segment_elapsed[key]
+        segment = bisect.bisect_right(starts, position) - 1
+        if segment < 0:
+            return ()
+        return self._segment_players[key][segment]
+
+    def on_court_at(self, period: int, clock: str) -> Dict[str, Tuple[str, ...]]:
+        """
+        Get both teams' players on the floor at a moment
+
+        Substitutions made at exactly that clock reading are applied, so the
+        answer is the lineup that played on from that moment.
+
+        Args:
+            period: Period number
+            clock: Game clock (MM:SS)
+
+        Returns:
+            Dict mapping team_id -> sorted tuple of player IDs
+        """
+        elapsed = self.store.to_elapsed(period, clock_to_seconds(clock))
+        return {team_id: self._lookup(team_id, period, elapsed, by_event=False) for team_id in self.team_ids}
+
+    def on_court_at_event(self, index: int) -> Dict[str, Tuple[str, ...]]:
+        """
+        Get both teams' players on the floor for an event in the store
+
+        Args:
+            index: Event index in the store
+
+        Returns:
+            Dict mapping team_id -> sorted tuple of player IDs
+        """
+        period = int(self.store.period[index])
+        return {team_id: self._lookup(team_id, period, index, by_event=True) for team_id in self.team_ids}
+
+    def lineup_codes(self, team_id: str) -> Tuple[List[Tuple[str, ...]], np.ndarray]:
+        """
+        The team's players on the floor for every indexed event, as a code column
+
+        Lets lineup aggregations run as bincounts over events instead of a
+        lookup per event.
+
+        Args:
+            team_id: Team identifier
+
+        Returns:
+            Tuple of (distinct lineups as sorted player ID tuples, per-event
+            index into them, -1 where no players are known)
+        """
+        lineups: List[Tuple[str, ...]] = []
+        positions: Dict[Tuple[str, ...], int] = {}
+        codes = np.full(self.events_indexed, -1, dtype=np.int64)
+        for (segment_team_id, period), starts in self._segment_events.items():
+            if segment_team_id != team_id:
+                continue
+            period_end = min(self.store.period_offsets[period][1], self.events_indexed)
+            ends = starts[1:] + [period_end]
+            for start, end, players in zip(starts, ends, self._segment_players[(segment_team_id, period)]):
+                if not players:
+                    continue
+                if players not in positions:
+                    positions[players] = len(lineups)
+                    lineups.append(players)
+                codes[start:end] = positions[players]
+        return lineups, codes
+
+    def intervals_for(self, player_id: str) -> List[OnCourtInterval]:
+        """All of a player's spells on the floor, in game order"""
+        return self.player_intervals.get(player_id, [])
+
+    def interval_at(self, player_id: str, index: int) -> Optional[OnCourtInterval]:
+        """The player's spell on the floor covering an event, if any"""
+        if player_id not in self.player_intervals:
+            return None
+        position = bisect.bisect_right(self._interval_starts[player_id], index) - 1
+        if position < 0:
+            return None
+        interval = self.player_intervals[player_id][position]
+        if interval.end_event is not None and index >= interval.end_event:
+            return None
+        return interval
+
+    def is_on_court(self, player_id: str, index: int) -> bool:
+        """Whether a player was on the floor for an event in the store"""
+        return self.interval_at(player_id, index) is not None
+
+# Indexes keyed by (snapshot_dir_name, game_id)
+_indexes: Dict[Tuple[str, str], OnCourtIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_oncourt_index(snapshot: str, game_id: str) -> Optional[OnCourtIndex]:
+    """
+    Get the on-court index for a game, extended with any newly arrived events
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_id: Game identifier
+
+    Returns:
+        OnCourtIndex, or None if the game has no event store
+    """
+    store = get_event_store(snapshot, game_id)
+    if store is None:
+        return None
+
+    key = (store.snapshot, game_id)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None or index.store is not store:
+            period_lineups = load_period_lineups(store.snapshot, game_id, store.home_team_id, store.visitor_team_id)
+            index = OnCourtIndex(store, period_lineups)
+            _indexes[key] = index
+        elif index.events_indexed < len(store):
+            index.extend()
+        return index
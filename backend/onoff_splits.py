@@ -0,0 +1,183 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from event_store import FOUL, FREE_THROW, HOME, MADE_SHOT, MISSED_SHOT, TURNOVER, VISITOR, PbpEventStore
+from oncourt_index import OnCourtIndex, get_oncourt_index
+
+# Per-player sums kept for every game; all of them add across games
+ONOFF_FIELDS = (
+    "on_points_for", "on_points_against", "on_possessions_for", "on_possessions_against", "on_seconds",
+    "off_points_for", "off_points_against", "off_possessions_for", "off_possessions_against", "off_seconds",
+    "games",
+)
+
+def incidence_matrix(index: OnCourtIndex) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Build the players x events on-court matrix for a game
+
+    Row p, column i is True when player p was on the floor for event i, using
+    the same rule as the on-court index (a substitution applies from its own
+    event onward).
+
+    Args:
+        index: On-court index of the game
+
+    Returns:
+        Tuple of (player IDs in row order, team side of each row, boolean matrix)
+    """
+    player_ids = sorted(index.player_intervals)
+    sides = np.array([index.store.team_side_of(index.player_intervals[p][0].team_id) for p in player_ids], dtype=np.int64)
+    matrix = np.zeros((len(player_ids), len(index.store)), dtype=bool)
+    for row, player_id in enumerate(player_ids):
+        for interval in index.player_intervals[player_id]:
+            end = interval.end_event if interval.end_event is not None else len(index.store)
+            matrix[row, interval.start_event:end] = True
+    return player_ids, sides, matrix
+
+def credit_columns(store: PbpEventStore) -> np.ndarray:
+    """
+    Event whose lineup is credited with each event's points
+
+    Free throws belong to the players on the floor when the foul was called,
+    so a substitution between free throws doesn't move their points to the
+    new player. Every other event credits its own lineup.
+    """
+    positions = np.arange(len(store))
+    last_foul = np.maximum.accumulate(np.where(store.msg_type == FOUL, positions, 0)) if len(store) else positions
+    return np.where(store.msg_type == FREE_THROW, last_foul, positions)
+
+def event_vectors(store: PbpEventStore) -> Dict[str, np.ndarray]:
+    """
+    Per-event score, possession and time deltas as events x 2 arrays (home, visitor)
+
+    Possessions use LineupTracker's definition (field goal attempts plus
+    turnovers) so on/off splits line up with the lineup stats. Each event owns
+    the time until the next event.
+    """
+    possession_end = np.isin(store.msg_type, (MADE_SHOT, MISSED_SHOT, TURNOVER))
+    seconds = np.diff(store.elapsed, append=store.elapsed[-1] if len(store) else 0.0)
+    return {
+        "points": np.column_stack([store.home_points, store.visitor_points]).astype(np.float64),
+        "possessions": np.column_stack([
+            possession_end & (store.team_side == HOME),
+            possession_end & (store.team_side == VISITOR),
+        ]).astype(np.float64),
+        "seconds": np.clip(seconds, 0, None),
+    }
+
+def compute_onoff(index: OnCourtIndex, event_mask: Optional[np.ndarray] = None) -> Dict[str, Dict]:
+    """
+    On/off court sums for every player who appeared in a game
+
+    The on sums are matrix products of the incidence matrix with the per-event
+    vectors; off sums are the team's game totals minus the on sums. Points
+    match the boxscore PlusMinus convention for free throws.
+
+    Args:
+        index: On-court index of the game
+        event_mask: Only count events where this boolean array is True
+            (a situation mask, for example)
+
+    Returns:
+        Dict mapping player_id to team_id plus ONOFF_FIELDS
+    """
+    store = index.store
+    player_ids, sides, matrix = incidence_matrix(index)
+    if not player_ids:
+        return {}
+
+    vectors = event_vectors(store)
+    if event_mask is not None:
+        vectors = {name: (vector.T * event_mask).T for name, vector in vectors.items()}
+    weights = matrix.astype(np.float64)
+    on_points = weights[:, credit_columns(store)] @ vectors["points"]  # players x (home, visitor)
+    on_possessions = weights @ vectors["possessions"]
+    on_seconds = weights @ vectors["seconds"]
+
+    total_points = vectors["points"].sum(axis=0)
+    total_possessions = vectors["possessions"].sum(axis=0)
+    total_seconds = vectors["seconds"].sum()
+
+    rows = np.arange(len(player_ids))
+    own, other = sides, 1 - sides
+    columns = {
+        "on_points_for": on_points[rows, own],
+        "on_points_against": on_points[rows, other],
+        "on_possessions_for": on_possessions[rows, own],
+        "on_possessions_against": on_possessions[rows, other],
+        "on_seconds": on_seconds,
+    }
+    columns["off_points_for"] = total_points[own] - columns["on_points_for"]
+    columns["off_points_against"] = total_points[other] - columns["on_points_against"]
+    columns["off_possessions_for"] = total_possessions[own] - columns["on_possessions_for"]
+    columns["off_possessions_against"] = total_possessions[other] - columns["on_possessions_against"]
+    columns["off_seconds"] = total_seconds - on_seconds
+
+    splits = {}
+    for row, player_id in enumerate(player_ids):
+        splits[player_id] = {"team_id": store.team_id_of(int(sides[row])), "games": 1}
+        for name, values in columns.items():
+            splits[player_id][name] = float(values[row])
+    return splits
+
+def _net(points_for: float, points_against: float, possessions_for: float, possessions_against: float) -> Dict[str, float]:
+    ppp = points_for / possessions_for if possessions_for > 0 else 0
+    papp = points_against / possessions_against if possessions_against > 0 else 0
+    return {"ppp": ppp, "papp": papp, "net_rating": ppp - papp}
+
+def onoff_metrics(row: Dict) -> Dict:
+    """
+    Turn a player's on/off sums into ratings
+
+    Ratings are per possession, like lineup_efficiency, and plus_minus is the
+    score margin while the player was on the floor.
+    """
+    on = _net(row["on_points_for"], row["on_points_against"], row["on_possessions_for"], row["on_possessions_against"])
+    off = _net(row["off_points_for"], row["off_points_against"], row["off_possessions_for"], row["off_possessions_against"])
+    return {
+        **row,
+        "plus_minus": int(round(row["on_points_for"] - row["on_points_against"])),
+        "on": on,
+        "off": off,
+        "on_off_net": on["net_rating"] - off["net_rating"],
+    }
+
+def current_stint_plus_minus(index: OnCourtIndex, player_id: str) -> int:
+    """Score margin since a player last checked in, or 0 if they are on the bench"""
+    store = index.store
+    intervals = index.intervals_for(player_id)
+    if not intervals or intervals[-1].end_event is not None:
+        return 0
+
+    credited = credit_columns(store) >= intervals[-1].start_event
+    margin = int(store.home_points[credited].sum() - store.visitor_points[credited].sum())
+    return margin if store.team_side_of(intervals[-1].team_id) == HOME else -margin
+
+# Splits keyed by (snapshot_dir_name, game_id) -> (store, events covered, splits)
+_splits: Dict[Tuple[str, str], Tuple[PbpEventStore, int, Dict[str, Dict]]] = {}
+_splits_lock = threading.Lock()
+
+def get_onoff_splits(snapshot: str, game_id: str) -> Optional[Dict[str, Dict]]:
+    """
+    Get on/off sums for a game, recomputed only when new events have arrived
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_id: Game identifier
+
+    Returns:
+        Dict mapping player_id to on/off sums, or None if the game has no event store
+    """
+    index = get_oncourt_index(snapshot, game_id)
+    if index is None:
+        return None
+
+    key = (index.store.snapshot, game_id)
+    with _splits_lock:
+        cached = _splits.get(key)
+        if cached is None or cached[0] is not index.store or cached[1] != len(index.store):
+            cached = (index.store, len(index.store), compute_onoff(index))
+            _splits[key] = cached
+        return cached[2]
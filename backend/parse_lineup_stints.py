@@ -1,13 +1,19 @@
 from lxml import etree
+import logging
 import os
+import bisect
 from typing import Dict, List, Set, Tuple, Optional
 from dataclasses import dataclass, field
 from collections import defaultdict
 from pathlib import Path
 
-# Define data root path - going up one directory from backend to find data folder
-DATA_ROOT = Path(__file__).parent.parent / "data"
-print(f"Data root path: {DATA_ROOT}")  # Debug print to verify path
+import parse_xml
+from parse_xml import parse_file
+
+# Snapshot directories, shared with parse_xml so PBP_DATA_ROOT applies here too
+SNAPSHOT_ROOT = Path(parse_xml.DATA_ROOT)
+logger = logging.getLogger(__name__)
+logger.debug(f"Snapshot root path: {SNAPSHOT_ROOT}")
 
 # Data Classes for Type Hints
 @dataclass
@@ -19,7 +25,6 @@ class PlayerStint:
     start_time: str
     period: int
     end_time: Optional[str] = None
-    plus_minus: int = 0
     fg_made: int = 0
     fg_attempted: int = 0
     turnovers: int = 0
@@ -51,6 +56,104 @@ class TeamStats:
     fg_attempted: int = 0
     current_lineup: Set[str] = field(default_factory=set)
 
+def lineup_efficiency(stats: LineupStats) -> Dict[str, float]:
+    """
+    Calculate PPP, PAPP and net rating for a lineup's accumulated stats
+    """
+    ppp = stats.points_for / stats.possessions_for if stats.possessions_for > 0 else 0
+    papp = stats.points_against / stats.possessions_against if stats.possessions_against > 0 else 0
+
+    return {
+        "ppp": ppp,
+        "papp": papp,
+        "net_rating": ppp - papp
+    }
+
+class LineupLeaderboard:
+    """
+    Keep lineups ranked by each efficiency metric as their stats change.
+
+    Each metric holds a sorted list of (sort_value, lineup_key) entries for the
+    lineups that meet the possession threshold. An update finds the old and new
+    positions by binary search, but deleting and inserting shift the list, so
+    it costs O(n) in the number of ranked lineups (a memmove, cheap at the few
+    hundred lineups a game produces). The top-k is a prefix of the list instead
+    of a full re-sort of lineup_history.
+    """
+    METRICS = ("net_rating", "ppp", "papp")
+    LOWER_IS_BETTER = {"papp"}
+
+    def __init__(self, min_possessions: int = 5):
+        self.min_possessions = min_possessions
+        self.metrics: Dict[str, Dict[str, float]] = {}  # lineup_key -> cached efficiency metrics
+        self.possessions: Dict[str, int] = {}
+        self._ranked: Dict[str, List[Tuple[float, str]]] = {metric: [] for metric in self.METRICS}
+
+    def _sort_value(self, metric: str, value: float) -> float:
+        """Lists are kept ascending, so best-first means negating higher-is-better metrics"""
+        return value if metric in self.LOWER_IS_BETTER else -value
+
+    def update(self, lineup_key: str, stats: LineupStats) -> Dict[str, float]:
+        """
+        Recalculate one lineup's metrics and move it to its new rank
+
+        Args:
+            lineup_key: Unique lineup identifier
+            stats: The lineup's current accumulated stats
+
+        Returns:
+            The lineup's updated efficiency metrics
+        """
+        self._remove(lineup_key)
+
+        metrics = lineup_efficiency(stats)
+        self.metrics[lineup_key] = metrics
+        self.possessions[lineup_key] = stats.possessions_for
+
+        if stats.possessions_for >= self.min_possessions:
+            for metric in self.METRICS:
+                entry = (self._sort_value(metric, metrics[metric]), lineup_key)
+                bisect.insort(self._ranked[metric], entry)
+
+        return metrics
+
+    def _remove(self, lineup_key: str) -> None:
+        """Drop a lineup's current entries from every ranking"""
+        old_metrics = self.metrics.get(lineup_key)
+        if old_metrics is None or self.possessions[lineup_key] < self.min_possessions:
+            return
+
+        for metric in self.METRICS:
+            ranked = self._ranked[metric]
+            entry = (self._sort_value(metric, old_metrics[metric]), lineup_key)
+            index = bisect.bisect_left(ranked, entry)
+            if index < len(ranked) and ranked[index] == entry:
+                del ranked[index]
+
+    def top(self, metric: str = "net_rating", k: Optional[int] = None, min_possessions: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Get the best lineups for a metric
+
+        Args:
+            metric: Metric to rank by ('net_rating', 'ppp', or 'papp')
+            k: Number of lineups to return, all qualifying lineups if None
+            min_possessions: Stricter possession threshold than the leaderboard's own
+
+        Returns:
+            List of (lineup_key, metric_value) tuples, best first
+        """
+        if metric not in self._ranked:
+            raise ValueError(f"Unknown lineup metric: {metric}")
+
+        results = []
+        for _, lineup_key in self._ranked[metric]:
+            if min_possessions is not None and self.possessions[lineup_key] < min_possessions:
+                continue
+            results.append((lineup_key, self.metrics[lineup_key][metric]))
+            if k is not None and len(results) >= k:
+                break
+        return results
+
 class LineupTracker:
     def __init__(self, game_id: str, snapshot: str, home_team_id: str, away_team_id: str, verbose: bool = False):
         self.game_id = game_id
@@ -83,6 +186,21 @@ class LineupTracker:
             home_team_id: 0,
             away_team_id: 0
         }
+        self.lineup_start_clock: Dict[str, str] = {
+            home_team_id: "12:00",
+            away_team_id: "12:00"
+        }
+
+        # Period-start lineups from roster_lineup.xml, keyed by period then team
+        self.period_lineups: Dict[int, Dict[str, Set[str]]] = {}
+
+        # Loaded PBP events and how many of them have been applied
+        self.events_processed: int = 0
+        self._pbp_events: List[etree._Element] = []
+        self._pbp_signature: Optional[Tuple] = None
+
+        # Lineup rankings kept in sync with lineup_history as events arrive
+        self.leaderboard = LineupLeaderboard()
 
     @staticmethod
     def clock_to_seconds(clock_str: str) -> float:
@@ -141,6 +259,47 @@ class LineupTracker:
         players = sorted(list(self.current_lineups[team_id]))
         return f"{team_id}-{'_'.join(players)}"
 
+    def _ensure_lineup(self, team_id: str) -> str:
+        """
+        Get the key for a team's current lineup, creating its stats entry if needed
+        
+        Args:
+            team_id: Team identifier
+            
+        Returns:
+            Lineup key present in lineup_history
+        """
+        lineup_key = self.get_lineup_key(team_id)
+        if lineup_key not in self.lineup_history:
+            self.lineup_history[lineup_key] = LineupStats(
+                players=self.current_lineups[team_id].copy()
+            )
+            self.leaderboard.update(lineup_key, self.lineup_history[lineup_key])
+        return lineup_key
+
+    def _refresh_leaderboard(self, *lineup_keys: str) -> None:
+        """Re-rank lineups whose stats just changed"""
+        for lineup_key in lineup_keys:
+            self.leaderboard.update(lineup_key, self.lineup_history[lineup_key])
+
+    def _opponent_id(self, team_id: str) -> str:
+        """Get the other team's identifier"""
+        return self.away_team_id if team_id == self.home_team_id else self.home_team_id
+
+    def _close_lineup_segment(self, team_id: str, game_clock: str) -> None:
+        """
+        Credit a team's current lineup with the minutes since it took the floor
+        
+        Args:
+            team_id: Team identifier
+            game_clock: Game clock when the lineup changes or the period ends
+        """
+        if self.current_lineups[team_id]:
+            lineup_key = self._ensure_lineup(team_id)
+            elapsed = self.clock_to_seconds(self.lineup_start_clock[team_id]) - self.clock_to_seconds(game_clock)
+            self.lineup_history[lineup_key].minutes_played += max(elapsed, 0) / 60
+        self.lineup_start_clock[team_id] = game_clock
+
     def update_lineup_tracking(self, team_id: str, player_in_id: str, player_out_id: str, game_clock: str) -> None:
         """
         Update lineup tracking when substitution occurs
@@ -151,16 +310,15 @@ class LineupTracker:
             player_out_id: Player leaving game
             game_clock: Current game clock
         """
+        # Close out the outgoing lineup's minutes
+        self._close_lineup_segment(team_id, game_clock)
+
         # Update current lineup
-        self.current_lineups[team_id].remove(player_out_id)
+        self.current_lineups[team_id].discard(player_out_id)
         self.current_lineups[team_id].add(player_in_id)
         
         # Get or create lineup stats
-        lineup_key = self.get_lineup_key(team_id)
-        if lineup_key not in self.lineup_history:
-            self.lineup_history[lineup_key] = LineupStats(
-                players=self.current_lineups[team_id].copy()
-            )
+        self._ensure_lineup(team_id)
 
     def track_points_scored(self, team_id: str, points: int, opponent_id: str) -> None:
         """
@@ -176,11 +334,12 @@ class LineupTracker:
         self.current_run[opponent_id] = 0
         
         # Update lineup stats
-        lineup_key = self.get_lineup_key(team_id)
-        opp_lineup_key = self.get_lineup_key(opponent_id)
+        lineup_key = self._ensure_lineup(team_id)
+        opp_lineup_key = self._ensure_lineup(opponent_id)
         
         self.lineup_history[lineup_key].points_for += points
         self.lineup_history[opp_lineup_key].points_against += points
+        self._refresh_leaderboard(lineup_key, opp_lineup_key)
 
     def calculate_lineup_efficiency(self, lineup_key: str) -> Dict[str, float]:
         """
@@ -193,106 +352,70 @@ class LineupTracker:
             Dict containing PPP (points per possession) and 
             PAPP (points allowed per possession)
         """
-        stats = self.lineup_history[lineup_key]
-        ppp = stats.points_for / stats.possessions_for if stats.possessions_for > 0 else 0
-        papp = stats.points_against / stats.possessions_against if stats.possessions_against > 0 else 0
-        
-        return {
-            "ppp": ppp,
-            "papp": papp,
-            "net_rating": ppp - papp
-        }
+        return lineup_efficiency(self.lineup_history[lineup_key])
 
     def initialize_from_files(self) -> None:
-        """Initialize tracker with starting lineups"""
-        # Get current period from boxscore
-        boxscore = self.load_boxscore()
-        self.current_period = int(boxscore.get("current_period", "1"))
-        
-        # Load initial lineups
-        lineups = self.load_lineups()
+        """Initialize tracker with game state and period-start lineups"""
+        self._load_boxscore()
+        self._load_roster_lineup()
         
-        # Track all players that appear in lineups
-        all_players = set()
-        for team_id, team_data in lineups.items():
-            for player in team_data["players"]:
-                all_players.add(player["person_id"])
-                
-        # Initialize stint history for all players
-        for player_id in all_players:
-            if player_id not in self.player_stint_history:
-                self.player_stint_history[player_id] = []
-                
-        # Initialize current lineups
-        for team_id, team_data in lineups.items():
-            current_players = set()
-            for player in team_data["players"]:
-                if player.get("on_court"):
-                    player_id = player["person_id"]
-                    current_players.add(player_id)
-                    # Initialize stint for players on court
-                    self.initialize_player_stint(player_id, "12:00", self.current_period)
-                    
-            self.current_lineups[team_id] = current_players
+        # Initialize stint history for all players in the starting lineups
+        for players in self.current_lineups.values():
+            for player_id in players:
+                if player_id not in self.player_stint_history:
+                    self.player_stint_history[player_id] = []
 
     def _load_roster_lineup(self) -> Optional[Dict]:
         """Load and parse roster_lineup.xml"""
         snapshot_dir = self.snapshot.lower().replace(' ', '_')
         filename = f"{self.game_id}_roster_lineup.xml"
-        file_path = DATA_ROOT / "pbp_snap_shot" / snapshot_dir / filename
+        file_path = SNAPSHOT_ROOT / snapshot_dir / filename
         
         if not file_path.exists():
             print(f"Roster file not found: {file_path}")
             return None
         
         try:
-            tree = etree.parse(str(file_path))
+            tree = parse_file(str(file_path))
             root = tree.getroot()
             
-            # Get initial lineup for current period
+            # Get starting lineup for every period
             lineups = root.xpath(".//Msg_game_lineup")
             if not lineups:
                 print("No lineup data found")
                 return None
             
-            current_lineup = lineups[-1]  # Get most recent lineup
-            
-            # Initialize home team lineup
-            home_players = [
-                current_lineup.get("Home_guard_1_id"),
-                current_lineup.get("Home_guard_2_id"),
-                current_lineup.get("Home_forward_1_id"),
-                current_lineup.get("Home_forward_2_id"),
-                current_lineup.get("Home_center_id")
-            ]
-            
-            # Initialize away team lineup
-            away_players = [
-                current_lineup.get("Visitor_guard_1_id"),
-                current_lineup.get("Visitor_guard_2_id"),
-                current_lineup.get("Visitor_forward_1_id"),
-                current_lineup.get("Visitor_forward_2_id"),
-                current_lineup.get("Visitor_center_id")
-            ]
-            
-            # Store current lineups
-            self.current_lineups[self.home_team_id] = {pid for pid in home_players if pid}
-            self.current_lineups[self.away_team_id] = {pid for pid in away_players if pid}
-            
-            print("\nInitial Lineups:")
-            print(f"Home Team ({self.home_team_id}): {self.current_lineups[self.home_team_id]}")
-            print(f"Away Team ({self.away_team_id}): {self.current_lineups[self.away_team_id]}")
-            
-            # Initialize stint tracking for all players
-            period_start = "12:00" if self.current_period <= 4 else "5:00"
+            for period_lineup in lineups:
+                period = int(period_lineup.get("Period", "1"))
+                
+                home_players = [
+                    period_lineup.get("Home_guard_1_id"),
+                    period_lineup.get("Home_guard_2_id"),
+                    period_lineup.get("Home_forward_1_id"),
+                    period_lineup.get("Home_forward_2_id"),
+                    period_lineup.get("Home_center_id")
+                ]
+                
+                away_players = [
+                    period_lineup.get("Visitor_guard_1_id"),
+                    period_lineup.get("Visitor_guard_2_id"),
+                    period_lineup.get("Visitor_forward_1_id"),
+                    period_lineup.get("Visitor_forward_2_id"),
+                    period_lineup.get("Visitor_center_id")
+                ]
+                
+                self.period_lineups[period] = {
+                    self.home_team_id: {pid for pid in home_players if pid},
+                    self.away_team_id: {pid for pid in away_players if pid}
+                }
             
-            for player_id in self.current_lineups[self.home_team_id]:
-                self.initialize_player_stint(player_id, period_start, self.current_period)
-                print(f"Initialized stint for home player: {player_id}")
+            # Events are replayed from the first period on
+            self._handle_period_start(min(self.period_lineups))
             
-            for player_id in self.current_lineups[self.away_team_id]:
-                self.initialize_player_stint(player_id, period_start, self.current_period)
-                print(f"Initialized stint for away player: {player_id}")
+            if self.verbose:
+                print("\nInitial Lineups:")
+                print(f"Home Team ({self.home_team_id}): {self.current_lineups[self.home_team_id]}")
+                print(f"Away Team ({self.away_team_id}): {self.current_lineups[self.away_team_id]}")
             
             return {"success": True}
             
@@ -304,14 +427,14 @@ class LineupTracker:
         """Load and parse boxscore.xml for current game state"""
         snapshot_dir = self.snapshot.lower().replace(' ', '_')
         filename = f"{self.game_id}_boxscore.xml"
-        file_path = DATA_ROOT / "pbp_snap_shot" / snapshot_dir / filename
+        file_path = SNAPSHOT_ROOT / snapshot_dir / filename
         
         if not file_path.exists():
             print(f"Boxscore file not found: {file_path}")
             return None
         
         try:
-            tree = etree.parse(str(file_path))
+            tree = parse_file(str(file_path))
             root = tree.getroot()
             
             # Get current period and game clock
@@ -319,9 +442,10 @@ class LineupTracker:
             self.current_period = int(period_info.get("Period", "1"))
             self.current_game_clock = period_info.get("Game_clock", "12:00")
             
-            print(f"\nGame State from Boxscore:")
-            print(f"Period: {self.current_period}")
-            print(f"Game Clock: {self.current_game_clock}")
+            if self.verbose:
+                print(f"\nGame State from Boxscore:")
+                print(f"Period: {self.current_period}")
+                print(f"Game Clock: {self.current_game_clock}")
             
             return {"success": True}
             
@@ -329,33 +453,122 @@ class LineupTracker:
             print(f"Error loading boxscore file: {e}")
             return None
 
+    def load_pbp_events(self) -> List[etree._Element]:
+        """
+        Load play-by-play events from every period file in the snapshot
+        
+        Files are only re-parsed when their size or modification time changes,
+        so repeated calls during a live game cost a few stat() calls.
+        
+        Returns:
+            All events in period order
+        """
+        snapshot_dir = SNAPSHOT_ROOT / self.snapshot.lower().replace(' ', '_')
+        pbp_files = sorted(
+            snapshot_dir.glob(f"{self.game_id}_pbp_Q*.xml"),
+            key=lambda path: int(path.stem.split("_Q")[-1])
+        )
+        
+        signature = tuple((path.name, path.stat().st_mtime_ns, path.stat().st_size) for path in pbp_files)
+        if signature != self._pbp_signature:
+            events = []
+            for path in pbp_files:
+                tree = parse_file(str(path))
+                events.extend(tree.getroot().xpath(".//Event_pbp"))
+            self._pbp_events = events
+            self._pbp_signature = signature
+        
+        return self._pbp_events
+
     def process_pbp_events(self):
-        """Process play-by-play events to track lineups and stats"""
+        """Process play-by-play events that arrived since the last call"""
         events = self.load_pbp_events()
         
-        for event in events:
-            # Update game clock
-            self.current_game_clock = event.get("Game_clock", self.current_game_clock)
+        for event in events[self.events_processed:]:
+            self.process_event(event)
+        self.events_processed = len(events)
+
+    def process_event(self, event: etree._Element) -> None:
+        """
+        Apply a single play-by-play event to lineups, stints and lineup stats
+        
+        Args:
+            event: Event_pbp element (or any mapping with the same attributes)
+        """
+        # Update game clock
+        self.current_game_clock = event.get("Game_clock", self.current_game_clock)
+        
+        msg_type = event.get("Msg_type")
+        team_id = event.get("Team_id")
+        player_id = event.get("Person_id")
+        
+        # Initialize player if not seen before
+        if player_id and player_id not in self.player_stint_history:
+            self.player_stint_history[player_id] = []
             
-            msg_type = event.get("Msg_type")
-            team_id = event.get("Team_id")
-            player_id = event.get("Person_id")
+        # Process event based on type
+        if msg_type == "12":  # Start of period
+            self._handle_period_start(int(event.get("Period", self.current_period)), self.current_game_clock)
             
-            # Initialize player if not seen before
-            if player_id and player_id not in self.player_stint_history:
-                self.player_stint_history[player_id] = []
-                
-            # Process event based on type
-            if msg_type == "8":  # Substitution
-                player_in_id = event.get("Person1")
-                player_out_id = event.get("Person2")
-                
-                # Initialize players if not seen before
-                for pid in [player_in_id, player_out_id]:
-                    if pid and pid not in self.player_stint_history:
-                        self.player_stint_history[pid] = []
-                        
+        elif msg_type == "13":  # End of period
+            self._handle_period_end()
+            
+        elif msg_type == "8":  # Substitution
+            player_out_id = event.get("Person_id")
+            player_in_id = event.get("Person_id2")
+            
+            # Initialize players if not seen before
+            for pid in [player_in_id, player_out_id]:
+                if pid and pid not in self.player_stint_history:
+                    self.player_stint_history[pid] = []
+                    
+            if team_id in self.current_lineups:
                 self._handle_substitution(team_id, player_in_id, player_out_id)
+                
+        elif msg_type == "1":  # Made shot
+            self._handle_made_shot(event)
+            
+        elif msg_type == "2":  # Missed shot
+            self._handle_missed_shot(event)
+            
+        elif msg_type == "3":  # Free throw
+            self._handle_free_throw(event)
+            
+        elif msg_type == "5":  # Turnover
+            self._handle_turnover(event)
+            
+        elif msg_type == "6":  # Foul
+            self._handle_foul(event)
+
+    def _handle_period_start(self, period: int, start_clock: Optional[str] = None) -> None:
+        """
+        Put a period's recorded starting five on the floor and start their stints
+        
+        Args:
+            period: Period number
+            start_clock: Clock on the start-of-period event. Untimed G League
+                overtime starts at 99:00 rather than 5:00, so prefer the feed's value.
+        """
+        self.current_period = period
+        self.current_game_clock = start_clock or ("12:00" if period <= 4 else "5:00")
+        
+        for team_id, players in self.period_lineups.get(period, {}).items():
+            self.current_lineups[team_id] = players.copy()
+            
+        for team_id, players in self.current_lineups.items():
+            self.lineup_start_clock[team_id] = self.current_game_clock
+            for player_id in players:
+                self.initialize_player_stint(player_id, self.current_game_clock, period)
+            if players:
+                self._ensure_lineup(team_id)
+
+    def _handle_period_end(self) -> None:
+        """Close out lineup minutes and player stints at the end of a period"""
+        for team_id in self.current_lineups:
+            self._close_lineup_segment(team_id, self.current_game_clock)
+            
+        for player_id in list(self.player_stints):
+            self.end_player_stint(player_id, self.current_game_clock)
 
     def _handle_substitution(self, team_id: str, player_in_id: str, player_out_id: str) -> None:
         """Handle substitution event"""
@@ -374,31 +587,23 @@ class LineupTracker:
             team_id = event.get("Team_id")
             player_id = event.get("Person_id")
             points = int(event.get("Pts", "2"))
-            opponent_id = self.away_team_id if team_id == self.home_team_id else self.home_team_id
+            opponent_id = self._opponent_id(team_id)
             
             # Update player stats
             if player_id in self.player_stints:
                 self.player_stints[player_id].fg_made += 1
                 self.player_stints[player_id].fg_attempted += 1
             
-            # Get lineup keys
-            scoring_lineup_key = self.get_lineup_key(team_id)
-            opposing_lineup_key = self.get_lineup_key(opponent_id)
-            
-            # Ensure both lineups exist in history
-            if scoring_lineup_key not in self.lineup_history:
-                self.lineup_history[scoring_lineup_key] = LineupStats(
-                    players=self.current_lineups[team_id].copy()
-                )
-            if opposing_lineup_key not in self.lineup_history:
-                self.lineup_history[opposing_lineup_key] = LineupStats(
-                    players=self.current_lineups[opponent_id].copy()
-                )
+            # Get lineup keys, ensuring both lineups exist in history
+            scoring_lineup_key = self._ensure_lineup(team_id)
+            opposing_lineup_key = self._ensure_lineup(opponent_id)
             
             # Update lineup stats
             self.lineup_history[scoring_lineup_key].points_for += points
             self.lineup_history[opposing_lineup_key].points_against += points
             self.lineup_history[scoring_lineup_key].possessions_for += 1
+            self.lineup_history[opposing_lineup_key].possessions_against += 1
+            self._refresh_leaderboard(scoring_lineup_key, opposing_lineup_key)
             
             # Update run counter
             self.current_run[team_id] += points
@@ -417,32 +622,61 @@ class LineupTracker:
         team_id = event.get("Team_id")
         player_id = event.get("Person_id")
         
+        if team_id not in self.current_lineups:
+            return
+        
         # Update player stats - increment attempts only
         if player_id in self.player_stints:
             self.player_stints[player_id].fg_attempted += 1
         
-        # Update possession counter
-        lineup_key = self.get_lineup_key(team_id)
-        if lineup_key in self.lineup_history:
-            self.lineup_history[lineup_key].possessions_for += 1
-            if self.verbose:
-                print(f"Possession ended - missed shot by {player_id}")
+        # Update possession counters
+        lineup_key = self._ensure_lineup(team_id)
+        opposing_lineup_key = self._ensure_lineup(self._opponent_id(team_id))
+        self.lineup_history[lineup_key].possessions_for += 1
+        self.lineup_history[opposing_lineup_key].possessions_against += 1
+        self._refresh_leaderboard(lineup_key, opposing_lineup_key)
+        if self.verbose:
+            print(f"Possession ended - missed shot by {player_id}")
+
+    def _handle_free_throw(self, event: etree._Element) -> None:
+        """Handle free throw event - made free throws carry their points in Pts"""
+        team_id = event.get("Team_id")
+        points = int(event.get("Pts", "0"))
+        if team_id not in self.current_lineups or points <= 0:
+            return
+        
+        opponent_id = self._opponent_id(team_id)
+        scoring_lineup_key = self._ensure_lineup(team_id)
+        opposing_lineup_key = self._ensure_lineup(opponent_id)
+        
+        self.lineup_history[scoring_lineup_key].points_for += points
+        self.lineup_history[opposing_lineup_key].points_against += points
+        self._refresh_leaderboard(scoring_lineup_key, opposing_lineup_key)
+        
+        # Update run counter
+        self.current_run[team_id] += points
+        self.current_run[opponent_id] = 0
 
     def _handle_turnover(self, event: etree._Element) -> None:
         """Handle turnover event"""
         team_id = event.get("Team_id")
         player_id = event.get("Person_id")
         
+        if team_id not in self.current_lineups:
+            return
+        
         # Update player stats
         if player_id in self.player_stints:
             self.player_stints[player_id].turnovers += 1
             if self.verbose:
                 print(f"Turnover by {player_id}")
         
-        # Update possession counter
-        lineup_key = self.get_lineup_key(team_id)
-        if lineup_key in self.lineup_history:
-            self.lineup_history[lineup_key].possessions_for += 1
+        # Update possession counters
+        lineup_key = self._ensure_lineup(team_id)
+        opposing_lineup_key = self._ensure_lineup(self._opponent_id(team_id))
+        self.lineup_history[lineup_key].possessions_for += 1
+        self.lineup_history[opposing_lineup_key].possessions_against += 1
+        self._refresh_leaderboard(lineup_key, opposing_lineup_key)
 
     def _handle_foul(self, event: etree._Element) -> None:
         """Handle foul event"""
@@ -485,20 +719,19 @@ class LineupTracker:
             min_possessions: Minimum possessions for lineup to be included
             
         Returns:
-            List of (lineup_key, metric_value) tuples, sorted by metric
+            List of (lineup_key, metric_value) tuples, best first
+            (lowest first for 'papp')
         """
-        ranked_lineups = []
-        
-        for lineup_key, lineup in self.lineup_history.items():
-            # Check minimum possession requirement
-            if lineup.possessions_for < min_possessions:
-                continue
-            
-            efficiency = self.calculate_lineup_efficiency(lineup_key)
-            ranked_lineups.append((lineup_key, efficiency[metric]))
-        
-        # Sort by metric value (descending)
-        ranked_lineups.sort(key=lambda x: x[1], reverse=True)
+        if min_possessions >= self.leaderboard.min_possessions:
+            ranked_lineups = self.leaderboard.top(metric, min_possessions=min_possessions)
+        else:
+            # Threshold is looser than the leaderboard's, so fall back to a full pass
+            ranked_lineups = [
+                (lineup_key, self.calculate_lineup_efficiency(lineup_key)[metric])
+                for lineup_key, lineup in self.lineup_history.items()
+                if lineup.possessions_for >= min_possessions
+            ]
+            ranked_lineups.sort(key=lambda x: x[1], reverse=metric not in LineupLeaderboard.LOWER_IS_BETTER)
         
         if self.verbose:
             print(f"\nLineups ranked by {metric}:")
@@ -509,27 +742,88 @@ class LineupTracker:
 
     def calculate_total_minutes(self, player_id: str) -> str:
         """Calculate total minutes played across all stints"""
+        stints = list(self.player_stint_history.get(player_id, []))
+        if player_id in self.player_stints:
+            stints.append(self.player_stints[player_id])
+        
         total_seconds = sum(
             self.clock_to_seconds(stint.start_time) - self.clock_to_seconds(stint.end_time or self.current_game_clock)
-            for stint in self.player_stint_history.get(player_id, [])
+            for stint in stints
         )
         minutes = int(total_seconds // 60)
         seconds = int(total_seconds % 60)
         return f"{minutes}:{seconds:02d}"
 
-    def generate_lineup_report(self) -> Dict:
-        """Generate comprehensive lineup report"""
-        efficiencies = self.calculate_all_lineup_efficiencies()
+    def get_current_stint_stats(self, player_id: str) -> Dict:
+        """Get stats for a player's stint in progress"""
+        stint = self.player_stints.get(player_id)
+        if stint is None:
+            return {
+                "startTime": None,
+                "fgm": 0,
+                "fga": 0,
+                "stintDuration": "0:00",
+                "turnovers": 0,
+                "fouls": 0
+            }
         
+        return {
+            "startTime": stint.start_time,
+            "fgm": stint.fg_made,
+            "fga": stint.fg_attempted,
+            "stintDuration": self.calculate_stint_duration(stint.start_time, self.current_game_clock),
+            "turnovers": stint.turnovers,
+            "fouls": stint.fouls
+        }
+
+    def get_total_stats(self, player_id: str) -> Dict:
+        """Get stats summed over all of a player's stints, including the current one"""
+        stints = list(self.player_stint_history.get(player_id, []))
+        if player_id in self.player_stints:
+            stints.append(self.player_stints[player_id])
+        
+        return {
+            "minutes": self.calculate_total_minutes(player_id),
+            "fgm": sum(stint.fg_made for stint in stints),
+            "fga": sum(stint.fg_attempted for stint in stints),
+            "turnovers": sum(stint.turnovers for stint in stints),
+            "fouls": sum(stint.fouls for stint in stints)
+        }
+
+    def generate_lineup_report(self, top_k: int = 5) -> Dict:
+        """
+        Generate comprehensive lineup report
+        
+        Lineup efficiencies come from the leaderboard's cached metrics, which are
+        updated as events arrive, rather than being recomputed for every lineup.
+        
+        Args:
+            top_k: Number of lineups to include per metric in bestLineups
+        """
         # Ensure all players have stats
         all_players = set()
         for team_id, players in self.current_lineups.items():
             all_players.update(players)
         
         return {
-            "currentLineups": self.current_lineups,
+            "currentLineups": {
+                team_id: sorted(players)
+                for team_id, players in self.current_lineups.items()
+            },
             "lineupStats": {
-                # ... existing lineup stats ...
+                lineup_key: {
+                    "efficiency": self.leaderboard.metrics[lineup_key],
+                    "points_for": stats.points_for,
+                    "points_against": stats.points_against,
+                    "possessions_for": stats.possessions_for,
+                    "possessions_against": stats.possessions_against,
+                    "minutes_played": stats.minutes_played
+                }
+                for lineup_key, stats in self.lineup_history.items()
+            },
+            "bestLineups": {
+                metric: self.leaderboard.top(metric, top_k)
+                for metric in LineupLeaderboard.METRICS
             },
             "playerStats": {
                 player_id: {
@@ -585,7 +879,7 @@ class LineupTracker:
             for player_id in players:
                 stint = self.player_stints.get(player_id)
                 if stint:
-                    print(f"  {player_id}: +/-={stint.plus_minus}, FGM/A={stint.fg_made}/{stint.fg_attempted}")
+                    print(f"  {player_id}: FGM/A={stint.fg_made}/{stint.fg_attempted}")
                     
             lineup_key = self.get_lineup_key(team_id)
             if lineup_key in self.lineup_history:
@@ -626,9 +920,9 @@ class LineupTracker:
         # Load PBP file
         snapshot_dir = self.snapshot.lower().replace(' ', '_')
         filename = f"{self.game_id}_pbp_Q{self.current_period}.xml"
-        file_path = DATA_ROOT / "pbp_snap_shot" / snapshot_dir / filename
+        file_path = SNAPSHOT_ROOT / snapshot_dir / filename
         
-        tree = etree.parse(str(file_path))
+        tree = parse_file(str(file_path))
         root = tree.getroot()
         
         # Track actual scores
@@ -1,9 +1,9 @@
-import xml.etree.ElementTree as ET
 import os
 from shapely.geometry import Point, Polygon, MultiPolygon
 import numpy as np
+from functools import lru_cache
 
-DATA_ROOT = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'pbp_snap_shot')
+from parse_xml import DATA_ROOT, parse_file
 
 def transform_coordinates(x, y):
     """
@@ -216,12 +216,14 @@ def determine_shot_zone(x, y, zones, paint_circle, three_point_circle):
 
 
 
-def parse_pbp_shots(xml_path):
-    """Parse shots from all available quarters of play-by-play data."""
-    base_dir = os.path.dirname(xml_path)
-    game_id = os.path.basename(xml_path).split('_')[0]
-    
-    shots = []
+@lru_cache(maxsize=1)
+def zone_geometry():
+    """
+    Build the zone polygons and the paint and three point circles once.
+
+    Returns:
+        Tuple of (zones, paint_circle, three_point_circle) for determine_shot_zone
+    """
     zones = define_zones()
     
     # Calculate circles for zone detection
@@ -248,6 +250,20 @@ def parse_pbp_shots(xml_path):
     
     paint_circle = Point(70, 250).buffer(78)
     three_point_circle = Point(cx, cy).buffer(R)
+    return zones, paint_circle, three_point_circle
+
+def event_shot_zone(event):
+    """Zone number and name for a shot event's LocationX/LocationY attributes"""
+    locX, locY = transform_coordinates(int(event.get('LocationX', 0)), int(event.get('LocationY', 0)))
+    return determine_shot_zone(locX, locY, *zone_geometry())
+
+def parse_pbp_shots(xml_path):
+    """Parse shots from all available quarters of play-by-play data."""
+    base_dir = os.path.dirname(xml_path)
+    game_id = os.path.basename(xml_path).split('_')[0]
+    
+    shots = []
+    zones, paint_circle, three_point_circle = zone_geometry()
 
     # Process all quarters
     for quarter in range(1, 11):
@@ -256,7 +272,7 @@ def parse_pbp_shots(xml_path):
         if not os.path.exists(quarter_file):
             continue
             
-        tree = ET.parse(quarter_file)
+        tree = parse_file(quarter_file)
         root = tree.getroot()
 
         for game in root.findall('.//Game'):
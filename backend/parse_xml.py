@@ -1,12 +1,42 @@
 # backend/parse_xml.py
 import os
+import threading
+from contextlib import contextmanager
 from lxml import etree
 import logging
 
-logging.basicConfig(level=logging.DEBUG)
+from metrics import timed_parse
+
 logger = logging.getLogger(__name__)
 
-DATA_ROOT = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'pbp_snap_shot')
+# Snapshot directories; PBP_DATA_ROOT points the backend at another tree (synthetic games, load tests)
+DATA_ROOT = os.environ.get('PBP_DATA_ROOT') or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'pbp_snap_shot')
+
+# Trees parsed inside a shared_parse() block, per thread
+_shared = threading.local()
+
+def parse_file(file_path):
+    """Parse an XML file, reusing the tree if it was already parsed inside a shared_parse() block"""
+    trees = getattr(_shared, "trees", None)
+    if trees is not None and file_path in trees:
+        return trees[file_path]
+    with timed_parse():
+        tree = etree.parse(file_path)
+    if trees is not None:
+        trees[file_path] = tree
+    return tree
+
+@contextmanager
+def shared_parse():
+    """Parse every XML file at most once on this thread until the block exits"""
+    outer = getattr(_shared, "trees", None)
+    if outer is None:
+        _shared.trees = {}
+    try:
+        yield
+    finally:
+        if outer is None:
+            _shared.trees = None
 
 def list_snapshots():
     logger.debug(f"Looking for snapshots in: {DATA_ROOT}")
@@ -30,13 +60,70 @@ def list_games(snapshot):
             game_ids.append(game_id)
     return sorted(game_ids)
 
+SCHEDULE_FILE = os.path.join(DATA_ROOT, 'gleague_showcase_schedule.xml')
+
+# Parsed schedule and the (path, mtime_ns, size) of the file it came from
+_schedule_cache = (None, {})
+_schedule_lock = threading.Lock()
+
+def parse_schedule():
+    """
+    Parse the league schedule into a lookup of game metadata.
+
+    The file is only re-parsed when it changes, so the result is shared
+    between callers and must not be modified.
+
+    Returns:
+        dict: Game ID -> date, teams and final score. Dates are ISO strings
+        (YYYY-MM-DD) so they sort and can be sliced by month.
+    """
+    global _schedule_cache
+    try:
+        stat = os.stat(SCHEDULE_FILE)
+    except OSError:
+        return {}
+    signature = (SCHEDULE_FILE, stat.st_mtime_ns, stat.st_size)
+
+    with _schedule_lock:
+        if _schedule_cache[0] == signature:
+            return _schedule_cache[1]
+        schedule = _read_schedule()
+        _schedule_cache = (signature, schedule)
+        return schedule
+
+def _read_schedule():
+    tree = parse_file(SCHEDULE_FILE)
+    root = tree.getroot()
+
+    schedule = {}
+    for info in root.xpath(".//Msg_game_info"):
+        game = info.find("Game_info")
+        home_team = info.find("Home_team")
+        visitor_team = info.find("Visitor_team")
+        if game is None or home_team is None or visitor_team is None:
+            continue
+
+        month, day, year = game.get("Game_date", "01/01/1970").split("/")
+        schedule[game.get("Game_id")] = {
+            "game_id": game.get("Game_id"),
+            "game_date": f"{year}-{month}-{day}",
+            "home_id": home_team.get("Team_id", ""),
+            "home_abr": home_team.get("Team_abr", ""),
+            "visitor_id": visitor_team.get("Team_id", ""),
+            "visitor_abr": visitor_team.get("Team_abr", ""),
+            "home_points": int(game.get("Home_Team_Pts") or 0),
+            "visitor_points": int(game.get("Visitor_Team_Pts") or 0),
+        }
+
+    return schedule
+
 def parse_game_info(snapshot, game_id):
     filename = f"{game_id}_game_info.xml"
     file_path = os.path.join(DATA_ROOT, snapshot, filename)
     if not os.path.isfile(file_path):
         return None
 
-    tree = etree.parse(file_path)
+    tree = parse_file(file_path)
     root = tree.getroot()
 
     game_info = {}
@@ -64,7 +151,7 @@ def parse_boxscore(snapshot, game_id):
     if not os.path.isfile(file_path):
         return None
 
-    tree = etree.parse(file_path)
+    tree = parse_file(file_path)
     root = tree.getroot()
 
     # Get game info first
@@ -87,7 +174,7 @@ def parse_boxscore(snapshot, game_id):
     pbp_filename = f"{game_id}_pbp_Q{current_period}.xml"
     pbp_path = os.path.join(DATA_ROOT, snapshot_dir_name, pbp_filename)
     if os.path.exists(pbp_path):
-        pbp_tree = etree.parse(pbp_path)
+        pbp_tree = parse_file(pbp_path)
         pbp_root = pbp_tree.getroot()
         for event in pbp_root.xpath(".//Event_pbp"):
             if event.get("Msg_type") == "6":
@@ -109,6 +196,7 @@ def parse_boxscore(snapshot, game_id):
 
         player_entry = {
             "person_id": player.get("Person_id"),
+            "team_id": player.get("Team_id", ""),
             "first_name": player.get('First_name', ''),
             "last_name": player.get('Last_name', ''),
             "jersey_number": player.get('Jersey_number', ''),
@@ -121,6 +209,7 @@ def parse_boxscore(snapshot, game_id):
             "fg_pct": fg_pct,
             "fouls": fouls,
             "starter": player.get("starter") == "1",
+            "starting_position": player.get("Starting_position", ""),
             # oncourt means currently on court at snapshot
             "oncourt": player.get("OnCrt") == "1",
             "minutes": int(player.get("Minutes", "0")),
@@ -191,7 +280,47 @@ def parse_boxscore(snapshot, game_id):
         "teams": teams,
     }
 
-def parse_lineups(snapshot, game_id):
+# Msg_game_lineup slot prefixes -> position group
+LINEUP_SLOT_POSITIONS = {"guard": "G", "forward": "F", "center": "C"}
+
+def parse_roster(snapshot, game_id):
+    snapshot_dir_name = snapshot.lower().replace(' ', '_')
+    filename = f"{game_id}_roster_lineup.xml"
+    file_path = os.path.join(DATA_ROOT, snapshot_dir_name, filename)
+    if not os.path.isfile(file_path):
+        return {}
+
+    tree = parse_file(file_path)
+    root = tree.getroot()
+
+    # Position group from the first period-start lineup slot each player filled
+    slot_positions = {}
+    for lineup in root.xpath(".//Msg_game_lineup"):
+        for attribute, pid in lineup.attrib.items():
+            parts = attribute.lower().split('_')
+            if len(parts) >= 3 and parts[-1] == "id" and parts[1] in LINEUP_SLOT_POSITIONS and pid:
+                slot_positions.setdefault(pid, LINEUP_SLOT_POSITIONS[parts[1]])
+
+    players = {}
+    for person in root.xpath(".//Msg_person_info"):
+        if person.get("Person_type") != "Player":
+            continue
+        pid = person.get("Person_id")
+        status_text = person.get("Status_text", "")
+        players[pid] = {
+            "person_id": pid,
+            "team_id": person.get("Team_id", ""),
+            "first_name": person.get("First_name", ""),
+            "last_name": person.get("Last_name", ""),
+            "jersey_number": person.get("Jersey_number", ""),
+            "status_text": status_text,
+            # NWT = not with team; DNP players are still available
+            "active": person.get("Player_status") == "A" and not status_text.startswith("NWT"),
+            "lineup_position": slot_positions.get(pid, "")
+        }
+    return players
+
+def parse_lineups(snapshot, game_id, boxscore_data=None):
     def clock_to_seconds(clock_str):
         try:
             if ':' in clock_str:
@@ -208,7 +337,7 @@ def parse_lineups(snapshot, game_id):
         return {"lineups": {}}
 
     # Get current period and game clock from boxscore
-    boxscore_data = parse_boxscore(snapshot, game_id)
+    boxscore_data = boxscore_data or parse_boxscore(snapshot, game_id)
     if not boxscore_data:
         return {"lineups": {}}
 
@@ -227,7 +356,7 @@ def parse_lineups(snapshot, game_id):
     pbp_path = os.path.join(DATA_ROOT, snapshot_dir_name, pbp_filename)
     
     # Get initial lineup from roster_lineup.xml
-    tree = etree.parse(file_path)
+    tree = parse_file(file_path)
     root = tree.getroot()
     
     # Get all players info
@@ -277,7 +406,7 @@ def parse_lineups(snapshot, game_id):
     boxscore_path = os.path.join(DATA_ROOT, snapshot_dir_name, boxscore_filename)
     
     if os.path.exists(boxscore_path):
-        boxscore_tree = etree.parse(boxscore_path)
+        boxscore_tree = parse_file(boxscore_path)
         boxscore_root = boxscore_tree.getroot()
         
         for team in boxscore_root.xpath(".//Team_stats"):
@@ -291,7 +420,7 @@ def parse_lineups(snapshot, game_id):
             elif full_team_name == boxscore_data["teams"][1]["team_name"]:
                 team_b_id = team_id
 
-    print(f"Found team IDs - Team A: {team_a_id}, Team B: {team_b_id}")
+    logger.debug(f"Found team IDs - Team A: {team_a_id}, Team B: {team_b_id}")
 
     # Track scores and lineup times separately for each team
     team_data = {
@@ -308,11 +437,11 @@ def parse_lineups(snapshot, game_id):
             "team_name": boxscore_data["teams"][1]["team_name"]
         }
     }
-    print(f"Team data initialized: {team_data}")
+    logger.debug(f"Team data initialized: {team_data}")
 
     # Process substitutions from PBP to find when current lineup was formed
     if os.path.exists(pbp_path):
-        pbp_tree = etree.parse(pbp_path)
+        pbp_tree = parse_file(pbp_path)
         pbp_root = pbp_tree.getroot()
         
         for event in pbp_root.xpath(".//Event_pbp"):
@@ -329,7 +458,7 @@ def parse_lineups(snapshot, game_id):
                     # Calculate and update their stint time
                     stint_time = event_time - current_time_seconds
                     person_map[player_in_id]["onCourtTime"] = stint_time
-                    print(f"Player {player_in_id} ({person_map[player_in_id]['last_name']}) entered at {event_time}, stint time: {stint_time}")
+                    logger.debug(f"Player {player_in_id} ({person_map[player_in_id]['last_name']}) entered at {event_time}, stint time: {stint_time}")
 
                 # Player going out (Person_id)
                 player_out_id = event.get("Person_id")
@@ -339,21 +468,21 @@ def parse_lineups(snapshot, game_id):
                         del player_stint_times[player_out_id]
                         if player_out_id in person_map:
                             person_map[player_out_id]["onCourtTime"] = 0
-                            print(f"Player {player_out_id} ({person_map[player_out_id]['last_name']}) exited at {event_time}")
+                            logger.debug(f"Player {player_out_id} ({person_map[player_out_id]['last_name']}) exited at {event_time}")
 
                 # Get the team making the substitution
                 sub_team_id = event.get("Team_id")
-                print(sub_team_id)
+                logger.debug(f"Substitution team: {sub_team_id}")
                 
                 # Update the appropriate team's data
                 if sub_team_id == team_data["teamA"]["team_id"]:
                     team_data["teamA"]["lineup_start_time"] = event_time
                     team_data["teamA"]["last_sub_score"] = home_score
-                    print(f"Team A lineup start time updated to {event_time}, last sub score: {home_score}")
+                    logger.debug(f"Team A lineup start time updated to {event_time}, last sub score: {home_score}")
                 elif sub_team_id == team_data["teamB"]["team_id"]:
                     team_data["teamB"]["lineup_start_time"] = event_time
                     team_data["teamB"]["last_sub_score"] = visitor_score
-                    print(f"Team B lineup start time updated to {event_time}, last sub score: {visitor_score}")
+                    logger.debug(f"Team B lineup start time updated to {event_time}, last sub score: {visitor_score}")
 
     # Calculate stint duration and plus/minus for current lineup
     stint_duration_a = team_data["teamA"]["lineup_start_time"] - current_time_seconds
@@ -363,8 +492,8 @@ def parse_lineups(snapshot, game_id):
     team_a_plusminus = (team_a_score - team_data["teamA"]["last_sub_score"]) - (team_b_score - team_data["teamB"]["last_sub_score"])
     team_b_plusminus = (team_b_score - team_data["teamB"]["last_sub_score"]) - (team_a_score - team_data["teamA"]["last_sub_score"])
 
-    print(f"Team A stint duration: {stint_duration_a}, plus/minus: {team_a_plusminus}")
-    print(f"Team B stint duration: {stint_duration_b}, plus/minus: {team_b_plusminus}")
+    logger.debug(f"Team A stint duration: {stint_duration_a}, plus/minus: {team_a_plusminus}")
+    logger.debug(f"Team B stint duration: {stint_duration_b}, plus/minus: {team_b_plusminus}")
 
     # Populate team players lists
     for player in boxscore_data["players"]:
@@ -378,12 +507,12 @@ def parse_lineups(snapshot, game_id):
                 else:
                     team_b_players.append(player_data)
 
-    # Debug logging
-    print(f"\nCurrent game clock: {current_game_clock} ({current_time_seconds} seconds)")
-    print("On-court players and their stint times:")
-    for player in boxscore_data["players"]:
-        if player["oncourt"]:
-            print(f"Player {player['jersey_number']} ({player['last_name']}): {person_map[player['person_id']]['onCourtTime']} seconds")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Current game clock: {current_game_clock} ({current_time_seconds} seconds)")
+        logger.debug("On-court players and their stint times:")
+        for player in boxscore_data["players"]:
+            if player["oncourt"]:
+                logger.debug(f"Player {player['jersey_number']} ({player['last_name']}): {person_map[player['person_id']]['onCourtTime']} seconds")
 
     return {
         "currentLineupTeamA": team_a_players,
@@ -413,7 +542,7 @@ def parse_pbp(snapshot, game_id):
         filename = f"{game_id}_pbp_{q}.xml"
         file_path = os.path.join(DATA_ROOT, snapshot_dir_name, filename)
         if os.path.isfile(file_path):
-            tree = etree.parse(file_path)
+            tree = parse_file(file_path)
             root = tree.getroot()
             for evt in root.xpath(".//Event_pbp"):
                 events.append(evt)
@@ -513,11 +642,11 @@ def parse_pbp(snapshot, game_id):
 
     return pbp_data
 
-def parse_shot_chart(snapshot, game_id):
+def parse_shot_chart(snapshot, game_id, boxscore_data=None):
     snapshot_dir_name = snapshot.lower().replace(' ', '_')
     
     # Get current period from boxscore
-    boxscore_data = parse_boxscore(snapshot, game_id)
+    boxscore_data = boxscore_data or parse_boxscore(snapshot, game_id)
     if not boxscore_data:
         return None
         
@@ -546,7 +675,7 @@ def parse_shot_chart(snapshot, game_id):
     pbp_path = os.path.join(DATA_ROOT, snapshot_dir_name, pbp_filename)
     
     if os.path.exists(pbp_path):
-        pbp_tree = etree.parse(pbp_path)
+        pbp_tree = parse_file(pbp_path)
         pbp_root = pbp_tree.getroot()
         
         for event in pbp_root.xpath(".//Event_pbp"):
@@ -573,7 +702,7 @@ def parse_shot_chart(snapshot, game_id):
     
     return shot_zones
 
-def parse_shot_zones(snapshot, game_id, period=None):
+def parse_shot_zones(snapshot, game_id, period=None, boxscore_data=None):
     """
     Parse shot data and classify into zones for both teams.
     
@@ -581,6 +710,7 @@ def parse_shot_zones(snapshot, game_id, period=None):
         snapshot (str): Snapshot name
         game_id (str): Game ID
         period (int, optional): Specific period to analyze. If None, analyzes all periods.
+        boxscore_data (dict, optional): Already parsed boxscore, to skip parsing it again
     
     Returns:
         dict: Shot data organized by team and zone with makes/attempts/percentages
@@ -588,7 +718,7 @@ def parse_shot_zones(snapshot, game_id, period=None):
     snapshot_dir_name = snapshot.lower().replace(' ', '_')
     
     # Get team info from boxscore
-    boxscore_data = parse_boxscore(snapshot, game_id)
+    boxscore_data = boxscore_data or parse_boxscore(snapshot, game_id)
     if not boxscore_data:
         return None
         
@@ -667,7 +797,7 @@ def parse_shot_zones(snapshot, game_id, period=None):
         pbp_path = os.path.join(DATA_ROOT, snapshot_dir_name, pbp_filename)
         
         if os.path.exists(pbp_path):
-            pbp_tree = etree.parse(pbp_path)
+            pbp_tree = parse_file(pbp_path)
             pbp_root = pbp_tree.getroot()
             
             for event in pbp_root.xpath(".//Event_pbp"):
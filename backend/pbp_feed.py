@@ -0,0 +1,198 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from event_store import PbpEventStore, get_event_store
+
+# Event attributes naming the players involved (shooter/assister/blocker and so on)
+PLAYER_FIELDS = ("Person_id", "Person_id2", "Person_id3")
+# Most events returned by one request; clients page on with nextSince
+MAX_EVENTS = 1000
+
+@dataclass(frozen=True)
+class FeedFilter:
+    """
+    Which raw events a delta request wants
+
+    Empty tuples mean no filtering on that field, so FeedFilter() is every event.
+    """
+    periods: Tuple[int, ...] = ()
+    msg_types: Tuple[int, ...] = ()
+    player_ids: Tuple[int, ...] = ()
+
+def _int_list(value: Optional[str], name: str) -> Tuple[int, ...]:
+    if not value:
+        return ()
+    try:
+        return tuple(int(item) for item in value.split(",") if item.strip())
+    except ValueError:
+        raise ValueError(f"{name} must be a comma-separated list of integers")
+
+def parse_feed_filter(periods: Optional[str] = None, msg_types: Optional[str] = None,
+                      player_ids: Optional[str] = None) -> FeedFilter:
+    """
+    Build a FeedFilter from comma-separated request arguments
+
+    Raises:
+        ValueError: If a value isn't an integer
+    """
+    return FeedFilter(_int_list(periods, "period"), _int_list(msg_types, "msg_type"),
+                      _int_list(player_ids, "player_id"))
+
+class PbpFeed:
+    """
+    Raw play-by-play of one game with the lookups delta requests need.
+
+    The feed cursor is a store position (events already delivered), not a
+    PbpOrder: PbpOrder restarts and repeats inside a game (in middle_of_third
+    it drops from 323 to 44 late in period 2), so it can't say which events
+    are newer. Event_num is not always in feed order either, so it's mapped
+    to a store position through a dict.
+    Period filters narrow the scan to the store's period offsets before any
+    mask is built, and the player columns are parsed once per event rather
+    than per request.
+    """
+
+    def __init__(self, store: PbpEventStore):
+        self.store = store
+        # events x len(PLAYER_FIELDS), 0 where the event names no player
+        self.players = np.zeros((0, len(PLAYER_FIELDS)), dtype=np.int64)
+        # Event_num -> store index of the event carrying it
+        self.event_positions: Dict[int, int] = {}
+        self.events_covered = 0
+
+        self.extend()
+
+    def extend(self) -> None:
+        """Index events added to the store since the last call"""
+        store = self.store
+        start = self.events_covered
+        if start >= len(store):
+            return
+
+        tail = np.array([[int(event.get(field) or 0) for field in PLAYER_FIELDS] for event in store.events[start:]],
+                        dtype=np.int64).reshape(-1, len(PLAYER_FIELDS))
+        self.players = np.concatenate([self.players, tail])
+        for index in range(start, len(store)):
+            self.event_positions[int(store.event_num[index])] = index
+        self.events_covered = len(store)
+
+    def position_after_cursor(self, since: int) -> int:
+        """
+        Store index to resume from for a nextSince cursor
+
+        A cursor past the end (from a store that has since been rebuilt
+        shorter) resumes at the end rather than replaying the feed.
+
+        Raises:
+            ValueError: If the cursor is negative
+        """
+        if since < 0:
+            raise ValueError("since must be 0 or greater")
+        return min(since, self.events_covered)
+
+    def position_after_event_num(self, event_num: int) -> int:
+        """
+        Store index just past the event with a given Event_num
+
+        Raises:
+            ValueError: If no event carries that Event_num
+        """
+        if event_num not in self.event_positions:
+            raise ValueError(f"Unknown Event_num {event_num}")
+        return self.event_positions[event_num] + 1
+
+    def _ranges(self, start: int, periods: Sequence[int]) -> List[Tuple[int, int]]:
+        """Store index ranges at or after `start`, limited to the given periods"""
+        if not periods:
+            return [(start, self.events_covered)]
+        ranges = []
+        for period in sorted(set(periods)):
+            first, end = self.store.period_offsets.get(period, (0, 0))
+            first, end = max(first, start), min(end, self.events_covered)
+            if first < end:
+                ranges.append((first, end))
+        return ranges
+
+    def select(self, start: int, feed_filter: FeedFilter = FeedFilter()) -> np.ndarray:
+        """
+        Store indexes of the events from `start` on that pass a filter
+
+        Args:
+            start: First store index to consider
+            feed_filter: Period, message type and player filters
+
+        Returns:
+            Matching store indexes in feed order
+        """
+        selected = []
+        for lo, hi in self._ranges(start, feed_filter.periods):
+            mask = np.ones(hi - lo, dtype=bool)
+            if feed_filter.msg_types:
+                mask &= np.isin(self.store.msg_type[lo:hi], feed_filter.msg_types)
+            if feed_filter.player_ids:
+                mask &= np.isin(self.players[lo:hi], feed_filter.player_ids).any(axis=1)
+            selected.append(lo + np.flatnonzero(mask))
+        return np.concatenate(selected) if selected else np.zeros(0, dtype=np.int64)
+
+    def delta(self, start: int, feed_filter: FeedFilter = FeedFilter(), limit: int = MAX_EVENTS) -> Dict:
+        """
+        Raw events from `start` on, with the cursor to ask for the next batch
+
+        nextSince is the cursor to send back as `since`: the store position
+        just past the newest event in the feed, or past the last one returned
+        when `limit` cut the batch short.
+
+        Args:
+            start: First store index to consider
+            feed_filter: Period, message type and player filters
+            limit: Most events to return
+
+        Returns:
+            Dictionary with the events and feed cursors
+        """
+        indexes = self.select(start, feed_filter)
+        has_more = len(indexes) > limit
+        indexes = indexes[:limit]
+
+        store = self.store
+        next_since = int(indexes[-1]) + 1 if has_more else self.events_covered
+        return {
+            "events": [store.events[index] for index in indexes],
+            "nextSince": next_since,
+            "hasMore": has_more,
+            "lastPbpOrder": int(store.pbp_order[self.events_covered - 1]) if self.events_covered else 0,
+            "lastEventNum": int(store.event_num[self.events_covered - 1]) if self.events_covered else 0,
+            "eventCount": self.events_covered,
+        }
+
+# Feeds keyed by (snapshot_dir_name, game_id)
+_feeds: Dict[Tuple[str, str], PbpFeed] = {}
+_feeds_lock = threading.Lock()
+
+def get_pbp_feed(snapshot: str, game_id: str) -> Optional[PbpFeed]:
+    """
+    Get the raw event feed for a game, extended with any newly arrived events
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_id: Game identifier
+
+    Returns:
+        PbpFeed, or None if the game has no event store
+    """
+    store = get_event_store(snapshot, game_id)
+    if store is None:
+        return None
+
+    key = (store.snapshot, game_id)
+    with _feeds_lock:
+        feed = _feeds.get(key)
+        if feed is None or feed.store is not store:
+            feed = PbpFeed(store)
+            _feeds[key] = feed
+        else:
+            feed.extend()
+        return feed
@@ -0,0 +1,275 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from assist_network import SHOT_ZONES, ZONE_INDEX
+from event_store import FREE_THROW, MADE_SHOT, MISSED_SHOT, TURNOVER, PbpEventStore, get_event_store
+from onoff_splits import get_onoff_splits
+from parse_pbp_shots import event_shot_zone
+from parse_xml import list_games, parse_roster
+
+# Court zones that make up the shot profile ("unknown" shots are left out)
+PROFILE_ZONES = SHOT_ZONES[:-1]
+ZONE_COUNT = len(SHOT_ZONES)
+
+# Layout of the per-player count vector kept for every game
+COUNT_FIELDS = tuple(f"{zone}_attempts" for zone in SHOT_ZONES) + \
+               tuple(f"{zone}_made" for zone in SHOT_ZONES) + \
+               ("ft_attempted", "turnovers", "assists", "on_possessions", "games")
+ATTEMPTS = slice(0, ZONE_COUNT)
+MADE = slice(ZONE_COUNT, 2 * ZONE_COUNT)
+FT_ATTEMPTED, TURNOVERS, ASSISTS, ON_POSSESSIONS, GAMES = range(2 * ZONE_COUNT, len(COUNT_FIELDS))
+
+FEATURE_NAMES = tuple(f"{zone}_share" for zone in PROFILE_ZONES) + \
+                tuple(f"{zone}_pct" for zone in PROFILE_ZONES) + \
+                ("usage", "assist_rate")
+# Each group carries the same total weight, so nine zone columns don't drown out usage
+FEATURE_GROUPS = {
+    "zone_share": slice(0, len(PROFILE_ZONES)),
+    "zone_pct": slice(len(PROFILE_ZONES), 2 * len(PROFILE_ZONES)),
+    "usage": slice(2 * len(PROFILE_ZONES), 2 * len(PROFILE_ZONES) + 1),
+    "assist_rate": slice(2 * len(PROFILE_ZONES) + 1, 2 * len(PROFILE_ZONES) + 2),
+}
+
+# Zone FG% is pulled toward the league rate as if the player had this many extra attempts there
+SHRINK_ATTEMPTS = 5
+DEFAULT_MIN_ATTEMPTS = 10
+# Indexes kept for distinct (snapshot, games, min_attempts) keys; the least recently used is dropped
+MAX_INDEXES = 8
+
+def game_counts(store: PbpEventStore, onoff: Optional[Dict[str, Dict]] = None) -> Dict[str, np.ndarray]:
+    """
+    Shot zone, free throw, turnover and assist counts for every player in one game
+
+    Args:
+        store: Event store
+        onoff: On/off sums for the game, used for each player's on-court possessions
+
+    Returns:
+        Dict mapping player_id to a len(COUNT_FIELDS) integer array
+    """
+    counts: Dict[str, np.ndarray] = {}
+
+    def row(player_id: str) -> np.ndarray:
+        if player_id not in counts:
+            counts[player_id] = np.zeros(len(COUNT_FIELDS), dtype=np.int64)
+        return counts[player_id]
+
+    for index, event in enumerate(store.events):
+        msg_type = int(store.msg_type[index])
+        player_id = event.get("Person_id")
+        if not player_id or store.team_side[index] < 0:
+            continue
+        if msg_type in (MADE_SHOT, MISSED_SHOT):
+            zone = ZONE_INDEX.get(event_shot_zone(event)[1], ZONE_INDEX["unknown"])
+            row(player_id)[zone] += 1
+            if msg_type == MADE_SHOT:
+                row(player_id)[ZONE_COUNT + zone] += 1
+                if event.get("Stat_Category2") == "AST" and event.get("Person_id2"):
+                    row(event["Person_id2"])[ASSISTS] += 1
+        elif msg_type == FREE_THROW:
+            row(player_id)[FT_ATTEMPTED] += 1
+        elif msg_type == TURNOVER:
+            row(player_id)[TURNOVERS] += 1
+
+    for player_id, sums in (onoff or {}).items():
+        if sums.get("on_seconds", 0) > 0:
+            row(player_id)[ON_POSSESSIONS] += int(sums["on_possessions_for"])
+    for player_counts in counts.values():
+        player_counts[GAMES] = 1
+    return counts
+
+def profile_features(counts: np.ndarray) -> np.ndarray:
+    """
+    Turn summed player counts into raw feature rows (FEATURE_NAMES order)
+
+    Zone shares are each zone's part of the player's located attempts. Zone
+    FG% is shrunk toward the pool's rate in that zone, so a 1-for-1 corner
+    three doesn't read as a 100% shooter. Usage is (FGA + 0.44 FTA + TOV) per
+    team possession while on the floor, and assist rate is assists per team
+    possession while on the floor.
+
+    Args:
+        counts: players x len(COUNT_FIELDS) array
+
+    Returns:
+        players x len(FEATURE_NAMES) float array
+    """
+    counts = counts.astype(np.float64)
+    zones = len(PROFILE_ZONES)
+    attempts = counts[:, ATTEMPTS][:, :zones]
+    made = counts[:, MADE][:, :zones]
+
+    located = attempts.sum(axis=1, keepdims=True)
+    share = np.divide(attempts, located, out=np.zeros_like(attempts), where=located > 0)
+
+    pool_attempts = attempts.sum(axis=0)
+    pool_rate = np.divide(made.sum(axis=0), pool_attempts, out=np.zeros(zones), where=pool_attempts > 0)
+    pct = (made + SHRINK_ATTEMPTS * pool_rate) / (attempts + SHRINK_ATTEMPTS)
+
+    possessions = counts[:, ON_POSSESSIONS]
+    field_goal_attempts = counts[:, ATTEMPTS].sum(axis=1)
+    plays = field_goal_attempts + 0.44 * counts[:, FT_ATTEMPTED] + counts[:, TURNOVERS]
+    usage = np.divide(plays, possessions, out=np.zeros_like(plays), where=possessions > 0)
+    assist_rate = np.divide(counts[:, ASSISTS], possessions, out=np.zeros_like(plays), where=possessions > 0)
+
+    return np.column_stack([share, pct, usage, assist_rate])
+
+class PlayerSimilarityIndex:
+    """
+    Nearest-neighbour search over player shot and box profiles.
+
+    Raw features are z-scored per column, weighted so every feature group
+    counts the same, and each row is scaled to unit length. Cosine similarity
+    against every player is then a single matrix-vector product, and the top
+    matches come out of argpartition without sorting the whole pool.
+    """
+
+    def __init__(self, counts: Dict[str, np.ndarray], players: Optional[Dict[str, Dict[str, str]]] = None,
+                 min_attempts: int = DEFAULT_MIN_ATTEMPTS, weights: Optional[Dict[str, float]] = None):
+        self.players = players or {}
+        eligible = sorted(p for p, c in counts.items() if c[ATTEMPTS].sum() >= min_attempts)
+        self.player_ids: List[str] = eligible
+        self.rows = {player_id: row for row, player_id in enumerate(eligible)}
+        self.counts = np.array([counts[p] for p in eligible], dtype=np.int64).reshape(len(eligible), len(COUNT_FIELDS))
+        self.features = profile_features(self.counts)
+
+        mean = self.features.mean(axis=0) if len(eligible) else np.zeros(len(FEATURE_NAMES))
+        std = self.features.std(axis=0) if len(eligible) else np.ones(len(FEATURE_NAMES))
+        scaled = (self.features - mean) / np.where(std > 0, std, 1.0)
+
+        column_weights = np.ones(len(FEATURE_NAMES))
+        for group, columns in FEATURE_GROUPS.items():
+            width = columns.stop - columns.start
+            column_weights[columns] = (weights or {}).get(group, 1.0) / np.sqrt(width)
+        scaled *= column_weights
+
+        norms = np.linalg.norm(scaled, axis=1, keepdims=True)
+        self.matrix = np.divide(scaled, norms, out=np.zeros_like(scaled), where=norms > 0)
+
+    def __len__(self) -> int:
+        return len(self.player_ids)
+
+    def similar(self, player_id: str, limit: int = 10, team_id: Optional[str] = None) -> List[Dict]:
+        """
+        Players whose profiles are closest to one player's
+
+        Args:
+            player_id: Player to match
+            limit: Number of matches to return
+            team_id: Only match players from this team
+
+        Returns:
+            List of match dicts, most similar first (empty if the player isn't indexed)
+        """
+        row = self.rows.get(player_id)
+        if row is None:
+            return []
+
+        similarity = self.matrix @ self.matrix[row]
+        candidates = np.ones(len(self), dtype=bool)
+        candidates[row] = False
+        if team_id:
+            candidates &= np.array([self.players.get(p, {}).get("teamId") == team_id for p in self.player_ids], dtype=bool)
+
+        positions = np.flatnonzero(candidates)
+        if len(positions) > limit:
+            positions = positions[np.argpartition(-similarity[positions], limit - 1)[:limit]]
+        positions = positions[np.argsort(-similarity[positions], kind="stable")]
+        return [self.describe(self.player_ids[p], float(similarity[p])) for p in positions]
+
+    def describe(self, player_id: str, similarity: Optional[float] = None) -> Dict:
+        """A player's profile as returned by the API"""
+        row = self.rows[player_id]
+        info = self.players.get(player_id, {})
+        profile = {
+            "playerId": player_id,
+            "name": info.get("name", ""),
+            "teamId": info.get("teamId", ""),
+            "games": int(self.counts[row, GAMES]),
+            "fieldGoalAttempts": int(self.counts[row, ATTEMPTS].sum()),
+            "features": {name: round(float(value), 4) for name, value in zip(FEATURE_NAMES, self.features[row])},
+        }
+        if similarity is not None:
+            profile["similarity"] = round(similarity, 4)
+        return profile
+
+# Counts keyed by (snapshot_dir_name, game_id) -> (store, events covered, counts, roster)
+_game_counts: Dict[Tuple[str, str], Tuple[PbpEventStore, int, Dict[str, np.ndarray], Dict[str, Dict]]] = {}
+_game_counts_lock = threading.Lock()
+
+def get_game_counts(snapshot: str, game_id: str) -> Optional[Tuple[PbpEventStore, Dict[str, np.ndarray], Dict[str, Dict]]]:
+    """
+    Get a game's per-player profile counts and roster, recounted only when new events arrive
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_id: Game identifier
+
+    Returns:
+        Tuple of (store, counts, roster), or None if the game has no event store
+    """
+    store = get_event_store(snapshot, game_id)
+    if store is None:
+        return None
+
+    key = (store.snapshot, game_id)
+    with _game_counts_lock:
+        cached = _game_counts.get(key)
+        if cached is None or cached[0] is not store or cached[1] != len(store):
+            roster = cached[3] if cached is not None else {
+                player_id: {"name": f"{player['first_name']} {player['last_name']}".strip(), "teamId": player["team_id"]}
+                for player_id, player in parse_roster(snapshot, game_id).items()
+            }
+            cached = (store, len(store), game_counts(store, get_onoff_splits(snapshot, game_id)), roster)
+            _game_counts[key] = cached
+        return store, cached[2], cached[3]
+
+# Indexes keyed by (snapshot, games, min_attempts) -> (game counts they were built from, index),
+# least recently used first
+_indexes: "OrderedDict[Tuple, Tuple[List[Dict[str, np.ndarray]], PlayerSimilarityIndex]]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+def season_similarity_index(snapshot: str, game_ids: Optional[List[str]] = None,
+                            min_attempts: int = DEFAULT_MIN_ATTEMPTS) -> PlayerSimilarityIndex:
+    """
+    Similarity index over player profiles summed across games
+
+    The index is rebuilt only when one of its games has new events.
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_ids: Games to include (defaults to every game in the snapshot)
+        min_attempts: Field goal attempts a player needs to be indexed
+
+    Returns:
+        PlayerSimilarityIndex
+    """
+    game_ids = game_ids if game_ids is not None else list_games(snapshot)
+    games = [get_game_counts(snapshot, game_id) for game_id in game_ids]
+    games = [game for game in games if game is not None]
+    sources = [counts for _, counts, _ in games]
+
+    key = (snapshot, tuple(game_ids), min_attempts)
+    with _indexes_lock:
+        cached = _indexes.get(key)
+        if cached is not None and len(cached[0]) == len(sources) and all(a is b for a, b in zip(cached[0], sources)):
+            _indexes.move_to_end(key)
+            return cached[1]
+
+    totals: Dict[str, np.ndarray] = {}
+    players: Dict[str, Dict[str, str]] = {}
+    for _, counts, roster in games:
+        players.update(roster)
+        for player_id, player_counts in counts.items():
+            totals[player_id] = totals.get(player_id, 0) + player_counts
+
+    index = PlayerSimilarityIndex(totals, players, min_attempts)
+    with _indexes_lock:
+        _indexes[key] = (sources, index)
+        _indexes.move_to_end(key)
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
@@ -0,0 +1,227 @@
+import threading
+from collections import defaultdict
+from typing import Dict, Optional, Tuple
+
+from event_store import (FREE_THROW, MADE_SHOT, MISSED_SHOT, PERIOD_END, PERIOD_START, REBOUND,
+                         TURNOVER, PbpEventStore)
+from oncourt_index import OnCourtIndex, get_oncourt_index
+
+# A shot this soon after an offensive rebound by the same team is a putback
+PUTBACK_SECONDS = 3
+
+TEAM_FIELDS = ("offensive_rebounds", "defensive_rebounds", "offensive_rebound_chances",
+               "second_chance_points", "putback_attempts", "putback_made", "putback_points")
+PLAYER_FIELDS = ("offensive_rebounds", "defensive_rebounds", "second_chance_points",
+                 "putback_attempts", "putback_made", "putback_points")
+
+def _rates(row: Dict[str, int]) -> Dict[str, float]:
+    chances = row.get("offensive_rebound_chances", 0)
+    attempts = row["putback_attempts"]
+    return {
+        "offensive_rebound_rate": row["offensive_rebounds"] / chances if chances else 0.0,
+        "putback_pct": row["putback_made"] / attempts if attempts else 0.0,
+        "putback_points_per_attempt": row["putback_points"] / attempts if attempts else 0.0,
+    }
+
+class PossessionChains:
+    """
+    Miss -> rebound -> next shot or turnover chains for one game.
+
+    One linear pass over the event store links every missed field goal or
+    free throw to the rebound that follows it, and every rebound, offensive
+    or defensive, to the rebounding team's next shot or turnover. The pass
+    keeps its state between calls, so extend() only walks events that
+    arrived since.
+
+    Second-chance points are what the rebounding team scores from the
+    offensive rebound up to and including its next basket, counting free
+    throws from fouls before that basket and an and-one at the basket's
+    clock. That matches the bundled boxscores' SecondChancePoints at
+    middle_of_third and middle_of_fourth; at end_of_game the home team comes
+    out one point above the boxscore, whose own fourth-quarter increase is
+    one short of the second-chance baskets in the feed.
+    Rebound chances only count player rebounds; team rebounds still start
+    and end chains. Lineups are keyed like LineupTracker ("team-p1_p2_...").
+    """
+
+    def __init__(self, store: PbpEventStore, oncourt: Optional[OnCourtIndex] = None):
+        self.store = store
+        self.oncourt = oncourt
+        self.teams: Dict[str, Dict[str, int]] = {
+            team_id: dict.fromkeys(TEAM_FIELDS, 0) for team_id in (store.home_team_id, store.visitor_team_id)
+        }
+        self.players: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(PLAYER_FIELDS, 0))
+        self.lineups: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(TEAM_FIELDS, 0))
+        # One entry per rebound; outcome stays None if the possession ended
+        # some other way (free throws, the other team's shot, end of period)
+        self.chains = []
+
+        # Pass state
+        self._missed_by: Optional[str] = None
+        self._chain_team: Optional[str] = None
+        self._second_chance_team: Optional[str] = None
+        self._second_chance_lineup: Optional[str] = None
+        self._putback_window: Optional[Tuple[str, float]] = None
+        # (team, elapsed, lineup) of the basket that ended a second chance, for its and-one
+        self._and_one: Optional[Tuple[str, float, Optional[str]]] = None
+        self.events_covered = 0
+
+        self.extend()
+
+    def _lineup_key(self, team_id: str, index: int) -> Optional[str]:
+        if self.oncourt is None:
+            return None
+        players = self.oncourt.on_court_at_event(index).get(team_id)
+        return f"{team_id}-{'_'.join(players)}" if players else None
+
+    def _credit(self, team_id: str, player_id: Optional[str], lineup_key: Optional[str], field: str, amount: int = 1) -> None:
+        self.teams[team_id][field] += amount
+        if player_id and field in PLAYER_FIELDS:
+            self.players[player_id][field] += amount
+        if lineup_key:
+            self.lineups[lineup_key][field] += amount
+
+    def _end_second_chance(self) -> None:
+        self._second_chance_team = None
+        self._second_chance_lineup = None
+        self._putback_window = None
+
+    def extend(self) -> None:
+        """Continue the pass over events appended to the store since the last call"""
+        store = self.store
+        for index in range(self.events_covered, len(store)):
+            event = store.events[index]
+            msg_type = int(store.msg_type[index])
+            team_id = event.get("Team_id")
+            player_id = event.get("Person_id")
+            points = int(store.home_points[index] + store.visitor_points[index])
+
+            if msg_type in (PERIOD_START, PERIOD_END):
+                self._missed_by = None
+                self._chain_team = None
+                self._and_one = None
+                self._end_second_chance()
+                continue
+            if team_id not in self.teams:
+                continue
+
+            if msg_type in (MADE_SHOT, MISSED_SHOT, FREE_THROW, TURNOVER) and \
+                    self._second_chance_team is not None and team_id != self._second_chance_team:
+                self._end_second_chance()
+            if msg_type in (MADE_SHOT, MISSED_SHOT, REBOUND, TURNOVER):
+                self._and_one = None
+
+            if msg_type in (MADE_SHOT, MISSED_SHOT):
+                self._close_chain(index, team_id, "made_shot" if msg_type == MADE_SHOT else "missed_shot")
+                self._handle_shot(index, team_id, player_id, points, made=msg_type == MADE_SHOT)
+            elif msg_type == FREE_THROW:
+                self._handle_free_throw(index, team_id, player_id, points, missed=event.get("Option1") == "2")
+            elif msg_type == REBOUND:
+                self._handle_rebound(index, team_id, player_id)
+            elif msg_type == TURNOVER:
+                self._close_chain(index, team_id, "turnover")
+                if self._second_chance_team == team_id:
+                    self._end_second_chance()
+                self._missed_by = None
+
+        self.events_covered = len(store)
+
+    def _handle_shot(self, index: int, team_id: str, player_id: Optional[str], points: int, made: bool) -> None:
+        if self._second_chance_team == team_id:
+            lineup_key = self._second_chance_lineup
+            if self._putback_window is not None and float(self.store.elapsed[index]) <= self._putback_window[1]:
+                self._credit(team_id, player_id, lineup_key, "putback_attempts")
+                if made:
+                    self._credit(team_id, player_id, lineup_key, "putback_made")
+                    self._credit(team_id, player_id, lineup_key, "putback_points", points)
+            self._putback_window = None
+            if made:
+                self._credit(team_id, player_id, lineup_key, "second_chance_points", points)
+                self._end_second_chance()
+                self._and_one = (team_id, float(self.store.elapsed[index]), lineup_key)
+        self._missed_by = None if made else team_id
+
+    def _handle_free_throw(self, index: int, team_id: str, player_id: Optional[str], points: int, missed: bool) -> None:
+        if self._second_chance_team == team_id:
+            lineup_key = self._second_chance_lineup
+        elif self._and_one is not None and self._and_one[:2] == (team_id, float(self.store.elapsed[index])):
+            lineup_key = self._and_one[2]
+        else:
+            lineup_key = None
+            points = 0
+        if points:
+            self._credit(team_id, player_id, lineup_key, "second_chance_points", points)
+        self._missed_by = team_id if missed else None
+
+    def _handle_rebound(self, index: int, team_id: str, player_id: Optional[str]) -> None:
+        shooting_team = self._missed_by
+        self._missed_by = None
+        if shooting_team is None:
+            return
+
+        offensive = team_id == shooting_team
+        if player_id:
+            # Chances belong to the shooting team, and to its lineup on the floor
+            shooting_lineup = self._lineup_key(shooting_team, index)
+            self._credit(shooting_team, None, shooting_lineup, "offensive_rebound_chances")
+            if offensive:
+                self._credit(team_id, player_id, shooting_lineup, "offensive_rebounds")
+            else:
+                self._credit(team_id, player_id, self._lineup_key(team_id, index), "defensive_rebounds")
+
+        if offensive:
+            self._second_chance_team = team_id
+            self._second_chance_lineup = self._lineup_key(team_id, index)
+            self._putback_window = (player_id, float(self.store.elapsed[index]) + PUTBACK_SECONDS)
+        else:
+            self._end_second_chance()
+        self._chain_team = team_id
+        self.chains.append({"team_id": team_id, "rebounder_id": player_id, "offensive": offensive,
+                            "rebound_event": index, "end_event": None, "outcome": None})
+
+    def _close_chain(self, index: int, team_id: str, outcome: str) -> None:
+        """Record how the latest rebound's possession ended, if this shot or turnover ends it"""
+        if self._chain_team is None:
+            return
+        if team_id == self._chain_team:
+            self.chains[-1]["end_event"] = index
+            self.chains[-1]["outcome"] = outcome
+        self._chain_team = None
+
+    def summary(self) -> Dict[str, Dict]:
+        """Team, player and lineup totals with offensive rebound and putback rates"""
+        return {
+            "teams": {team_id: {**row, **_rates(row)} for team_id, row in self.teams.items()},
+            "players": {player_id: {**row, **_rates(row)} for player_id, row in self.players.items()},
+            "lineups": {lineup_key: {**row, **_rates(row)} for lineup_key, row in self.lineups.items()},
+        }
+
+# Chains keyed by (snapshot_dir_name, game_id)
+_chains: Dict[Tuple[str, str], PossessionChains] = {}
+_chains_lock = threading.Lock()
+
+def get_possession_chains(snapshot: str, game_id: str) -> Optional[PossessionChains]:
+    """
+    Get the possession chain analysis for a game, extended with any newly arrived events
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_id: Game identifier
+
+    Returns:
+        PossessionChains, or None if the game has no event store
+    """
+    oncourt = get_oncourt_index(snapshot, game_id)
+    if oncourt is None:
+        return None
+
+    key = (oncourt.store.snapshot, game_id)
+    with _chains_lock:
+        chains = _chains.get(key)
+        if chains is None or chains.store is not oncourt.store:
+            chains = PossessionChains(oncourt.store, oncourt)
+            _chains[key] = chains
+        elif chains.events_covered < len(oncourt.store):
+            chains.oncourt = oncourt
+            chains.extend()
+        return chains
@@ -0,0 +1,29 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+# Workers start from a fresh interpreter rather than a fork of the threaded
+# server, which could copy a lock (event store, metrics, logging) that another
+# thread held at that moment and deadlock the child
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# Long-lived pool so requests don't pay for process start-up
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def get_process_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    Get the process pool shared by the CPU-bound season and simulation work
+
+    Args:
+        max_workers: Pool size (defaults to the CPU count; only used when the pool is first created)
+
+    Returns:
+        ProcessPoolExecutor
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(START_METHOD))
+        return _pool
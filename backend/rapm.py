@@ -0,0 +1,451 @@
+import argparse
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse.linalg import LinearOperator, cg, splu
+
+from event_store import HOME, VISITOR, get_event_store
+from oncourt_index import OnCourtIndex, get_oncourt_index
+from onoff_splits import credit_columns, event_vectors, incidence_matrix
+from parse_xml import list_games, parse_roster
+from season_aggregates import DEFAULT_SNAPSHOT
+
+# Ridge penalty in possessions; larger values pull every rating harder toward zero
+DEFAULT_RIDGE_LAMBDA = 2000.0
+# Game updates served by the cached factorization before it is rebuilt
+REFACTOR_AFTER = 8
+CG_TOLERANCE = 1e-8
+CG_MAX_ITERATIONS = 200
+# Solvers kept for distinct (snapshot, lambda) pairs; the least recently used is dropped
+MAX_SOLVERS = 8
+
+@dataclass
+class Stint:
+    """A stretch of a game with the same ten players on the floor"""
+    home_players: Tuple[str, ...]
+    visitor_players: Tuple[str, ...]
+    home_points: float = 0.0
+    visitor_points: float = 0.0
+    home_possessions: float = 0.0
+    visitor_possessions: float = 0.0
+    seconds: float = 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "homePlayers": list(self.home_players),
+            "visitorPlayers": list(self.visitor_players),
+            "homePoints": self.home_points,
+            "visitorPoints": self.visitor_points,
+            "homePossessions": self.home_possessions,
+            "visitorPossessions": self.visitor_possessions,
+            "seconds": round(self.seconds, 1),
+        }
+
+def game_stints(index: OnCourtIndex) -> List[Stint]:
+    """
+    Split a game into stints between substitutions
+
+    Uses the same lineups, possession definition and free throw crediting as
+    LineupTracker and the on/off splits, but keeps both fives of every stint
+    together so they can be set against each other.
+
+    Args:
+        index: On-court index of the game
+
+    Returns:
+        List of Stint in game order
+    """
+    store = index.store
+    player_ids, sides, matrix = incidence_matrix(index)
+    if not len(store) or not player_ids:
+        return []
+
+    vectors = event_vectors(store)
+    points = np.zeros_like(vectors["points"])
+    np.add.at(points, credit_columns(store), vectors["points"])
+
+    changes = np.flatnonzero((matrix[:, 1:] != matrix[:, :-1]).any(axis=0)) + 1
+    starts = np.concatenate([[0], changes])
+    stint_points = np.add.reduceat(points, starts, axis=0)
+    stint_possessions = np.add.reduceat(vectors["possessions"], starts, axis=0)
+    stint_seconds = np.add.reduceat(vectors["seconds"], starts)
+
+    stints = []
+    for row, start in enumerate(starts):
+        on = matrix[:, start]
+        home = tuple(player_ids[p] for p in np.flatnonzero(on & (sides == HOME)))
+        visitor = tuple(player_ids[p] for p in np.flatnonzero(on & (sides == VISITOR)))
+        if not home or not visitor:
+            continue
+        stints.append(Stint(
+            home_players=home,
+            visitor_players=visitor,
+            home_points=float(stint_points[row, HOME]),
+            visitor_points=float(stint_points[row, VISITOR]),
+            home_possessions=float(stint_possessions[row, HOME]),
+            visitor_possessions=float(stint_possessions[row, VISITOR]),
+            seconds=float(stint_seconds[row]),
+        ))
+    return stints
+
+@dataclass
+class GameDesign:
+    """
+    One game's share of the RAPM normal equations.
+
+    Every stint gives two rows, one per team on offense: the offensive five
+    get +1, the defensive five -1, the target is points per 100 possessions
+    and the weight is the possessions. Only X'WX, X'Wy and X'W1 over the
+    game's own players are kept, since those add across games.
+    """
+    player_ids: List[str]
+    gram: np.ndarray
+    xtwy: np.ndarray
+    xtw: np.ndarray
+    weight: float
+    weighted_target: float
+    stints: int
+    roster: Dict[str, Dict[str, str]] = field(default_factory=dict)
+
+def game_design(stints: List[Stint], roster: Optional[Dict[str, Dict[str, str]]] = None) -> GameDesign:
+    """
+    Build a game's contribution to the RAPM normal equations
+
+    Args:
+        stints: Stints of the game
+        roster: Player ID -> {"name", "teamId"} for labelling ratings
+
+    Returns:
+        GameDesign
+    """
+    player_ids = sorted({p for stint in stints for p in stint.home_players + stint.visitor_players})
+    columns = {player_id: i for i, player_id in enumerate(player_ids)}
+
+    rows, cols, values, weights, targets = [], [], [], [], []
+    for stint in stints:
+        for offense, defense, points, possessions in (
+            (stint.home_players, stint.visitor_players, stint.home_points, stint.home_possessions),
+            (stint.visitor_players, stint.home_players, stint.visitor_points, stint.visitor_possessions),
+        ):
+            if possessions <= 0:
+                continue
+            row = len(weights)
+            for players, sign in ((offense, 1.0), (defense, -1.0)):
+                rows.extend([row] * len(players))
+                cols.extend(columns[p] for p in players)
+                values.extend([sign] * len(players))
+            weights.append(possessions)
+            targets.append(100.0 * points / possessions)
+
+    weights = np.array(weights, dtype=np.float64)
+    targets = np.array(targets, dtype=np.float64)
+    design = sparse.csr_matrix((values, (rows, cols)), shape=(len(weights), len(player_ids)))
+    weighted = design.T.multiply(weights).tocsr()
+    return GameDesign(
+        player_ids=player_ids,
+        gram=(weighted @ design).toarray(),
+        xtwy=weighted @ targets,
+        xtw=np.asarray(weighted.sum(axis=1)).ravel(),
+        weight=float(weights.sum()),
+        weighted_target=float(weights @ targets),
+        stints=len(stints),
+        roster=roster or {},
+    )
+
+class RapmSolver:
+    """
+    Ridge-regressed plus-minus over any set of games.
+
+    Games are added, replaced or removed one at a time by adding or
+    subtracting their share of the sparse normal equations. The system
+    (X'WX + lambda I) beta = X'W(y - mean) is factorized with a sparse LU
+    and the factor is cached: after a game changes, the new system is solved
+    with conjugate gradients preconditioned by the old factor and started
+    from the previous ratings, which takes a handful of iterations. The
+    factor is rebuilt every REFACTOR_AFTER updates or when CG stalls.
+    """
+
+    def __init__(self, ridge_lambda: float = DEFAULT_RIDGE_LAMBDA):
+        self.ridge_lambda = ridge_lambda
+        self.player_ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.games: Dict[str, GameDesign] = {}
+        self.coefficients = np.zeros(0)
+        self.last_solve: Dict = {}
+
+        self._gram = sparse.csr_matrix((0, 0))
+        self._xtwy = np.zeros(0)
+        self._xtw = np.zeros(0)
+        self._weight = 0.0
+        self._weighted_target = 0.0
+        self._factor = None
+        self._factor_size = 0
+        self._updates_since_factor = 0
+        self._dirty = False
+
+    def _grow(self, player_ids: List[str]) -> np.ndarray:
+        """Rows of the given players, adding any new ones at the end"""
+        for player_id in player_ids:
+            if player_id not in self.rows:
+                self.rows[player_id] = len(self.player_ids)
+                self.player_ids.append(player_id)
+        size = len(self.player_ids)
+        if self._gram.shape[0] < size:
+            self._gram.resize((size, size))
+            self._xtwy = np.concatenate([self._xtwy, np.zeros(size - len(self._xtwy))])
+            self._xtw = np.concatenate([self._xtw, np.zeros(size - len(self._xtw))])
+        return np.array([self.rows[p] for p in player_ids], dtype=np.int64)
+
+    def _apply(self, design: GameDesign, sign: float) -> None:
+        """Add (sign=1) or subtract (sign=-1) a game's share of the normal equations"""
+        rows = self._grow(design.player_ids)
+        size = len(self.player_ids)
+        local = np.nonzero(design.gram)
+        self._gram = self._gram + sparse.csr_matrix(
+            (sign * design.gram[local], (rows[local[0]], rows[local[1]])), shape=(size, size))
+        np.add.at(self._xtwy, rows, sign * design.xtwy)
+        np.add.at(self._xtw, rows, sign * design.xtw)
+        self._weight += sign * design.weight
+        self._weighted_target += sign * design.weighted_target
+        self._updates_since_factor += 1
+        self._dirty = True
+
+    def set_game(self, game_id: str, design: GameDesign) -> None:
+        """Add a game, or replace it if it is already included"""
+        previous = self.games.get(game_id)
+        if previous is design:
+            return
+        if previous is not None:
+            self._apply(previous, -1.0)
+        self._apply(design, 1.0)
+        self.games[game_id] = design
+
+    def remove_game(self, game_id: str) -> None:
+        """Take a game back out of the ratings"""
+        previous = self.games.pop(game_id, None)
+        if previous is not None:
+            self._apply(previous, -1.0)
+
+    @property
+    def league_average(self) -> float:
+        """Possession-weighted points per 100 possessions over every row"""
+        return self._weighted_target / self._weight if self._weight > 0 else 0.0
+
+    def _system(self) -> Tuple[sparse.csc_matrix, np.ndarray]:
+        size = len(self.player_ids)
+        system = (self._gram + self.ridge_lambda * sparse.identity(size, format="csr")).tocsc()
+        return system, self._xtwy - self.league_average * self._xtw
+
+    def _factorize(self, system: sparse.csc_matrix) -> None:
+        self._factor = splu(system)
+        self._factor_size = system.shape[0]
+        self._updates_since_factor = 0
+
+    def solve(self) -> np.ndarray:
+        """
+        Ratings for every player ever added, re-solved only after a change
+
+        Returns:
+            Array of RAPM values (points per 100 possessions) in player_ids order
+        """
+        if not self._dirty:
+            return self.coefficients
+        system, rhs = self._system()
+        size = len(self.player_ids)
+        if size == 0:
+            self._dirty = False
+            return self.coefficients
+
+        solution = None
+        if self._factor is not None and self._updates_since_factor < REFACTOR_AFTER:
+            factor, factor_size = self._factor, self._factor_size
+            diagonal = system.diagonal()
+
+            def precondition(vector: np.ndarray) -> np.ndarray:
+                result = vector / diagonal
+                result[:factor_size] = factor.solve(np.ascontiguousarray(vector[:factor_size]))
+                return result
+
+            iterations = [0]
+            start = np.concatenate([self.coefficients, np.zeros(size - len(self.coefficients))])
+            solution, info = cg(system, rhs, x0=start, rtol=CG_TOLERANCE, maxiter=CG_MAX_ITERATIONS,
+                                M=LinearOperator((size, size), matvec=precondition),
+                                callback=lambda _: iterations.__setitem__(0, iterations[0] + 1))
+            if info == 0:
+                self.last_solve = {"method": "cg", "iterations": iterations[0]}
+            else:
+                solution = None
+
+        if solution is None:
+            self._factorize(system)
+            solution = self._factor.solve(rhs)
+            self.last_solve = {"method": "factorization", "iterations": 0}
+
+        self.coefficients = solution
+        self._dirty = False
+        return self.coefficients
+
+    def ratings(self, team_id: Optional[str] = None, min_possessions: float = 0.0,
+                limit: Optional[int] = None) -> List[Dict]:
+        """
+        Player ratings, best first
+
+        Args:
+            team_id: Only include players who appeared for this team
+            min_possessions: Offensive plus defensive possessions a player needs to be listed
+            limit: Number of players to return (all when None)
+
+        Returns:
+            List of rating dicts
+        """
+        coefficients = self.solve()
+        possessions = self._gram.diagonal() if len(self.player_ids) else np.zeros(0)
+        players: Dict[str, Dict[str, str]] = {}
+        games: Dict[str, int] = {}
+        for design in self.games.values():
+            players.update(design.roster)
+            for player_id in design.player_ids:
+                games[player_id] = games.get(player_id, 0) + 1
+
+        results = []
+        for player_id, row in self.rows.items():
+            info = players.get(player_id, {})
+            if not games.get(player_id) or possessions[row] < max(min_possessions, 1e-9):
+                continue
+            if team_id and info.get("teamId") != team_id:
+                continue
+            results.append({
+                "playerId": player_id,
+                "name": info.get("name", ""),
+                "teamId": info.get("teamId", ""),
+                "rapm": round(float(coefficients[row]), 2),
+                "possessions": round(float(possessions[row]), 1),
+                "games": games[player_id],
+            })
+        results.sort(key=lambda r: r["rapm"], reverse=True)
+        return results[:limit] if limit is not None else results
+
+    def summary(self) -> Dict:
+        """Model details reported alongside the ratings"""
+        return {
+            "games": len(self.games),
+            "players": len(self.player_ids),
+            "stints": sum(design.stints for design in self.games.values()),
+            "ridgeLambda": self.ridge_lambda,
+            "leagueAverage": round(self.league_average, 2),
+            "solve": self.last_solve,
+        }
+
+# Game designs keyed by (snapshot_dir_name, game_id) -> (store, events covered, design)
+_designs: Dict[Tuple[str, str], Tuple[object, int, GameDesign]] = {}
+_designs_lock = threading.Lock()
+
+def get_game_design(snapshot: str, game_id: str) -> Optional[GameDesign]:
+    """
+    Get a game's RAPM design, rebuilt only when new events arrive
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_id: Game identifier
+
+    Returns:
+        GameDesign, or None if the game has no event store
+    """
+    store = get_event_store(snapshot, game_id)
+    if store is None:
+        return None
+
+    key = (store.snapshot, game_id)
+    with _designs_lock:
+        cached = _designs.get(key)
+        if cached is not None and cached[0] is store and cached[1] == len(store):
+            return cached[2]
+
+    roster = cached[2].roster if cached is not None else {
+        player_id: {"name": f"{player['first_name']} {player['last_name']}".strip(), "teamId": player["team_id"]}
+        for player_id, player in parse_roster(snapshot, game_id).items()
+    }
+    design = game_design(game_stints(get_oncourt_index(snapshot, game_id)), roster)
+    with _designs_lock:
+        _designs[key] = (store, len(store), design)
+    return design
+
+# Solvers keyed by (snapshot_dir_name, ridge_lambda), least recently used first
+_solvers: "OrderedDict[Tuple[str, float], RapmSolver]" = OrderedDict()
+_solvers_lock = threading.Lock()
+
+def parse_ridge_lambda(value: str) -> float:
+    """
+    Parse a ridge penalty from a query parameter
+
+    Raises:
+        ValueError: If it isn't a finite number greater than 0. Zero leaves the
+            fit unregularized and a negative penalty makes it meaningless.
+    """
+    try:
+        ridge_lambda = float(value)
+    except (TypeError, ValueError):
+        ridge_lambda = float("nan")
+    if not math.isfinite(ridge_lambda) or ridge_lambda <= 0:
+        raise ValueError("lambda must be a finite number greater than 0")
+    return ridge_lambda
+
+def season_rapm(snapshot: str = DEFAULT_SNAPSHOT, game_ids: Optional[List[str]] = None,
+                ridge_lambda: float = DEFAULT_RIDGE_LAMBDA) -> RapmSolver:
+    """
+    RAPM over a snapshot's games, updated in place as games change
+
+    Only games whose events changed since the last call are re-added, so a
+    new or growing game costs one design build and a warm-started solve.
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_ids: Games to include (defaults to every game in the snapshot)
+        ridge_lambda: Ridge penalty
+
+    Returns:
+        Solved RapmSolver
+    """
+    game_ids = game_ids if game_ids is not None else list_games(snapshot)
+    designs = {game_id: get_game_design(snapshot, game_id) for game_id in game_ids}
+    designs = {game_id: design for game_id, design in designs.items() if design is not None}
+
+    key = (snapshot.lower().replace(' ', '_'), float(ridge_lambda))
+    with _solvers_lock:
+        solver = _solvers.get(key)
+        if solver is None:
+            solver = _solvers[key] = RapmSolver(ridge_lambda)
+            while len(_solvers) > MAX_SOLVERS:
+                _solvers.popitem(last=False)
+        _solvers.move_to_end(key)
+        for game_id in [g for g in solver.games if g not in designs]:
+            solver.remove_game(game_id)
+        for game_id, design in designs.items():
+            solver.set_game(game_id, design)
+        solver.solve()
+        return solver
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compute season RAPM from every game in a snapshot")
+    parser.add_argument("--snapshot", default=DEFAULT_SNAPSHOT, help="Snapshot directory to read games from")
+    parser.add_argument("--ridge-lambda", type=float, default=DEFAULT_RIDGE_LAMBDA, help="Ridge penalty")
+    parser.add_argument("--team-id", help="Only list players from this team")
+    parser.add_argument("--min-possessions", type=float, default=0.0, help="Possessions needed to be listed")
+    parser.add_argument("--top", type=int, default=20, help="Number of players to list")
+    args = parser.parse_args()
+
+    solver = season_rapm(args.snapshot, ridge_lambda=args.ridge_lambda)
+    summary = solver.summary()
+    print(f"{summary['games']} games, {summary['stints']} stints, {summary['players']} players, "
+          f"league average {summary['leagueAverage']} pts/100")
+    for rating in solver.ratings(args.team_id, args.min_possessions, args.top):
+        print(f"{rating['rapm']:+7.2f}  {rating['possessions']:7.1f} poss  {rating['games']:3d} g  "
+              f"{rating['name'] or rating['playerId']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,357 @@
+import argparse
+import gzip
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from flask import Flask, Response, g, has_app_context, request
+from flask.json.provider import DefaultJSONProvider
+
+from metrics import record_cache, record_phase
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bytes of encoded responses (all variants) kept before the least recently used are dropped
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+# Smaller bodies aren't worth compressing
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def _available_encodings() -> List[str]:
+    """Content-Encodings this server can produce, best first"""
+    return (["br"] if brotli is not None else []) + ["gzip"]
+
+def _json_default(value):
+    return DefaultJSONProvider.default(value)
+
+def encode_json(obj) -> bytes:
+    """
+    Encode a response body the way DefaultJSONProvider would (compact, sorted keys)
+
+    Uses orjson when it's installed and falls back to the standard library
+    for anything orjson can't represent.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_json_default,
+                                option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            pass
+    return json.dumps(obj, default=_json_default, sort_keys=True, separators=(",", ":")).encode()
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a body with gzip or brotli"""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that builds jsonify() bodies with encode_json and times the encoding"""
+
+    def response(self, *args, **kwargs) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        start = time.perf_counter()
+        body = encode_json(obj)
+        if has_app_context():
+            g.encode_seconds = g.get("encode_seconds", 0.0) + time.perf_counter() - start
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+class EncodedResponse:
+    """Encoded body of one response plus its compressed variants, built on first request"""
+
+    def __init__(self, endpoint: str, body: bytes, mimetype: str, encode_seconds: float):
+        self.endpoint = endpoint
+        self.mimetype = mimetype
+        self.encode_seconds = encode_seconds
+        self.variants: Dict[str, bytes] = {"identity": body}
+        self.lock = threading.Lock()
+        # Cache holding this entry and the bytes it has counted for it
+        self.cache: Optional["ResponseCache"] = None
+        self.cached_bytes = 0
+
+    @property
+    def size(self) -> int:
+        return sum(len(body) for body in self.variants.values())
+
+    def variant(self, encoding: str) -> bytes:
+        """
+        Body in the given encoding, compressing it the first time it is asked for
+
+        A new variant is charged to the cache holding this entry, which may
+        evict older entries to stay within its byte budget.
+        """
+        with self.lock:
+            body = self.variants.get(encoding)
+            if body is not None:
+                return body
+            start = time.perf_counter()
+            body = self.variants[encoding] = compress(self.variants["identity"], encoding)
+            seconds = time.perf_counter() - start
+            _stats.record_compression(self.endpoint, encoding, len(self.variants["identity"]), len(body), seconds)
+            record_phase("serialize", seconds)
+        cache = self.cache
+        if cache is not None:
+            cache.grow(self, len(body))
+        return body
+
+class ResponseStats:
+    """Per-endpoint encode time, compression ratio and cache hit counts"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, Dict[str, float]] = {}
+
+    def _row(self, endpoint: str) -> Dict[str, float]:
+        return self._endpoints.setdefault(endpoint, {
+            "hits": 0, "misses": 0, "encodes": 0, "encode_seconds": 0.0, "raw_bytes": 0,
+        })
+
+    def record_hit(self, endpoint: str) -> None:
+        with self._lock:
+            self._row(endpoint)["hits"] += 1
+
+    def record_encode(self, endpoint: str, size: int, seconds: float) -> None:
+        with self._lock:
+            row = self._row(endpoint)
+            row["misses"] += 1
+            row["encodes"] += 1
+            row["encode_seconds"] += seconds
+            row["raw_bytes"] += size
+
+    def record_compression(self, endpoint: str, encoding: str, raw: int, compressed: int, seconds: float) -> None:
+        with self._lock:
+            row = self._row(endpoint)
+            row[f"{encoding}_raw_bytes"] = row.get(f"{encoding}_raw_bytes", 0) + raw
+            row[f"{encoding}_bytes"] = row.get(f"{encoding}_bytes", 0) + compressed
+            row[f"{encoding}_seconds"] = row.get(f"{encoding}_seconds", 0.0) + seconds
+            row[f"{encoding}_count"] = row.get(f"{encoding}_count", 0) + 1
+
+    def summary(self) -> Dict[str, Dict]:
+        """Averages per endpoint: encode ms, body size, compression ratio and ms per encoding"""
+        with self._lock:
+            rows = {endpoint: dict(row) for endpoint, row in self._endpoints.items()}
+        result = {}
+        for endpoint, row in sorted(rows.items()):
+            encodes = row["encodes"] or 1
+            entry = {
+                "hits": row["hits"],
+                "misses": row["misses"],
+                "encodeMs": round(1000 * row["encode_seconds"] / encodes, 3),
+                "bodyBytes": round(row["raw_bytes"] / encodes),
+            }
+            for encoding in _available_encodings():
+                if row.get(f"{encoding}_bytes"):
+                    entry[f"{encoding}Ratio"] = round(row[f"{encoding}_raw_bytes"] / row[f"{encoding}_bytes"], 2)
+                    entry[f"{encoding}Ms"] = round(1000 * row[f"{encoding}_seconds"] / row[f"{encoding}_count"], 3)
+            result[endpoint] = entry
+        return result
+
+_stats = ResponseStats()
+
+class ResponseCache:
+    """Byte-bounded LRU of encoded responses keyed by ETag"""
+
+    def __init__(self, max_bytes: int = MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, EncodedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Running total of cached_bytes over the entries
+        self._bytes = 0
+
+    def get(self, key: str) -> Optional[EncodedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: EncodedResponse) -> None:
+        with self._lock:
+            replaced = self._entries.get(key)
+            if replaced is not None:
+                self._release(replaced)
+            entry.cache = self
+            entry.cached_bytes = entry.size
+            self._bytes += entry.cached_bytes
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def grow(self, entry: EncodedResponse, added: int) -> None:
+        """Count a variant added to a cached entry and evict if the budget is exceeded"""
+        with self._lock:
+            if entry.cache is not self:
+                return
+            entry.cached_bytes += added
+            self._bytes += added
+            self._evict()
+
+    def _release(self, entry: EncodedResponse) -> None:
+        self._bytes -= entry.cached_bytes
+        entry.cache = None
+        entry.cached_bytes = 0
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, dropped = self._entries.popitem(last=False)
+            self._release(dropped)
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry in self._entries.values():
+                self._release(entry)
+            self._entries.clear()
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+_cache = ResponseCache()
+
+def response_stats() -> Dict[str, Dict]:
+    """Per-endpoint encoding and compression measurements collected so far"""
+    return _stats.summary()
+
+def _negotiate(body: bytes) -> str:
+    """Best Content-Encoding the client accepts for a body of this size"""
+    if len(body) < MIN_COMPRESS_BYTES:
+        return "identity"
+    accepted = request.accept_encodings
+    for encoding in _available_encodings():
+        if accepted[encoding] > 0:
+            return encoding
+    return "identity"
+
+def _serve(entry: EncodedResponse) -> Response:
+    encoding = _negotiate(entry.variants["identity"])
+    response = Response(entry.variant(encoding), mimetype=entry.mimetype)
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
+def _before_request() -> Optional[Response]:
+    """Serve already-encoded bytes when the ETag (endpoint, params and data version) is cached"""
+    etag = g.get("etag")
+    if etag is None or request.method not in ("GET", "HEAD"):
+        return None
+    entry = _cache.get(etag)
+    if entry is None:
+        return None
+    _stats.record_hit(request.endpoint)
+    record_cache("response", True)
+    return _serve(entry)
+
+def _after_request(response: Response) -> Response:
+    """Cache a freshly built JSON response and send it in the negotiated encoding"""
+    etag = g.get("etag")
+    if (etag is None or response.status_code != 200 or response.is_streamed or response.mimetype != "application/json"
+            or "Content-Encoding" in response.headers or _cache.get(etag) is not None):
+        return response
+
+    body = response.get_data()
+    entry = EncodedResponse(request.endpoint, body, response.mimetype, g.get("encode_seconds", 0.0))
+    _stats.record_encode(request.endpoint, len(body), entry.encode_seconds)
+    record_cache("response", False)
+    _cache.put(etag, entry)
+
+    encoding = _negotiate(body)
+    if encoding != "identity":
+        response.set_data(entry.variant(encoding))
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    return response
+
+def init_response_cache(app: Flask) -> None:
+    """
+    Encode JSON with the fast provider and cache the encoded bytes of every response
+
+    Must be installed after init_http_cache, whose ETag (endpoint, arguments,
+    source file stats and code version) is the cache key.
+
+    Args:
+        app: Flask app to install the provider and request hooks on
+    """
+    app.json = FastJSONProvider(app)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+
+def benchmark_endpoints(app: Flask, paths: List[str], repeat: int = 5) -> Dict[str, Dict]:
+    """
+    Encode time and compression ratio of each path's response body
+
+    Each response is built once through the app, then its payload is
+    re-encoded `repeat` times with the standard library and with
+    encode_json, and compressed with every available encoding.
+
+    Args:
+        app: Flask app to request the paths from
+        paths: URLs with query strings
+        repeat: Encodes per measurement (the best is kept)
+
+    Returns:
+        Path -> measurements
+    """
+    client = app.test_client()
+    results = {}
+    for path in paths:
+        response = client.get(path, headers={"Accept-Encoding": "identity"})
+        if response.status_code != 200:
+            results[path] = {"status": response.status_code}
+            continue
+        payload = json.loads(response.get_data())
+
+        def best(function):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                output = function()
+                timings.append(time.perf_counter() - start)
+            return output, round(1000 * min(timings), 3)
+
+        body, fast_ms = best(lambda: encode_json(payload))
+        _, stdlib_ms = best(lambda: json.dumps(payload, sort_keys=True, separators=(",", ":")).encode())
+        result = {"bytes": len(body), "stdlibMs": stdlib_ms, "encodeMs": fast_ms}
+        for encoding in _available_encodings():
+            compressed, ms = best(lambda: compress(body, encoding))
+            result[f"{encoding}Ratio"] = round(len(body) / len(compressed), 2)
+            result[f"{encoding}Ms"] = ms
+        results[path] = result
+    return results
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark JSON encoding and compression per endpoint")
+    parser.add_argument("--snapshot", default="end_of_game", help="Snapshot to request")
+    parser.add_argument("--game-id", default="2052400190", help="Game to request")
+    parser.add_argument("--repeat", type=int, default=5, help="Encodes per measurement")
+    args = parser.parse_args()
+
+    from app import app
+    game = f"snapshot={args.snapshot}&game_id={args.game_id}"
+    paths = [
+        f"/boxscore?{game}", f"/lineups?{game}", f"/pbp?{game}", f"/shot-zones?{game}", f"/api/shots?{game}",
+        f"/game-state?{game}", f"/api/lineup-data/{args.game_id}/{args.snapshot}", f"/api/on-off?{game}",
+        f"/api/win-probability-series?{game}", f"/api/season/players?snapshot={args.snapshot}",
+        f"/api/season/rapm?snapshot={args.snapshot}",
+    ]
+    results = benchmark_endpoints(app, paths, args.repeat)
+    print(f"encoder: {'orjson' if orjson is not None else 'json'}, encodings: {', '.join(_available_encodings())}")
+    for path, result in results.items():
+        print(f"{path}\n    {json.dumps(result)}")
+
+if __name__ == "__main__":
+    main()
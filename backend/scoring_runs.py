@@ -0,0 +1,229 @@
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from event_store import PbpEventStore
+from oncourt_index import OnCourtIndex, get_oncourt_index
+
+# Detectors kept for run definitions other than the default, over all games;
+# the least recently used is dropped so query-string definitions can't pile up
+MAX_CUSTOM_DETECTORS = 32
+
+@dataclass(frozen=True)
+class RunDefinition:
+    """
+    What counts as a scoring run
+
+    A run is points scored by one team while the other scores nothing. With
+    window_seconds set, only the best stretch of an unanswered streak that fits
+    in the window counts, so "8-0 within 2 minutes" is
+    RunDefinition(min_points=8, window_seconds=120).
+
+    Raises:
+        ValueError: If min_points is below 1 or window_seconds isn't a finite
+            number greater than 0
+    """
+    min_points: int = 8
+    window_seconds: Optional[float] = None
+
+    def __post_init__(self):
+        if self.min_points < 1:
+            raise ValueError("min_points must be at least 1")
+        if self.window_seconds is not None and not (math.isfinite(self.window_seconds) and self.window_seconds > 0):
+            raise ValueError("window_seconds must be a finite number greater than 0")
+
+@dataclass
+class ScoringRun:
+    """One scoring run; start/end are event store indexes of its first and last baskets"""
+    team_id: str
+    points: int
+    start_event: int
+    end_event: int
+    start_period: int
+    start_clock: str
+    end_period: int
+    end_clock: str
+    start_elapsed: float
+    end_elapsed: float
+    lineups: List[Dict[str, List[str]]]
+
+    def to_dict(self) -> Dict:
+        return {
+            "teamId": self.team_id,
+            "points": self.points,
+            "startEvent": self.start_event,
+            "endEvent": self.end_event,
+            "startPeriod": self.start_period,
+            "startClock": self.start_clock,
+            "endPeriod": self.end_period,
+            "endClock": self.end_clock,
+            "seconds": self.end_elapsed - self.start_elapsed,
+            "lineups": self.lineups,
+        }
+
+def find_streaks(sides: np.ndarray, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Split a sequence of baskets into unanswered streaks
+
+    Args:
+        sides: Scoring team side of each basket
+        points: Points of each basket
+
+    Returns:
+        Tuple of (start position of each streak, points in each streak)
+    """
+    if len(sides) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.diff(sides, prepend=sides[0] - 1) != 0)
+    return starts, np.add.reduceat(points, starts)
+
+def best_window(elapsed: np.ndarray, points: np.ndarray, window_seconds: float) -> Tuple[int, int, int]:
+    """
+    Most points scored within any window of a streak
+
+    Args:
+        elapsed: Elapsed time of each basket in the streak
+        points: Points of each basket in the streak
+        window_seconds: Window length
+
+    Returns:
+        Tuple of (first basket, last basket, points) for the best window
+    """
+    cumulative = np.concatenate([[0], np.cumsum(points)])
+    first = np.searchsorted(elapsed, elapsed - window_seconds, side="left")
+    totals = cumulative[1:] - cumulative[first]
+    last = int(np.argmax(totals))
+    return int(first[last]), last, int(totals[last])
+
+class RunDetector:
+    """
+    Every scoring run in a game under one RunDefinition.
+
+    Baskets are pulled out of the event store's point columns once and split
+    into unanswered streaks with diff/reduceat. Only the last streak can still
+    grow, so extend() keeps the finished runs and re-examines the game from
+    the start of the last streak onward.
+    """
+
+    def __init__(self, store: PbpEventStore, oncourt: Optional[OnCourtIndex], definition: RunDefinition = RunDefinition()):
+        self.store = store
+        self.oncourt = oncourt
+        self.definition = definition
+        self.finished: List[ScoringRun] = []
+        self.open_run: Optional[ScoringRun] = None
+        self.events_scanned = 0
+        self._resume_from = 0
+
+        self.extend()
+
+    @property
+    def runs(self) -> List[ScoringRun]:
+        """Finished runs followed by the run in progress, if it qualifies"""
+        return self.finished + ([self.open_run] if self.open_run is not None else [])
+
+    def extend(self) -> None:
+        """Detect runs in events added to the store since the last call"""
+        store = self.store
+        points = (store.home_points + store.visitor_points)[self._resume_from:]
+        baskets = np.flatnonzero(points > 0) + self._resume_from
+        self.events_scanned = len(store)
+        self.open_run = None
+        if len(baskets) == 0:
+            return
+
+        sides = store.team_side[baskets]
+        basket_points = (store.home_points + store.visitor_points)[baskets]
+        starts, totals = find_streaks(sides, basket_points)
+        ends = np.append(starts[1:], len(baskets))
+
+        for streak, (start, end) in enumerate(zip(starts, ends)):
+            run = self._qualify(baskets[start:end], basket_points[start:end], int(totals[streak]))
+            if streak < len(starts) - 1:
+                if run is not None:
+                    self.finished.append(run)
+            else:
+                self.open_run = run
+                self._resume_from = int(baskets[start])
+
+    def _qualify(self, baskets: np.ndarray, points: np.ndarray, total: int) -> Optional[ScoringRun]:
+        """Turn a streak into a run if it meets the definition"""
+        if self.definition.window_seconds is not None:
+            first, last, total = best_window(self.store.elapsed[baskets], points, self.definition.window_seconds)
+            baskets = baskets[first:last + 1]
+        if total < self.definition.min_points:
+            return None
+        return self._make_run(baskets, total)
+
+    def _make_run(self, baskets: np.ndarray, total: int) -> ScoringRun:
+        store = self.store
+        start, end = int(baskets[0]), int(baskets[-1])
+
+        lineups = []
+        if self.oncourt is not None:
+            for index in baskets:
+                on_court = {team_id: list(players) for team_id, players in self.oncourt.on_court_at_event(int(index)).items()}
+                if not lineups or lineups[-1] != on_court:
+                    lineups.append(on_court)
+
+        return ScoringRun(
+            team_id=store.team_id_of(int(store.team_side[start])),
+            points=total,
+            start_event=start,
+            end_event=end,
+            start_period=int(store.period[start]),
+            start_clock=store.events[start].get("Game_clock", ""),
+            end_period=int(store.period[end]),
+            end_clock=store.events[end].get("Game_clock", ""),
+            start_elapsed=float(store.elapsed[start]),
+            end_elapsed=float(store.elapsed[end]),
+            lineups=lineups,
+        )
+
+    def longest_runs(self) -> Dict[str, int]:
+        """Biggest run for each team (0 if the team had none)"""
+        longest = {self.store.home_team_id: 0, self.store.visitor_team_id: 0}
+        for run in self.runs:
+            longest[run.team_id] = max(longest[run.team_id], run.points)
+        return longest
+
+# Detectors keyed by (snapshot_dir_name, game_id, definition): default-definition
+# detectors for every game, and an LRU of the rest, least recently used first
+_detectors: Dict[Tuple[str, str, RunDefinition], RunDetector] = {}
+_custom_detectors: "OrderedDict[Tuple[str, str, RunDefinition], RunDetector]" = OrderedDict()
+_detectors_lock = threading.Lock()
+
+def get_run_detector(snapshot: str, game_id: str, definition: RunDefinition = RunDefinition()) -> Optional[RunDetector]:
+    """
+    Get the run detector for a game and definition, extended with any newly arrived events
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_id: Game identifier
+        definition: Run definition
+
+    Returns:
+        RunDetector, or None if the game has no event store
+    """
+    oncourt = get_oncourt_index(snapshot, game_id)
+    if oncourt is None:
+        return None
+
+    key = (oncourt.store.snapshot, game_id, definition)
+    cache = _detectors if definition == RunDefinition() else _custom_detectors
+    with _detectors_lock:
+        detector = cache.get(key)
+        if detector is None or detector.store is not oncourt.store:
+            detector = RunDetector(oncourt.store, oncourt, definition)
+            cache[key] = detector
+        elif detector.events_scanned < len(oncourt.store):
+            detector.oncourt = oncourt
+            detector.extend()
+        if cache is _custom_detectors:
+            _custom_detectors.move_to_end(key)
+            while len(_custom_detectors) > MAX_CUSTOM_DETECTORS:
+                _custom_detectors.popitem(last=False)
+        return detector
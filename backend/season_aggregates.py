@@ -0,0 +1,330 @@
+import os
+import threading
+from dataclasses import dataclass, field
+from functools import reduce
+from typing import Dict, Iterable, List, Optional
+
+from parse_xml import DATA_ROOT, list_games, parse_game_info, parse_schedule
+from parse_lineup_stints import LineupStats, create_lineup_tracker, lineup_efficiency
+from oncourt_index import get_oncourt_index
+from onoff_splits import ONOFF_FIELDS, compute_onoff, onoff_metrics
+from process_pool import get_process_pool
+
+# Season queries read the final state of each game
+DEFAULT_SNAPSHOT = "end_of_game"
+
+LINEUP_FIELDS = ("points_for", "points_against", "possessions_for", "possessions_against", "minutes_played", "games")
+STINT_FIELDS = ("stints", "seconds", "games")
+PLAYER_FIELDS = ("fg_made", "fg_attempted", "turnovers", "fouls", "seconds", "games")
+
+@dataclass
+class GamePartial:
+    """
+    Per-game lineup, stint and player sums that merge associatively.
+
+    Every field is a sum except longest_stint (a max), so partials for any
+    grouping of games can be combined in any order with merge_partials and an
+    empty GamePartial is the identity.
+    """
+    games: Dict[str, Dict] = field(default_factory=dict)  # game_id -> schedule metadata
+    lineups: Dict[str, Dict[str, float]] = field(default_factory=dict)  # lineup_key -> LINEUP_FIELDS
+    stints: Dict[str, Dict[str, float]] = field(default_factory=dict)  # player_id -> STINT_FIELDS + longest_stint
+    players: Dict[str, Dict[str, float]] = field(default_factory=dict)  # player_id -> PLAYER_FIELDS + team_id
+    onoff: Dict[str, Dict[str, float]] = field(default_factory=dict)  # player_id -> ONOFF_FIELDS + team_id
+
+def _merge_rows(left: Dict[str, Dict], right: Dict[str, Dict], fields: Iterable[str]) -> Dict[str, Dict]:
+    """Sum the numeric fields of two keyed row tables"""
+    merged = {key: dict(row) for key, row in left.items()}
+    for key, row in right.items():
+        if key not in merged:
+            merged[key] = dict(row)
+            continue
+        target = merged[key]
+        for name in fields:
+            target[name] = target.get(name, 0) + row.get(name, 0)
+        if "longest_stint" in row:
+            target["longest_stint"] = max(target.get("longest_stint", 0), row["longest_stint"])
+    return merged
+
+def merge_partials(left: GamePartial, right: GamePartial) -> GamePartial:
+    """
+    Combine two partials into a new one without modifying either
+
+    Args:
+        left: Partial for one set of games
+        right: Partial for a disjoint set of games
+
+    Returns:
+        Partial covering both sets of games
+    """
+    return GamePartial(
+        games={**left.games, **right.games},
+        lineups=_merge_rows(left.lineups, right.lineups, LINEUP_FIELDS),
+        stints=_merge_rows(left.stints, right.stints, STINT_FIELDS),
+        players=_merge_rows(left.players, right.players, PLAYER_FIELDS),
+        onoff=_merge_rows(left.onoff, right.onoff, ONOFF_FIELDS),
+    )
+
+def build_game_partial(game_id: str, snapshot: str = DEFAULT_SNAPSHOT) -> Optional[GamePartial]:
+    """
+    Replay one game through LineupTracker and reduce it to a partial
+
+    Args:
+        game_id: Game identifier
+        snapshot: Snapshot directory to read the game from
+
+    Returns:
+        GamePartial for the game, or None if the game info is missing
+    """
+    snapshot_dir_name = snapshot.lower().replace(' ', '_')
+    game_info = parse_game_info(snapshot_dir_name, game_id)
+    if not game_info:
+        return None
+
+    tracker = create_lineup_tracker(
+        game_id=game_id,
+        snapshot=snapshot,
+        home_team_id=game_info['home_id'],
+        away_team_id=game_info['visitor_id']
+    )
+    tracker.process_pbp_events()
+
+    metadata = parse_schedule().get(game_id, {})
+    partial = GamePartial(games={
+        game_id: {
+            "game_id": game_id,
+            "game_date": metadata.get("game_date", ""),
+            "home_id": game_info['home_id'],
+            "visitor_id": game_info['visitor_id'],
+        }
+    })
+
+    for lineup_key, stats in tracker.lineup_history.items():
+        partial.lineups[lineup_key] = {
+            "points_for": stats.points_for,
+            "points_against": stats.points_against,
+            "possessions_for": stats.possessions_for,
+            "possessions_against": stats.possessions_against,
+            "minutes_played": stats.minutes_played,
+            "games": 1,
+        }
+
+    # Every player who logged a stint appears in at least one lineup
+    team_of = {}
+    for lineup_key, stats in tracker.lineup_history.items():
+        for player_id in stats.players:
+            team_of[player_id] = lineup_key.split('-')[0]
+
+    for player_id, history in tracker.player_stint_history.items():
+        stints = list(history)
+        if player_id in tracker.player_stints:
+            stints.append(tracker.player_stints[player_id])
+        if not stints:
+            continue
+
+        durations = [
+            tracker.clock_to_seconds(stint.start_time) - tracker.clock_to_seconds(stint.end_time or tracker.current_game_clock)
+            for stint in stints
+        ]
+        partial.stints[player_id] = {
+            "stints": len(stints),
+            "seconds": sum(durations),
+            "longest_stint": max(durations),
+            "games": 1,
+        }
+        partial.players[player_id] = {
+            "team_id": team_of.get(player_id, ""),
+            "fg_made": sum(stint.fg_made for stint in stints),
+            "fg_attempted": sum(stint.fg_attempted for stint in stints),
+            "turnovers": sum(stint.turnovers for stint in stints),
+            "fouls": sum(stint.fouls for stint in stints),
+            "seconds": sum(durations),
+            "games": 1,
+        }
+
+    oncourt = get_oncourt_index(snapshot_dir_name, game_id)
+    if oncourt is not None:
+        partial.onoff = compute_onoff(oncourt)
+
+    return partial
+
+# Partials keyed by (game_id, snapshot), invalidated when the game's files change
+_partial_cache: Dict[tuple, tuple] = {}
+_partial_lock = threading.Lock()
+
+def _game_signature(game_id: str, snapshot_dir_name: str) -> tuple:
+    """Names, sizes and modification times of a game's snapshot files"""
+    snapshot_dir = os.path.join(DATA_ROOT, snapshot_dir_name)
+    if not os.path.isdir(snapshot_dir):
+        return ()
+    signature = []
+    for filename in sorted(os.listdir(snapshot_dir)):
+        if filename.startswith(f"{game_id}_"):
+            stat = os.stat(os.path.join(snapshot_dir, filename))
+            signature.append((filename, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+def _build_partial_entry(args: tuple) -> Optional[GamePartial]:
+    """Process pool entry point, which takes a single picklable argument"""
+    game_id, snapshot = args
+    return build_game_partial(game_id, snapshot)
+
+def get_game_partials(game_ids: List[str], snapshot: str = DEFAULT_SNAPSHOT, max_workers: Optional[int] = None) -> List[GamePartial]:
+    """
+    Get partials for many games, building uncached ones in the shared process pool
+
+    Args:
+        game_ids: Games to include
+        snapshot: Snapshot directory to read games from
+        max_workers: Process pool size (defaults to the CPU count; only used when the pool is first created)
+
+    Returns:
+        Partials for every game that could be parsed
+    """
+    snapshot_dir_name = snapshot.lower().replace(' ', '_')
+    signatures = {game_id: _game_signature(game_id, snapshot_dir_name) for game_id in game_ids}
+
+    with _partial_lock:
+        cached = {game_id: _partial_cache.get((game_id, snapshot_dir_name)) for game_id in game_ids}
+    missing = [game_id for game_id in game_ids if cached[game_id] is None or cached[game_id][0] != signatures[game_id]]
+
+    # Built outside the lock; a game two requests both build just gets stored twice
+    if len(missing) > 1:
+        jobs = [(game_id, snapshot_dir_name) for game_id in missing]
+        built = list(get_process_pool(max_workers).map(_build_partial_entry, jobs))
+    else:
+        built = [build_game_partial(game_id, snapshot_dir_name) for game_id in missing]
+
+    with _partial_lock:
+        for game_id, partial in zip(missing, built):
+            entry = (signatures[game_id], partial)
+            _partial_cache[(game_id, snapshot_dir_name)] = entry
+            cached[game_id] = entry
+
+    partials = [cached[game_id][1] for game_id in game_ids]
+    return [partial for partial in partials if partial is not None]
+
+def filter_games(game_ids: List[str], team_id: Optional[str] = None, month: Optional[str] = None, opponent_id: Optional[str] = None) -> List[str]:
+    """
+    Narrow a game list using the schedule
+
+    Args:
+        game_ids: Candidate games
+        team_id: Only games this team played
+        month: Only games in this month (YYYY-MM)
+        opponent_id: Only games against this team
+
+    Returns:
+        Game IDs that match every filter given
+    """
+    if not (team_id or month or opponent_id):
+        return list(game_ids)
+
+    schedule = parse_schedule()
+    selected = []
+    for game_id in game_ids:
+        game = schedule.get(game_id)
+        if game is None:
+            continue
+        teams = {game["home_id"], game["visitor_id"]}
+        if team_id and team_id not in teams:
+            continue
+        if opponent_id and opponent_id not in teams:
+            continue
+        if month and not game["game_date"].startswith(month):
+            continue
+        selected.append(game_id)
+    return selected
+
+def season_partial(snapshot: str = DEFAULT_SNAPSHOT, team_id: Optional[str] = None, month: Optional[str] = None, opponent_id: Optional[str] = None) -> GamePartial:
+    """
+    Merge the partials of every game in a snapshot that matches the filters
+
+    Args:
+        snapshot: Snapshot directory to read games from
+        team_id: Only games this team played
+        month: Only games in this month (YYYY-MM)
+        opponent_id: Only games against this team
+
+    Returns:
+        Merged GamePartial (empty if no game matches)
+    """
+    game_ids = filter_games(list_games(snapshot), team_id, month, opponent_id)
+    return reduce(merge_partials, get_game_partials(game_ids, snapshot), GamePartial())
+
+def season_lineup_stats(partial: GamePartial, team_id: Optional[str] = None, min_possessions: int = 0) -> Dict[str, Dict]:
+    """
+    Turn merged lineup sums into per-lineup stats with efficiency metrics
+
+    Args:
+        partial: Merged partial
+        team_id: Only lineups for this team
+        min_possessions: Minimum possessions for lineup to be included
+
+    Returns:
+        Dict mapping lineup_key to summed stats and efficiency
+    """
+    lineup_stats = {}
+    for lineup_key, row in partial.lineups.items():
+        if team_id and not lineup_key.startswith(f"{team_id}-"):
+            continue
+        if row["possessions_for"] < min_possessions:
+            continue
+
+        stats = LineupStats(
+            players=set(lineup_key.split('-')[1].split('_')),
+            points_for=row["points_for"],
+            points_against=row["points_against"],
+            possessions_for=row["possessions_for"],
+            possessions_against=row["possessions_against"],
+            minutes_played=row["minutes_played"],
+        )
+        lineup_stats[lineup_key] = {
+            **row,
+            "efficiency": lineup_efficiency(stats),
+        }
+    return lineup_stats
+
+def season_player_stats(partial: GamePartial, team_id: Optional[str] = None) -> Dict[str, Dict]:
+    """
+    Combine merged player and stint sums into per-player season stats
+
+    Args:
+        partial: Merged partial
+        team_id: Only players for this team
+
+    Returns:
+        Dict mapping player_id to totals, per-game minutes and stint averages
+    """
+    player_stats = {}
+    for player_id, row in partial.players.items():
+        if team_id and row.get("team_id") != team_id:
+            continue
+        stints = partial.stints.get(player_id, {})
+        stint_count = stints.get("stints", 0)
+        player_stats[player_id] = {
+            **row,
+            "minutes_per_game": row["seconds"] / 60 / row["games"] if row["games"] else 0,
+            "fg_pct": row["fg_made"] / row["fg_attempted"] if row["fg_attempted"] else 0.0,
+            "stints": stint_count,
+            "avg_stint_seconds": stints.get("seconds", 0) / stint_count if stint_count else 0,
+            "longest_stint_seconds": stints.get("longest_stint", 0),
+        }
+    return player_stats
+
+def season_onoff_stats(partial: GamePartial, team_id: Optional[str] = None) -> Dict[str, Dict]:
+    """
+    Turn merged on/off sums into per-player on/off ratings
+
+    Args:
+        partial: Merged partial
+        team_id: Only players for this team
+
+    Returns:
+        Dict mapping player_id to on/off sums and ratings
+    """
+    return {
+        player_id: onoff_metrics(row)
+        for player_id, row in partial.onoff.items()
+        if not team_id or row.get("team_id") == team_id
+    }
@@ -0,0 +1,350 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from event_store import (FOUL, HOME, MADE_SHOT, MISSED_SHOT, REGULATION_PERIODS, TIMEOUT, TURNOVER, VISITOR,
+                         PbpEventStore, default_period_start, get_event_store)
+from game_replay import NON_TEAM_FOUL_ACTIONS
+from oncourt_index import OnCourtIndex, get_oncourt_index
+from onoff_splits import credit_columns, event_vectors
+from parse_pbp_shots import event_shot_zone
+from parse_xml import list_games
+from stat_timelines import TIMELINE_STATS, event_stat_deltas
+
+CLUTCH_SECONDS = 300
+CLUTCH_MARGIN = 5
+END_OF_PERIOD_SECONDS = 120
+# Team fouls by the defense before the offense shoots free throws on every foul
+BONUS_FOULS = 4
+
+SITUATIONS = ("clutch", "end_of_period", "bonus", "after_timeout")
+# Per-lineup sums from masked_lineup_stats; all of them add across games
+LINEUP_FIELDS = ("points_for", "points_against", "possessions_for", "possessions_against", "seconds")
+
+def _untimed_periods(store: PbpEventStore) -> np.ndarray:
+    """Events in periods whose clock starts above the normal length (G League untimed overtime)"""
+    untimed = [p for p, clock in store.period_start_clock.items() if clock > default_period_start(p)]
+    return np.isin(store.period, untimed)
+
+def _period_start_positions(store: PbpEventStore) -> np.ndarray:
+    """For each event, the index of the first event of its period"""
+    starts = np.zeros(len(store), dtype=np.int64)
+    for first, last in store.period_offsets.values():
+        starts[first:last] = first
+    return starts
+
+def situation_masks(store: PbpEventStore) -> Dict[str, np.ndarray]:
+    """
+    Boolean masks over a game's events for each situation in SITUATIONS
+
+        clutch: last five minutes of the fourth period or overtime with the
+            score within five before the event (untimed overtime counts whole)
+        end_of_period: last two minutes of any timed period
+        bonus: the team on the event has the opponent in the bonus, using the
+            same team-foul count as the boxscore panel
+        after_timeout: the team that called a timeout, up to and including the
+            event that ends its next possession
+
+    Args:
+        store: Event store
+
+    Returns:
+        Dict mapping situation name to a boolean array of len(store)
+    """
+    count = len(store)
+    positions = np.arange(count)
+    untimed = _untimed_periods(store)
+
+    margin_before = (store.home_score - store.home_points) - (store.visitor_score - store.visitor_points)
+    late = (store.period >= REGULATION_PERIODS) & ((store.clock <= CLUTCH_SECONDS) | untimed)
+    clutch = late & (np.abs(margin_before) <= CLUTCH_MARGIN)
+
+    end_of_period = (store.clock <= END_OF_PERIOD_SECONDS) & ~untimed
+
+    # Team fouls committed earlier in the same period, per side
+    team_foul = (store.msg_type == FOUL) & ~np.isin(store.action_type, [int(a) for a in NON_TEAM_FOUL_ACTIONS])
+    period_start = _period_start_positions(store)
+    fouls_before = {}
+    for side in (HOME, VISITOR):
+        running = np.concatenate([[0], np.cumsum(team_foul & (store.team_side == side))])
+        fouls_before[side] = running[positions] - running[period_start]
+    bonus = ((store.team_side == HOME) & (fouls_before[VISITOR] >= BONUS_FOULS)) | \
+            ((store.team_side == VISITOR) & (fouls_before[HOME] >= BONUS_FOULS))
+
+    # Possession-ending events strictly before each event, and the most recent timeout at or before it
+    possession_end = np.isin(store.msg_type, (MADE_SHOT, MISSED_SHOT, TURNOVER))
+    last_end = np.maximum.accumulate(np.where(possession_end, positions, -1)) if count else positions
+    last_end_before = np.concatenate([[-1], last_end[:-1]]) if count else positions
+    is_timeout = store.msg_type == TIMEOUT
+    last_timeout = np.maximum.accumulate(np.where(is_timeout, positions, -1)) if count else positions
+    timeout_side = store.team_side[np.maximum(last_timeout, 0)]
+    after_timeout = (last_timeout >= 0) & (last_timeout > last_end_before) & ~is_timeout & \
+                    (store.team_side == timeout_side) & (store.period == store.period[np.maximum(last_timeout, 0)])
+
+    return {
+        "clutch": clutch,
+        "end_of_period": end_of_period,
+        "bonus": bonus,
+        "after_timeout": after_timeout,
+    }
+
+# Per-event box deltas and player rows keyed by (snapshot_dir_name, game_id) -> (store, player IDs, rows, deltas)
+_event_columns: Dict[Tuple[str, str], Tuple[PbpEventStore, List[str], np.ndarray, np.ndarray]] = {}
+_event_columns_lock = threading.Lock()
+
+def event_columns(store: PbpEventStore) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    What each event adds to the box score, and the player it is credited to
+
+    Cached per store and extended with only the events added since the last
+    call, so masked sums are pure array work.
+
+    Returns:
+        Tuple of (player IDs in row order, each event's player row or -1,
+        events x TIMELINE_STATS deltas)
+    """
+    key = (store.snapshot, store.game_id)
+    with _event_columns_lock:
+        cached = _event_columns.get(key)
+        if cached is None or cached[0] is not store:
+            cached = (store, [], np.zeros(0, dtype=np.int64), np.zeros((0, len(TIMELINE_STATS)), dtype=np.int64))
+        _, player_ids, rows, deltas = cached
+        start = len(rows)
+        if start < len(store):
+            positions = {player_id: row for row, player_id in enumerate(player_ids)}
+            player_ids = list(player_ids)
+            new_rows = np.full(len(store) - start, -1, dtype=np.int64)
+            for offset, event in enumerate(store.events[start:]):
+                player_id = event.get("Person_id")
+                if player_id and store.team_side[start + offset] >= 0:
+                    if player_id not in positions:
+                        positions[player_id] = len(player_ids)
+                        player_ids.append(player_id)
+                    new_rows[offset] = positions[player_id]
+            rows = np.concatenate([rows, new_rows])
+            deltas = np.concatenate([deltas, event_stat_deltas(store, start)])
+            cached = (store, player_ids, rows, deltas)
+            _event_columns[key] = cached
+        return cached[1], cached[2], cached[3]
+
+def masked_stats(store: PbpEventStore, mask: np.ndarray) -> Dict[str, Dict]:
+    """
+    Team and player box totals over the events selected by a mask
+
+    Args:
+        store: Event store
+        mask: Boolean array over the store's events
+
+    Returns:
+        Dict with "teams" and "players", each mapping an ID to TIMELINE_STATS totals
+    """
+    player_ids, rows, deltas = event_columns(store)
+    count = min(len(mask), len(rows))
+    mask, rows, deltas, sides = mask[:count], rows[:count], deltas[:count], store.team_side[:count]
+    teams = {}
+    for side in (HOME, VISITOR):
+        totals = deltas[mask & (sides == side)].sum(axis=0)
+        teams[store.team_id_of(side)] = {name: int(value) for name, value in zip(TIMELINE_STATS, totals)}
+
+    selected = mask & (rows >= 0)
+    totals = np.zeros((len(player_ids), len(TIMELINE_STATS)), dtype=np.int64)
+    np.add.at(totals, rows[selected], deltas[selected])
+    present = np.bincount(rows[selected], minlength=len(player_ids)) > 0
+    return {
+        "teams": teams,
+        "players": {
+            player_ids[row]: {name: int(value) for name, value in zip(TIMELINE_STATS, totals[row])}
+            for row in np.flatnonzero(present)
+        },
+    }
+
+def masked_lineup_stats(oncourt: OnCourtIndex, mask: np.ndarray) -> Dict[str, Dict]:
+    """
+    Lineup totals over the events selected by a mask
+
+    Uses the same crediting as the on/off splits: free throws count for the
+    lineup on the floor at the foul, possessions are field goal attempts plus
+    turnovers, and each event owns the time until the next one.
+
+    Args:
+        oncourt: On-court index of the game
+        mask: Boolean array over the store's events
+
+    Returns:
+        Dict mapping lineup key (team_id-sorted player IDs, as LineupTracker
+        writes them) to team_id plus LINEUP_FIELDS, for lineups on the floor
+        for at least one selected event
+    """
+    store = oncourt.store
+    count = min(len(mask), oncourt.events_indexed)
+    weights = mask[:count].astype(np.float64)
+    vectors = {name: vector[:count] for name, vector in event_vectors(store).items()}
+    credit = credit_columns(store)[:count]
+
+    lineups = {}
+    for side in (HOME, VISITOR):
+        team_id = store.team_id_of(side)
+        players, codes = oncourt.lineup_codes(team_id)
+        codes = codes[:count]
+
+        def total(values: np.ndarray, columns: np.ndarray = codes) -> np.ndarray:
+            known = columns >= 0
+            return np.bincount(columns[known], weights=(values * weights)[known], minlength=len(players))
+
+        columns = {
+            "points_for": total(vectors["points"][:, side], codes[credit]),
+            "points_against": total(vectors["points"][:, 1 - side], codes[credit]),
+            "possessions_for": total(vectors["possessions"][:, side]),
+            "possessions_against": total(vectors["possessions"][:, 1 - side]),
+            "seconds": total(vectors["seconds"]),
+        }
+        on_floor = np.bincount(codes[(codes >= 0) & mask[:count]], minlength=len(players)) > 0
+        for row in np.flatnonzero(on_floor):
+            lineups[f"{team_id}-{'_'.join(players[row])}"] = {
+                "team_id": team_id,
+                **{name: float(columns[name][row]) for name in LINEUP_FIELDS},
+            }
+    return lineups
+
+def shot_zone_column(store: PbpEventStore, start: int = 0) -> Tuple[np.ndarray, Dict[int, str]]:
+    """
+    Shot zone of every event from `start` on
+
+    Returns:
+        Tuple of (zone number per event, 0 for events that aren't field goal
+        attempts, and the zone names of the numbers seen)
+    """
+    zones = np.zeros(len(store) - start, dtype=np.int64)
+    names = {}
+    for offset in np.flatnonzero(np.isin(store.msg_type[start:], (MADE_SHOT, MISSED_SHOT))):
+        zone, name = event_shot_zone(store.events[start + offset])
+        zones[offset] = zone
+        names[zone] = name
+    return zones, names
+
+def masked_shot_stats(store: PbpEventStore, zones: np.ndarray, zone_names: Dict[int, str], mask: np.ndarray) -> Dict[str, Dict]:
+    """
+    Field goals by team and zone over the events selected by a mask
+
+    Args:
+        store: Event store
+        zones: Zone number per event, from shot_zone_column
+        zone_names: Names of the zone numbers
+        mask: Boolean array over the store's events
+
+    Returns:
+        Dict mapping team_id to zone name to {"made", "attempts"}, the same
+        counts parse_shot_zones reports
+    """
+    count = min(len(mask), len(zones))
+    attempts = mask[:count] & np.isin(store.msg_type[:count], (MADE_SHOT, MISSED_SHOT))
+    made = attempts & (store.msg_type[:count] == MADE_SHOT)
+    width = max(zone_names, default=0) + 1
+    shots = {}
+    for side in (HOME, VISITOR):
+        team = store.team_side[:count] == side
+        team_attempts = np.bincount(zones[:count][attempts & team], minlength=width)
+        team_made = np.bincount(zones[:count][made & team], minlength=width)
+        shots[store.team_id_of(side)] = {
+            zone_names[zone]: {"made": int(team_made[zone]), "attempts": int(team_attempts[zone])}
+            for zone in np.flatnonzero(team_attempts)
+        }
+    return shots
+
+# Masks keyed by (snapshot_dir_name, game_id) -> (store, events covered, masks)
+_masks: Dict[Tuple[str, str], Tuple[PbpEventStore, int, Dict[str, np.ndarray]]] = {}
+_masks_lock = threading.Lock()
+
+def get_situation_masks(snapshot: str, game_id: str) -> Optional[Tuple[PbpEventStore, Dict[str, np.ndarray]]]:
+    """
+    Get a game's event store and its situation masks, recomputed only when new events arrive
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_id: Game identifier
+
+    Returns:
+        Tuple of (store, masks), or None if the game has no event store
+    """
+    store = get_event_store(snapshot, game_id)
+    if store is None:
+        return None
+
+    key = (store.snapshot, game_id)
+    with _masks_lock:
+        cached = _masks.get(key)
+        if cached is None or cached[0] is not store or cached[1] != len(store):
+            cached = (store, len(store), situation_masks(store))
+            _masks[key] = cached
+        return store, cached[2]
+
+# Shot zone columns keyed by (snapshot_dir_name, game_id) -> (store, zones, zone names)
+_shot_zones: Dict[Tuple[str, str], Tuple[PbpEventStore, np.ndarray, Dict[int, str]]] = {}
+_shot_zones_lock = threading.Lock()
+
+def get_shot_zone_column(store: PbpEventStore) -> Tuple[np.ndarray, Dict[int, str]]:
+    """
+    Get the shot zone column for a store, classifying only shots added since the last call
+
+    Args:
+        store: Event store
+
+    Returns:
+        Tuple of (zone number per event, zone names), as from shot_zone_column
+    """
+    key = (store.snapshot, store.game_id)
+    with _shot_zones_lock:
+        cached = _shot_zones.get(key)
+        if cached is None or cached[0] is not store:
+            cached = (store, *shot_zone_column(store))
+        elif len(cached[1]) < len(store):
+            zones, names = shot_zone_column(store, len(cached[1]))
+            cached = (store, np.concatenate([cached[1], zones]), {**cached[2], **names})
+        _shot_zones[key] = cached
+        return cached[1], cached[2]
+
+def season_situational_stats(snapshot: str, situation: str, game_ids: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """
+    Team, player, lineup and shot zone totals in one situation, summed across games
+
+    Args:
+        snapshot: Snapshot name or directory name
+        situation: One of SITUATIONS
+        game_ids: Games to include (defaults to every game in the snapshot)
+
+    Returns:
+        Dict with "games", "teams", "players", "lineups" and "shots" totals
+    """
+    if situation not in SITUATIONS:
+        raise ValueError(f"Unknown situation: {situation}")
+
+    totals = {"games": [], "teams": {}, "players": {}, "lineups": {}, "shots": {}}
+    for game_id in game_ids if game_ids is not None else list_games(snapshot):
+        result = get_situation_masks(snapshot, game_id)
+        if result is None:
+            continue
+        store, masks = result
+        mask = masks[situation]
+        game_stats = masked_stats(store, mask)
+        totals["games"].append(game_id)
+        for group in ("teams", "players"):
+            for entity_id, stats in game_stats[group].items():
+                target = totals[group].setdefault(entity_id, dict.fromkeys(TIMELINE_STATS, 0))
+                for name, value in stats.items():
+                    target[name] += value
+
+        oncourt = get_oncourt_index(snapshot, game_id)
+        if oncourt is not None:
+            for lineup_key, row in masked_lineup_stats(oncourt, mask).items():
+                target = totals["lineups"].setdefault(lineup_key, {"team_id": row["team_id"], **dict.fromkeys(LINEUP_FIELDS, 0.0), "games": 0})
+                for name in LINEUP_FIELDS:
+                    target[name] += row[name]
+                target["games"] += 1
+
+        for team_id, zones in masked_shot_stats(store, *get_shot_zone_column(store), mask).items():
+            for zone_name, counts in zones.items():
+                target = totals["shots"].setdefault(team_id, {}).setdefault(zone_name, {"made": 0, "attempts": 0})
+                target["made"] += counts["made"]
+                target["attempts"] += counts["attempts"]
+    return totals
@@ -0,0 +1,169 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from event_store import (FOUL, FREE_THROW, HOME, MADE_SHOT, MISSED_SHOT, REBOUND, TURNOVER, VISITOR,
+                         PbpEventStore, get_event_store)
+from game_replay import TECHNICAL_FOUL_ACTIONS
+
+TIMELINE_STATS = ("points", "fg_made", "fg_attempted", "three_made", "three_attempted",
+                  "ft_made", "ft_attempted", "turnovers", "fouls", "rebounds")
+
+def event_stat_deltas(store: PbpEventStore, start: int = 0) -> np.ndarray:
+    """
+    What each event adds to the box score of the team/player on it
+
+    Args:
+        store: Event store
+        start: First event to include
+
+    Returns:
+        (events - start) x len(TIMELINE_STATS) integer array
+    """
+    events = store.events[start:]
+    msg_type = store.msg_type[start:]
+    is_shot = np.isin(msg_type, (MADE_SHOT, MISSED_SHOT))
+    is_three = is_shot & np.array([event.get("Option1") == "3" for event in events], dtype=bool)
+    is_free_throw = msg_type == FREE_THROW
+    technical = np.isin(store.action_type[start:], [int(action) for action in TECHNICAL_FOUL_ACTIONS])
+
+    columns = {
+        "points": store.home_points[start:] + store.visitor_points[start:],
+        "fg_made": msg_type == MADE_SHOT,
+        "fg_attempted": is_shot,
+        "three_made": is_three & (msg_type == MADE_SHOT),
+        "three_attempted": is_three,
+        "ft_made": is_free_throw & np.array([event.get("Option1") == "1" for event in events], dtype=bool),
+        "ft_attempted": is_free_throw,
+        "turnovers": msg_type == TURNOVER,
+        "fouls": (msg_type == FOUL) & ~technical,
+        "rebounds": msg_type == REBOUND,
+    }
+    return np.column_stack([columns[name] for name in TIMELINE_STATS]).astype(np.int64)
+
+class StatTimeline:
+    """
+    Prefix sums of team and player box-score stats along the event axis.
+
+    Row k of a prefix array holds the totals over the first k events, so the
+    stats for any stretch of events [lo, hi) are prefix[hi] - prefix[lo], and
+    a stretch of game time is two searchsorted lookups on the store's elapsed
+    column away from that.
+    """
+
+    def __init__(self, store: PbpEventStore):
+        self.store = store
+        self.team_ids = (store.home_team_id, store.visitor_team_id)
+        width = len(TIMELINE_STATS)
+
+        # side -> (events + 1) x stats
+        self.team_prefix = np.zeros((2, 1, width), dtype=np.int64)
+        # player row -> (events + 1) x stats
+        self.player_rows: Dict[str, int] = {}
+        self.player_prefix = np.zeros((0, 1, width), dtype=np.int64)
+        self.events_covered = 0
+
+        self.extend()
+
+    def extend(self) -> None:
+        """Append prefix rows for events added to the store since the last call"""
+        store = self.store
+        start = self.events_covered
+        if start >= len(store):
+            return
+
+        deltas = event_stat_deltas(store, start)
+        count = len(deltas)
+
+        team_deltas = np.zeros((2, count, deltas.shape[1]), dtype=np.int64)
+        sides = store.team_side[start:]
+        for side in (HOME, VISITOR):
+            team_deltas[side] = deltas * (sides == side)[:, None]
+        team_tail = self.team_prefix[:, -1:, :] + np.cumsum(team_deltas, axis=1)
+        self.team_prefix = np.concatenate([self.team_prefix, team_tail], axis=1)
+
+        rows = np.full(count, -1, dtype=np.int64)
+        for offset, event in enumerate(store.events[start:]):
+            player_id = event.get("Person_id")
+            if player_id and sides[offset] >= 0:
+                if player_id not in self.player_rows:
+                    self.player_rows[player_id] = len(self.player_rows)
+                rows[offset] = self.player_rows[player_id]
+
+        new_players = len(self.player_rows) - self.player_prefix.shape[0]
+        if new_players:
+            blank = np.zeros((new_players,) + self.player_prefix.shape[1:], dtype=np.int64)
+            self.player_prefix = np.concatenate([self.player_prefix, blank], axis=0)
+
+        player_deltas = np.zeros((len(self.player_rows), count, deltas.shape[1]), dtype=np.int64)
+        credited = np.flatnonzero(rows >= 0)
+        player_deltas[rows[credited], credited] = deltas[credited]
+        player_tail = self.player_prefix[:, -1:, :] + np.cumsum(player_deltas, axis=1)
+        self.player_prefix = np.concatenate([self.player_prefix, player_tail], axis=1)
+
+        self.events_covered = len(store)
+
+    def event_range(self, start_elapsed: float, end_elapsed: float) -> Tuple[int, int]:
+        """Events from start_elapsed up to and including end_elapsed, as [lo, hi)"""
+        elapsed = self.store.elapsed[:self.events_covered]
+        lo = int(np.searchsorted(elapsed, start_elapsed, side="left"))
+        hi = int(np.searchsorted(elapsed, end_elapsed, side="right"))
+        return lo, max(lo, hi)
+
+    def last_seconds(self, seconds: float) -> Tuple[int, int]:
+        """Events in the last `seconds` of game time played so far"""
+        now = float(self.store.elapsed[self.events_covered - 1]) if self.events_covered else 0.0
+        return self.event_range(now - seconds, now)
+
+    def period_range(self, period: int) -> Tuple[int, int]:
+        """Events in one period"""
+        return self.store.period_offsets.get(period, (0, 0))
+
+    def _as_dict(self, values: np.ndarray) -> Dict[str, int]:
+        return {name: int(value) for name, value in zip(TIMELINE_STATS, values)}
+
+    def team_stats(self, lo: int, hi: int) -> Dict[str, Dict[str, int]]:
+        """Both teams' stats over events [lo, hi)"""
+        window = self.team_prefix[:, hi] - self.team_prefix[:, lo]
+        return {team_id: self._as_dict(window[side]) for side, team_id in enumerate(self.team_ids)}
+
+    def player_stats(self, lo: int, hi: int, player_ids: Optional[List[str]] = None) -> Dict[str, Dict[str, int]]:
+        """Player stats over events [lo, hi), for every player or just the ones given"""
+        window = self.player_prefix[:, hi] - self.player_prefix[:, lo]
+        if player_ids is None:
+            player_ids = list(self.player_rows)
+        return {
+            player_id: self._as_dict(window[self.player_rows[player_id]])
+            for player_id in player_ids
+            if player_id in self.player_rows
+        }
+
+# Timelines keyed by (snapshot_dir_name, game_id)
+_timelines: Dict[Tuple[str, str], StatTimeline] = {}
+_timelines_lock = threading.Lock()
+
+def get_stat_timeline(snapshot: str, game_id: str) -> Optional[StatTimeline]:
+    """
+    Get the stat timeline for a game, extended with any newly arrived events
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_id: Game identifier
+
+    Returns:
+        StatTimeline, or None if the game has no event store
+    """
+    store = get_event_store(snapshot, game_id)
+    if store is None:
+        return None
+
+    key = (store.snapshot, game_id)
+    with _timelines_lock:
+        timeline = _timelines.get(key)
+        if timeline is None or timeline.store is not store:
+            timeline = StatTimeline(store)
+            _timelines[key] = timeline
+        else:
+            timeline.extend()
+        return timeline
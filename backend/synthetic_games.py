@@ -0,0 +1,138 @@
+import argparse
+import os
+import shutil
+from typing import List, Optional
+
+from lxml import etree
+
+from event_store import REGULATION_PERIODS
+from parse_xml import DATA_ROOT, SCHEDULE_FILE, parse_schedule
+
+# The bundled game every synthetic game is cloned from
+SOURCE_GAME_ID = "2052400190"
+
+def synthetic_game_ids(count: int, source_game_id: str = SOURCE_GAME_ID) -> List[str]:
+    """
+    IDs for synthetic games, taken from the schedule so season filters find them
+
+    Falls back to made-up IDs when the schedule has fewer games than asked for.
+    """
+    scheduled = [game_id for game_id in sorted(parse_schedule()) if game_id != source_game_id]
+    game_ids = scheduled[:count]
+    next_id = int(source_game_id) * 10
+    while len(game_ids) < count:
+        next_id += 1
+        game_ids.append(str(next_id))
+    return game_ids
+
+def write_synthetic_games(target_root: str, count: int, source_root: str = DATA_ROOT,
+                          source_game_id: str = SOURCE_GAME_ID, snapshots: Optional[List[str]] = None) -> List[str]:
+    """
+    Build a data root with `count` copies of a bundled game under new IDs
+
+    Every snapshot directory of the source root is recreated with the source
+    game and its copies, and the schedule is copied alongside, so the tree can
+    stand in for DATA_ROOT (through PBP_DATA_ROOT) when no season of real
+    feeds is available.
+
+    Args:
+        target_root: Directory to write into (created if missing)
+        count: Synthetic games per snapshot, besides the source game
+        source_root: Data root holding the source game
+        source_game_id: Game to clone
+        snapshots: Snapshot directory names to include (all of them when None)
+
+    Returns:
+        IDs of the synthetic games
+    """
+    game_ids = synthetic_game_ids(count, source_game_id)
+    if snapshots is None:
+        snapshots = sorted(d for d in os.listdir(source_root) if os.path.isdir(os.path.join(source_root, d)))
+
+    for snapshot_dir_name in snapshots:
+        source_dir = os.path.join(source_root, snapshot_dir_name)
+        target_dir = os.path.join(target_root, snapshot_dir_name)
+        os.makedirs(target_dir, exist_ok=True)
+        for filename in sorted(os.listdir(source_dir)):
+            if not filename.startswith(f"{source_game_id}_"):
+                continue
+            with open(os.path.join(source_dir, filename), encoding="utf-8") as f:
+                content = f.read()
+            shutil.copyfile(os.path.join(source_dir, filename), os.path.join(target_dir, filename))
+            suffix = filename[len(source_game_id):]
+            for game_id in game_ids:
+                with open(os.path.join(target_dir, f"{game_id}{suffix}"), "w", encoding="utf-8") as f:
+                    f.write(content.replace(source_game_id, game_id))
+
+    schedule_file = os.path.join(source_root, os.path.basename(SCHEDULE_FILE))
+    if os.path.isfile(schedule_file):
+        shutil.copyfile(schedule_file, os.path.join(target_root, os.path.basename(SCHEDULE_FILE)))
+    return game_ids
+
+def write_overtime_game(target_root: str, overtimes: int = 3, snapshot: str = "end_of_game",
+                        target_snapshot: Optional[str] = None, source_root: str = DATA_ROOT,
+                        source_game_id: str = SOURCE_GAME_ID) -> str:
+    """
+    Write a copy of the bundled game that goes to `overtimes` overtime periods
+
+    The bundled final already has one overtime (Q5). Each extra period
+    repeats it with the period number changed and Event_num/PbpOrder moved
+    past the previous period, and the boxscore is advanced to the last one.
+    Scores in the repeated periods aren't meaningful, only the event volume.
+
+    Args:
+        target_root: Data root to write into
+        overtimes: Overtime periods in the written game (at least 1)
+        snapshot: Snapshot directory of the source game
+        target_snapshot: Snapshot directory to write the game to (same as `snapshot` when None)
+        source_root: Data root holding the source game
+        source_game_id: Game to clone
+
+    Returns:
+        ID of the written game
+    """
+    source_dir = os.path.join(source_root, snapshot)
+    target_dir = os.path.join(target_root, target_snapshot or snapshot)
+    os.makedirs(target_dir, exist_ok=True)
+    game_id = synthetic_game_ids(1, source_game_id)[0]
+
+    for filename in sorted(os.listdir(source_dir)):
+        if filename.startswith(f"{source_game_id}_"):
+            with open(os.path.join(source_dir, filename), encoding="utf-8") as f:
+                content = f.read().replace(source_game_id, game_id)
+            with open(os.path.join(target_dir, game_id + filename[len(source_game_id):]), "w", encoding="utf-8") as f:
+                f.write(content)
+
+    last_period = REGULATION_PERIODS + 1
+    template = etree.parse(os.path.join(target_dir, f"{game_id}_pbp_Q{last_period}.xml"))
+    events = template.getroot().findall(".//Event_pbp")
+    event_num = max(int(event.get("Event_num", "0")) for event in events)
+    pbp_order = max(int(event.get("PbpOrder", "0")) for event in events)
+    for period in range(last_period + 1, REGULATION_PERIODS + overtimes + 1):
+        tree = etree.parse(os.path.join(target_dir, f"{game_id}_pbp_Q{last_period}.xml"))
+        for event in tree.getroot().iter("Event_pbp"):
+            event.set("Period", str(period))
+            event_num += 1
+            pbp_order += 1
+            event.set("Event_num", str(event_num))
+            event.set("PbpOrder", str(pbp_order))
+        tree.write(os.path.join(target_dir, f"{game_id}_pbp_Q{period}.xml"), encoding="utf-8")
+
+    boxscore_path = os.path.join(target_dir, f"{game_id}_boxscore.xml")
+    boxscore = etree.parse(boxscore_path)
+    for period_time in boxscore.getroot().iter("Period_time"):
+        period_time.set("Period", str(REGULATION_PERIODS + overtimes))
+    boxscore.write(boxscore_path, encoding="utf-8")
+    return game_id
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write a data root of synthetic games cloned from the bundled one")
+    parser.add_argument("target", help="Directory to write the data root into")
+    parser.add_argument("--games", type=int, default=100, help="Synthetic games per snapshot")
+    args = parser.parse_args()
+
+    game_ids = write_synthetic_games(args.target, args.games)
+    print(f"Wrote {len(game_ids)} synthetic games to {args.target}; serve them with PBP_DATA_ROOT={args.target}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from asgi import AsgiAdapter
+from flask import Flask, Response, jsonify, request
+
+
+def make_app(calls, active, peak):
+    app = Flask(__name__)
+    lock = threading.Lock()
+
+    @app.route('/boxscore')
+    def get_boxscore():
+        game_id = request.args.get('game_id')
+        with lock:
+            calls.append(game_id)
+            active[game_id] = active.get(game_id, 0) + 1
+            peak[game_id] = max(peak.get(game_id, 0), active[game_id])
+        time.sleep(0.05)
+        with lock:
+            active[game_id] -= 1
+        return jsonify({"game": game_id, "n": request.args.get('n')})
+
+    @app.route('/api/stream/ticks')
+    def get_ticks():
+        return Response((f"data: {i}\n\n" for i in range(3)), mimetype='text/event-stream')
+
+    return app
+
+
+async def call(adapter, path, query=b"", disconnect=False):
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": query, "headers": [],
+             "http_version": "1.1", "scheme": "http", "server": ("testserver", 80)}
+    sent = []
+    messages = [{"type": "http.request", "body": b""}]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        if disconnect:
+            return {"type": "http.disconnect"}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    await adapter(scope, receive, send)
+    return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:])
+
+
+@pytest.fixture
+def state():
+    return {"calls": [], "active": {}, "peak": {}}
+
+
+@pytest.fixture
+def adapter(state):
+    return AsgiAdapter(make_app(state["calls"], state["active"], state["peak"]), max_workers=8, per_game_limit=2)
+
+
+class TestAsgiAdapter:
+    def test_get(self, adapter):
+        status, body = asyncio.run(call(adapter, "/boxscore", b"snapshot=end_of_game&game_id=100&n=1"))
+
+        assert status == 200
+        assert b'"game":"100"' in body
+
+    def test_per_game_limit(self, adapter, state):
+        async def burst():
+            requests = [call(adapter, "/boxscore", f"game_id=100&n={i}".encode()) for i in range(6)]
+            requests += [call(adapter, "/boxscore", f"game_id=200&n={i}".encode()) for i in range(2)]
+            return await asyncio.gather(*requests)
+
+        results = asyncio.run(burst())
+
+        assert all(status == 200 for status, _ in results)
+        assert state["peak"]["100"] == 2
+        assert state["calls"].count("100") == 6
+        # Semaphores are dropped once no request holds or waits on them
+        assert adapter._game_limits == {} and adapter._game_users == {}
+
+    def test_identical_requests_coalesce(self, adapter, state):
+        async def burst():
+            return await asyncio.gather(*[call(adapter, "/boxscore", b"game_id=100&n=1") for _ in range(5)])
+
+        results = asyncio.run(burst())
+
+        assert len({body for _, body in results}) == 1
+        assert state["calls"] == ["100"]
+
+    def test_stream_relays_chunks(self, adapter):
+        status, body = asyncio.run(call(adapter, "/api/stream/ticks"))
+
+        assert status == 200
+        assert body == b"data: 0\n\ndata: 1\n\ndata: 2\n\n"
@@ -0,0 +1,74 @@
+import pytest
+from assist_network import AssistNetwork
+from event_store import PbpEventStore
+
+HOME_TEAM_ID = "1612709903"
+AWAY_TEAM_ID = "1612709924"
+
+
+def assisted(scorer, passer, team_id, points, x=0, y=0):
+    return {"Period": "1", "Game_clock": "10:00", "Msg_type": "1", "Option1": str(points), "Team_id": team_id,
+            "Person_id": scorer, "Pts": str(points), "Person_id2": passer, "Stat_Category2": "AST",
+            "LocationX": str(x), "LocationY": str(y)}
+
+
+EVENTS = [
+    {"Period": "1", "Game_clock": "12:00", "Msg_type": "12"},
+    assisted("1631131", "1641795", HOME_TEAM_ID, 2),
+    assisted("1631131", "1641795", HOME_TEAM_ID, 3, x=0, y=280),
+    assisted("1642268", "1641795", HOME_TEAM_ID, 2),
+    assisted("1642484", "1642353", AWAY_TEAM_ID, 2),
+    # Unassisted basket and a blocked miss carry a different Stat_Category2
+    {"Period": "1", "Game_clock": "9:00", "Msg_type": "1", "Team_id": HOME_TEAM_ID, "Person_id": "1631131", "Pts": "2"},
+    {"Period": "1", "Game_clock": "8:00", "Msg_type": "2", "Team_id": AWAY_TEAM_ID, "Person_id": "1642484", "Pts": "0",
+     "Person_id2": "1631131", "Stat_Category2": "BLK"},
+]
+
+
+class TestAssistNetwork:
+    @pytest.fixture
+    def store(self):
+        store = PbpEventStore("2052400190", "end_of_game", HOME_TEAM_ID, AWAY_TEAM_ID)
+        store.extend(EVENTS)
+        return store
+
+    @pytest.fixture
+    def network(self, store):
+        network = AssistNetwork()
+        network.extend(store)
+        return network
+
+    def test_matrices(self, network):
+        counts, points = network.matrices()
+        passer, scorer = network.player_rows["1641795"], network.player_rows["1631131"]
+
+        assert counts.sum() == 4
+        assert counts[passer, scorer] == 2
+        assert points[passer, scorer] == 5
+
+    def test_top_connections(self, network):
+        top = network.top_connections(limit=2)
+
+        assert [(c["passerId"], c["scorerId"], c["assists"]) for c in top] == [
+            ("1641795", "1631131", 2), ("1641795", "1642268", 1)
+        ]
+        assert sum(top[0]["zones"].values()) == 2
+        assert network.top_connections(team_id=AWAY_TEAM_ID)[0]["passerId"] == "1642353"
+
+    def test_player_totals(self, network):
+        totals = network.player_totals(HOME_TEAM_ID)
+
+        assert totals["1641795"]["assists"] == 3
+        assert totals["1641795"]["pointsCreated"] == 7
+        assert totals["1631131"]["assistedBaskets"] == 2
+
+    def test_extend_and_merge(self, store, network):
+        store.extend([assisted("1642268", "1641795", HOME_TEAM_ID, 2)])
+        network.extend(store)
+        assert network.player_totals()["1641795"]["assists"] == 4
+
+        season = AssistNetwork()
+        season.merge(network)
+        season.merge(network)
+        assert season.top_connections(limit=1)[0]["assists"] == 4
+        assert season.player_totals()["1641795"]["assists"] == 8
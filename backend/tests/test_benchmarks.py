@@ -0,0 +1,56 @@
+from benchmarks.run_benchmarks import compare_results, format_comparison, input_mismatches
+from event_store import read_pbp_events
+from parse_xml import parse_boxscore
+from synthetic_games import write_overtime_game
+
+
+def report(**medians):
+    return {"meta": {}, "results": {name.replace("__", "/"): {"medianMs": value} for name, value in medians.items()}}
+
+
+class TestCompareResults:
+    def test_flags_slowdowns_beyond_threshold(self):
+        baseline = report(bundled__parse_pbp=4.0, bundled__parse_boxscore=1.0, season__parse_pbp=400.0)
+        current = report(bundled__parse_pbp=5.5, bundled__parse_boxscore=1.2, season__parse_pbp=250.0)
+
+        statuses = {row["case"]: row["status"] for row in compare_results(baseline, current, threshold=0.25)}
+
+        assert statuses == {"bundled/parse_pbp": "regression", "bundled/parse_boxscore": "ok",
+                            "season/parse_pbp": "improvement"}
+
+    def test_ignores_noise_on_tiny_cases(self):
+        baseline = report(bundled__parse_boxscore=0.01)
+        current = report(bundled__parse_boxscore=0.03, bundled__parse_lineups=9.0)
+
+        rows = compare_results(baseline, current)
+
+        assert [(row["case"], row["status"]) for row in rows] == [("bundled/parse_boxscore", "ok")]
+
+    def test_different_inputs_compared_per_game_or_skipped(self):
+        baseline = report(season__parse_pbp=400.0, multi_ot__parse_pbp=5.0, bundled__parse_pbp=4.0)
+        baseline["meta"] = {"seasonGames": 101, "overtimes": 3}
+        baseline["results"]["season/parse_pbp"]["perGameMs"] = 3.96
+        current = report(season__parse_pbp=16.0, multi_ot__parse_pbp=9.0, bundled__parse_pbp=4.1)
+        current["meta"] = {"seasonGames": 4, "overtimes": 2}
+        current["results"]["season/parse_pbp"]["perGameMs"] = 4.0
+
+        rows = {row["case"]: row for row in compare_results(baseline, current)}
+
+        assert (rows["season/parse_pbp"]["basis"], rows["season/parse_pbp"]["status"]) == ("perGameMs", "ok")
+        assert rows["multi_ot/parse_pbp"]["status"] == "skipped"
+        assert (rows["bundled/parse_pbp"]["basis"], rows["bundled/parse_pbp"]["status"]) == ("medianMs", "ok")
+        assert "skipped" in format_comparison(list(rows.values()))
+        assert input_mismatches(baseline, current) == ["seasonGames: baseline 101, current 4",
+                                                       "overtimes: baseline 3, current 2"]
+
+
+class TestOvertimeGame:
+    def test_adds_overtime_periods(self, tmp_path, monkeypatch):
+        game_id = write_overtime_game(str(tmp_path), overtimes=3, target_snapshot="multi_overtime")
+        monkeypatch.setattr("parse_xml.DATA_ROOT", str(tmp_path))
+
+        assert parse_boxscore("multi_overtime", game_id)["current_period"] == 7
+        events = read_pbp_events(str(tmp_path / "multi_overtime"), game_id)
+        assert sorted({int(event["Period"]) for event in events}) == [1, 2, 3, 4, 5, 6, 7]
+        event_nums = [int(event["Event_num"]) for event in events]
+        assert len(set(event_nums)) == len(event_nums)
@@ -0,0 +1,104 @@
+import os
+import shutil
+
+import cache_warmer
+import event_store
+import http_cache
+import parse_xml
+import pytest
+from cache_warmer import CacheWarmer
+
+
+@pytest.fixture
+def data_root(tmp_path, monkeypatch):
+    for snapshot, game_ids in (("end_of_game", ["100", "200"]), ("middle_of_third", ["100"])):
+        snapshot_dir = tmp_path / snapshot
+        snapshot_dir.mkdir()
+        for game_id in game_ids:
+            (snapshot_dir / f"{game_id}_game_info.xml").write_text("<a/>")
+            (snapshot_dir / f"{game_id}_pbp_Q1.xml").write_text("<a/>")
+    monkeypatch.setattr(cache_warmer, "DATA_ROOT", str(tmp_path))
+    monkeypatch.setattr(http_cache, "DATA_ROOT", str(tmp_path))
+    monkeypatch.setattr(http_cache, "SCHEDULE_FILE", str(tmp_path / "schedule.xml"))
+    monkeypatch.setattr("parse_xml.DATA_ROOT", str(tmp_path))
+    monkeypatch.setattr(CacheWarmer, "warm_shared", lambda self: None)
+    return tmp_path
+
+
+class TestCacheWarmer:
+    def test_warms_every_game(self, data_root):
+        warmed = []
+        warmer = CacheWarmer([lambda snapshot, game_id: warmed.append((snapshot, game_id))])
+
+        warmer.refresh()
+
+        assert warmed == [("end_of_game", "100"), ("end_of_game", "200"), ("middle_of_third", "100")]
+        assert warmer.status()["warmed"] and warmer.status()["games"] == 3
+
+    def test_rewarms_changed_games(self, data_root, monkeypatch):
+        notified = []
+        monkeypatch.setattr(cache_warmer, "notify_game_changed", lambda *key: notified.append(key))
+        warmed = []
+        warmer = CacheWarmer([lambda snapshot, game_id: warmed.append((snapshot, game_id))])
+        warmer.refresh()
+        warmed.clear()
+
+        assert warmer.refresh() == []
+
+        pbp = data_root / "end_of_game" / "200_pbp_Q1.xml"
+        pbp.write_text("<a><b/></a>")
+        os.utime(pbp, ns=(0, 1))
+        (data_root / "end_of_game" / "300_game_info.xml").write_text("<a/>")
+
+        assert warmer.refresh() == [("end_of_game", "200"), ("end_of_game", "300")]
+        # Only games a stream may already be watching are notified
+        assert notified == [("end_of_game", "200")]
+
+    def test_invalidates_store_only_for_game_info(self, data_root, monkeypatch):
+        invalidated = []
+        monkeypatch.setattr(cache_warmer, "notify_game_changed", lambda *key: None)
+        monkeypatch.setattr(cache_warmer, "invalidate_event_store", lambda *key: invalidated.append(key))
+        warmer = CacheWarmer([lambda snapshot, game_id: None])
+        warmer.refresh()
+
+        (data_root / "end_of_game" / "100_pbp_Q2.xml").write_text("<a/>")
+        (data_root / "end_of_game" / "100_boxscore.xml").write_text("<a/>")
+        (data_root / "end_of_game" / "200_game_info.xml").write_text("<a><b/></a>")
+
+        assert warmer.refresh() == [("end_of_game", "100"), ("end_of_game", "200")]
+        assert invalidated == [("end_of_game", "200")]
+
+    def test_boxscore_update_keeps_event_store(self, tmp_path, monkeypatch):
+        source = os.path.join(event_store.DATA_ROOT, "end_of_game")
+        (tmp_path / "end_of_game").mkdir()
+        for filename in os.listdir(source):
+            shutil.copy(os.path.join(source, filename), tmp_path / "end_of_game" / filename)
+        for module in (cache_warmer, http_cache, event_store, parse_xml):
+            monkeypatch.setattr(module, "DATA_ROOT", str(tmp_path))
+        monkeypatch.setattr(http_cache, "SCHEDULE_FILE", str(tmp_path / "schedule.xml"))
+        monkeypatch.setattr(event_store, "_stores", {})
+        monkeypatch.setattr(cache_warmer, "notify_game_changed", lambda *key: None)
+        monkeypatch.setattr(CacheWarmer, "warm_shared", lambda self: None)
+        warmer = CacheWarmer([event_store.get_event_store])
+        warmer.refresh()
+        store = event_store.get_event_store("end_of_game", "2052400190")
+
+        with open(tmp_path / "end_of_game" / "2052400190_boxscore.xml", "a") as f:
+            f.write(" ")
+        assert warmer.refresh() == [("end_of_game", "2052400190")]
+        assert event_store.get_event_store("end_of_game", "2052400190") is store
+
+        with open(tmp_path / "end_of_game" / "2052400190_game_info.xml", "a") as f:
+            f.write(" ")
+        warmer.refresh()
+        assert event_store.get_event_store("end_of_game", "2052400190") is not store
+
+    def test_failing_game_reported(self, data_root):
+        def warmer_fn(snapshot, game_id):
+            if game_id == "200":
+                raise ValueError("bad feed")
+
+        warmer = CacheWarmer([warmer_fn])
+        warmer.refresh()
+
+        assert warmer.status()["errors"] == {"end_of_game/200": "bad feed"}
@@ -0,0 +1,31 @@
+import threading
+
+import event_store
+from event_store import get_event_store
+
+
+class TestGetEventStore:
+    def test_games_build_concurrently(self, monkeypatch):
+        # Both parses have to be in flight at once for the barrier to open
+        barrier = threading.Barrier(2, timeout=5)
+        monkeypatch.setattr(event_store, "_stores", {})
+        monkeypatch.setattr(event_store, "parse_game_info", lambda snapshot, game_id: {"home_id": "1", "visitor_id": "2"})
+        stores = {}
+
+        def read_pbp_events(snapshot_dir, game_id):
+            barrier.wait()
+            return []
+
+        monkeypatch.setattr(event_store, "read_pbp_events", read_pbp_events)
+
+        def build(game_id):
+            stores[game_id] = get_event_store("end_of_game", game_id)
+
+        threads = [threading.Thread(target=build, args=(game_id,)) for game_id in ("100", "200")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not barrier.broken
+        assert sorted(store.game_id for store in stores.values()) == ["100", "200"]
@@ -0,0 +1,115 @@
+import pytest
+from event_store import PbpEventStore
+from oncourt_index import OnCourtIndex
+from game_replay import GameReplay
+
+HOME_TEAM_ID = "1612709903"
+AWAY_TEAM_ID = "1612709924"
+
+HOME_LINEUP = {"1631131", "1641795", "1642262", "1642268", "1642271"}
+AWAY_LINEUP = {"1630539", "1641787", "1641989", "1642353", "1642484"}
+
+PERIOD_LINEUPS = {
+    1: {HOME_TEAM_ID: HOME_LINEUP, AWAY_TEAM_ID: AWAY_LINEUP},
+    2: {HOME_TEAM_ID: HOME_LINEUP, AWAY_TEAM_ID: AWAY_LINEUP},
+}
+
+EVENTS = [
+    {"Period": "1", "Game_clock": "12:00", "Msg_type": "12"},
+    {"Period": "1", "Game_clock": "11:33", "Msg_type": "1", "Option1": "3", "Team_id": HOME_TEAM_ID, "Person_id": "1631131", "Pts": "3",
+     "Person_id2": "1641795", "Stat_Category2": "AST"},
+    {"Period": "1", "Game_clock": "11:10", "Msg_type": "2", "Option1": "2", "Team_id": AWAY_TEAM_ID, "Person_id": "1642484", "Pts": "0",
+     "Person_id2": "1642268", "Stat_Category2": "BLK"},
+    {"Period": "1", "Game_clock": "11:08", "Msg_type": "4", "Team_id": HOME_TEAM_ID, "Person_id": "1642268", "Offensive_Team_id": AWAY_TEAM_ID},
+    {"Period": "1", "Game_clock": "10:50", "Msg_type": "6", "Action_type": "2", "Team_id": AWAY_TEAM_ID, "Person_id": "1642353"},
+    {"Period": "1", "Game_clock": "10:50", "Msg_type": "3", "Option1": "1", "Team_id": HOME_TEAM_ID, "Person_id": "1642262", "Pts": "1"},
+    {"Period": "1", "Game_clock": "10:50", "Msg_type": "3", "Option1": "2", "Team_id": HOME_TEAM_ID, "Person_id": "1642262", "Pts": "0"},
+    # Williams out, Jones Garcia in
+    {"Period": "1", "Game_clock": "7:48", "Msg_type": "8", "Team_id": HOME_TEAM_ID, "Person_id": "1642262", "Person_id2": "1642357"},
+    {"Period": "1", "Game_clock": "7:30", "Msg_type": "5", "Team_id": AWAY_TEAM_ID, "Person_id": "1642484",
+     "Person_id2": "1642357", "Stat_Category2": "ST"},
+    {"Period": "1", "Game_clock": "7:28", "Msg_type": "1", "Option1": "2", "Team_id": AWAY_TEAM_ID, "Person_id": "1642353", "Pts": "2"},
+    {"Period": "1", "Game_clock": "7:00", "Msg_type": "6", "Action_type": "26", "Team_id": AWAY_TEAM_ID, "Person_id": "1642353"},
+    {"Period": "1", "Game_clock": "0:00.0", "Msg_type": "13"},
+    {"Period": "2", "Game_clock": "12:00", "Msg_type": "12"},
+    {"Period": "2", "Game_clock": "11:40", "Msg_type": "1", "Option1": "2", "Team_id": AWAY_TEAM_ID, "Person_id": "1642353", "Pts": "2"},
+]
+
+
+class TestGameReplay:
+    @pytest.fixture
+    def store(self):
+        store = PbpEventStore("2052400190", "middle_of_third", HOME_TEAM_ID, AWAY_TEAM_ID)
+        store.extend(EVENTS)
+        return store
+
+    @pytest.fixture
+    def replay(self, store):
+        return GameReplay(store, OnCourtIndex(store, PERIOD_LINEUPS), checkpoint_interval=4)
+
+    def test_checkpoints_stored(self, replay):
+        assert [state.event_count for state in replay.checkpoints] == [0, 4, 8, 12]
+
+    def test_state_matches_full_replay(self, replay, store):
+        # Replaying from checkpoints must agree with replaying from tip-off
+        full = GameReplay(store, replay.oncourt, checkpoint_interval=len(store) + 1)
+        for count in range(len(store) + 1):
+            assert replay.state_at(count) == full.state_at(count)
+
+    def test_score_and_box_totals(self, replay):
+        state = replay.state_at(7)
+
+        assert state.scores == {HOME_TEAM_ID: 4, AWAY_TEAM_ID: 0}
+        shooter = state.player_box["1631131"]
+        assert (shooter["points"], shooter["three_made"], shooter["three_attempted"]) == (3, 1, 1)
+        assert state.player_box["1641795"]["assists"] == 1
+        assert state.player_box["1642268"]["blocks"] == 1
+        assert state.player_box["1642262"]["ft_made"] == 1
+        assert state.player_box["1642262"]["ft_attempted"] == 2
+        assert state.team_box[HOME_TEAM_ID]["blocks"] == 1
+        assert state.team_box[HOME_TEAM_ID]["rebounds"] == 1
+        assert state.team_box[HOME_TEAM_ID]["offensive_rebounds"] == 0
+
+    def test_steal_credited_to_defense(self, replay):
+        state = replay.state_at(9)
+
+        assert state.player_box["1642357"]["steals"] == 1
+        assert state.team_box[HOME_TEAM_ID]["steals"] == 1
+        assert state.team_box[AWAY_TEAM_ID]["turnovers"] == 1
+
+    def test_team_fouls_reset_each_period(self, replay):
+        # The offensive charge is a personal foul but not a team foul
+        state = replay.state_at(11)
+        assert state.period_fouls[AWAY_TEAM_ID] == 1
+        assert state.player_box["1642353"]["fouls"] == 2
+
+        state = replay.state_at(13)
+        assert state.period_fouls[AWAY_TEAM_ID] == 0
+
+    def test_current_run(self, replay):
+        state = replay.state_at(len(EVENTS))
+        assert (state.run_team, state.run_points) == (AWAY_TEAM_ID, 4)
+
+    def test_state_at_time(self, replay):
+        state = replay.state_at_time(1, "7:48")
+        assert state.event_count == 8
+        assert state.game_clock == "7:48"
+
+    def test_describe_lineups_and_stints(self, replay):
+        described = replay.describe(replay.state_at(9))
+        home = described["teams"][HOME_TEAM_ID]
+
+        assert "1642357" in home["lineup"] and "1642262" not in home["lineup"]
+        assert described["stints"]["1642357"]["seconds"] == 18  # 7:48 -> 7:30
+        assert described["totalEvents"] == len(EVENTS)
+
+    def test_extend_with_new_events(self, store, replay):
+        store.extend([
+            {"Period": "2", "Game_clock": "11:20", "Msg_type": "1", "Option1": "2", "Team_id": HOME_TEAM_ID, "Person_id": "1631131", "Pts": "2"},
+        ])
+        replay.oncourt.extend()
+        replay.extend()
+
+        state = replay.state_at(len(store))
+        assert state.scores == {HOME_TEAM_ID: 6, AWAY_TEAM_ID: 4}
+        assert (state.run_team, state.run_points) == (HOME_TEAM_ID, 2)
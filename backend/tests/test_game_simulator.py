@@ -0,0 +1,125 @@
+from collections import OrderedDict
+
+import app
+import game_simulator
+import numpy as np
+import pytest
+from event_store import HOME, VISITOR, PbpEventStore
+from game_simulator import (PRIOR_OUTCOMES, SimulationParams, SimulationState, TeamRates, possession_after,
+                            parse_simulations, run_simulations, simulate_batch, simulate_game, team_rates)
+from process_pool import get_process_pool
+
+HOME_TEAM_ID = "1612709903"
+AWAY_TEAM_ID = "1612709924"
+
+NO_STATS = dict.fromkeys(("points", "fg_made", "fg_attempted", "three_made", "three_attempted",
+                          "ft_made", "ft_attempted", "turnovers", "fouls", "rebounds"), 0)
+
+
+def store_with(*events):
+    store = PbpEventStore("2052400190", "end_of_game", HOME_TEAM_ID, AWAY_TEAM_ID)
+    store.extend([{"Period": "1", "Game_clock": "12:00", "Msg_type": "12"}, *events])
+    return store
+
+
+class TestPossessionAfter:
+    def test_made_shot_and_turnover(self):
+        made = {"Period": "1", "Game_clock": "11:40", "Msg_type": "1", "Team_id": HOME_TEAM_ID, "Person_id": "1", "Pts": "2"}
+        turnover = {"Period": "1", "Game_clock": "11:20", "Msg_type": "5", "Team_id": HOME_TEAM_ID, "Person_id": "1"}
+
+        assert possession_after(store_with(made)) == VISITOR
+        assert possession_after(store_with(made, turnover)) == VISITOR
+
+    def test_rebound_and_loose_ball(self):
+        miss = {"Period": "1", "Game_clock": "11:40", "Msg_type": "2", "Team_id": HOME_TEAM_ID, "Person_id": "1", "Pts": "0"}
+        rebound = {"Period": "1", "Game_clock": "11:38", "Msg_type": "4", "Team_id": AWAY_TEAM_ID, "Person_id": "2"}
+
+        assert possession_after(store_with(miss)) == -1
+        assert possession_after(store_with(miss, rebound)) == VISITOR
+        assert possession_after(store_with()) == -1
+
+
+class TestTeamRates:
+    def test_no_games_played_is_prior(self):
+        rates = team_rates(NO_STATS, None, 0, 0, 0, 0)
+
+        assert rates.outcomes == pytest.approx(tuple(PRIOR_OUTCOMES))
+
+    def test_hot_shooting_moves_rates(self):
+        hot = {**NO_STATS, "fg_made": 30, "fg_attempted": 40, "three_made": 10}
+        rates = team_rates(hot, None, 0, 0, 0, 0)
+
+        assert rates.outcomes[3] > PRIOR_OUTCOMES[3]
+        assert sum(rates.outcomes) == pytest.approx(1.0)
+
+
+class TestSimulation:
+    @pytest.fixture
+    def params(self):
+        return SimulationParams(TeamRates(), TeamRates())
+
+    def test_big_late_lead(self, params):
+        state = SimulationState(home_score=100, visitor_score=80, period=4, clock=20.0, possession=VISITOR)
+        result = run_simulations(state, params, simulations=2000, seed=1, use_pool=False)
+
+        assert result["homeWinProbability"] == 1.0
+        assert result["simulations"] == 2000
+        assert sum(row["probability"] for row in result["marginDistribution"]) == pytest.approx(1.0)
+
+    def test_reproducible(self, params):
+        state = SimulationState(home_score=50, visitor_score=52, period=3, clock=300.0, possession=HOME)
+        first = run_simulations(state, params, simulations=3000, seed=7, use_pool=False)
+        second = run_simulations(state, params, simulations=3000, seed=7, use_pool=False)
+
+        assert first["homeWinProbability"] == second["homeWinProbability"]
+        assert 0.2 < first["homeWinProbability"] < 0.8
+
+    def test_pool_reproducible(self, params):
+        state = SimulationState(home_score=50, visitor_score=52, period=3, clock=300.0, possession=HOME)
+        first = run_simulations(state, params, simulations=5000, seed=7, max_workers=2)
+        second = run_simulations(state, params, simulations=5000, seed=7, max_workers=2)
+
+        assert first["simulations"] == 5000
+        assert first["homeWinProbability"] == second["homeWinProbability"]
+        assert get_process_pool()._mp_context.get_start_method() != "fork"
+
+    def test_finished_untimed_overtime_keeps_score(self, params):
+        state = SimulationState(home_score=113, visitor_score=115, period=5, clock=5711.0,
+                                home_target=114, visitor_target=114)
+        scores = simulate_batch(state, params, 100, 3)
+
+        assert (scores["home"] == 113).all() and (scores["visitor"] == 115).all()
+
+    def test_tie_goes_to_untimed_overtime(self, params):
+        state = SimulationState(home_score=100, visitor_score=100, period=4, clock=0.5, possession=HOME)
+        scores = simulate_batch(state, params, 500, 5)
+        winner = np.maximum(scores["home"], scores["visitor"])
+        loser = np.minimum(scores["home"], scores["visitor"])
+
+        assert (winner > loser).all()
+        # Either the last possession of regulation scored, or the winner got to 107 in overtime
+        assert ((loser == 100) | (winner >= 107)).all()
+        assert (winner >= 107).any()
+
+
+class TestSimulateGame:
+    def test_parse_simulations(self):
+        assert parse_simulations("500") == 500
+        for value in ("0", "-5", "abc", "200001"):
+            with pytest.raises(ValueError, match="simulations"):
+                parse_simulations(value)
+
+    def test_bad_parameters_are_400(self):
+        client = app.app.test_client()
+        url = "/api/win-probability?snapshot=end_of_game&game_id=2052400190"
+
+        assert client.get(f"{url}&simulations=0").status_code == 400
+        assert client.get(f"{url}&simulations=100&seed=abc").status_code == 400
+
+    def test_result_cache_bound(self, monkeypatch):
+        monkeypatch.setattr(game_simulator, "MAX_RESULTS", 2)
+        monkeypatch.setattr(game_simulator, "_results", OrderedDict())
+        for simulations in (100, 200, 300):
+            simulate_game("end_of_game", "2052400190", simulations)
+
+        assert [key[2] for key in game_simulator._results] == [200, 300]
@@ -0,0 +1,47 @@
+import pytest
+from lxml import etree
+import app
+from game_state import GAME_STATE_FIELDS, build_game_state, parse_fields
+from parse_xml import parse_file, shared_parse
+
+
+@pytest.fixture
+def xml_file(tmp_path):
+    path = tmp_path / "100_boxscore.xml"
+    path.write_text("<Game><Period_time Period='2'/></Game>")
+    return str(path)
+
+
+class TestParseFields:
+    def test_default_and_order(self):
+        assert parse_fields(None) == GAME_STATE_FIELDS
+        assert parse_fields("shots, boxscore") == ("boxscore", "shots")
+
+    def test_unknown_field(self):
+        with pytest.raises(ValueError, match="bogus"):
+            parse_fields("boxscore,bogus")
+
+
+class TestSharedParse:
+    def test_tree_reused_inside_block(self, xml_file, monkeypatch):
+        calls = []
+        parse = etree.parse
+        monkeypatch.setattr(etree, "parse", lambda path: calls.append(path) or parse(path))
+
+        with shared_parse():
+            first = parse_file(xml_file)
+            with shared_parse():
+                assert parse_file(xml_file) is first
+        assert len(calls) == 1
+
+        parse_file(xml_file)
+        assert len(calls) == 2
+
+
+class TestBuildGameState:
+    def test_shots_section_matches_endpoint(self):
+        state = build_game_state("End Of Game", "2052400190", ["shots"])
+        response = app.app.test_client().get("/api/shots?snapshot=End Of Game&game_id=2052400190")
+
+        assert state["shots"] == response.get_json()
+        assert state["shots"]["shots"]
@@ -0,0 +1,81 @@
+import json
+
+import game_stream
+import pytest
+from game_stream import GameStream, format_event, merge_patch
+
+
+class TestMergePatch:
+    def test_nested_changes_and_removals(self):
+        old = {"boxscore": {"clock": "5:00", "teams": [1, 2]}, "pbp": {"run": 4}, "shots": []}
+        new = {"boxscore": {"clock": "4:40", "teams": [1, 2]}, "pbp": {"run": 4}}
+
+        assert merge_patch(old, new) == {"boxscore": {"clock": "4:40"}, "shots": None}
+        assert merge_patch(new, new) is None
+
+    def test_lists_replaced_whole(self):
+        assert merge_patch({"shots": [1]}, {"shots": [1, 2]}) == {"shots": [1, 2]}
+
+
+def drain(subscriber):
+    messages = []
+    while not subscriber.messages.empty():
+        messages.append(subscriber.messages.get_nowait())
+    return messages
+
+
+class TestGameStream:
+    @pytest.fixture
+    def feed(self, monkeypatch):
+        feed = {"signature": ("v1",), "state": {"boxscore": {"clock": "5:00"}, "pbp": {"run": 4}}, "builds": 0}
+
+        def build(snapshot, game_id):
+            feed["builds"] += 1
+            return json.loads(json.dumps(feed["state"]))
+
+        monkeypatch.setattr(game_stream, "source_signature", lambda snapshot, game_id: feed["signature"])
+        monkeypatch.setattr(game_stream, "build_game_state", build)
+        # Keep the watcher thread out of the way; the tests drive refresh() themselves
+        monkeypatch.setattr(GameStream, "_watch", lambda self: None)
+        return feed
+
+    def test_one_build_fans_out(self, feed):
+        stream = GameStream("end_of_game", "100")
+        subscribers = [stream.subscribe(), stream.subscribe(), stream.subscribe(["pbp"])]
+
+        feed["signature"] = ("v2",)
+        feed["state"]["boxscore"]["clock"] = "4:40"
+        assert stream.refresh()
+
+        assert feed["builds"] == 2
+        first = drain(subscribers[0])
+        assert first[0] == ("state", {"boxscore": {"clock": "5:00"}, "pbp": {"run": 4}}, 1)
+        assert first[1] == ("delta", {"boxscore": {"clock": "4:40"}}, 2)
+        # The pbp-only client has nothing to apply
+        assert drain(subscribers[2]) == [("state", {"pbp": {"run": 4}}, 1)]
+
+    def test_unchanged_files_skip_rebuild(self, feed):
+        stream = GameStream("end_of_game", "100")
+        stream.subscribe()
+
+        assert not stream.refresh()
+        assert feed["builds"] == 1
+
+    def test_slow_client_resyncs(self, feed, monkeypatch):
+        monkeypatch.setattr(game_stream, "CLIENT_QUEUE_SIZE", 2)
+        stream = GameStream("end_of_game", "100")
+        subscriber = stream.subscribe()
+        for clock in ("4:00", "3:00", "2:00"):
+            feed["signature"] = (clock,)
+            feed["state"]["boxscore"]["clock"] = clock
+            stream.refresh()
+
+        assert [event for event, _, _ in drain(subscriber)] == ["resync"]
+        stream.subscribers.remove(subscriber)
+        subscriber.messages.put_nowait(("resync", {}, 4))
+        message = next(stream.messages(subscriber))
+        assert message.startswith("event: state\nid: 4\n")
+        assert '"clock":"2:00"' in message
+
+    def test_format_event(self):
+        assert format_event("delta", {"a": 1}, 3) == 'event: delta\nid: 3\ndata: {"a":1}\n\n'
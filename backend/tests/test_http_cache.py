@@ -0,0 +1,82 @@
+import os
+
+import http_cache
+import pytest
+from flask import Flask, jsonify, request
+
+
+@pytest.fixture
+def data_root(tmp_path, monkeypatch):
+    snapshot_dir = tmp_path / "end_of_game"
+    snapshot_dir.mkdir()
+    (snapshot_dir / "100_boxscore.xml").write_text("<a/>")
+    (snapshot_dir / "200_boxscore.xml").write_text("<b/>")
+    monkeypatch.setattr(http_cache, "DATA_ROOT", str(tmp_path))
+    monkeypatch.setattr(http_cache, "SCHEDULE_FILE", str(tmp_path / "schedule.xml"))
+    return snapshot_dir
+
+
+@pytest.fixture
+def client(data_root):
+    app = Flask(__name__)
+    http_cache.init_http_cache(app)
+    app.config["CACHE_CONTROL"]["get_live"] = "no-store"
+    calls = []
+
+    @app.route('/boxscore')
+    def get_boxscore():
+        calls.append(request.args.get('game_id'))
+        return jsonify({"game": request.args.get('game_id')})
+
+    @app.route('/live')
+    def get_live():
+        return jsonify({})
+
+    @app.route('/missing')
+    def get_missing():
+        return jsonify({"error": "No game info found"}), 404
+
+    client = app.test_client()
+    client.calls = calls
+    return client
+
+
+def touch(path, offset):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + offset))
+
+
+class TestConditionalRequests:
+    URL = '/boxscore?snapshot=End Of Game&game_id=100'
+
+    def test_matching_etag_skips_view(self, client):
+        first = client.get(self.URL)
+        second = client.get(self.URL, headers={"If-None-Match": first.headers["ETag"]})
+
+        assert first.status_code == 200 and first.headers["Cache-Control"] == "no-cache"
+        assert second.status_code == 304 and second.data == b""
+        assert second.headers["ETag"] == first.headers["ETag"]
+        assert client.calls == ["100"]
+
+    def test_etag_follows_game_files_and_arguments(self, client, data_root):
+        etag = client.get(self.URL).headers["ETag"]
+
+        touch(data_root / "200_boxscore.xml", 10_000)
+        assert client.get(self.URL, headers={"If-None-Match": etag}).status_code == 304
+
+        assert client.get(self.URL + "&period=2", headers={"If-None-Match": etag}).status_code == 200
+        touch(data_root / "100_boxscore.xml", 10_000)
+        assert client.get(self.URL, headers={"If-None-Match": etag}).status_code == 200
+
+    def test_new_file_changes_etag(self, client, data_root):
+        etag = client.get(self.URL).headers["ETag"]
+        (data_root / "100_pbp_Q2.xml").write_text("<c/>")
+
+        assert client.get(self.URL, headers={"If-None-Match": etag}).status_code == 200
+
+    def test_policy_and_errors(self, client):
+        live = client.get('/live')
+        missing = client.get('/missing')
+
+        assert "ETag" not in live.headers
+        assert "ETag" not in missing.headers
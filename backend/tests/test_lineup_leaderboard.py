@@ -0,0 +1,176 @@
+import os
+import shutil
+
+import pytest
+from parse_lineup_stints import LineupLeaderboard, LineupStats, LineupTracker, create_lineup_tracker
+from parse_xml import DATA_ROOT as ORIGINAL_DATA_ROOT
+
+HOME_TEAM_ID = "1612709903"
+AWAY_TEAM_ID = "1612709924"
+
+HOME_LINEUP = {"1631131", "1641795", "1642262", "1642268", "1642271"}
+AWAY_LINEUP = {"1630539", "1641787", "1641989", "1642353", "1642484"}
+
+SAMPLE_SHOT_MADE = {
+    "Period": "1",
+    "Game_clock": "11:33",
+    "Msg_type": "1",  # Made shot
+    "Team_id": HOME_TEAM_ID,
+    "Person_id": "1631131",
+    "Pts": "2"
+}
+
+SAMPLE_SHOT_MISSED = {
+    "Period": "1",
+    "Game_clock": "11:06",
+    "Msg_type": "2",  # Missed shot
+    "Team_id": AWAY_TEAM_ID,
+    "Person_id": "1642353",
+    "Pts": "0"
+}
+
+SAMPLE_SUBSTITUTION = {
+    "Period": "1",
+    "Game_clock": "7:48",
+    "Msg_type": "8",  # Substitution
+    "Team_id": HOME_TEAM_ID,
+    "Person_id": "1642262",  # Player going out
+    "Person_id2": "1642357"  # Player coming in
+}
+
+
+class TestLineupLeaderboard:
+    @pytest.fixture
+    def leaderboard(self):
+        return LineupLeaderboard(min_possessions=5)
+
+    def test_top_orders_best_first(self, leaderboard):
+        """Higher net rating ranks first, lower PAPP ranks first"""
+        leaderboard.update("a", LineupStats(players=set(), points_for=10, possessions_for=5, points_against=5, possessions_against=5))
+        leaderboard.update("b", LineupStats(players=set(), points_for=6, possessions_for=5, points_against=2, possessions_against=5))
+
+        assert [key for key, _ in leaderboard.top("net_rating")] == ["a", "b"]
+        assert [key for key, _ in leaderboard.top("papp")] == ["b", "a"]
+
+    def test_update_moves_lineup(self, leaderboard):
+        """Re-ranking replaces the old entry instead of duplicating it"""
+        stats = LineupStats(players=set(), points_for=0, possessions_for=5)
+        leaderboard.update("a", stats)
+        leaderboard.update("b", LineupStats(players=set(), points_for=5, possessions_for=5))
+
+        stats.points_for = 15
+        leaderboard.update("a", stats)
+
+        assert leaderboard.top("ppp") == [("a", 3.0), ("b", 1.0)]
+
+    def test_min_possessions(self, leaderboard):
+        """Lineups below the threshold stay off the board until they qualify"""
+        stats = LineupStats(players=set(), points_for=8, possessions_for=4)
+        leaderboard.update("a", stats)
+        assert leaderboard.top("ppp") == []
+
+        stats.possessions_for = 8
+        leaderboard.update("a", stats)
+        assert leaderboard.top("ppp") == [("a", 1.0)]
+        assert leaderboard.top("ppp", min_possessions=10) == []
+
+    def test_top_k(self, leaderboard):
+        for i in range(10):
+            leaderboard.update(str(i), LineupStats(players=set(), points_for=i, possessions_for=5))
+
+        assert [key for key, _ in leaderboard.top("ppp", 3)] == ["9", "8", "7"]
+
+    def test_unknown_metric(self, leaderboard):
+        with pytest.raises(ValueError):
+            leaderboard.top("plus_minus")
+
+
+class TestTrackerLeaderboard:
+    @pytest.fixture
+    def tracker(self):
+        tracker = LineupTracker(
+            game_id="2052400190",
+            snapshot="middle_of_third",
+            home_team_id=HOME_TEAM_ID,
+            away_team_id=AWAY_TEAM_ID
+        )
+        tracker.period_lineups[1] = {HOME_TEAM_ID: set(HOME_LINEUP), AWAY_TEAM_ID: set(AWAY_LINEUP)}
+        tracker.process_event({"Period": "1", "Game_clock": "12:00", "Msg_type": "12"})
+        return tracker
+
+    def test_events_update_leaderboard(self, tracker):
+        """Made shots and misses keep the cached metrics in sync with lineup_history"""
+        for _ in range(5):
+            tracker.process_event(SAMPLE_SHOT_MADE)
+            tracker.process_event(SAMPLE_SHOT_MISSED)
+
+        home_key = tracker.get_lineup_key(HOME_TEAM_ID)
+        away_key = tracker.get_lineup_key(AWAY_TEAM_ID)
+
+        assert tracker.leaderboard.metrics[home_key] == tracker.calculate_lineup_efficiency(home_key)
+        assert tracker.rank_lineups_by_metric("net_rating") == [(home_key, 2.0), (away_key, -2.0)]
+
+    def test_rank_matches_full_scan(self, tracker):
+        """The leaderboard returns the same ranking as scanning every lineup"""
+        for _ in range(6):
+            tracker.process_event(SAMPLE_SHOT_MADE)
+        tracker.process_event(SAMPLE_SUBSTITUTION)
+        for _ in range(6):
+            tracker.process_event(SAMPLE_SHOT_MISSED)
+
+        for metric in LineupLeaderboard.METRICS:
+            full_scan = sorted(
+                (
+                    (key, tracker.calculate_lineup_efficiency(key)[metric])
+                    for key, stats in tracker.lineup_history.items()
+                    if stats.possessions_for >= 5
+                ),
+                key=lambda x: x[1],
+                reverse=metric not in LineupLeaderboard.LOWER_IS_BETTER
+            )
+            assert [v for _, v in tracker.rank_lineups_by_metric(metric)] == [v for _, v in full_scan]
+
+    def test_substitution_credits_minutes(self, tracker):
+        starting_key = tracker.get_lineup_key(HOME_TEAM_ID)
+        tracker.process_event(SAMPLE_SUBSTITUTION)
+
+        assert "1642357" in tracker.current_lineups[HOME_TEAM_ID]
+        assert tracker.lineup_history[starting_key].minutes_played == pytest.approx(4.2)
+
+    def test_report_includes_best_lineups(self, tracker):
+        for _ in range(5):
+            tracker.process_event(SAMPLE_SHOT_MADE)
+
+        report = tracker.generate_lineup_report(top_k=1)
+        home_key = tracker.get_lineup_key(HOME_TEAM_ID)
+
+        assert report["bestLineups"]["ppp"] == [(home_key, 2.0)]
+        assert report["lineupStats"][home_key]["points_for"] == 10
+
+
+class TestCachedTracker:
+    def copy_files(self, source, target, *suffixes):
+        target.mkdir(exist_ok=True)
+        for suffix in suffixes:
+            shutil.copyfile(os.path.join(ORIGINAL_DATA_ROOT, source, f"2052400190_{suffix}"), target / f"2052400190_{suffix}")
+
+    def test_rebuilt_when_roster_changes(self, tmp_path, monkeypatch):
+        import app
+        for module in ("parse_xml", "event_store"):
+            monkeypatch.setattr(f"{module}.DATA_ROOT", str(tmp_path))
+        monkeypatch.setattr("parse_lineup_stints.SNAPSHOT_ROOT", tmp_path)
+        monkeypatch.setattr("event_store._stores", {})
+        monkeypatch.setattr(app, "lineup_trackers", {})
+
+        live = tmp_path / "live"
+        self.copy_files("middle_of_fourth", live, "game_info.xml", "boxscore.xml", "pbp_Q1.xml", "pbp_Q2.xml", "pbp_Q3.xml")
+        self.copy_files("middle_of_third", live, "roster_lineup.xml")
+        app.get_lineup_tracker("2052400190", "live")
+
+        self.copy_files("middle_of_fourth", live, "pbp_Q4.xml", "roster_lineup.xml")
+        tracker = app.get_lineup_tracker("2052400190", "live")
+        fresh = create_lineup_tracker("2052400190", "live", tracker.home_team_id, tracker.away_team_id)
+        fresh.process_pbp_events()
+
+        assert tracker.current_lineups == fresh.current_lineups
+        assert all(len(players) == 5 for players in tracker.current_lineups.values())
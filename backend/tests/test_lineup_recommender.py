@@ -0,0 +1,99 @@
+import itertools
+
+import numpy as np
+import pytest
+from lineup_recommender import LineupConstraints, LineupModel, LineupSearch, available_players, foul_trouble_limit
+
+TEAM_ID = "1612709903"
+
+
+@pytest.fixture
+def model():
+    rng = np.random.default_rng(7)
+    player_ids = [f"p{i}" for i in range(12)]
+    pairs = rng.normal(0, 4, (12, 12))
+    pairs = (pairs + pairs.T) / 2
+    np.fill_diagonal(pairs, 0)
+    return LineupModel(TEAM_ID, player_ids, rng.normal(0, 8, 12), pairs, np.full((12, 12), 50.0))
+
+
+def brute_force(model, candidates, positions, constraints, limit):
+    legal = []
+    for five in itertools.combinations(candidates, 5):
+        groups = [positions.get(p) for p in five]
+        if all(groups.count(g) >= n for g, n in constraints.min_positions.items()) and \
+                all(p in five for p in constraints.required):
+            legal.append(model.score(list(five))["score"])
+    return sorted(legal, reverse=True)[:limit]
+
+
+class TestLineupSearch:
+    def test_matches_brute_force(self, model):
+        positions = {p: "GGGGFFFFCCC?"[i] for i, p in enumerate(model.player_ids)}
+        constraints = LineupConstraints(min_positions={"G": 2, "F": 1, "C": 1})
+        search = LineupSearch(model, model.player_ids, positions, constraints, limit=3, time_budget=10)
+
+        ranked = search.run()
+
+        assert search.complete
+        assert [score for score, _ in ranked] == pytest.approx(brute_force(model, model.player_ids, positions, constraints, 3))
+        assert ranked[0][0] == pytest.approx(model.score(list(ranked[0][1]))["score"])
+
+    def test_prunes(self, model):
+        search = LineupSearch(model, model.player_ids, {}, LineupConstraints(min_positions={}), limit=1, time_budget=10)
+        search.run()
+
+        # C(12, 5) = 792 complete lineups without pruning
+        assert search.nodes < 792
+
+    def test_required_player(self, model):
+        constraints = LineupConstraints(min_positions={}, required=("p11",))
+        ranked = LineupSearch(model, model.player_ids, {}, constraints, limit=2, time_budget=10).run()
+
+        assert all("p11" in players for _, players in ranked)
+        assert [score for score, _ in ranked] == pytest.approx(brute_force(model, model.player_ids, {}, constraints, 2))
+
+    def test_infeasible_positions(self, model):
+        constraints = LineupConstraints(min_positions={"C": 2})
+        positions = {"p0": "C"}
+
+        assert LineupSearch(model, model.player_ids, positions, constraints, time_budget=10).run() == []
+
+    def test_time_budget(self, model):
+        search = LineupSearch(model, model.player_ids, {}, LineupConstraints(min_positions={}), limit=5, time_budget=0)
+        search.nodes = 255
+
+        assert search.run() == []
+        assert not search.complete
+
+
+class TestAvailablePlayers:
+    @pytest.fixture
+    def roster(self):
+        def person(active=True, position=""):
+            return {"team_id": TEAM_ID, "first_name": "A", "last_name": "B", "active": active, "lineup_position": position}
+        return {"p1": person(position="G"), "p2": person(), "p3": person(), "p4": person(active=False), "p5": person()}
+
+    @pytest.fixture
+    def boxscore(self):
+        def player(player_id, fouls=0, minutes=0, position=""):
+            return {"person_id": player_id, "team_id": TEAM_ID, "fouls": fouls, "minutes": minutes, "seconds": 0,
+                    "starting_position": position}
+        return {"players": [player("p1"), player("p2", fouls=6), player("p3", fouls=3, position="C"),
+                            player("p5", minutes=40)]}
+
+    def test_reasons(self, roster, boxscore):
+        available, players = available_players(roster, boxscore, TEAM_ID, 2, LineupConstraints(max_minutes=38))
+
+        assert available == ["p1"]
+        assert {p: info["unavailable"] for p, info in players.items()} == {
+            "p1": None, "p2": "fouled_out", "p3": "foul_trouble", "p4": "inactive", "p5": "minutes_limit"
+        }
+        assert players["p1"]["position"] == "G"
+        assert players["p3"]["position"] == "C"
+
+    def test_foul_trouble_allowed(self, roster, boxscore):
+        available, _ = available_players(roster, boxscore, TEAM_ID, 2, LineupConstraints(avoid_foul_trouble=False))
+
+        assert available == ["p1", "p3", "p5"]
+        assert foul_trouble_limit(5) == foul_trouble_limit(4) == 5
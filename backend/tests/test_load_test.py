@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+
+import pytest
+from flask import Flask, Response, jsonify, request
+from load_test import latency_summary, run_load_test
+from synthetic_games import write_synthetic_games
+from werkzeug.serving import make_server
+
+
+@pytest.fixture
+def server():
+    app = Flask(__name__)
+    seen = []
+
+    @app.route('/snapshots')
+    def get_snapshots():
+        return jsonify({"snapshots": ["End Of Game"]})
+
+    @app.route('/games')
+    def get_games():
+        return jsonify({"games": ["100", "200"]})
+
+    @app.route('/boxscore')
+    @app.route('/lineups')
+    @app.route('/pbp')
+    @app.route('/api/shots')
+    def get_game_data():
+        seen.append((request.path, request.args.get('snapshot'), request.args.get('game_id')))
+        return jsonify({"ok": True})
+
+    @app.route('/api/lineup-data/<game_id>/<snapshot>')
+    def get_lineup_data(game_id, snapshot):
+        seen.append((request.path, snapshot, game_id))
+        return jsonify({"ok": True})
+
+    @app.route('/api/stream/game-state')
+    def get_game_state_stream():
+        seen.append((request.path, request.args.get('fields'), request.args.get('game_id')))
+
+        def messages():
+            yield 'event: state\ndata: {"boxscore": {}}\n\n'
+            time.sleep(0.05)
+            yield 'event: delta\ndata: {"pbp": []}\n\n'
+            while True:
+                time.sleep(0.05)
+                yield ": keepalive\n\n"
+
+        return Response(messages(), mimetype='text/event-stream')
+
+    http_server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    http_server.seen = seen
+    yield http_server
+    http_server.shutdown()
+
+
+class TestLoadTest:
+    def test_replays_frontend_requests(self, server):
+        results = run_load_test(f"http://127.0.0.1:{server.port}", clients=2, duration=0.3, poll_seconds=0.1)
+
+        cold = results["cold"]
+        assert cold["errors"] == 0
+        assert cold["endpoints"]["snapshots"]["count"] == 2
+        assert set(cold["endpoints"]) == {"snapshots", "games", "stream", "boxscore", "shots", "lineup-data"}
+        assert set(results["warm"]["endpoints"]) == {"boxscore", "shots", "lineup-data"}
+        assert results["games"] == 2
+        assert results["warm"]["requests"] >= 6
+        assert results["streamPatches"] == 2
+        assert ("/api/stream/game-state", "boxscore,lineups,pbp", "200") in server.seen
+        assert ("/api/lineup-data/200/End Of Game", "End Of Game", "200") in server.seen
+
+    def test_legacy_mix(self, server):
+        results = run_load_test(f"http://127.0.0.1:{server.port}", clients=1, duration=0.1, poll_seconds=0.1, mix="legacy")
+
+        assert set(results["cold"]["endpoints"]) == {"snapshots", "games", "boxscore", "lineups", "pbp", "shots", "lineup-data"}
+        assert results["streamPatches"] == 0
+
+    def test_latency_summary(self):
+        summary = latency_summary([0.001 * i for i in range(1, 101)])
+
+        assert summary["count"] == 100
+        assert summary["p50Ms"] == pytest.approx(50.5)
+        assert summary["p99Ms"] == pytest.approx(99.01)
+
+
+class TestSyntheticGames:
+    def test_clones_bundled_game(self, tmp_path):
+        game_ids = write_synthetic_games(str(tmp_path), 2, snapshots=["end_of_game"])
+
+        assert len(game_ids) == 2
+        snapshot_dir = tmp_path / "end_of_game"
+        for game_id in game_ids + ["2052400190"]:
+            assert (snapshot_dir / f"{game_id}_pbp_Q5.xml").exists()
+        info = (snapshot_dir / f"{game_ids[0]}_game_info.xml").read_text()
+        assert f'Game_id="{game_ids[0]}"' in info and "2052400190" not in info
+        assert os.path.exists(tmp_path / "gleague_showcase_schedule.xml")
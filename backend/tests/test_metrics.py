@@ -0,0 +1,68 @@
+import time
+
+import metrics
+import pytest
+from flask import Flask, jsonify
+from metrics import Histogram, Metrics, init_metrics, metrics_response, record_phase
+
+
+@pytest.fixture
+def client(monkeypatch):
+    registry = Metrics()
+    monkeypatch.setattr(metrics, "_metrics", registry)
+
+    app = Flask(__name__)
+    init_metrics(app)
+
+    @app.route('/boxscore')
+    def get_boxscore():
+        time.sleep(0.005)
+        record_phase("parse", 0.002)
+        return jsonify({"players": list(range(50))})
+
+    @app.route('/metrics')
+    def get_metrics():
+        return metrics_response()
+
+    client = app.test_client()
+    client.registry = registry
+    return client
+
+
+class TestHistogram:
+    def test_cumulative_buckets(self):
+        histogram = Histogram((0.01, 0.1))
+        for value in (0.005, 0.01, 0.05, 3.0):
+            histogram.observe(value)
+
+        assert histogram.cumulative() == [("0.01", 2), ("0.1", 3), ("+Inf", 4)]
+        assert histogram.count == 4
+
+
+class TestRequestMetrics:
+    def test_latency_status_and_bytes(self, client):
+        body = client.get('/boxscore').data
+        client.get('/missing')
+        registry = client.registry
+
+        assert registry.value("http_requests_total", endpoint="get_boxscore", status="200") == 1
+        assert registry.value("http_requests_total", endpoint="unmatched", status="404") == 1
+        assert registry.value("http_response_bytes_total", endpoint="get_boxscore") == len(body)
+        assert registry.histograms["http_request_duration_seconds"][(("endpoint", "get_boxscore"),)].count == 1
+
+    def test_phases(self, client):
+        client.get('/boxscore')
+        registry = client.registry
+
+        assert registry.value("http_request_phase_seconds_total", endpoint="get_boxscore", phase="parse") == 0.002
+        assert registry.value("http_request_phase_seconds_total", endpoint="get_boxscore", phase="compute") >= 0.003
+
+    def test_text_exposition(self, client):
+        client.get('/boxscore')
+        metrics.record_cache("response", False)
+        text = client.get('/metrics').get_data(as_text=True)
+
+        assert '# TYPE http_request_duration_seconds histogram' in text
+        assert 'http_request_duration_seconds_bucket{endpoint="get_boxscore",le="+Inf"} 1' in text
+        assert 'cache_requests_total{cache="response",result="miss"} 1' in text
+        assert text.endswith("\n")
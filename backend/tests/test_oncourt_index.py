@@ -0,0 +1,114 @@
+import os
+import shutil
+
+import pytest
+from event_store import PbpEventStore
+from oncourt_index import OnCourtIndex, get_oncourt_index, load_period_lineups
+from parse_xml import DATA_ROOT as ORIGINAL_DATA_ROOT
+
+HOME_TEAM_ID = "1612709903"
+AWAY_TEAM_ID = "1612709924"
+
+HOME_LINEUP = {"1631131", "1641795", "1642262", "1642268", "1642271"}
+AWAY_LINEUP = {"1630539", "1641787", "1641989", "1642353", "1642484"}
+
+PERIOD_LINEUPS = {
+    1: {HOME_TEAM_ID: HOME_LINEUP, AWAY_TEAM_ID: AWAY_LINEUP},
+    2: {HOME_TEAM_ID: HOME_LINEUP, AWAY_TEAM_ID: AWAY_LINEUP},
+}
+
+EVENTS = [
+    {"Period": "1", "Game_clock": "12:00", "Msg_type": "12"},
+    {"Period": "1", "Game_clock": "11:33", "Msg_type": "1", "Team_id": HOME_TEAM_ID, "Person_id": "1631131", "Pts": "2"},
+    # Williams out, Jones Garcia in
+    {"Period": "1", "Game_clock": "7:48", "Msg_type": "8", "Team_id": HOME_TEAM_ID, "Person_id": "1642262", "Person_id2": "1642357"},
+    {"Period": "1", "Game_clock": "7:28", "Msg_type": "1", "Team_id": HOME_TEAM_ID, "Person_id": "1642357", "Pts": "2"},
+    {"Period": "1", "Game_clock": "0:00.0", "Msg_type": "13"},
+]
+
+PERIOD_TWO_EVENTS = [
+    {"Period": "2", "Game_clock": "12:00", "Msg_type": "12"},
+    {"Period": "2", "Game_clock": "10:00", "Msg_type": "2", "Team_id": AWAY_TEAM_ID, "Person_id": "1642353", "Pts": "0"},
+]
+
+
+class TestOnCourtIndex:
+    @pytest.fixture
+    def store(self):
+        store = PbpEventStore("2052400190", "middle_of_third", HOME_TEAM_ID, AWAY_TEAM_ID)
+        store.extend(EVENTS)
+        return store
+
+    @pytest.fixture
+    def index(self, store):
+        return OnCourtIndex(store, PERIOD_LINEUPS)
+
+    def test_starting_lineup(self, index):
+        on_court = index.on_court_at(1, "10:00")
+        assert set(on_court[HOME_TEAM_ID]) == HOME_LINEUP
+        assert set(on_court[AWAY_TEAM_ID]) == AWAY_LINEUP
+
+    def test_substitution_changes_lineup(self, index):
+        before = index.on_court_at(1, "7:49")[HOME_TEAM_ID]
+        at_sub = index.on_court_at(1, "7:48")[HOME_TEAM_ID]
+
+        assert "1642262" in before
+        assert "1642357" in at_sub and "1642262" not in at_sub
+
+    def test_lineup_at_event(self, index):
+        assert "1642262" in index.on_court_at_event(1)[HOME_TEAM_ID]
+        assert "1642357" in index.on_court_at_event(3)[HOME_TEAM_ID]
+
+    def test_player_intervals(self, index):
+        intervals = index.intervals_for("1642262")
+
+        assert len(intervals) == 1
+        assert intervals[0].start_elapsed == 0
+        assert intervals[0].end_elapsed == 252  # 12:00 -> 7:48
+        assert index.is_on_court("1642262", 1)
+        assert not index.is_on_court("1642262", 3)
+
+    def test_period_end_closes_intervals(self, index):
+        interval = index.intervals_for("1642357")[-1]
+        assert interval.end_event == 4
+        assert interval.end_elapsed == 720
+
+    def test_extend_with_new_events(self, store, index):
+        store.extend(PERIOD_TWO_EVENTS)
+        index.extend()
+
+        # Period 2 starts from its recorded starting five, so Williams is back
+        assert "1642262" in index.on_court_at(2, "11:00")[HOME_TEAM_ID]
+        assert len(index.intervals_for("1642262")) == 2
+        assert index.is_on_court("1642262", 6)
+
+
+class TestLiveFeed:
+    @pytest.fixture
+    def data_root(self, tmp_path, monkeypatch):
+        for module in ("parse_xml", "event_store", "oncourt_index"):
+            monkeypatch.setattr(f"{module}.DATA_ROOT", str(tmp_path))
+        monkeypatch.setattr("event_store._stores", {})
+        monkeypatch.setattr("oncourt_index._indexes", {})
+        return tmp_path
+
+    def copy_files(self, source, target, *suffixes):
+        target.mkdir(exist_ok=True)
+        for suffix in suffixes:
+            shutil.copyfile(os.path.join(ORIGINAL_DATA_ROOT, source, f"2052400190_{suffix}"), target / f"2052400190_{suffix}")
+
+    def test_new_period_uses_updated_roster(self, data_root):
+        # The fourth-quarter feed, before Q4 and its starting fives have arrived
+        live = data_root / "live"
+        self.copy_files("middle_of_fourth", live, "game_info.xml", "pbp_Q1.xml", "pbp_Q2.xml", "pbp_Q3.xml")
+        self.copy_files("middle_of_third", live, "roster_lineup.xml")
+        first = get_oncourt_index("live", "2052400190")
+
+        self.copy_files("middle_of_fourth", live, "pbp_Q4.xml", "roster_lineup.xml")
+        index = get_oncourt_index("live", "2052400190")
+        periods = load_period_lineups("live", "2052400190", HOME_TEAM_ID, AWAY_TEAM_ID)
+
+        assert index is not first
+        on_court = index.on_court_at(4, "11:59")
+        assert set(on_court[AWAY_TEAM_ID]) == periods[4][AWAY_TEAM_ID]
+        assert set(on_court[HOME_TEAM_ID]) == periods[4][HOME_TEAM_ID]
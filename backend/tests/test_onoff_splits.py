@@ -0,0 +1,74 @@
+import pytest
+from event_store import PbpEventStore
+from oncourt_index import OnCourtIndex
+from onoff_splits import compute_onoff, current_stint_plus_minus, incidence_matrix, onoff_metrics
+from season_aggregates import GamePartial, merge_partials, season_onoff_stats
+
+HOME_TEAM_ID = "1612709903"
+AWAY_TEAM_ID = "1612709924"
+
+HOME_LINEUP = {"1631131", "1641795", "1642262", "1642268", "1642271"}
+AWAY_LINEUP = {"1630539", "1641787", "1641989", "1642353", "1642484"}
+
+PERIOD_LINEUPS = {1: {HOME_TEAM_ID: HOME_LINEUP, AWAY_TEAM_ID: AWAY_LINEUP}}
+
+EVENTS = [
+    {"Period": "1", "Game_clock": "12:00", "Msg_type": "12"},
+    {"Period": "1", "Game_clock": "11:00", "Msg_type": "1", "Team_id": HOME_TEAM_ID, "Person_id": "1631131", "Pts": "2"},
+    {"Period": "1", "Game_clock": "10:00", "Msg_type": "2", "Team_id": AWAY_TEAM_ID, "Person_id": "1642484", "Pts": "0"},
+    {"Period": "1", "Game_clock": "9:00", "Msg_type": "6", "Action_type": "2", "Team_id": HOME_TEAM_ID, "Person_id": "1642262"},
+    {"Period": "1", "Game_clock": "9:00", "Msg_type": "3", "Option1": "1", "Team_id": AWAY_TEAM_ID, "Person_id": "1642484", "Pts": "1"},
+    # Williams out, Jones Garcia in between free throws
+    {"Period": "1", "Game_clock": "9:00", "Msg_type": "8", "Team_id": HOME_TEAM_ID, "Person_id": "1642262", "Person_id2": "1642357"},
+    {"Period": "1", "Game_clock": "9:00", "Msg_type": "3", "Option1": "1", "Team_id": AWAY_TEAM_ID, "Person_id": "1642484", "Pts": "1"},
+    {"Period": "1", "Game_clock": "8:00", "Msg_type": "1", "Team_id": AWAY_TEAM_ID, "Person_id": "1642353", "Pts": "3"},
+    {"Period": "1", "Game_clock": "6:00", "Msg_type": "5", "Team_id": HOME_TEAM_ID, "Person_id": "1631131"},
+]
+
+
+class TestOnOffSplits:
+    @pytest.fixture
+    def index(self):
+        store = PbpEventStore("2052400190", "middle_of_third", HOME_TEAM_ID, AWAY_TEAM_ID)
+        store.extend(EVENTS)
+        return OnCourtIndex(store, PERIOD_LINEUPS)
+
+    def test_incidence_matrix(self, index):
+        player_ids, sides, matrix = incidence_matrix(index)
+
+        assert matrix.shape == (11, len(EVENTS))
+        williams = player_ids.index("1642262")
+        assert matrix[williams].tolist() == [True] * 5 + [False] * 4
+        assert sides[player_ids.index("1642357")] == 0
+
+    def test_free_throws_credit_lineup_at_foul(self, index):
+        splits = compute_onoff(index)
+
+        # Williams was on for the foul, so both free throws count against him
+        assert splits["1642262"]["on_points_against"] == 2
+        assert splits["1642357"]["on_points_against"] == 3
+        assert onoff_metrics(splits["1642262"])["plus_minus"] == 0
+        assert onoff_metrics(splits["1642357"])["plus_minus"] == -3
+
+    def test_off_is_team_total_minus_on(self, index):
+        splits = compute_onoff(index)
+        williams = splits["1642262"]
+
+        assert williams["off_points_for"] == 0
+        assert williams["off_points_against"] == 3
+        assert williams["on_seconds"] + williams["off_seconds"] == 360
+        assert williams["on_possessions_for"] == 1
+        assert williams["off_possessions_for"] == 1
+
+    def test_current_stint_plus_minus(self, index):
+        assert current_stint_plus_minus(index, "1642357") == -3
+        assert current_stint_plus_minus(index, "1642262") == 0
+        assert current_stint_plus_minus(index, "1631131") == -3
+
+    def test_season_merge(self, index):
+        game = GamePartial(onoff=compute_onoff(index))
+        season = season_onoff_stats(merge_partials(game, game), HOME_TEAM_ID)
+
+        assert set(season) == HOME_LINEUP | {"1642357"}
+        assert season["1642357"]["games"] == 2
+        assert season["1642357"]["plus_minus"] == -6
@@ -0,0 +1,95 @@
+import app
+import pytest
+from event_store import PbpEventStore
+from pbp_feed import FeedFilter, PbpFeed, parse_feed_filter
+
+HOME_TEAM_ID = "1612709903"
+AWAY_TEAM_ID = "1612709924"
+
+
+def event(order, event_num, period, msg_type, person_id=None, person_id2=None):
+    attrs = {"PbpOrder": str(order), "Event_num": str(event_num), "Period": str(period),
+             "Game_clock": "5:00", "Msg_type": str(msg_type), "Team_id": HOME_TEAM_ID}
+    if person_id:
+        attrs["Person_id"] = person_id
+    if person_id2:
+        attrs["Person_id2"] = person_id2
+    return attrs
+
+
+EVENTS = [
+    event(1, 2, 1, 12),
+    event(2, 4, 1, 1, "101", "102"),
+    event(3, 9, 1, 2, "103"),
+    # Event_num out of feed order, as happens in the real feed
+    event(4, 7, 1, 4, "102"),
+    event(5, 11, 2, 12),
+    event(6, 12, 2, 1, "102"),
+    event(7, 13, 2, 6, "104"),
+]
+
+
+@pytest.fixture
+def store():
+    store = PbpEventStore("2052400190", "end_of_game", HOME_TEAM_ID, AWAY_TEAM_ID)
+    store.extend(EVENTS[:5])
+    return store
+
+
+def orders(result):
+    return [int(e["PbpOrder"]) for e in result["events"]]
+
+
+class TestPbpFeed:
+    def test_since_cursor(self, store):
+        feed = PbpFeed(store)
+        result = feed.delta(feed.position_after_cursor(3))
+
+        assert orders(result) == [4, 5]
+        assert (result["nextSince"], result["hasMore"], result["eventCount"]) == (5, False, 5)
+
+    def test_since_event_num_out_of_order(self, store):
+        feed = PbpFeed(store)
+
+        assert orders(feed.delta(feed.position_after_event_num(9))) == [4, 5]
+        with pytest.raises(ValueError):
+            feed.position_after_event_num(8)
+
+    def test_filters(self, store):
+        feed = PbpFeed(store)
+
+        # Assists (Person_id2) count as involvement
+        assert orders(feed.delta(0, FeedFilter(player_ids=(102,)))) == [2, 4]
+        assert orders(feed.delta(0, FeedFilter(periods=(1,), msg_types=(1, 2)))) == [2, 3]
+        assert orders(feed.delta(feed.position_after_cursor(1), FeedFilter(periods=(2,)))) == [5]
+
+    def test_extend_and_limit(self, store):
+        feed = PbpFeed(store)
+        store.extend(EVENTS[5:])
+        feed.extend()
+
+        first = feed.delta(feed.position_after_cursor(4), limit=2)
+        assert orders(first) == [5, 6]
+        assert (first["nextSince"], first["hasMore"]) == (6, True)
+        assert orders(feed.delta(feed.position_after_cursor(first["nextSince"]), FeedFilter(player_ids=(104,)))) == [7]
+
+    def test_cursor_round_trips_on_unordered_pbp_order(self):
+        # PbpOrder drops from 323 to 44 late in period 2 and repeats in period 3
+        client = app.app.test_client()
+        url = "/api/pbp-events?snapshot=middle_of_third&game_id=2052400190"
+        first = client.get(url).get_json()
+        assert first["eventCount"] == 326 and first["nextSince"] == 326
+        assert client.get(f"{url}&since={first['nextSince']}").get_json()["events"] == []
+
+        paged, since, has_more = [], 0, True
+        while has_more:
+            page = client.get(f"{url}&since={since}&limit=100").get_json()
+            paged += page["events"]
+            since, has_more = page["nextSince"], page["hasMore"]
+        assert paged == first["events"]
+        assert client.get(f"{url}&since=-1").status_code == 400
+
+    def test_parse_feed_filter(self):
+        assert parse_feed_filter("1,2", None, "101") == FeedFilter((1, 2), (), (101,))
+        with pytest.raises(ValueError):
+            parse_feed_filter("Q1")
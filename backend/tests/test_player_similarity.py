@@ -0,0 +1,117 @@
+from collections import OrderedDict
+
+import app
+import numpy as np
+import player_similarity
+import pytest
+from event_store import PbpEventStore
+from player_similarity import (ASSISTS, COUNT_FIELDS, FEATURE_NAMES, FT_ATTEMPTED, GAMES, ON_POSSESSIONS,
+                               ZONE_COUNT, PlayerSimilarityIndex, game_counts, season_similarity_index)
+from assist_network import ZONE_INDEX
+
+HOME_TEAM_ID = "1612709903"
+AWAY_TEAM_ID = "1612709924"
+
+EVENTS = [
+    {"Period": "1", "Game_clock": "12:00", "Msg_type": "12"},
+    # Made paint basket assisted by 1641795, then a made three from the top of the key
+    {"Period": "1", "Game_clock": "11:40", "Msg_type": "1", "Option1": "2", "Team_id": HOME_TEAM_ID,
+     "Person_id": "1631131", "Pts": "2", "LocationX": "0", "LocationY": "0",
+     "Person_id2": "1641795", "Stat_Category2": "AST"},
+    {"Period": "1", "Game_clock": "11:20", "Msg_type": "2", "Option1": "3", "Team_id": AWAY_TEAM_ID,
+     "Person_id": "1642484", "Pts": "0", "LocationX": "0", "LocationY": "280"},
+    {"Period": "1", "Game_clock": "11:00", "Msg_type": "3", "Option1": "1", "Team_id": HOME_TEAM_ID,
+     "Person_id": "1631131", "Pts": "1"},
+    {"Period": "1", "Game_clock": "10:40", "Msg_type": "5", "Team_id": HOME_TEAM_ID, "Person_id": "1631131"},
+]
+
+
+def profile(zone_attempts, zone_made, possessions=100, assists=0):
+    """Count vector with attempts/makes per zone name"""
+    counts = np.zeros(len(COUNT_FIELDS), dtype=np.int64)
+    for zone, attempts in zone_attempts.items():
+        counts[ZONE_INDEX[zone]] = attempts
+        counts[ZONE_COUNT + ZONE_INDEX[zone]] = zone_made.get(zone, 0)
+    counts[ON_POSSESSIONS] = possessions
+    counts[ASSISTS] = assists
+    counts[GAMES] = 1
+    return counts
+
+
+class TestGameCounts:
+    @pytest.fixture
+    def store(self):
+        store = PbpEventStore("2052400190", "end_of_game", HOME_TEAM_ID, AWAY_TEAM_ID)
+        store.extend(EVENTS)
+        return store
+
+    def test_counts(self, store):
+        counts = game_counts(store, {"1631131": {"on_seconds": 80.0, "on_possessions_for": 3}})
+        scorer = counts["1631131"]
+
+        assert scorer[ZONE_INDEX["paint"]] == 1
+        assert scorer[ZONE_COUNT + ZONE_INDEX["paint"]] == 1
+        assert scorer[FT_ATTEMPTED] == 1
+        assert scorer[ON_POSSESSIONS] == 3
+        assert counts["1641795"][ASSISTS] == 1
+        assert counts["1642484"][ZONE_INDEX["topKeyThree"]] == 1
+        assert counts["1642484"][ZONE_COUNT:2 * ZONE_COUNT].sum() == 0
+
+
+class TestPlayerSimilarityIndex:
+    @pytest.fixture
+    def index(self):
+        counts = {
+            "slasher_a": profile({"paint": 40, "midRange2": 5}, {"paint": 26, "midRange2": 2}),
+            "slasher_b": profile({"paint": 36, "midRange2": 6}, {"paint": 22, "midRange2": 2}),
+            "shooter_a": profile({"wingThree1": 20, "cornerThree1": 15, "topKeyThree": 10},
+                                 {"wingThree1": 8, "cornerThree1": 6, "topKeyThree": 4}, assists=12),
+            "shooter_b": profile({"wingThree2": 18, "cornerThree2": 14, "topKeyThree": 12},
+                                 {"wingThree2": 7, "cornerThree2": 6, "topKeyThree": 5}, assists=10),
+            "bench": profile({"paint": 3}, {"paint": 1}),
+        }
+        players = {player_id: {"name": player_id, "teamId": HOME_TEAM_ID if player_id.endswith("a") else AWAY_TEAM_ID}
+                   for player_id in counts}
+        return PlayerSimilarityIndex(counts, players, min_attempts=10)
+
+    def test_min_attempts(self, index):
+        assert "bench" not in index.rows
+        assert len(index) == 4
+        assert index.matrix.shape == (4, len(FEATURE_NAMES))
+        assert np.allclose(np.linalg.norm(index.matrix, axis=1), 1.0)
+
+    def test_similar(self, index):
+        matches = index.similar("slasher_a", limit=3)
+
+        assert [m["playerId"] for m in matches][0] == "slasher_b"
+        assert matches[0]["similarity"] > matches[-1]["similarity"]
+        assert "slasher_a" not in [m["playerId"] for m in matches]
+
+    def test_team_filter_and_unknown_player(self, index):
+        assert [m["playerId"] for m in index.similar("shooter_b", team_id=HOME_TEAM_ID)] == ["shooter_a", "slasher_a"]
+        assert index.similar("bench") == []
+
+    def test_shrunk_zone_pct(self, index):
+        features = index.describe("slasher_a")["features"]
+
+        assert features["paint_share"] == pytest.approx(40 / 45, abs=1e-4)
+        # 0-for-0 from the wing falls back to the pool's wing rate
+        assert features["wingThree1_pct"] == pytest.approx(8 / 20, abs=1e-4)
+        assert features["usage"] == pytest.approx(0.45)
+
+
+class TestSeasonIndex:
+    def test_index_cache_bound(self, monkeypatch):
+        monkeypatch.setattr(player_similarity, "MAX_INDEXES", 2)
+        monkeypatch.setattr(player_similarity, "_indexes", OrderedDict())
+        for min_attempts in (1, 2, 3):
+            season_similarity_index("end_of_game", min_attempts=min_attempts)
+
+        assert [key[2] for key in player_similarity._indexes] == [2, 3]
+
+    def test_bad_parameters_are_400(self):
+        client = app.app.test_client()
+        url = "/api/similar-players?snapshot=end_of_game&player_id=1641864"
+
+        for query in ("min_attempts=abc", "min_attempts=-1", "limit=x", "limit=0"):
+            assert client.get(f"{url}&{query}").status_code == 400
@@ -0,0 +1,90 @@
+import os
+
+import pytest
+from event_store import PbpEventStore
+from parse_xml import DATA_ROOT, parse_file
+from possession_chains import PossessionChains, get_possession_chains
+
+HOME_TEAM_ID = "1612709903"
+AWAY_TEAM_ID = "1612709924"
+
+
+def event(clock, msg_type, team_id=None, person_id=None, **extra):
+    attrs = {"Period": "1", "Game_clock": clock, "Msg_type": str(msg_type)}
+    if team_id:
+        attrs["Team_id"] = team_id
+    if person_id:
+        attrs["Person_id"] = person_id
+    attrs.update(extra)
+    return attrs
+
+
+EVENTS = [
+    event("12:00", 12),
+    event("11:40", 2, HOME_TEAM_ID, "1631131", Pts="0"),
+    event("11:38", 4, HOME_TEAM_ID, "1642268"),                 # offensive rebound
+    event("11:37", 1, HOME_TEAM_ID, "1642268", Pts="2"),        # putback
+    event("11:37", 6, AWAY_TEAM_ID, "1642484", Action_type="2"),
+    event("11:37", 3, HOME_TEAM_ID, "1642268", Pts="1", Option1="1"),  # and-one is a second-chance point
+    event("11:10", 2, AWAY_TEAM_ID, "1642484", Pts="0"),
+    event("11:08", 4, HOME_TEAM_ID, "1631131"),                 # defensive rebound
+    event("10:50", 2, HOME_TEAM_ID, "1641795", Pts="0"),
+    event("10:48", 4, HOME_TEAM_ID, "1631131"),                 # offensive rebound
+    event("10:40", 1, HOME_TEAM_ID, "1641795", Pts="3"),        # too late for a putback
+    event("10:20", 1, AWAY_TEAM_ID, "1642484", Pts="2"),
+    event("10:00", 2, AWAY_TEAM_ID, "1642484", Pts="0"),
+    event("9:58", 4, AWAY_TEAM_ID, "1642353"),                  # offensive rebound
+    event("9:50", 5, AWAY_TEAM_ID, "1642353"),
+]
+
+
+class TestPossessionChains:
+    @pytest.fixture
+    def store(self):
+        store = PbpEventStore("2052400190", "end_of_game", HOME_TEAM_ID, AWAY_TEAM_ID)
+        store.extend(EVENTS)
+        return store
+
+    def test_team_totals(self, store):
+        teams = PossessionChains(store).summary()["teams"]
+        home = teams[HOME_TEAM_ID]
+
+        assert home["offensive_rebounds"] == 2
+        assert home["defensive_rebounds"] == 1
+        assert home["offensive_rebound_chances"] == 2
+        assert home["offensive_rebound_rate"] == 1.0
+        assert home["second_chance_points"] == 6
+        assert teams[AWAY_TEAM_ID]["offensive_rebound_chances"] == 2
+        assert teams[AWAY_TEAM_ID]["offensive_rebound_rate"] == 0.5
+
+    def test_putbacks(self, store):
+        summary = PossessionChains(store).summary()
+
+        assert summary["teams"][HOME_TEAM_ID]["putback_attempts"] == 1
+        assert summary["teams"][HOME_TEAM_ID]["putback_points"] == 2
+        assert summary["players"]["1642268"]["putback_made"] == 1
+        assert summary["players"]["1642268"]["second_chance_points"] == 3
+
+    def test_chain_outcomes(self, store):
+        chains = PossessionChains(store).chains
+        assert [(chain["rebound_event"], chain["offensive"], chain["outcome"]) for chain in chains] == [
+            (2, True, "made_shot"), (7, False, "missed_shot"), (9, True, "made_shot"), (13, True, "turnover")
+        ]
+
+    def test_extend_matches_single_pass(self, store):
+        partial = PbpEventStore("2052400190", "end_of_game", HOME_TEAM_ID, AWAY_TEAM_ID)
+        partial.extend(EVENTS[:3])
+        chains = PossessionChains(partial)
+        partial.extend(EVENTS[3:])
+        chains.extend()
+
+        assert chains.summary() == PossessionChains(store).summary()
+
+    @pytest.mark.parametrize("snapshot", ["middle_of_third", "middle_of_fourth"])
+    def test_matches_boxscore(self, snapshot):
+        boxscore = parse_file(os.path.join(DATA_ROOT, snapshot, "2052400190_boxscore.xml"))
+        expected = {team.get("Team_id"): int(team.get("SecondChancePoints")) for team in boxscore.iter("Team_stats")}
+
+        teams = get_possession_chains(snapshot, "2052400190").summary()["teams"]
+
+        assert {team_id: row["second_chance_points"] for team_id, row in teams.items()} == expected
@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+import rapm
+from event_store import PbpEventStore
+from oncourt_index import OnCourtIndex
+from rapm import RapmSolver, Stint, game_design, game_stints, parse_ridge_lambda, season_rapm
+
+HOME_TEAM_ID = "1612709903"
+AWAY_TEAM_ID = "1612709924"
+
+HOME_LINEUP = {"1631131", "1641795", "1642262", "1642268", "1642271"}
+AWAY_LINEUP = {"1630539", "1641787", "1641989", "1642353", "1642484"}
+
+EVENTS = [
+    {"Period": "1", "Game_clock": "12:00", "Msg_type": "12"},
+    {"Period": "1", "Game_clock": "11:00", "Msg_type": "1", "Team_id": HOME_TEAM_ID, "Person_id": "1631131", "Pts": "2"},
+    {"Period": "1", "Game_clock": "10:00", "Msg_type": "2", "Team_id": AWAY_TEAM_ID, "Person_id": "1642484", "Pts": "0"},
+    {"Period": "1", "Game_clock": "9:00", "Msg_type": "6", "Action_type": "2", "Team_id": HOME_TEAM_ID, "Person_id": "1642262"},
+    {"Period": "1", "Game_clock": "9:00", "Msg_type": "3", "Option1": "1", "Team_id": AWAY_TEAM_ID, "Person_id": "1642484", "Pts": "1"},
+    {"Period": "1", "Game_clock": "9:00", "Msg_type": "8", "Team_id": HOME_TEAM_ID, "Person_id": "1642262", "Person_id2": "1642357"},
+    {"Period": "1", "Game_clock": "9:00", "Msg_type": "3", "Option1": "1", "Team_id": AWAY_TEAM_ID, "Person_id": "1642484", "Pts": "1"},
+    {"Period": "1", "Game_clock": "8:00", "Msg_type": "1", "Team_id": AWAY_TEAM_ID, "Person_id": "1642353", "Pts": "3"},
+    {"Period": "1", "Game_clock": "6:00", "Msg_type": "5", "Team_id": HOME_TEAM_ID, "Person_id": "1631131"},
+]
+
+
+def synthetic_season(games, seed=0, players_per_team=9, teams=6):
+    """Random stints where each player's true rating shifts their team's scoring"""
+    rng = np.random.default_rng(seed)
+    rosters = [[f"{team}{slot:02d}" for slot in range(players_per_team)] for team in range(teams)]
+    truth = {p: rng.normal(0, 4) for roster in rosters for p in roster}
+    season = []
+    for _ in range(games):
+        home, visitor = rng.choice(teams, 2, replace=False)
+        stints = []
+        for _ in range(30):
+            home_five = tuple(sorted(rng.choice(rosters[home], 5, replace=False)))
+            visitor_five = tuple(sorted(rng.choice(rosters[visitor], 5, replace=False)))
+            edge = sum(truth[p] for p in home_five) - sum(truth[p] for p in visitor_five)
+            possessions = float(rng.integers(2, 8))
+            stints.append(Stint(home_five, visitor_five,
+                                home_points=max(0.0, possessions * (1.05 + edge / 200) + rng.normal(0, 1)),
+                                visitor_points=max(0.0, possessions * (1.05 - edge / 200) + rng.normal(0, 1)),
+                                home_possessions=possessions, visitor_possessions=possessions))
+        season.append(game_design(stints))
+    return truth, season
+
+
+class TestGameStints:
+    def test_stints_split_on_substitution(self):
+        store = PbpEventStore("2052400190", "middle_of_third", HOME_TEAM_ID, AWAY_TEAM_ID)
+        store.extend(EVENTS)
+        stints = game_stints(OnCourtIndex(store, {1: {HOME_TEAM_ID: HOME_LINEUP, AWAY_TEAM_ID: AWAY_LINEUP}}))
+
+        assert len(stints) == 2
+        assert "1642262" in stints[0].home_players and "1642357" in stints[1].home_players
+        # Both free throws belong to the five on the floor for the foul
+        assert (stints[0].home_points, stints[0].visitor_points) == (2, 2)
+        assert (stints[1].home_points, stints[1].visitor_points) == (0, 3)
+        assert stints[1].home_possessions == 1
+
+
+class TestGameDesign:
+    def test_offense_and_defense_rows(self):
+        stint = Stint(("a", "b"), ("c", "d"), home_points=3, visitor_points=0, home_possessions=2, visitor_possessions=1)
+        design = game_design([stint])
+
+        # Two rows: home offense (weight 2, 150 pts/100) and visitor offense (weight 1, 0 pts/100)
+        assert design.weight == 3
+        assert design.weighted_target == pytest.approx(300)
+        assert design.gram[0, 0] == 3
+        assert design.gram[0, 2] == -3
+        assert design.xtwy.tolist() == pytest.approx([300, 300, -300, -300])
+
+
+class TestRapmSolver:
+    def test_recovers_player_ordering(self):
+        truth, season = synthetic_season(120)
+        solver = RapmSolver(ridge_lambda=50)
+        for game, design in enumerate(season):
+            solver.set_game(str(game), design)
+        coefficients = solver.solve()
+        estimated = np.array([coefficients[solver.rows[p]] for p in truth])
+
+        assert np.corrcoef(estimated, list(truth.values()))[0, 1] > 0.7
+
+    def test_incremental_matches_fresh_solve(self):
+        _, season = synthetic_season(40, seed=3)
+        solver = RapmSolver()
+        for game, design in enumerate(season[:-1]):
+            solver.set_game(str(game), design)
+        solver.solve()
+        solver.set_game("39", season[-1])
+        incremental = solver.solve()
+
+        fresh = RapmSolver()
+        for game, design in enumerate(season):
+            fresh.set_game(str(game), design)
+        expected = fresh.solve()
+
+        assert solver.last_solve["method"] == "cg"
+        assert fresh.last_solve["method"] == "factorization"
+        order = [fresh.rows[p] for p in solver.player_ids]
+        assert np.allclose(incremental, expected[order], atol=1e-6)
+
+    def test_replace_and_remove_game(self):
+        _, season = synthetic_season(6, seed=5)
+        solver = RapmSolver()
+        for game, design in enumerate(season[:5]):
+            solver.set_game(str(game), design)
+        solver.set_game("4", season[5])
+        solver.remove_game("0")
+
+        fresh = RapmSolver()
+        for game, design in [("1", season[1]), ("2", season[2]), ("3", season[3]), ("4", season[5])]:
+            fresh.set_game(game, design)
+
+        assert solver.league_average == pytest.approx(fresh.league_average)
+        assert {r["playerId"]: r["rapm"] for r in solver.ratings()} == \
+               pytest.approx({r["playerId"]: r["rapm"] for r in fresh.ratings()}, abs=0.01)
+
+
+class TestSeasonRapm:
+    @pytest.mark.parametrize("value", ["0", "-2000", "nan", "inf", "abc", ""])
+    def test_rejects_invalid_lambda(self, value):
+        with pytest.raises(ValueError):
+            parse_ridge_lambda(value)
+
+    def test_solver_cache_is_bounded(self, monkeypatch):
+        monkeypatch.setattr(rapm, "_solvers", rapm.OrderedDict())
+        monkeypatch.setattr(rapm, "MAX_SOLVERS", 2)
+
+        for ridge_lambda in (100.0, 200.0, 300.0):
+            season_rapm("end_of_game", game_ids=[], ridge_lambda=ridge_lambda)
+
+        assert list(rapm._solvers) == [("end_of_game", 200.0), ("end_of_game", 300.0)]
@@ -0,0 +1,88 @@
+import gzip
+import json
+
+import http_cache
+import numpy as np
+import pytest
+import response_cache
+from flask import Flask, jsonify, request
+from response_cache import ResponseCache, EncodedResponse, encode_json
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    snapshot_dir = tmp_path / "end_of_game"
+    snapshot_dir.mkdir()
+    (snapshot_dir / "100_boxscore.xml").write_text("<a/>")
+    monkeypatch.setattr(http_cache, "DATA_ROOT", str(tmp_path))
+    monkeypatch.setattr(http_cache, "SCHEDULE_FILE", str(tmp_path / "schedule.xml"))
+    monkeypatch.setattr(response_cache, "_cache", ResponseCache())
+
+    app = Flask(__name__)
+    http_cache.init_http_cache(app)
+    response_cache.init_response_cache(app)
+    calls = []
+
+    @app.route('/shots')
+    def get_shots():
+        calls.append(request.args.get('game_id'))
+        return jsonify({"shots": [{"x": i, "made": i % 3 == 0} for i in range(200)]})
+
+    client = app.test_client()
+    client.calls = calls
+    return client
+
+
+class TestEncodeJson:
+    def test_matches_default_provider(self):
+        payload = {"b": [1, 2.5, None], "a": {"z": True, "y": "é"}, 3: "int key"}
+        stdlib = json.dumps(payload, sort_keys=False, separators=(",", ":"))
+
+        assert json.loads(encode_json(payload)) == json.loads(stdlib)
+        assert list(json.loads(encode_json(payload))) == ["3", "a", "b"]
+
+    def test_numpy_values(self):
+        assert json.loads(encode_json({"n": np.int64(3), "v": np.arange(2)})) == {"n": 3, "v": [0, 1]}
+
+
+class TestResponseCache:
+    URL = '/shots?snapshot=end_of_game&game_id=100'
+
+    def test_second_request_served_from_bytes(self, client):
+        first = client.get(self.URL)
+        second = client.get(self.URL)
+
+        assert client.calls == ["100"]
+        assert first.data == second.data
+        assert second.headers["Vary"] == "Accept-Encoding"
+
+    def test_gzip_negotiated(self, client):
+        plain = client.get(self.URL, headers={"Accept-Encoding": "identity"})
+        compressed = client.get(self.URL, headers={"Accept-Encoding": "gzip"})
+        refused = client.get(self.URL, headers={"Accept-Encoding": "gzip;q=0"})
+
+        assert compressed.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(compressed.data) == plain.data
+        assert len(compressed.data) < len(plain.data)
+        assert "Content-Encoding" not in refused.headers
+
+    def test_lru_bound(self):
+        cache = ResponseCache(max_bytes=250)
+        for key in "abc":
+            cache.put(key, EncodedResponse("e", b"x" * 100, "application/json", 0.0))
+
+        assert len(cache) == 2
+        assert cache.get("a") is None and cache.get("c") is not None
+
+    def test_variant_counts_against_bound(self):
+        cache = ResponseCache(max_bytes=2600)
+        for key in "ab":
+            cache.put(key, EncodedResponse("e", bytes(range(256)) * 5, "application/json", 0.0))
+        assert cache.total_bytes == 2560
+
+        cache.get("b").variant("gzip")
+
+        assert len(cache) == 1 and cache.get("a") is None
+        assert cache.total_bytes == cache.get("b").size
+        cache.clear()
+        assert cache.total_bytes == 0
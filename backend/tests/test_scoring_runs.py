@@ -0,0 +1,100 @@
+from collections import OrderedDict
+
+import app
+import numpy as np
+import pytest
+import scoring_runs
+from event_store import PbpEventStore
+from scoring_runs import RunDefinition, RunDetector, best_window, find_streaks, get_run_detector
+
+HOME_TEAM_ID = "1612709903"
+AWAY_TEAM_ID = "1612709924"
+
+
+def basket(clock, team_id, points, period="1"):
+    return {"Period": period, "Game_clock": clock, "Msg_type": "1", "Team_id": team_id, "Person_id": "1631131", "Pts": str(points)}
+
+
+EVENTS = [
+    {"Period": "1", "Game_clock": "12:00", "Msg_type": "12"},
+    basket("11:30", HOME_TEAM_ID, 2),
+    basket("11:00", AWAY_TEAM_ID, 3),
+    basket("10:30", AWAY_TEAM_ID, 2),
+    {"Period": "1", "Game_clock": "10:10", "Msg_type": "2", "Team_id": HOME_TEAM_ID, "Person_id": "1631131", "Pts": "0"},
+    basket("9:00", AWAY_TEAM_ID, 3),
+    basket("5:00", AWAY_TEAM_ID, 2),
+    basket("4:30", HOME_TEAM_ID, 2),
+    basket("4:00", HOME_TEAM_ID, 3),
+]
+
+
+class TestStreakHelpers:
+    def test_find_streaks(self):
+        starts, totals = find_streaks(np.array([0, 1, 1, 1, 0]), np.array([2, 3, 2, 3, 2]))
+
+        assert starts.tolist() == [0, 1, 4]
+        assert totals.tolist() == [2, 8, 2]
+
+    def test_best_window(self):
+        elapsed = np.array([0.0, 100.0, 110.0, 400.0])
+        assert best_window(elapsed, np.array([3, 2, 3, 2]), 120) == (0, 2, 8)
+        assert best_window(elapsed, np.array([3, 2, 3, 2]), 30) == (1, 2, 5)
+
+
+class TestRunDetector:
+    @pytest.fixture
+    def store(self):
+        store = PbpEventStore("2052400190", "middle_of_third", HOME_TEAM_ID, AWAY_TEAM_ID)
+        store.extend(EVENTS)
+        return store
+
+    def test_unanswered_runs(self, store):
+        detector = RunDetector(store, None, RunDefinition(min_points=5))
+        runs = detector.runs
+
+        assert [(run.team_id, run.points) for run in runs] == [(AWAY_TEAM_ID, 10), (HOME_TEAM_ID, 5)]
+        assert (runs[0].start_clock, runs[0].end_clock) == ("11:00", "5:00")
+        assert detector.longest_runs() == {HOME_TEAM_ID: 5, AWAY_TEAM_ID: 10}
+
+    def test_time_window(self, store):
+        # The 10-0 took six minutes, but 8 of it came inside two and a half
+        runs = RunDetector(store, None, RunDefinition(min_points=8, window_seconds=150)).runs
+
+        assert [(run.points, run.start_clock, run.end_clock) for run in runs] == [(8, "11:00", "9:00")]
+
+    def test_extend_grows_open_run(self, store):
+        detector = RunDetector(store, None, RunDefinition(min_points=5))
+        store.extend([basket("3:00", HOME_TEAM_ID, 2), basket("2:00", AWAY_TEAM_ID, 2)])
+        detector.extend()
+
+        assert [(run.team_id, run.points) for run in detector.finished] == [(AWAY_TEAM_ID, 10), (HOME_TEAM_ID, 7)]
+        assert detector.open_run is None
+
+
+class TestDetectorCache:
+    def test_custom_definitions_are_bounded(self, monkeypatch):
+        monkeypatch.setattr(scoring_runs, "_detectors", {})
+        monkeypatch.setattr(scoring_runs, "_custom_detectors", OrderedDict())
+        monkeypatch.setattr(scoring_runs, "MAX_CUSTOM_DETECTORS", 2)
+
+        get_run_detector("end_of_game", "2052400190")
+        for min_points in (6, 7, 9):
+            get_run_detector("end_of_game", "2052400190", RunDefinition(min_points=min_points))
+
+        assert list(scoring_runs._detectors) == [("end_of_game", "2052400190", RunDefinition())]
+        assert [key[2].min_points for key in scoring_runs._custom_detectors] == [7, 9]
+
+
+class TestRunDefinition:
+    def test_rejects_bad_values(self):
+        for kwargs in ({"min_points": 0}, {"min_points": -3}, {"window_seconds": -5}, {"window_seconds": float("nan")}):
+            with pytest.raises(ValueError):
+                RunDefinition(**kwargs)
+
+    def test_bad_parameters_are_400(self):
+        client = app.app.test_client()
+        url = "/api/runs?snapshot=end_of_game&game_id=2052400190"
+
+        for query in ("min_points=0", "min_points=-3&window_seconds=-5", "window_seconds=abc"):
+            assert client.get(f"{url}&{query}").status_code == 400
+        assert client.get(f"{url}&min_points=8&window_seconds=120").status_code == 200
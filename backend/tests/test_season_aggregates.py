@@ -0,0 +1,71 @@
+from season_aggregates import GamePartial, merge_partials, season_lineup_stats, season_player_stats
+
+LINEUP_KEY = "1612709903-1631131_1641795_1642262_1642268_1642271"
+
+
+def make_partial(game_id, points_for, possessions, longest_stint):
+    return GamePartial(
+        games={game_id: {"game_id": game_id, "game_date": "2024-12-12"}},
+        lineups={
+            LINEUP_KEY: {
+                "points_for": points_for,
+                "points_against": 10,
+                "possessions_for": possessions,
+                "possessions_against": possessions,
+                "minutes_played": 6.0,
+                "games": 1
+            }
+        },
+        stints={"1631131": {"stints": 3, "seconds": 900, "longest_stint": longest_stint, "games": 1}},
+        players={
+            "1631131": {
+                "team_id": "1612709903",
+                "fg_made": 4,
+                "fg_attempted": 8,
+                "turnovers": 1,
+                "fouls": 2,
+                "seconds": 900,
+                "games": 1
+            }
+        }
+    )
+
+
+class TestMergePartials:
+    def test_merge_is_associative(self):
+        a = make_partial("1", 12, 10, 300)
+        b = make_partial("2", 8, 10, 420)
+        c = make_partial("3", 20, 12, 200)
+
+        assert merge_partials(merge_partials(a, b), c) == merge_partials(a, merge_partials(b, c))
+
+    def test_empty_partial_is_identity(self):
+        a = make_partial("1", 12, 10, 300)
+
+        assert merge_partials(GamePartial(), a) == a
+        assert merge_partials(a, GamePartial()) == a
+
+    def test_merge_does_not_modify_inputs(self):
+        a = make_partial("1", 12, 10, 300)
+        b = make_partial("2", 8, 10, 420)
+        merge_partials(a, b)
+
+        assert a.lineups[LINEUP_KEY]["points_for"] == 12
+
+    def test_merged_stats(self):
+        merged = merge_partials(make_partial("1", 12, 10, 300), make_partial("2", 8, 10, 420))
+
+        lineup = season_lineup_stats(merged)[LINEUP_KEY]
+        assert lineup["games"] == 2
+        assert lineup["efficiency"]["ppp"] == 1.0
+
+        player = season_player_stats(merged, "1612709903")["1631131"]
+        assert player["minutes_per_game"] == 15.0
+        assert player["longest_stint_seconds"] == 420
+        assert player["avg_stint_seconds"] == 300
+
+    def test_min_possessions_and_team_filter(self):
+        merged = make_partial("1", 12, 4, 300)
+
+        assert season_lineup_stats(merged, min_possessions=5) == {}
+        assert season_lineup_stats(merged, team_id="1612709924") == {}
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+from event_store import PbpEventStore
+from oncourt_index import OnCourtIndex
+from situations import masked_lineup_stats, masked_shot_stats, masked_stats, situation_masks
+
+HOME_TEAM_ID = "1612709903"
+AWAY_TEAM_ID = "1612709924"
+
+HOME_LINEUP = {"1631131", "1641795", "1642262", "1642268", "1642271"}
+AWAY_LINEUP = {"1630539", "1641787", "1641989", "1642353", "1642484"}
+
+
+def foul(clock, team_id, period="1", action_type="1"):
+    return {"Period": period, "Game_clock": clock, "Msg_type": "6", "Action_type": action_type, "Team_id": team_id, "Person_id": "1642268"}
+
+
+EVENTS = [
+    {"Period": "1", "Game_clock": "12:00", "Msg_type": "12"},
+    {"Period": "1", "Game_clock": "11:00", "Msg_type": "9", "Team_id": HOME_TEAM_ID},
+    {"Period": "1", "Game_clock": "11:00", "Msg_type": "8", "Team_id": HOME_TEAM_ID, "Person_id": "1642262", "Person_id2": "1642357"},
+    {"Period": "1", "Game_clock": "10:40", "Msg_type": "1", "Team_id": HOME_TEAM_ID, "Person_id": "1631131", "Pts": "2"},
+    {"Period": "1", "Game_clock": "10:20", "Msg_type": "2", "Team_id": HOME_TEAM_ID, "Person_id": "1631131", "Pts": "0"},
+    foul("9:00", AWAY_TEAM_ID),
+    foul("8:00", AWAY_TEAM_ID),
+    foul("7:00", AWAY_TEAM_ID, action_type="4"),  # offensive, not a team foul
+    foul("6:00", AWAY_TEAM_ID),
+    foul("5:00", AWAY_TEAM_ID),
+    {"Period": "1", "Game_clock": "5:00", "Msg_type": "3", "Option1": "1", "Team_id": HOME_TEAM_ID, "Person_id": "1631131", "Pts": "1"},
+    {"Period": "1", "Game_clock": "1:30", "Msg_type": "1", "Team_id": AWAY_TEAM_ID, "Person_id": "1642484", "Pts": "2"},
+    {"Period": "1", "Game_clock": "0:00", "Msg_type": "13"},
+    {"Period": "2", "Game_clock": "12:00", "Msg_type": "12"},
+    {"Period": "2", "Game_clock": "11:00", "Msg_type": "1", "Team_id": HOME_TEAM_ID, "Person_id": "1631131", "Pts": "2"},
+]
+
+CLUTCH_EVENTS = [
+    {"Period": "4", "Game_clock": "12:00", "Msg_type": "12"},
+    {"Period": "4", "Game_clock": "6:00", "Msg_type": "1", "Team_id": HOME_TEAM_ID, "Person_id": "1631131", "Pts": "2"},
+    {"Period": "4", "Game_clock": "4:00", "Msg_type": "1", "Team_id": HOME_TEAM_ID, "Person_id": "1631131", "Pts": "3"},
+    {"Period": "4", "Game_clock": "3:00", "Msg_type": "1", "Team_id": HOME_TEAM_ID, "Person_id": "1631131", "Pts": "3"},
+    {"Period": "4", "Game_clock": "2:00", "Msg_type": "1", "Team_id": AWAY_TEAM_ID, "Person_id": "1642484", "Pts": "3"},
+    {"Period": "4", "Game_clock": "1:00", "Msg_type": "1", "Team_id": AWAY_TEAM_ID, "Person_id": "1642484", "Pts": "3"},
+    {"Period": "4", "Game_clock": "0:10", "Msg_type": "1", "Team_id": AWAY_TEAM_ID, "Person_id": "1642484", "Pts": "2"},
+    {"Period": "4", "Game_clock": "0:00", "Msg_type": "13"},
+    # Untimed overtime runs down from 99:00
+    {"Period": "5", "Game_clock": "99:00", "Msg_type": "12"},
+    {"Period": "5", "Game_clock": "98:00", "Msg_type": "1", "Team_id": AWAY_TEAM_ID, "Person_id": "1642484", "Pts": "2"},
+]
+
+
+def make_store(events):
+    store = PbpEventStore("2052400190", "end_of_game", HOME_TEAM_ID, AWAY_TEAM_ID)
+    store.extend(events)
+    return store
+
+
+class TestSituationMasks:
+    @pytest.fixture
+    def masks(self):
+        return situation_masks(make_store(EVENTS))
+
+    def test_after_timeout_covers_next_possession(self, masks):
+        assert masks["after_timeout"].tolist()[:5] == [False, False, True, True, False]
+
+    def test_bonus_uses_team_fouls_in_period(self, masks):
+        # Fifth away foul is the fourth team foul, so the free throw after it is in the bonus
+        assert not masks["bonus"][9]
+        assert masks["bonus"][10]
+        # Fouls reset in the second period
+        assert not masks["bonus"][14]
+
+    def test_end_of_period(self, masks):
+        assert masks["end_of_period"][11]
+        assert not masks["end_of_period"][10]
+
+    def test_clutch(self):
+        masks = situation_masks(make_store(CLUTCH_EVENTS))
+
+        # 6:00 is too early, 2:00 comes with the home team up 8, untimed overtime counts throughout
+        assert masks["clutch"].tolist() == [False, False, True, True, False, True, True, True, True, True]
+
+    def test_masked_stats(self):
+        store = make_store(CLUTCH_EVENTS)
+        stats = masked_stats(store, situation_masks(store)["clutch"])
+
+        assert stats["teams"][HOME_TEAM_ID]["points"] == 6
+        assert stats["teams"][AWAY_TEAM_ID]["points"] == 7
+        assert stats["players"]["1631131"]["fg_made"] == 2
+
+    def test_masked_lineup_stats(self):
+        store = make_store(EVENTS)
+        oncourt = OnCourtIndex(store, {period: {HOME_TEAM_ID: HOME_LINEUP, AWAY_TEAM_ID: AWAY_LINEUP} for period in (1, 2)})
+
+        lineups = masked_lineup_stats(oncourt, situation_masks(store)["after_timeout"])
+
+        # Only the five that came on at the timeout played the after-timeout possession
+        home_key = f"{HOME_TEAM_ID}-1631131_1641795_1642268_1642271_1642357"
+        away_key = f"{AWAY_TEAM_ID}-{'_'.join(sorted(AWAY_LINEUP))}"
+        assert set(lineups) == {home_key, away_key}
+        assert lineups[home_key]["points_for"] == 2
+        assert lineups[home_key]["possessions_for"] == 1
+        assert lineups[home_key]["seconds"] == 40
+        assert lineups[away_key]["points_against"] == 2
+
+    def test_masked_shot_stats(self):
+        store = make_store(EVENTS)
+        zones = np.zeros(len(store), dtype=np.int64)
+        zones[3], zones[4] = 1, 6
+
+        shots = masked_shot_stats(store, zones, {0: "unknown", 1: "paint", 6: "midRange2"}, store.period == 1)
+
+        assert shots[HOME_TEAM_ID] == {"paint": {"made": 1, "attempts": 1}, "midRange2": {"made": 0, "attempts": 1}}
+        assert shots[AWAY_TEAM_ID] == {"unknown": {"made": 1, "attempts": 1}}
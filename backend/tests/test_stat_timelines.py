@@ -0,0 +1,74 @@
+import pytest
+from event_store import PbpEventStore
+from stat_timelines import StatTimeline
+
+HOME_TEAM_ID = "1612709903"
+AWAY_TEAM_ID = "1612709924"
+
+EVENTS = [
+    {"Period": "1", "Game_clock": "12:00", "Msg_type": "12"},
+    {"Period": "1", "Game_clock": "11:00", "Msg_type": "1", "Option1": "3", "Team_id": HOME_TEAM_ID, "Person_id": "1631131", "Pts": "3"},
+    {"Period": "1", "Game_clock": "10:00", "Msg_type": "2", "Option1": "2", "Team_id": AWAY_TEAM_ID, "Person_id": "1642484", "Pts": "0"},
+    {"Period": "1", "Game_clock": "9:55", "Msg_type": "4", "Team_id": HOME_TEAM_ID, "Person_id": "1642268"},
+    {"Period": "1", "Game_clock": "6:00", "Msg_type": "6", "Action_type": "2", "Team_id": HOME_TEAM_ID, "Person_id": "1642268"},
+    {"Period": "1", "Game_clock": "6:00", "Msg_type": "3", "Option1": "1", "Team_id": AWAY_TEAM_ID, "Person_id": "1642484", "Pts": "1"},
+    {"Period": "1", "Game_clock": "6:00", "Msg_type": "3", "Option1": "2", "Team_id": AWAY_TEAM_ID, "Person_id": "1642484", "Pts": "0"},
+    {"Period": "1", "Game_clock": "2:00", "Msg_type": "6", "Action_type": "11", "Team_id": AWAY_TEAM_ID, "Person_id": "1642484"},
+    {"Period": "1", "Game_clock": "0:00", "Msg_type": "13"},
+    {"Period": "2", "Game_clock": "12:00", "Msg_type": "12"},
+    {"Period": "2", "Game_clock": "11:30", "Msg_type": "5", "Team_id": HOME_TEAM_ID, "Person_id": "1631131"},
+]
+
+
+class TestStatTimeline:
+    @pytest.fixture
+    def store(self):
+        store = PbpEventStore("2052400190", "middle_of_third", HOME_TEAM_ID, AWAY_TEAM_ID)
+        store.extend(EVENTS)
+        return store
+
+    @pytest.fixture
+    def timeline(self, store):
+        return StatTimeline(store)
+
+    def test_full_game_totals(self, timeline, store):
+        teams = timeline.team_stats(0, len(store))
+
+        assert teams[HOME_TEAM_ID]["points"] == 3
+        assert teams[HOME_TEAM_ID]["three_made"] == 1
+        assert teams[HOME_TEAM_ID]["rebounds"] == 1
+        assert teams[AWAY_TEAM_ID]["ft_made"] == 1
+        assert teams[AWAY_TEAM_ID]["ft_attempted"] == 2
+        # Technicals are not personal fouls
+        assert teams[AWAY_TEAM_ID]["fouls"] == 0
+
+    def test_time_window(self, timeline):
+        lo, hi = timeline.event_range(60, 360)  # 11:00 to 6:00 of the first period
+        teams = timeline.team_stats(lo, hi)
+
+        assert teams[HOME_TEAM_ID]["fg_attempted"] == 1
+        assert teams[AWAY_TEAM_ID]["fg_attempted"] == 1
+        assert teams[AWAY_TEAM_ID]["points"] == 1
+
+    def test_period_and_last_seconds(self, timeline):
+        assert timeline.team_stats(*timeline.period_range(2))[HOME_TEAM_ID]["turnovers"] == 1
+        assert timeline.team_stats(*timeline.period_range(2))[HOME_TEAM_ID]["points"] == 0
+        assert timeline.last_seconds(30) == (8, 11)
+
+    def test_player_window(self, timeline):
+        players = timeline.player_stats(0, 7, ["1642484", "1642268", "unknown"])
+
+        assert set(players) == {"1642484", "1642268"}
+        assert players["1642484"]["points"] == 1
+        assert players["1642268"]["fouls"] == 1
+
+    def test_extend_matches_full_build(self, store):
+        partial = PbpEventStore("2052400190", "middle_of_third", HOME_TEAM_ID, AWAY_TEAM_ID)
+        partial.extend(EVENTS[:4])
+        timeline = StatTimeline(partial)
+        partial.extend(EVENTS[4:])
+        timeline.extend()
+
+        full = StatTimeline(store)
+        assert (timeline.team_prefix == full.team_prefix).all()
+        assert timeline.player_stats(2, 9) == full.player_stats(2, 9)
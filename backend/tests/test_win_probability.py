@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from event_store import PbpEventStore
+from win_probability import WinProbabilitySeries, pregame_probability, win_probability
+
+HOME_TEAM_ID = "1612709903"
+AWAY_TEAM_ID = "1612709924"
+
+
+def event(clock, msg_type, team_id, offense, points="0", period="1", person="1631131"):
+    return {"Period": period, "Game_clock": clock, "Msg_type": msg_type, "Team_id": team_id,
+            "Offensive_Team_id": offense, "Person_id": person, "Pts": points, "Option1": "2"}
+
+
+EVENTS = [
+    {"Period": "1", "Game_clock": "12:00", "Msg_type": "12", "Offensive_Team_id": "0"},
+    event("11:40", "1", HOME_TEAM_ID, HOME_TEAM_ID, "2"),
+    event("11:20", "2", AWAY_TEAM_ID, AWAY_TEAM_ID, person="1642484"),
+    event("11:18", "4", HOME_TEAM_ID, AWAY_TEAM_ID),
+    event("11:00", "1", HOME_TEAM_ID, HOME_TEAM_ID, "3"),
+]
+
+
+class TestWinProbability:
+    def test_symmetry_and_limits(self):
+        margins = np.array([5.0, -5.0, 0.0, 0.0, 3.0])
+        remaining = np.array([600.0, 600.0, 0.0, 2880.0, 0.0])
+        probability = win_probability(margins, remaining, np.zeros(5))
+
+        assert probability[0] > 0.5 > probability[1]
+        assert probability[2] == 0.5
+        assert probability[3] == pytest.approx(pregame_probability())
+        assert probability[4] == 1.0
+
+    def test_possession_matters_more_late(self):
+        early = win_probability(np.zeros(2), np.full(2, 2000.0), np.array([1, -1]))
+        late = win_probability(np.zeros(2), np.full(2, 10.0), np.array([1, -1]))
+
+        assert late[0] - late[1] > early[0] - early[1]
+        assert late[0] < 0.9
+
+    def test_untimed_overtime_race(self):
+        home_needed = np.array([1.0, 7.0, 0.0, np.nan])
+        visitor_needed = np.array([7.0, 1.0, 3.0, np.nan])
+        probability = win_probability(np.zeros(4), np.full(4, 100.0), np.zeros(4), home_needed, visitor_needed)
+
+        assert probability[0] > 0.9
+        assert probability[1] < 0.1
+        assert probability[2] == 1.0
+
+
+class TestWinProbabilitySeries:
+    @pytest.fixture
+    def store(self):
+        store = PbpEventStore("2052400190", "end_of_game", HOME_TEAM_ID, AWAY_TEAM_ID)
+        store.extend(EVENTS[:3])
+        return store
+
+    def test_possession_from_next_event(self, store):
+        series = WinProbabilitySeries(store)
+
+        # After the home basket the visitors have the ball; the miss leaves it unknown
+        assert list(series.possession) == [0, -1, 0]
+
+    def test_extend_matches_rebuild(self, store):
+        series = WinProbabilitySeries(store)
+        store.extend(EVENTS[3:])
+        series.extend()
+
+        rebuilt = WinProbabilitySeries(store)
+        assert series.events_covered == len(store)
+        assert np.allclose(series.home_win, rebuilt.home_win)
+        # The shooting team keeps the ball until the rebound hands it to home
+        assert list(series.possession) == [0, -1, -1, 1, -1]
+
+    def test_swings(self, store):
+        store.extend(EVENTS[3:])
+        swings = WinProbabilitySeries(store).swings(limit=2)
+
+        assert len(swings) == 2
+        assert abs(swings[0]["change"]) >= abs(swings[1]["change"])
+        assert swings[0]["homeWinProbability"] == pytest.approx(swings[0]["before"] + swings[0]["change"])
@@ -0,0 +1,200 @@
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy.special import ndtr
+
+from event_store import (HOME, PERIOD_END, PERIOD_START, REGULATION_PERIOD_SECONDS, REGULATION_PERIODS, VISITOR,
+                         PbpEventStore, default_period_start, get_event_store)
+from game_simulator import UNTIMED_OVERTIME_POINTS, possession_after
+
+GAME_SECONDS = REGULATION_PERIODS * REGULATION_PERIOD_SECONDS
+# Spread of the final margin from tip-off; it shrinks with the square root of the time left
+FINAL_MARGIN_SIGMA = 13.0
+# What having the ball is worth and how much one possession's points vary,
+# which keeps the last seconds of a close game from swinging to near-certainty
+POSSESSION_POINTS = 1.0
+POSSESSION_SIGMA = 1.5
+HOME_COURT_POINTS = 1.0
+# Spread per point still needed in untimed overtime
+UNTIMED_SIGMA = 1.5
+
+def win_probability(margin: np.ndarray, seconds_remaining: np.ndarray, possession: np.ndarray,
+                    home_needed: Optional[np.ndarray] = None, visitor_needed: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Home win probability for many game states at once
+
+    Timed play uses a normal model of the final margin: the current margin
+    plus the possession and the remaining share of home-court edge, with a
+    spread of FINAL_MARGIN_SIGMA * sqrt(share of the game left) on top of
+    one possession's spread. Untimed overtime is a race to a target score,
+    so it compares the points each team still needs instead of the clock.
+
+    Args:
+        margin: Home score minus visitor score
+        seconds_remaining: Seconds left in regulation (or in a timed overtime)
+        possession: +1 home ball, -1 visitor ball, 0 unknown
+        home_needed: Points home still needs in untimed overtime (NaN where not in one)
+        visitor_needed: Points visitor still needs in untimed overtime (NaN where not in one)
+
+    Returns:
+        Array of home win probabilities
+    """
+    margin = np.asarray(margin, dtype=np.float64)
+    share = np.clip(np.asarray(seconds_remaining, dtype=np.float64), 0, None) / GAME_SECONDS
+    running = share > 0
+    expected = margin + (possession * POSSESSION_POINTS + HOME_COURT_POINTS * share) * running
+    spread = np.sqrt(FINAL_MARGIN_SIGMA ** 2 * share + POSSESSION_SIGMA ** 2)
+    probability = np.where(running, ndtr(expected / spread), 0.5 * (1 + np.sign(margin)))
+
+    if home_needed is not None and visitor_needed is not None:
+        untimed = ~np.isnan(home_needed)
+        if untimed.any():
+            home_left = np.clip(home_needed[untimed], 0, None)
+            visitor_left = np.clip(visitor_needed[untimed], 0, None)
+            edge = visitor_left - home_left + possession[untimed] * POSSESSION_POINTS
+            spread = UNTIMED_SIGMA * np.sqrt(np.maximum((home_left + visitor_left) / 2, 1e-9))
+            race = ndtr(edge / spread)
+            race = np.where(home_left == 0, 1.0, np.where(visitor_left == 0, 0.0, race))
+            probability[untimed] = race
+    return probability
+
+def pregame_probability() -> float:
+    """Home win probability at tip-off"""
+    return float(win_probability(np.zeros(1), np.full(1, GAME_SECONDS), np.zeros(1))[0])
+
+class WinProbabilitySeries:
+    """
+    Home win probability after every event of a game.
+
+    The model is evaluated in one vectorized pass over the store's score,
+    period/clock and possession columns. Possession after an event is the
+    Offensive_Team_id of the next event, which isn't known for the newest
+    event yet, so extend() recomputes from that event onward.
+    """
+
+    def __init__(self, store: PbpEventStore):
+        self.store = store
+        self.home_win = np.zeros(0)
+        self.possession = np.zeros(0, dtype=np.int64)
+        self.events_covered = 0
+        self.extend()
+
+    def _untimed_targets(self) -> Dict[int, Tuple[int, int]]:
+        """Target scores for each untimed overtime period in the store"""
+        store = self.store
+        targets = {}
+        for period, (first, _) in store.period_offsets.items():
+            if period > REGULATION_PERIODS and store.period_start_clock.get(period, 0) > default_period_start(period):
+                home_start = int(store.home_score[first] - store.home_points[first])
+                visitor_start = int(store.visitor_score[first] - store.visitor_points[first])
+                targets[period] = (home_start + UNTIMED_OVERTIME_POINTS, visitor_start + UNTIMED_OVERTIME_POINTS)
+        return targets
+
+    def extend(self) -> None:
+        """Evaluate events added to the store since the last call"""
+        store = self.store
+        start = max(0, self.events_covered - 1)
+        end = len(store)
+        if end == start:
+            return
+
+        # Possession after each event: offense of the next event, or inferred for the newest one
+        next_offense = [store.team_side_of(event.get("Offensive_Team_id")) for event in store.events[start + 1:end]]
+        offense = np.array(next_offense + [possession_after(store)], dtype=np.int64)
+        possession = np.where(offense == HOME, 1, np.where(offense == VISITOR, -1, 0))
+        possession[np.isin(store.msg_type[start:end], (PERIOD_START, PERIOD_END))] = 0
+
+        period = store.period[start:end]
+        clock = store.clock[start:end]
+        regulation_left = (REGULATION_PERIODS - period) * REGULATION_PERIOD_SECONDS + clock
+        seconds_remaining = np.where(period <= REGULATION_PERIODS, regulation_left, clock)
+        home_score = store.home_score[start:end]
+        visitor_score = store.visitor_score[start:end]
+
+        home_needed = np.full(end - start, np.nan)
+        visitor_needed = np.full(end - start, np.nan)
+        for untimed_period, (home_target, visitor_target) in self._untimed_targets().items():
+            rows = period == untimed_period
+            home_needed[rows] = home_target - home_score[rows]
+            visitor_needed[rows] = visitor_target - visitor_score[rows]
+
+        values = win_probability(home_score - visitor_score, seconds_remaining, possession, home_needed, visitor_needed)
+        self.home_win = np.concatenate([self.home_win[:start], values])
+        self.possession = np.concatenate([self.possession[:start], possession])
+        self.events_covered = end
+
+    def swings(self, limit: int = 5) -> List[Dict]:
+        """
+        Events that moved the home win probability the most
+
+        Args:
+            limit: Number of events to return
+
+        Returns:
+            List of swing dicts, biggest absolute change first
+        """
+        before = np.concatenate([[pregame_probability()], self.home_win[:-1]])
+        change = self.home_win - before
+        if len(change) > limit:
+            candidates = np.argpartition(-np.abs(change), limit - 1)[:limit]
+        else:
+            candidates = np.arange(len(change))
+        order = candidates[np.argsort(-np.abs(change[candidates]), kind="stable")]
+        return [{**self.point(int(i)), "before": float(before[i]), "change": float(change[i])} for i in order]
+
+    def point(self, index: int) -> Dict:
+        """One event of the series"""
+        store = self.store
+        event = store.events[index]
+        return {
+            "event": index,
+            "pbpOrder": int(store.pbp_order[index]),
+            "period": int(store.period[index]),
+            "gameClock": event.get("Game_clock", ""),
+            "homeScore": int(store.home_score[index]),
+            "visitorScore": int(store.visitor_score[index]),
+            "teamId": event.get("Team_id", ""),
+            "playerName": event.get("Last_name", ""),
+            "msgType": int(store.msg_type[index]),
+            "description": event.get("Description", ""),
+            "homeWinProbability": float(self.home_win[index]),
+        }
+
+    def series(self) -> List[Dict]:
+        """Compact chart points: event index, elapsed seconds, period and home win probability"""
+        store = self.store
+        return [
+            {"event": i, "elapsed": float(store.elapsed[i]), "period": int(store.period[i]),
+             "homeWinProbability": round(float(p), 4)}
+            for i, p in enumerate(self.home_win)
+        ]
+
+# Series keyed by (snapshot_dir_name, game_id)
+_series: Dict[Tuple[str, str], WinProbabilitySeries] = {}
+_series_lock = threading.Lock()
+
+def get_win_probability_series(snapshot: str, game_id: str) -> Optional[WinProbabilitySeries]:
+    """
+    Get the win probability series for a game, extended with any newly arrived events
+
+    Args:
+        snapshot: Snapshot name or directory name
+        game_id: Game identifier
+
+    Returns:
+        WinProbabilitySeries, or None if the game has no event store
+    """
+    store = get_event_store(snapshot, game_id)
+    if store is None:
+        return None
+
+    key = (store.snapshot, game_id)
+    with _series_lock:
+        series = _series.get(key)
+        if series is None or series.store is not store:
+            series = WinProbabilitySeries(store)
+            _series[key] = series
+        elif series.events_covered < len(store):
+            series.extend()
+        return series
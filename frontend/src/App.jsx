@@ -4,6 +4,20 @@ import TopBanner from './components/TopBanner';
 import TeamPanel from './components/TeamPanel';
 import VisualizationContainer from './components/VisualizationContainer';
 
+// RFC 7386 merge patch: null removes a key, objects merge, anything else replaces
+function applyMergePatch(target, patch) {
+  if (patch === null || typeof patch !== 'object' || Array.isArray(patch)) return patch;
+  const result = target && typeof target === 'object' && !Array.isArray(target) ? { ...target } : {};
+  Object.entries(patch).forEach(([key, value]) => {
+    if (value === null) {
+      delete result[key];
+    } else {
+      result[key] = applyMergePatch(result[key], value);
+    }
+  });
+  return result;
+}
+
 function App() {
   const [snapshots, setSnapshots] = useState([]);
   const [selectedSnapshot, setSelectedSnapshot] = useState('');
@@ -12,6 +26,7 @@ function App() {
   const [boxscoreData, setBoxscoreData] = useState(null);
   const [lineupsData, setLineupsData] = useState(null);
   const [pbpData, setPbpData] = useState(null);
+  const [streamParams, setStreamParams] = useState(null);
 
   const [showFullScreen, setShowFullScreen] = useState(false);
   const [selectedPlayer, setSelectedPlayer] = useState(null);
@@ -29,6 +44,7 @@ function App() {
     const snap = e.target.value;
     setSelectedSnapshot(snap);
     setSelectedGame('');
+    setStreamParams(null);
     setBoxscoreData(null);
     setLineupsData(null);
     setPbpData(null);
@@ -51,34 +67,40 @@ function App() {
     setPbpData(null);
 
     if (gameId && selectedSnapshot) {
-      // Fetch boxscore
-      fetch(`http://localhost:5002/boxscore?snapshot=${selectedSnapshot}&game_id=${gameId}`)
-        .then(res => res.json())
-        .then(data => {
-          setBoxscoreData(data);
-          if (data && data.game_info) {
-            setShowFullScreen(true);
-          }
-        })
-        .catch(console.error);
-
-      // Fetch lineups
-      fetch(`http://localhost:5002/lineups?snapshot=${selectedSnapshot}&game_id=${gameId}`)
-        .then(res => res.json())
-        .then(data => {
-          console.log('Lineup data received:', data); // Debug log
-          setLineupsData(data.lineups); // Note: we're setting data.lineups directly
-        })
-        .catch(console.error);
-
-      // Fetch pbp
-      fetch(`http://localhost:5002/pbp?snapshot=${selectedSnapshot}&game_id=${gameId}`)
-        .then(res => res.json())
-        .then(data => setPbpData(data))
-        .catch(console.error);
+      setStreamParams({ snapshot: selectedSnapshot, gameId });
+    } else {
+      setStreamParams(null);
     }
   };
 
+  // Subscribe to the game state: the server sends it in full once, then merge patches as the game changes
+  useEffect(() => {
+    if (!streamParams) return undefined;
+    let state = {};
+    const applyState = () => {
+      const boxscore = state.boxscore;
+      setBoxscoreData(boxscore);
+      if (boxscore && boxscore.game_info) {
+        setShowFullScreen(true);
+      }
+      setLineupsData(state.lineups);
+      setPbpData({ pbp: state.pbp });
+    };
+    const source = new EventSource(
+      `http://localhost:5002/api/stream/game-state?snapshot=${streamParams.snapshot}&game_id=${streamParams.gameId}&fields=boxscore,lineups,pbp`
+    );
+    source.addEventListener('state', (e) => {
+      state = JSON.parse(e.data);
+      applyState();
+    });
+    source.addEventListener('delta', (e) => {
+      state = applyMergePatch(state, JSON.parse(e.data));
+      applyState();
+    });
+    source.onerror = (e) => console.error('Game state stream error:', e);
+    return () => source.close();
+  }, [streamParams]);
+
   const handlePlayerSelect = (playerId) => {
     if (playerId === 'TEAM' || playerId === 'team-total') {
       setSelectedTeam(null);